@@ -0,0 +1,111 @@
+"""
+Executa a suíte de benchmarks sobre dados sintéticos e grava os resultados em JSON.
+
+Uso:
+    python -m benchmarks [--escala 10k|100k|1m] [--vendas N] [--iteracoes N] [--saida resultados.json]
+                         [--comparar anterior.json] [--tolerancia 0.20] [--metricas]
+
+Com --comparar, cada cenário é confrontado com o mesmo cenário do arquivo
+anterior pela mediana (p50); se algum ficar mais lento que a tolerância, a
+execução termina com código 1, para uso em integração contínua.
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+from typing import Dict
+
+from benchmarks import cenarios, gerador
+from utils import metricas
+
+SUFIXOS = {"k": 1_000, "m": 1_000_000}
+
+
+def ler_escala(texto: str) -> int:
+    """Aceita '10000', '10k', '100k' ou '1m'."""
+    texto = texto.strip().lower()
+    if texto and texto[-1] in SUFIXOS:
+        return int(texto[:-1]) * SUFIXOS[texto[-1]]
+    return int(texto)
+
+
+def comparar(atual: Dict[str, dict], anterior: Dict[str, dict], tolerancia: float) -> int:
+    """Imprime a variação de p50 por cenário e retorna quantos regrediram além da tolerância."""
+    regressoes = 0
+    print(f"\n{'cenário':<32} {'anterior p50':>14} {'atual p50':>14} {'variação':>10}")
+    for nome, estat in atual.items():
+        base = anterior.get(nome)
+        if base is None or not base["p50_us"]:
+            print(f"{nome:<32} {'-':>14} {estat['p50_us']:>12.1f}us {'novo':>10}")
+            continue
+        razao = estat["p50_us"] / base["p50_us"]
+        marca = ""
+        if razao > 1 + tolerancia:
+            regressoes += 1
+            marca = "  <-- REGRESSÃO"
+        print(f"{nome:<32} {base['p50_us']:>12.1f}us {estat['p50_us']:>12.1f}us {razao - 1:>+9.1%}{marca}")
+    return regressoes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", type=ler_escala, default=gerador.ESCALAS[0],
+                        help="medicamentos e clientes gerados (padrão: 10k)")
+    parser.add_argument("--vendas", type=int, default=None, help="vendas no histórico (padrão: igual à escala)")
+    parser.add_argument("--iteracoes", type=int, default=1_000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", default=None, help="arquivo JSON de resultados")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.20,
+                        help="piora relativa de p50 aceita antes de acusar regressão")
+    parser.add_argument("--metricas", action="store_true",
+                        help="liga a instrumentação durante os cenários (mede o seu custo)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    dados = gerador.gerar(args.escala, args.vendas, args.semente)
+    geracao = time.perf_counter() - inicio
+    print(f"Dados gerados em {geracao:.1f}s: {args.escala:,} medicamentos, {args.escala:,} clientes, "
+          f"{len(dados.nomes_laboratorios):,} laboratórios.")
+
+    if args.metricas:
+        metricas.habilitar()
+    resultados = cenarios.executar(dados, args.iteracoes)
+    print(f"\n{'cenário':<32} {'iter':>6} {'p50':>12} {'p99':>12} {'ops/s':>12}")
+    for nome, estat in resultados.items():
+        print(f"{nome:<32} {estat['iteracoes']:>6} {estat['p50_us']:>10.1f}us {estat['p99_us']:>10.1f}us "
+              f"{estat['ops_por_s']:>12,.0f}")
+
+    relatorio = {
+        "escala": args.escala,
+        "vendas": args.escala if args.vendas is None else args.vendas,
+        "semente": args.semente,
+        "iteracoes": args.iteracoes,
+        "metricas": args.metricas,
+        "geracao_s": round(geracao, 3),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "data_hora": datetime.datetime.now().isoformat(timespec="seconds"),
+        "cenarios": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.saida}.")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)
+        if anterior.get("escala") != args.escala:
+            print(f"Aviso: a execução anterior usou escala {anterior.get('escala')}, não {args.escala}.")
+        regressoes = comparar(resultados, anterior["cenarios"], args.tolerancia)
+        if regressoes:
+            print(f"\n{regressoes} cenário(s) acima da tolerância de {args.tolerancia:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
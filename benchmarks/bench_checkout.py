@@ -0,0 +1,74 @@
+"""
+Mede a vazão do motor de vendas (carrinhos precificados e confirmados por segundo).
+
+Uso:
+    python -m benchmarks.bench_checkout [--carrinhos N] [--itens K]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from entidades.cliente import Cliente
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import MedicamentoQuimioterapico, MedicamentoFitoterapico
+from services import registrar_cliente, registrar_laboratorio, registrar_medicamento
+from motor_vendas import checkout, checkout_lote
+
+# Referência de receita usada em todos os carrinhos (exigida pelos itens controlados).
+RECEITA = "REC-BENCH"
+
+
+def popular(n_clientes: int = 1_000, n_medicamentos: int = 5_000, semente: int = 42) -> None:
+    """Cadastra um catálogo e uma base de clientes sintéticos."""
+    rnd = random.Random(semente)
+    lab = Laboratorio("Lab Bench", "Rua do Teste, 1", "0000-0000", "São Paulo", "SP")
+    registrar_laboratorio(lab)
+    for i in range(n_medicamentos):
+        preco = round(rnd.uniform(2.0, 120.0), 2)
+        if i % 2:
+            registrar_medicamento(MedicamentoQuimioterapico(f"Med{i:06d}", "composto", lab, "descrição",
+                                                            preco, i % 7 == 0))
+        else:
+            registrar_medicamento(MedicamentoFitoterapico(f"Med{i:06d}", "planta", lab, "descrição", preco))
+    for i in range(n_clientes):
+        nascimento = datetime.date(rnd.randint(1930, 2005), rnd.randint(1, 12), rnd.randint(1, 28))
+        registrar_cliente(Cliente(f"{i:011d}", f"Cliente {i}", nascimento))
+
+
+def gerar_carrinhos(n: int, itens_por_carrinho: int, n_clientes: int, n_medicamentos: int,
+                    semente: int = 7) -> list:
+    rnd = random.Random(semente)
+    return [(f"{rnd.randrange(n_clientes):011d}",
+             [(f"Med{rnd.randrange(n_medicamentos):06d}", rnd.randint(1, 3)) for _ in range(itens_por_carrinho)])
+            for _ in range(n)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--carrinhos", type=int, default=50_000)
+    parser.add_argument("--itens", type=int, default=3)
+    args = parser.parse_args()
+
+    n_clientes, n_medicamentos = 1_000, 5_000
+    popular(n_clientes, n_medicamentos)
+    carrinhos = gerar_carrinhos(args.carrinhos, args.itens, n_clientes, n_medicamentos)
+
+    inicio = time.perf_counter()
+    for cpf, itens in carrinhos[:len(carrinhos) // 2]:
+        checkout(cpf, itens, receita=RECEITA)
+    individual = time.perf_counter() - inicio
+
+    segunda_metade = carrinhos[len(carrinhos) // 2:]
+    inicio = time.perf_counter()
+    lote = checkout_lote(segunda_metade, receitas=[RECEITA] * len(segunda_metade))
+    em_lote = time.perf_counter() - inicio
+
+    metade = len(carrinhos) // 2
+    print(f"checkout individual: {metade / individual:,.0f} carrinhos/s ({metade} carrinhos, {args.itens} itens)")
+    print(f"checkout_lote:       {len(lote.resultados) / em_lote:,.0f} carrinhos/s "
+          f"({len(lote.resultados)} confirmados, {len(lote.erros)} rejeitados)")
+
+
+if __name__ == "__main__":
+    main()
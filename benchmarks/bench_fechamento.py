@@ -0,0 +1,53 @@
+"""
+Mede o fechamento do dia em paralelo com 1, 2, 4... processos (até o número de
+núcleos) e confere que todos chegam aos mesmos números de `estatisticas`.
+
+Uso:
+    python -m benchmarks.bench_fechamento [--escala 10k] [--vendas 500k] [--processos N] [--particao 50k]
+"""
+import argparse
+import os
+import time
+
+from benchmarks import gerador
+from benchmarks.__main__ import ler_escala
+from data import estatisticas
+from relatorios import fechamento
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", type=ler_escala, default=gerador.ESCALAS[0])
+    parser.add_argument("--vendas", type=ler_escala, default=500_000)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="máximo de processos")
+    parser.add_argument("--particao", type=ler_escala, default=fechamento.TAMANHO_PARTICAO,
+                        help="vendas por partição")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    gerador.gerar(args.escala, args.vendas)
+    print(f"Dados gerados em {time.perf_counter() - inicio:.1f}s: {args.vendas:,} vendas.")
+
+    # A primeira chamada também projeta as vendas nas partições; as seguintes só agregam.
+    particoes = fechamento.ParticionamentoVendas(args.particao)
+    inicio = time.perf_counter()
+    fechamento.fechar_dia(1, particoes=particoes)
+    print(f"particionamento + agregação (1 processo): {time.perf_counter() - inicio:.2f}s")
+
+    base = None
+    processos = 1
+    while processos <= args.processos:
+        inicio = time.perf_counter()
+        resultado = fechamento.fechar_dia(processos, particoes=particoes)
+        tempo = time.perf_counter() - inicio
+        base = base or tempo
+        assert resultado.mais_vendido()[:2] == estatisticas.mais_vendido()[:2]
+        assert resultado.total_quimio_vendido_qtde == estatisticas.total_quimio_vendido_qtde
+        assert resultado.total_fito_vendido_qtde == estatisticas.total_fito_vendido_qtde
+        print(f"{resultado.processos:>3} processo(s): {tempo:.2f}s | {base / tempo:.2f}x "
+              f"({resultado.particoes} partições)")
+        processos *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Mede bytes por cliente, por medicamento (SKU) e por venda, comparando o layout
+compacto atual (classes com __slots__ e itens de venda em arrays) com o layout
+anterior (classes com __dict__ e lista de tuplas por venda), reproduzido aqui.
+
+Uso:
+    python -m benchmarks.bench_memoria [--n N] [--itens K]
+"""
+import argparse
+import datetime
+import gc
+import tracemalloc
+from typing import Callable, List
+
+from entidades.cliente import Cliente
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import MedicamentoFitoterapico
+from entidades.venda import Venda
+
+
+class _ClienteLegado:
+    def __init__(self, cpf, nome, data_nascimento):
+        self.cpf = cpf
+        self.nome = nome
+        self.data_nascimento = data_nascimento
+
+
+class _MedicamentoLegado:
+    def __init__(self, nome, composto_principal, laboratorio, descricao, preco):
+        self.nome = nome
+        self.composto_principal = composto_principal
+        self.laboratorio = laboratorio
+        self.descricao = descricao
+        self.preco = preco
+
+
+class _VendaLegada:
+    def __init__(self, data_hora, itens, cliente, valor_total):
+        self.data_hora = data_hora
+        self.itens = itens
+        self.cliente = cliente
+        self.valor_total = valor_total
+
+
+def venda_armazenada(*args) -> Venda:
+    """Venda com os itens já no armazém compartilhado, como fica depois de registrada."""
+    venda = Venda(*args)
+    venda.armazenar_itens()
+    return venda
+
+
+def bytes_por_objeto(n: int, fabrica: Callable[[int], object]) -> float:
+    """Memória alocada por `fabrica(i)`, em média, para n objetos mantidos vivos."""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    objetos: List[object] = [fabrica(i) for i in range(n)]
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Desconta a própria lista que guarda os objetos.
+    return (depois - antes - objetos.__sizeof__()) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--itens", type=int, default=3)
+    args = parser.parse_args()
+    n, k = args.n, args.itens
+
+    lab = Laboratorio("Lab Bench", "Rua do Teste, 1", "0000-0000", "São Paulo", "SP")
+    nascimento = datetime.date(1980, 5, 17)
+    agora = datetime.datetime.now()
+    cliente = Cliente("00000000000", "Cliente", nascimento)
+    meds = [MedicamentoFitoterapico(f"Med{i}", "planta", lab, "descrição", 10.0) for i in range(k)]
+    meds_legados = [_MedicamentoLegado(f"Med{i}", "planta", lab, "descrição", 10.0) for i in range(k)]
+
+    # Os textos são compartilhados entre as instâncias, para medir só o custo das entidades.
+    linhas = [
+        ("cliente",
+         bytes_por_objeto(n, lambda i: _ClienteLegado("cpf", "nome", nascimento)),
+         bytes_por_objeto(n, lambda i: Cliente("cpf", "nome", nascimento))),
+        ("medicamento",
+         bytes_por_objeto(n, lambda i: _MedicamentoLegado("nome", "planta", lab, "descrição", 10.0)),
+         bytes_por_objeto(n, lambda i: MedicamentoFitoterapico("nome", "planta", lab, "descrição", 10.0))),
+        (f"venda ({k} itens)",
+         bytes_por_objeto(n, lambda i: _VendaLegada(agora, [(m, 1000 + i) for m in meds_legados], cliente, 1.5 * i)),
+         bytes_por_objeto(n, lambda i: venda_armazenada(agora, [(m, 1000 + i) for m in meds], cliente, 1.5 * i))),
+    ]
+    print(f"{'entidade':<18}{'antes (B)':>12}{'depois (B)':>12}{'redução':>10}")
+    for nome, antes, depois in linhas:
+        print(f"{nome:<18}{antes:>12.0f}{depois:>12.0f}{1 - depois / antes:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
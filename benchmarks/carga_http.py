@@ -0,0 +1,137 @@
+"""
+Teste de carga do servidor HTTP em localhost, com latências p50/p99.
+
+Sem --porta, sobe o servidor em um subprocesso com um catálogo sintético.
+Cada conexão envia --requisicoes requisições em keep-alive, em rajadas de
+--pipeline requisições enviadas antes de ler as respostas.
+
+Uso:
+    python -m benchmarks.carga_http [--conexoes 1000] [--requisicoes 20] [--pipeline 1] [--porta P]
+"""
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+N_CLIENTES = 1_000
+N_MEDICAMENTOS = 5_000
+
+
+def _subir_servidor(porta: int) -> None:
+    """Ponto de entrada do subprocesso: popula dados sintéticos e serve."""
+    from benchmarks.bench_checkout import popular
+    import servidor_http
+    popular(N_CLIENTES, N_MEDICAMENTOS)
+    asyncio.run(servidor_http.servir("127.0.0.1", porta))
+
+
+def _requisicao(rnd: random.Random) -> bytes:
+    sorteio = rnd.random()
+    if sorteio < 0.4:
+        alvo = f"/medicamentos?criterio=nome&termo=Med{rnd.randrange(N_MEDICAMENTOS):06d}"
+    elif sorteio < 0.7:
+        alvo = f"/clientes/{rnd.randrange(N_CLIENTES):011d}"
+    elif sorteio < 0.95:
+        corpo = (f'{{"cpf": "{rnd.randrange(N_CLIENTES):011d}", '
+                 f'"itens": [["Med{rnd.randrange(N_MEDICAMENTOS):06d}", {rnd.randint(1, 3)}]], '
+                 f'"receita": "REC-{rnd.randrange(10 ** 6):06d}"}}').encode()
+        return (b"POST /vendas HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(corpo)).encode() + b"\r\n\r\n" + corpo)
+    else:
+        alvo = "/estatisticas?top=5"
+    return f"GET {alvo} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+
+
+async def _ler_resposta(reader: asyncio.StreamReader) -> int:
+    cabecalho = await reader.readuntil(b"\r\n\r\n")
+    status = int(cabecalho.split(b" ", 2)[1])
+    for linha in cabecalho.split(b"\r\n"):
+        if linha.lower().startswith(b"content-length:"):
+            await reader.readexactly(int(linha.split(b":", 1)[1]))
+            break
+    return status
+
+
+async def _cliente(porta: int, requisicoes: int, pipeline: int, semente: int,
+                   latencias: List[float], erros: List[int]) -> None:
+    rnd = random.Random(semente)
+    reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+    try:
+        feitas = 0
+        while feitas < requisicoes:
+            rajada = min(pipeline, requisicoes - feitas)
+            inicio = time.perf_counter()
+            writer.write(b"".join(_requisicao(rnd) for _ in range(rajada)))
+            await writer.drain()
+            for _ in range(rajada):
+                status = await _ler_resposta(reader)
+                latencias.append(time.perf_counter() - inicio)
+                if status >= 500:
+                    erros.append(status)
+            feitas += rajada
+    finally:
+        writer.close()
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def _executar(porta: int, conexoes: int, requisicoes: int, pipeline: int) -> None:
+    latencias: List[float] = []
+    erros: List[int] = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_cliente(porta, requisicoes, pipeline, i, latencias, erros) for i in range(conexoes)))
+    duracao = time.perf_counter() - inicio
+    print(f"{conexoes} conexões x {requisicoes} requisições (pipeline {pipeline}) em {duracao:.2f}s")
+    print(f"vazão: {len(latencias) / duracao:,.0f} req/s | erros 5xx: {len(erros)}")
+    print(f"latência p50: {percentil(latencias, 50) * 1000:.2f} ms | p99: {percentil(latencias, 99) * 1000:.2f} ms")
+
+
+async def _aguardar_porta(porta: int, limite: float = 30.0) -> None:
+    prazo = time.monotonic() + limite
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", porta)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > prazo:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conexoes", type=int, default=1000)
+    parser.add_argument("--requisicoes", type=int, default=20)
+    parser.add_argument("--pipeline", type=int, default=1)
+    parser.add_argument("--porta", type=int, help="porta de um servidor já em execução")
+    parser.add_argument("--servidor", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.servidor:
+        _subir_servidor(args.servidor)
+        return
+
+    processo = None
+    porta = args.porta
+    if porta is None:
+        porta = 18080
+        processo = subprocess.Popen([sys.executable, "-m", "benchmarks.carga_http", "--servidor", str(porta)],
+                                    stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(_aguardar_porta(porta))
+        asyncio.run(_executar(porta, args.conexoes, args.requisicoes, args.pipeline))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Cenários de benchmark sobre os caminhos quentes da aplicação: as buscas do
+menu de venda, a precificação e o registro de carrinhos e os relatórios.
+
+Os cenários de console chamam as próprias funções de menu, com as respostas do
+operador vindas de uma fila e a saída descartada, de modo que medem o mesmo
+código executado pelo caixa.
+"""
+import builtins
+import contextlib
+import os
+import random
+import time
+from typing import Callable, Dict, Iterator, List, Sequence
+
+from data import clientes, medicamentos
+from motor_vendas import confirmar, precificar
+from services import buscar_medicamentos, menu_buscar_medicamentos, realizar_venda
+from relatorios.gerador_relatorios import (listar_clientes, listar_todos_medicamentos,
+                                           listar_medicamentos_por_tipo, exibir_estatisticas_dia,
+                                           exibir_mais_vendidos)
+from benchmarks.gerador import DadosGerados, gerar_carrinho
+
+# Termos de descrição usados nas buscas parciais (existem no vocabulário do gerador).
+TERMOS_DESCRICAO = ("analg", "antibi", "xarope", "calmante", "gotas", "pediátrico", "extrato de camomila")
+
+# Acima desta escala as listagens completas (todas as páginas) rodam uma única vez.
+ESCALA_LISTAGEM_COMPLETA = 100_000
+
+
+@contextlib.contextmanager
+def console_simulado(respostas: Callable[[], Sequence[str]]) -> Iterator[Callable[[], None]]:
+    """
+    Substitui `input` por uma fila de respostas e descarta o que for impresso.
+    Entrega uma função que recarrega a fila chamando `respostas`; quando as
+    respostas acabam, `input` passa a responder "" (Enter).
+    """
+    fila: List[str] = []
+
+    def responder(_mensagem: str = "") -> str:
+        return fila.pop() if fila else ""
+
+    def recarregar() -> None:
+        fila[:] = reversed(respostas())
+
+    input_original = builtins.input
+    builtins.input = responder
+    try:
+        with open(os.devnull, "w") as descarte, contextlib.redirect_stdout(descarte):
+            yield recarregar
+    finally:
+        builtins.input = input_original
+
+
+def percentil(amostras_ordenadas: List[float], p: float) -> float:
+    indice = min(len(amostras_ordenadas) - 1, int(round(p / 100 * (len(amostras_ordenadas) - 1))))
+    return amostras_ordenadas[indice]
+
+
+def medir(operacao: Callable[[], object], iteracoes: int, aquecimento: int = 1,
+          preparar: Callable[[], object] = None) -> Dict[str, float]:
+    """
+    Executa `operacao` `iteracoes` vezes (após `aquecimento` rodadas descartadas)
+    e retorna as estatísticas de latência em microssegundos. `preparar`, se
+    informado, roda antes de cada chamada, fora da medição.
+    """
+    amostras: List[float] = []
+    relogio = time.perf_counter
+    for i in range(aquecimento + iteracoes):
+        if preparar is not None:
+            preparar()
+        inicio = relogio()
+        operacao()
+        duracao = relogio() - inicio
+        if i >= aquecimento:
+            amostras.append(duracao * 1e6)
+    amostras.sort()
+    total = sum(amostras)
+    return {
+        "iteracoes": iteracoes,
+        "total_s": round(total / 1e6, 6),
+        "media_us": round(total / iteracoes, 3),
+        "min_us": round(amostras[0], 3),
+        "p50_us": round(percentil(amostras, 50), 3),
+        "p95_us": round(percentil(amostras, 95), 3),
+        "p99_us": round(percentil(amostras, 99), 3),
+        "max_us": round(amostras[-1], 3),
+        "ops_por_s": round(iteracoes / (total / 1e6), 1) if total else 0.0,
+    }
+
+
+def _medir_console(respostas: Callable[[], Sequence[str]], operacao: Callable[[], object],
+                   iteracoes: int, aquecimento: int = 1) -> Dict[str, float]:
+    with console_simulado(respostas) as recarregar:
+        return medir(operacao, iteracoes, aquecimento, preparar=recarregar)
+
+
+def _com_erro(rnd: random.Random, palavra: str) -> str:
+    """A palavra com uma letra trocada, como num erro de digitação."""
+    i = rnd.randrange(len(palavra))
+    return palavra[:i] + rnd.choice("aeioubcdfglmnprst") + palavra[i + 1:]
+
+
+def executar(dados: DadosGerados, iteracoes: int = 1_000, semente: int = 1) -> Dict[str, Dict[str, float]]:
+    """Roda todos os cenários sobre os dados gerados e retorna {cenário: estatísticas}."""
+    rnd = random.Random(semente)
+    nomes = dados.nomes_medicamentos
+    labs = dados.nomes_laboratorios
+    cpfs = dados.cpfs
+    resultados: Dict[str, Dict[str, float]] = {}
+    poucas = max(1, iteracoes // 20)
+
+    # --- Buscas (menu_buscar_medicamentos, opções 1 a 3) ---
+    resultados["busca_nome_exato"] = _medir_console(
+        lambda: ("1", rnd.choice(nomes)), menu_buscar_medicamentos, iteracoes)
+    resultados["busca_laboratorio"] = _medir_console(
+        lambda: ("2", rnd.choice(labs).lower()), menu_buscar_medicamentos, poucas)
+    resultados["busca_descricao"] = _medir_console(
+        lambda: ("3", rnd.choice(TERMOS_DESCRICAO)), menu_buscar_medicamentos, poucas)
+    resultados["busca_texto_api"] = medir(
+        lambda: buscar_medicamentos("texto", rnd.choice(TERMOS_DESCRICAO)), poucas)
+    resultados["busca_prefixo_api"] = medir(
+        lambda: buscar_medicamentos("prefixo", rnd.choice(nomes)[:4].lower()), iteracoes)
+    resultados["busca_sugestao_api"] = medir(
+        lambda: buscar_medicamentos("sugestao", _com_erro(rnd, rnd.choice(nomes).split()[0])), poucas)
+
+    # --- Venda: precificação, registro e o fluxo completo do caixa ---
+    def carrinho():
+        cliente = clientes[rnd.choice(cpfs)]
+        return cliente, [(medicamentos[nome], qtde) for nome, qtde in gerar_carrinho(rnd, nomes)]
+
+    resultados["precificar_carrinho"] = medir(lambda: precificar(*carrinho()), iteracoes)
+
+    def precificar_e_confirmar():
+        resultado = precificar(*carrinho())
+        resultado.receita = "REC-BENCH"
+        return confirmar(resultado)
+
+    resultados["precificar_e_confirmar"] = medir(precificar_e_confirmar, iteracoes)
+
+    def respostas_venda() -> List[str]:
+        respostas = [rnd.choice(cpfs)]
+        itens = gerar_carrinho(rnd, nomes)
+        for i, (nome, qtde) in enumerate(itens):
+            respostas += ["1", nome, str(qtde), "S" if i < len(itens) - 1 else "N"]
+        if any(getattr(medicamentos[nome], "necessita_receita", False) for nome, _ in itens):
+            respostas.append("REC-BENCH")
+        return respostas + ["S"]
+
+    resultados["realizar_venda_console"] = _medir_console(respostas_venda, realizar_venda, iteracoes)
+
+    # --- Relatórios: primeira página de cada listagem e listagens completas ---
+    resultados["listar_clientes_pagina"] = _medir_console(lambda: ("S",), listar_clientes, iteracoes)
+    resultados["listar_medicamentos_pagina"] = _medir_console(lambda: ("S",), listar_todos_medicamentos,
+                                                              iteracoes)
+    resultados["listar_quimio_pagina"] = _medir_console(lambda: ("Q", "S"), listar_medicamentos_por_tipo,
+                                                        iteracoes)
+    resultados["listar_fito_pagina"] = _medir_console(lambda: ("F", "S"), listar_medicamentos_por_tipo,
+                                                      iteracoes)
+    completas = 1 if dados.escala > ESCALA_LISTAGEM_COMPLETA else 5
+    aquecimento = 0 if dados.escala > ESCALA_LISTAGEM_COMPLETA else 1
+    resultados["listar_clientes_completo"] = _medir_console(lambda: (), listar_clientes, completas,
+                                                            aquecimento)
+    resultados["listar_medicamentos_completo"] = _medir_console(lambda: (), listar_todos_medicamentos,
+                                                                completas, aquecimento)
+    resultados["listar_quimio_completo"] = _medir_console(lambda: ("Q",), listar_medicamentos_por_tipo,
+                                                          completas, aquecimento)
+    resultados["listar_fito_completo"] = _medir_console(lambda: ("F",), listar_medicamentos_por_tipo,
+                                                        completas, aquecimento)
+
+    resultados["exibir_estatisticas_dia"] = _medir_console(lambda: (), exibir_estatisticas_dia, iteracoes)
+    resultados["exibir_mais_vendidos_top10"] = _medir_console(lambda: ("U", "10"), exibir_mais_vendidos,
+                                                              iteracoes)
+    return resultados
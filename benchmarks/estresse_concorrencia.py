@@ -0,0 +1,81 @@
+"""
+Teste de estresse do checkout concorrente: vários caixas (threads) vendendo e
+cadastrando ao mesmo tempo sobre o mesmo estado de `data`.
+
+Para cada quantidade de threads, executa o mesmo volume de carrinhos e
+verifica que os totais finais batem exatamente com o esperado (vendas,
+unidades por medicamento, itens no armazém) e que cadastros concorrentes do
+mesmo CPF resultam em um único cliente. Imprime a vazão por quantidade de threads.
+
+Uso:
+    python -m benchmarks.estresse_concorrencia [--carrinhos N] [--threads 1,2,4,8,16]
+"""
+import argparse
+import datetime
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from entidades.cliente import Cliente
+from entidades.itens_venda import armazem_itens
+from data import clientes, vendas, estatisticas
+from motor_vendas import checkout
+from services import registrar_cliente
+from benchmarks.bench_checkout import RECEITA, popular, gerar_carrinhos
+
+N_CLIENTES = 1_000
+N_MEDICAMENTOS = 5_000
+
+
+def rodada(carrinhos: list, threads: int, rodada_id: int) -> float:
+    """Executa os carrinhos com `threads` workers, valida os totais e retorna a vazão (carrinhos/s)."""
+    vendas_antes = len(vendas)
+    itens_antes = len(armazem_itens)
+    unidades_antes = {nome: qtde for nome, (qtde, _) in estatisticas.itens.items()}
+    esperado = Counter()
+    for _, itens in carrinhos:
+        for nome, qtde in itens:
+            esperado[nome] += qtde
+
+    # Cada CPF novo é cadastrado por várias threads ao mesmo tempo: só uma pode vencer.
+    cpfs_disputados = [f"9{rodada_id:04d}{i:06d}" for i in range(200)]
+    tarefas_cadastro = [cpf for cpf in cpfs_disputados for _ in range(4)]
+
+    def cadastrar(cpf: str) -> bool:
+        return registrar_cliente(Cliente(cpf, "Concorrente", datetime.date(1990, 1, 1)))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        vencedores = sum(executor.map(cadastrar, tarefas_cadastro))
+        list(executor.map(lambda carrinho: checkout(*carrinho, receita=RECEITA), carrinhos, chunksize=64))
+    duracao = time.perf_counter() - inicio
+
+    assert vencedores == len(cpfs_disputados), f"{vencedores} cadastros aceitos para {len(cpfs_disputados)} CPFs"
+    assert all(cpf in clientes for cpf in cpfs_disputados)
+    assert len(vendas) - vendas_antes == len(carrinhos), "vendas perdidas ou duplicadas"
+    assert len(armazem_itens) - itens_antes == sum(len(itens) for _, itens in carrinhos), "itens perdidos"
+    for nome, qtde in esperado.items():
+        obtido = estatisticas.itens[nome][0] - unidades_antes.get(nome, 0)
+        assert obtido == qtde, f"{nome}: esperado {qtde}, obtido {obtido}"
+    ranking = estatisticas.mais_vendidos(max(1, len(estatisticas.itens)))
+    assert all(a[1] >= b[1] for a, b in zip(ranking, ranking[1:])), "ranking fora de ordem"
+    return len(carrinhos) / duracao
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--carrinhos", type=int, default=20_000)
+    parser.add_argument("--threads", default="1,2,4,8,16")
+    args = parser.parse_args()
+
+    popular(N_CLIENTES, N_MEDICAMENTOS)
+    base = None
+    for rodada_id, threads in enumerate(int(t) for t in args.threads.split(",")):
+        carrinhos = gerar_carrinhos(args.carrinhos, 3, N_CLIENTES, N_MEDICAMENTOS, semente=rodada_id)
+        vazao = rodada(carrinhos, threads, rodada_id)
+        base = base or vazao
+        print(f"{threads:>3} threads: {vazao:>10,.0f} carrinhos/s ({vazao / base:.2f}x) | totais conferem")
+
+
+if __name__ == "__main__":
+    main()
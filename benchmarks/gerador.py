@@ -0,0 +1,130 @@
+"""
+Gerador determinístico de dados sintéticos da farmácia (laboratórios,
+medicamentos, clientes e histórico de vendas), nas escalas de 10 mil a 1 milhão.
+
+A mesma semente sempre gera exatamente os mesmos dados, para que execuções
+de benchmark diferentes sejam comparáveis.
+"""
+import datetime
+import random
+from typing import List, Tuple
+
+from entidades.cliente import Cliente
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import MedicamentoQuimioterapico, MedicamentoFitoterapico
+from data import clientes, medicamentos
+from services import registrar_cliente, registrar_laboratorio, registrar_medicamento
+from motor_vendas import confirmar, precificar
+
+ESCALAS = (10_000, 100_000, 1_000_000)
+
+SILABAS = ("ba", "be", "ci", "co", "da", "di", "fe", "fu", "ga", "lo", "lu", "ma", "me", "mi", "na",
+           "ne", "no", "pa", "pi", "po", "ra", "re", "ri", "ro", "sa", "se", "so", "ta", "te", "ti",
+           "to", "tu", "va", "vi", "xa", "xi", "za", "ze", "zo", "lex")
+PRINCIPIOS_QUIMIO = ("paracetamol", "dipirona", "ibuprofeno", "amoxicilina", "omeprazol", "losartana",
+                     "metformina", "sinvastatina", "azitromicina", "cetirizina", "loratadina", "diclofenaco",
+                     "nimesulida", "captopril", "fluoxetina", "sertralina", "clonazepam", "prednisona")
+PRINCIPIOS_FITO = ("camomila", "valeriana", "passiflora", "guaco", "hortelã", "gengibre", "equinácea",
+                   "ginkgo biloba", "alcachofra", "castanha-da-índia", "espinheira-santa", "boldo")
+FORMAS = ("comprimido", "cápsula", "xarope", "gotas", "pomada", "solução oral", "sachê", "spray")
+USOS = ("analgésico", "antitérmico", "anti-inflamatório", "antibiótico", "antialérgico", "calmante natural",
+        "digestivo", "expectorante", "anti-hipertensivo", "antidepressivo", "fitoterápico para o sono",
+        "protetor gástrico", "uso adulto e pediátrico", "uso adulto", "venda sob prescrição")
+PRENOMES = ("Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João",
+            "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Paulo", "Queila", "Rafael", "Sofia", "Tiago",
+            "Úrsula", "Vitor", "Wesley", "Yasmin", "Zeca")
+SOBRENOMES = ("Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima",
+              "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Vieira")
+ESTADOS = ("SP", "RJ", "MG", "RS", "PR", "SC", "BA", "PE", "GO", "DF", "CE", "AM")
+CIDADES = ("São Paulo", "Rio de Janeiro", "Belo Horizonte", "Porto Alegre", "Curitiba", "Florianópolis",
+           "Salvador", "Recife", "Goiânia", "Brasília", "Fortaleza", "Manaus")
+
+
+def nome_marca(i: int) -> str:
+    """Nome comercial único para cada i < 40**4, formado por sílabas (ex.: 'Ladiro')."""
+    silabas = []
+    for _ in range(4):
+        i, resto = divmod(i, len(SILABAS))
+        silabas.append(SILABAS[resto])
+    return "".join(silabas).capitalize()
+
+
+def cpf_sintetico(i: int) -> str:
+    return f"{i:011d}"
+
+
+class DadosGerados:
+    """
+    Resumo do que foi gerado, usado pelos cenários para montar consultas.
+
+    Atributos:
+        escala (int): Escala pedida.
+        nomes_medicamentos (List[str]): Nomes cadastrados, na ordem de geração.
+        nomes_laboratorios (List[str]): Laboratórios cadastrados.
+        cpfs (List[str]): CPFs cadastrados.
+    """
+    def __init__(self, escala: int):
+        self.escala = escala
+        self.nomes_medicamentos: List[str] = []
+        self.nomes_laboratorios: List[str] = []
+        self.cpfs: List[str] = []
+
+
+def gerar_carrinho(rnd: random.Random, nomes_medicamentos: List[str]) -> List[Tuple[str, int]]:
+    """Carrinho com 1 a 5 itens distintos e quantidades de 1 a 4."""
+    n = min(len(nomes_medicamentos), rnd.randint(1, 5))
+    return [(nome, rnd.randint(1, 4)) for nome in rnd.sample(nomes_medicamentos, n)]
+
+
+def gerar(escala: int, n_vendas: int = None, semente: int = 42,
+          inicio_historico: datetime.datetime = datetime.datetime(2026, 1, 1)) -> DadosGerados:
+    """
+    Cadastra `escala` medicamentos e `escala` clientes (mais ~1 laboratório a cada
+    500 medicamentos) e um histórico de `n_vendas` vendas (padrão: `escala`)
+    distribuídas ao longo de 30 dias a partir de `inicio_historico`.
+    """
+    rnd = random.Random(semente)
+    dados = DadosGerados(escala)
+    n_vendas = escala if n_vendas is None else n_vendas
+
+    labs = []
+    for i in range(max(10, escala // 500)):
+        uf = rnd.randrange(len(ESTADOS))
+        lab = Laboratorio(f"Laboratório {nome_marca(i + 7).upper()}", f"Rua {rnd.choice(SOBRENOMES)}, {i + 1}",
+                          f"({rnd.randint(11, 99)}) {rnd.randint(3000, 3999)}-{rnd.randint(1000, 9999)}",
+                          CIDADES[uf], ESTADOS[uf])
+        registrar_laboratorio(lab)
+        labs.append(lab)
+        dados.nomes_laboratorios.append(lab.nome)
+
+    for i in range(escala):
+        lab = labs[rnd.randrange(len(labs))]
+        forma = rnd.choice(FORMAS)
+        preco = round(rnd.lognormvariate(3.0, 0.8), 2)
+        nome = f"{nome_marca(i)} {rnd.choice((25, 50, 100, 200, 250, 500, 750, 1000))}mg {forma}"
+        if rnd.random() < 0.6:
+            principio = rnd.choice(PRINCIPIOS_QUIMIO)
+            descricao = f"{principio.capitalize()} em {forma}, {rnd.choice(USOS)}"
+            med = MedicamentoQuimioterapico(nome, principio, lab, descricao, preco, rnd.random() < 0.25)
+        else:
+            principio = rnd.choice(PRINCIPIOS_FITO)
+            descricao = f"Extrato de {principio} em {forma}, {rnd.choice(USOS)}"
+            med = MedicamentoFitoterapico(nome, principio, lab, descricao, preco)
+        registrar_medicamento(med)
+        dados.nomes_medicamentos.append(nome)
+
+    for i in range(escala):
+        nascimento = datetime.date(rnd.randint(1935, 2008), rnd.randint(1, 12), rnd.randint(1, 28))
+        cliente = Cliente(cpf_sintetico(i), f"{rnd.choice(PRENOMES)} {rnd.choice(SOBRENOMES)} "
+                                            f"{rnd.choice(SOBRENOMES)}", nascimento)
+        registrar_cliente(cliente)
+        dados.cpfs.append(cliente.cpf)
+
+    passo = datetime.timedelta(days=30) / max(1, n_vendas)
+    for i in range(n_vendas):
+        cliente = clientes[dados.cpfs[rnd.randrange(escala)]]
+        itens = [(medicamentos[nome], qtde) for nome, qtde in gerar_carrinho(rnd, dados.nomes_medicamentos)]
+        resultado = precificar(cliente, itens)
+        resultado.receita = f"REC-{i}"
+        confirmar(resultado, inicio_historico + passo * i)
+    return dados
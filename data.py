@@ -1,20 +1,56 @@
-from typing import List, Dict, Tuple
+import os
+from typing import List, Dict
 from entidades.cliente import Cliente
 from entidades.laboratorio import Laboratorio
 from entidades.medicamento import Medicamento
 from entidades.venda import Venda
+from utils.indice_busca import IndiceBusca
+from utils.indice_nomes import IndiceNomes
+from utils.estatisticas import EstatisticasVendas
+from utils.estoque import Estoque
+from utils.indice_ordenado import IndiceOrdenado
+from utils.historico_vendas import HistoricoVendas
+from utils.historico_clientes import HistoricoClientes
+from utils.concorrencia import TravaLeituraEscrita
+
+# Loja (filial) deste processo: cada filial roda sua própria cópia do sistema, e as
+# vendas e estatísticas levam esta identificação para a consolidação da rede.
+LOJA = os.environ.get("FARMACIA_LOJA", "")
 
 clientes: Dict[str, Cliente] = {}
 laboratorios: Dict[str, Laboratorio] = {}
 medicamentos: Dict[str, Medicamento] = {}  # chave: nome do medicamento
 vendas: List[Venda] = []
 
-# Para estatísticas do dia:
-#   - contador de vendas (para número de atendimentos)
+# Travas de leitores/escritor dos cadastros: consultas não se bloqueiam entre si,
+# e cada cadastro (verificação + inserção + índices) é atômico.
+trava_clientes = TravaLeituraEscrita()
+trava_laboratorios = TravaLeituraEscrita()
+trava_catalogo = TravaLeituraEscrita()  # medicamentos e seus índices
+# Mesmas vendas de `vendas`, indexadas por data/hora, com agregados por hora e por dia.
+historico_vendas = HistoricoVendas()
+# As mesmas vendas indexadas por CPF: agregados, compras recentes e controlados repetidos.
+historico_clientes = HistoricoClientes()
+
+# Índices secundários do catálogo (laboratório e texto livre), mantidos no cadastro.
+indice_busca = IndiceBusca()
+# Nomes sem acentos/maiúsculas: autocompletar por prefixo e sugestões para erros de digitação.
+indice_nomes = IndiceNomes()
+
+# Listagens já ordenadas por nome (sem diferenciar maiúsculas), mantidas no cadastro.
+indice_clientes_nome: IndiceOrdenado[Cliente] = IndiceOrdenado(lambda c: c.nome.casefold())
+indice_medicamentos_nome: IndiceOrdenado[Medicamento] = IndiceOrdenado(lambda m: m.nome.casefold())
+# Uma listagem por tipo: "Q" (quimioterápicos) e "F" (fitoterápicos).
+indice_medicamentos_tipo: Dict[str, IndiceOrdenado[Medicamento]] = {
+    "Q": IndiceOrdenado(lambda m: m.nome.casefold()),
+    "F": IndiceOrdenado(lambda m: m.nome.casefold()),
+}
+
+# Estatísticas do dia (instância única, compartilhada por todos os módulos):
 #   - mapa de nome_medicamento -> (quantidade_vendida, valor_total)
-estatisticas_itens_vendidos: Dict[str, Tuple[int, float]] = {}
-total_quimio_vendido_qtde = 0
-total_quimio_vendido_valor = 0.0
-total_fito_vendido_qtde = 0
-total_fito_vendido_valor = 0.0
+#   - totais por tipo e por loja e ranking dos mais vendidos
+# O número de atendimentos é o tamanho de `vendas`.
+estatisticas = EstatisticasVendas()
 
+# Estoque em mãos e reservado por SKU, com o índice de itens abaixo do mínimo.
+estoque = Estoque()
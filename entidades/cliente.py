@@ -1,4 +1,5 @@
 import datetime
+from typing import Optional
 
 class Cliente:
     """
@@ -10,14 +11,16 @@ class Cliente:
         nome (str): Nome completo do cliente.
         data_nascimento (datetime.date): Data de nascimento do cliente.
     """
+    __slots__ = ("cpf", "nome", "data_nascimento")
+
     def __init__(self, cpf: str, nome: str, data_nascimento: datetime.date):
         self.cpf = cpf
         self.nome = nome
         self.data_nascimento = data_nascimento
 
-    def idade(self) -> int:
-        """Retorna a idade atual do cliente em anos completos."""
-        hoje = datetime.date.today()
+    def idade(self, hoje: Optional[datetime.date] = None) -> int:
+        """Retorna a idade do cliente em anos completos (hoje, ou na data informada)."""
+        hoje = hoje or datetime.date.today()
         anos = hoje.year - self.data_nascimento.year
         if (hoje.month, hoje.day) < (self.data_nascimento.month, self.data_nascimento.day):
             anos -= 1
@@ -0,0 +1,97 @@
+import threading
+from array import array
+from typing import Iterator, List, Sequence, Tuple
+
+from .medicamento import Medicamento
+
+# Maior quantidade por item que cabe na coluna de quantidades (array "I", 32 bits sem sinal).
+QUANTIDADE_MAXIMA = 2 ** 32 - 1
+
+
+def validar_quantidade(med: Medicamento, qtde: int) -> None:
+    """Levanta ValueError se `qtde` não for uma quantidade de item armazenável (1 a QUANTIDADE_MAXIMA)."""
+    if not 0 < qtde <= QUANTIDADE_MAXIMA:
+        raise ValueError(f"Quantidade inválida para {med.nome}: {qtde}")
+
+
+class CatalogoSku:
+    """
+    Atribui a cada medicamento um id inteiro denso (SKU), usado para
+    referenciá-lo de forma compacta nos itens de venda.
+
+    Atributos:
+        _por_id (List[Medicamento]): Medicamentos indexados pelo seu sku_id.
+    """
+    def __init__(self):
+        self._por_id: List[Medicamento] = []
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._por_id)
+
+    def id_de(self, med: Medicamento) -> int:
+        """Retorna o sku_id do medicamento, atribuindo um novo na primeira vez."""
+        if med.sku_id is None:
+            with self._trava:
+                if med.sku_id is None:
+                    self._por_id.append(med)
+                    med.sku_id = len(self._por_id) - 1
+        return med.sku_id
+
+    def medicamento(self, sku_id: int) -> Medicamento:
+        return self._por_id[sku_id]
+
+
+class ArmazemItens:
+    """
+    Itens de todas as vendas em três arrays paralelos (sku_id, quantidade e
+    preço unitário cobrado). Cada Venda guarda apenas o intervalo [inicio, fim) dos seus itens.
+
+    Atributos:
+        skus (array): sku_id de cada item vendido.
+        qtdes (array): Quantidade de cada item vendido.
+        precos (array): Preço unitário cobrado em cada item (o das regras de preço, que pode diferir do cadastro).
+    """
+    def __init__(self, catalogo: CatalogoSku):
+        self.catalogo = catalogo
+        self.skus = array("I")
+        self.qtdes = array("I")
+        self.precos = array("d")
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+    def anexar(self, itens: Sequence[Tuple[Medicamento, int, float]]) -> Tuple[int, int]:
+        """
+        Grava os itens (medicamento, quantidade, preço cobrado) de uma venda e
+        retorna o intervalo ocupado (contíguo, mesmo com vários caixas).
+        """
+        skus = array("I", [self.catalogo.id_de(med) for med, _, _ in itens])
+        qtdes = array("I", [qtde for _, qtde, _ in itens])
+        precos = array("d", [preco for _, _, preco in itens])
+        with self._trava:
+            inicio = len(self.skus)
+            self.skus.extend(skus)
+            self.qtdes.extend(qtdes)
+            self.precos.extend(precos)
+        return inicio, inicio + len(skus)
+
+    def ids(self, inicio: int, fim: int) -> Iterator[Tuple[int, int]]:
+        """Gera (sku_id, quantidade) do intervalo, sem materializar medicamentos."""
+        return zip(self.skus[inicio:fim], self.qtdes[inicio:fim])
+
+    def itens(self, inicio: int, fim: int) -> List[Tuple[Medicamento, int]]:
+        medicamento = self.catalogo.medicamento
+        return [(medicamento(sku), qtde) for sku, qtde in self.ids(inicio, fim)]
+
+    def itens_precificados(self, inicio: int, fim: int) -> List[Tuple[Medicamento, int, float]]:
+        """(medicamento, quantidade, preço cobrado) de cada item do intervalo."""
+        medicamento = self.catalogo.medicamento
+        return [(medicamento(sku), qtde, preco)
+                for sku, qtde, preco in zip(self.skus[inicio:fim], self.qtdes[inicio:fim], self.precos[inicio:fim])]
+
+
+# Instâncias únicas do processo.
+catalogo_skus = CatalogoSku()
+armazem_itens = ArmazemItens(catalogo_skus)
@@ -9,6 +9,8 @@ class Laboratorio:
         cidade (str): Cidade onde se localiza.
         estado (str): Estado (sigla).
     """
+    __slots__ = ("nome", "endereco", "telefone", "cidade", "estado")
+
     def __init__(self, nome: str, endereco: str, telefone: str, cidade: str, estado: str):
         self.nome = nome
         self.endereco = endereco
@@ -10,7 +10,10 @@ class Medicamento:
         laboratorio (Laboratorio): Instância de Laboratorio que fabrica.
         descricao (str): Descrição livre do medicamento.
         preco (float): Preço unitário do medicamento.
+        sku_id (Optional[int]): Id inteiro atribuído pelo catálogo de SKUs (None até ser atribuído).
     """
+    __slots__ = ("nome", "composto_principal", "laboratorio", "descricao", "preco", "sku_id")
+
     def __init__(self, nome: str, composto_principal: str, laboratorio: Laboratorio,
                  descricao: str, preco: float):
         self.nome = nome
@@ -18,6 +21,7 @@ class Medicamento:
         self.laboratorio = laboratorio
         self.descricao = descricao
         self.preco = preco
+        self.sku_id = None
 
     def __str__(self) -> str:
         return (f"{self.nome} | {self.composto_principal} | Lab: {self.laboratorio.nome} | "
@@ -31,6 +35,8 @@ class MedicamentoQuimioterapico(Medicamento):
     Atributos adicionais:
         necessita_receita (bool): Indica se exige apresentação de receita para venda.
     """
+    __slots__ = ("necessita_receita",)
+
     def __init__(self, nome: str, composto_principal: str, laboratorio: Laboratorio,
                  descricao: str, preco: float, necessita_receita: bool):
         super().__init__(nome, composto_principal, laboratorio, descricao, preco)
@@ -48,6 +54,8 @@ class MedicamentoFitoterapico(Medicamento):
 
     Herda todos os atributos de Medicamento.
     """
+    __slots__ = ()
+
     def __init__(self, nome: str, composto_principal: str, laboratorio: Laboratorio,
                  descricao: str, preco: float):
         super().__init__(nome, composto_principal, laboratorio, descricao, preco)
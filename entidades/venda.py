@@ -1,27 +1,89 @@
 import datetime
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
 from .medicamento import Medicamento
 from .cliente import Cliente
+from .itens_venda import armazem_itens, catalogo_skus, validar_quantidade
 
 class Venda:
     """
     Representa uma venda realizada pela farmácia.
 
+    Enquanto a venda não é registrada, os itens ficam na própria instância.
+    No registro (`armazenar_itens`) eles passam para o armazém compartilhado
+    (`itens_venda.armazem_itens`) como (sku_id, quantidade, preço cobrado), e a
+    venda guarda só o intervalo que ocupa nele. Assim, vendas montadas e
+    descartadas (ex.: rejeitadas na confirmação) não deixam linhas no armazém.
+
     Atributos:
         data_hora (datetime.datetime): Data e hora em que a venda foi efetuada.
-        itens (List[Tuple[Medicamento, int]]): Lista de tuplas (medicamento, quantidade).
+        itens (List[Tuple[Medicamento, int]]): Lista de tuplas (medicamento, quantidade), montada sob demanda.
+        precos (List[float]): Preço unitário cobrado em cada item (padrão: o preço de cadastro).
         cliente (Cliente): Cliente para quem a venda foi feita.
         valor_total (float): Valor final da venda (já com desconto aplicado, se houver).
+        desconto (float): Percentual de desconto aplicado (0.20 = 20%).
+        tipo_desconto (str): Regra que originou o desconto ("" se nenhum).
+        loja (str): Loja (filial) em que a venda foi feita ("" em registros anteriores às filiais).
     """
+    __slots__ = ("data_hora", "cliente", "valor_total", "desconto", "tipo_desconto", "loja", "_pendentes",
+                 "_inicio", "_fim")
+
     def __init__(self, data_hora: datetime.datetime, itens: List[Tuple[Medicamento, int]],
-                 cliente: Cliente, valor_total: float):
+                 cliente: Cliente, valor_total: float, desconto: float = 0.0, tipo_desconto: str = "",
+                 loja: str = "", precos: Optional[Sequence[float]] = None):
+        if precos is None:
+            precos = [med.preco for med, _ in itens]
+        elif len(precos) != len(itens):
+            raise ValueError("A venda precisa de um preço por item.")
+        for med, qtde in itens:
+            validar_quantidade(med, qtde)
         self.data_hora = data_hora
-        self.itens = itens
+        self._pendentes: Optional[List[Tuple[Medicamento, int, float]]] = [
+            (med, qtde, preco) for (med, qtde), preco in zip(itens, precos)]
+        self._inicio = self._fim = 0
         self.cliente = cliente
         self.valor_total = valor_total
+        self.desconto = desconto
+        self.tipo_desconto = tipo_desconto
+        self.loja = loja
+
+    def armazenar_itens(self) -> None:
+        """Passa os itens para o armazém compartilhado; feito uma vez, no registro da venda."""
+        if self._pendentes is not None:
+            self._inicio, self._fim = armazem_itens.anexar(self._pendentes)
+            self._pendentes = None
+
+    def itens_precificados(self) -> List[Tuple[Medicamento, int, float]]:
+        """Lista de tuplas (medicamento, quantidade, preço unitário cobrado)."""
+        if self._pendentes is not None:
+            return list(self._pendentes)
+        return armazem_itens.itens_precificados(self._inicio, self._fim)
+
+    @property
+    def itens(self) -> List[Tuple[Medicamento, int]]:
+        if self._pendentes is not None:
+            return [(med, qtde) for med, qtde, _ in self._pendentes]
+        return armazem_itens.itens(self._inicio, self._fim)
+
+    @property
+    def precos(self) -> List[float]:
+        if self._pendentes is not None:
+            return [preco for _, _, preco in self._pendentes]
+        return armazem_itens.precos[self._inicio:self._fim].tolist()
+
+    def intervalo_itens(self) -> Tuple[int, int]:
+        """Intervalo [inicio, fim) dos itens desta venda nos arrays de `armazem_itens` (só após o registro)."""
+        if self._pendentes is not None:
+            raise ValueError("Venda ainda não registrada: os itens não estão no armazém.")
+        return self._inicio, self._fim
+
+    def itens_ids(self) -> Iterator[Tuple[int, int]]:
+        """Gera (sku_id, quantidade) dos itens, sem materializar os medicamentos."""
+        if self._pendentes is not None:
+            return iter([(catalogo_skus.id_de(med), qtde) for med, qtde, _ in self._pendentes])
+        return armazem_itens.ids(self._inicio, self._fim)
 
     def __str__(self) -> str:
-        itens_str = "; ".join([f"{med.nome} x{qtde} (R$ {med.preco:.2f} cada)" for med, qtde in self.itens])
+        itens_str = "; ".join([f"{med.nome} x{qtde} (R$ {preco:.2f} cada)"
+                               for med, qtde, preco in self.itens_precificados()])
         return (f"Data/Hora: {self.data_hora.strftime('%Y-%m-%d %H:%M:%S')} | Cliente: {self.cliente.nome} | "
                 f"Itens: [{itens_str}] | Total: R$ {self.valor_total:.2f}")
-
@@ -1,7 +1,25 @@
+import os
 import sys
+from typing import Optional
 
-from services import cadastrar_cliente, cadastrar_laboratorio, cadastrar_medicamento, realizar_venda
-from relatorios.gerador_relatorios import listar_clientes, listar_todos_medicamentos, listar_medicamentos_por_tipo, exibir_estatisticas_dia
+from services import (cadastrar_cliente, cadastrar_laboratorio, cadastrar_medicamento, realizar_venda,
+                      definir_estoque)
+from relatorios.gerador_relatorios import listar_clientes, listar_todos_medicamentos, listar_medicamentos_por_tipo, exibir_estatisticas_dia, exibir_mais_vendidos, exibir_vendas_periodo, exibir_resumo_periodo, exibir_faturamento_por_dimensao, exibir_metricas, exibir_fechamento_dia, exibir_historico_cliente, exibir_auditoria_controlados, exibir_consolidacao_rede, exibir_trilha_auditoria
+from utils import auditoria, persistencia, metricas
+from motor_vendas import definir_regras
+from regras_preco import carregar_regras
+from relatorios.exportacao import exportar_clientes, exportar_medicamentos, exportar_vendas
+from utils.importacao import importar_laboratorios, importar_medicamentos, importar_clientes, importar_reposicao
+from utils.catalogo_mmap import gravar_catalogo
+from relatorios.consolidacao import gerar_resumo, gravar_resumo
+from data import LOJA, medicamentos, laboratorios, estoque, estatisticas
+
+# Diretório do snapshot e do log de eventos (pode ser trocado pela variável de ambiente).
+DIRETORIO_DADOS = os.environ.get("FARMACIA_DADOS", "dados")
+# Se definido, arquivo JSON com as regras de preço e desconto (senão valem as regras padrão).
+ARQUIVO_REGRAS = os.environ.get("FARMACIA_REGRAS")
+# Se definido, as métricas são exportadas (formato Prometheus) para este arquivo ao sair.
+ARQUIVO_METRICAS = os.environ.get("FARMACIA_METRICAS_ARQUIVO")
 
 def exibir_menu():
     print("\n======== Farmácia E-Commerce ========")
@@ -10,7 +28,9 @@ def exibir_menu():
     print("3. Cadastrar Medicamento")
     print("4. Realizar Venda")
     print("5. Relatórios")
-    print("6. Sair")
+    print("6. Importar Arquivo (CSV/JSONL)")
+    print("7. Estoque")
+    print("8. Sair")
     print("=====================================")
 
 def menu_relatorios():
@@ -20,9 +40,20 @@ def menu_relatorios():
         print("2. Listar Todos os Medicamentos")
         print("3. Listar Medicamentos por Tipo")
         print("4. Exibir Estatísticas do Dia")
-        print("5. Voltar ao Menu Principal")
+        print("5. Ranking dos Mais Vendidos")
+        print("6. Vendas por Período")
+        print("7. Resumo Diário/Horário")
+        print("8. Faturamento por Dimensão")
+        print("9. Métricas")
+        print("10. Exportar (CSV/JSONL)")
+        print("11. Fechamento do Dia")
+        print("12. Histórico do Cliente")
+        print("13. Auditoria de Controlados Repetidos")
+        print("14. Consolidação da Rede")
+        print("15. Trilha de Auditoria de Controlados")
+        print("16. Voltar ao Menu Principal")
         print("====================================")
-        escolha_rel = input("Escolha uma opção (1-5): ").strip()
+        escolha_rel = input("Escolha uma opção (1-16): ").strip()
 
         if escolha_rel == "1":
             listar_clientes()
@@ -33,15 +64,180 @@ def menu_relatorios():
         elif escolha_rel == "4":
             exibir_estatisticas_dia()
         elif escolha_rel == "5":
+            exibir_mais_vendidos()
+        elif escolha_rel == "6":
+            exibir_vendas_periodo()
+        elif escolha_rel == "7":
+            exibir_resumo_periodo()
+        elif escolha_rel == "8":
+            exibir_faturamento_por_dimensao()
+        elif escolha_rel == "9":
+            exibir_metricas()
+        elif escolha_rel == "10":
+            menu_exportacao()
+        elif escolha_rel == "11":
+            exibir_fechamento_dia()
+        elif escolha_rel == "12":
+            exibir_historico_cliente()
+        elif escolha_rel == "13":
+            exibir_auditoria_controlados()
+        elif escolha_rel == "14":
+            exibir_consolidacao_rede()
+        elif escolha_rel == "15":
+            exibir_trilha_auditoria()
+        elif escolha_rel == "16":
+            break
+        else:
+            print("Opção inválida. Tente novamente.")
+
+def menu_importacao():
+    """Importa em lote um arquivo CSV/JSONL de laboratórios, medicamentos ou clientes."""
+    print("Importar: 1. Laboratórios | 2. Medicamentos | 3. Clientes")
+    escolha = input("Escolha (1/2/3): ").strip()
+    importadores = {"1": importar_laboratorios, "2": importar_medicamentos, "3": importar_clientes}
+    if escolha not in importadores:
+        print("Opção inválida.")
+        return
+    caminho = input("Caminho do arquivo (.csv ou .jsonl): ").strip()
+    try:
+        relatorio = importadores[escolha](caminho)
+    except (OSError, UnicodeDecodeError) as exc:
+        # Os arquivos são lidos como UTF-8; outra codificação cai aqui.
+        print(f"Não foi possível ler o arquivo: {exc}")
+        return
+    print(relatorio)
+
+def ler_inteiro(mensagem: str, padrao: Optional[int] = None) -> Optional[int]:
+    """Lê um inteiro >= 0; [Enter] devolve `padrao`. Retorna None (após avisar) se for inválido."""
+    texto = input(mensagem).strip()
+    if not texto and padrao is not None:
+        return padrao
+    try:
+        valor = int(texto)
+        if valor < 0:
+            raise ValueError
+    except ValueError:
+        print("Quantidade inválida.")
+        return None
+    return valor
+
+def menu_estoque():
+    """Define e consulta o estoque dos medicamentos, repõe em lote e lista os itens em falta."""
+    while True:
+        print("\n======== Estoque ========")
+        print("1. Definir Estoque de um Medicamento")
+        print("2. Reposição em Lote (CSV/JSONL: nome, quantidade)")
+        print("3. Itens com Estoque Baixo")
+        print("4. Consultar Estoque de um Medicamento")
+        print("5. Liberar Reservas Expiradas")
+        print("6. Voltar ao Menu Principal")
+        print("=========================")
+        escolha = input("Escolha uma opção (1-6): ").strip()
+
+        if escolha in ("1", "4"):
+            nome = input("Nome do medicamento: ").strip()
+            med = medicamentos.get(nome)
+            if med is None:
+                print("Medicamento não cadastrado.")
+                continue
+            if escolha == "4":
+                item = estoque.item(med)
+                print(item if item is not None else f"{med.nome} | estoque não controlado")
+                continue
+            em_maos = ler_inteiro("Unidades em mãos: ")
+            if em_maos is None:
+                continue
+            atual = estoque.item(med)
+            minimo = ler_inteiro("Estoque mínimo (ponto de reposição): ", atual.minimo if atual else 0)
+            if minimo is None:
+                continue
+            definir_estoque(med, em_maos, minimo)
+            print(f"Estoque de {med.nome} definido.")
+        elif escolha == "2":
+            caminho = input("Caminho do arquivo (.csv ou .jsonl): ").strip()
+            try:
+                print(importar_reposicao(caminho))
+            except (OSError, UnicodeDecodeError) as exc:
+                print(f"Não foi possível ler o arquivo: {exc}")
+        elif escolha == "3":
+            baixos = estoque.estoque_baixo()
+            if not baixos:
+                print("Nenhum item com estoque baixo.")
+            for item in baixos:
+                print(item)
+        elif escolha == "5":
+            print(f"{estoque.expirar_reservas()} reserva(s) liberada(s).")
+        elif escolha == "6":
             break
         else:
             print("Opção inválida. Tente novamente.")
 
+def menu_exportacao():
+    """
+    Exporta clientes, medicamentos (todos ou por tipo) ou vendas com itens para CSV/JSONL (.gz opcional),
+    ou grava o catálogo somente leitura usado pelos terminais de consulta ou o resumo da loja para a
+    consolidação da rede.
+    """
+    print("Exportar: 1. Clientes | 2. Medicamentos | 3. Vendas (uma linha por item) | 4. Catálogo (mmap) | "
+          "5. Resumo da loja")
+    escolha = input("Escolha (1/2/3/4/5): ").strip()
+    if escolha not in ("1", "2", "3", "4", "5"):
+        print("Opção inválida.")
+        return
+    tipo = None
+    if escolha == "2":
+        tipo = input("Tipo ([Q]uimio / [F]ito / [Enter] todos): ").strip().upper() or None
+        if tipo not in (None, "Q", "F"):
+            print("Tipo inválido.")
+            return
+    if escolha == "4":
+        caminho = input("Arquivo de destino (ex.: catalogo.cat): ").strip() or "catalogo.cat"
+    elif escolha == "5":
+        caminho = input(f"Arquivo de destino (ex.: {LOJA or 'loja'}.dig): ").strip() or f"{LOJA or 'loja'}.dig"
+    else:
+        caminho = input("Arquivo de destino (.csv, .jsonl, opcionalmente .gz; '-' = tela): ").strip()
+    if not caminho:
+        print("Arquivo não informado.")
+        return
+    try:
+        if escolha == "4":
+            n, entidade = gravar_catalogo(caminho, medicamentos.values(), laboratorios.values()), "medicamentos"
+        elif escolha == "5":
+            resumo = gerar_resumo(LOJA, estatisticas, medicamentos)
+            n, entidade = gravar_resumo(caminho, resumo), "medicamentos no resumo"
+        elif escolha == "1":
+            n, entidade = exportar_clientes(caminho), "clientes"
+        elif escolha == "2":
+            n, entidade = exportar_medicamentos(caminho, tipo), "medicamentos"
+        else:
+            n, entidade = exportar_vendas(caminho), "itens de venda"
+    except (OSError, ValueError) as exc:
+        print(f"Não foi possível gravar o arquivo: {exc}")
+        return
+    print(f"{n} {entidade} exportados.")
+
 def main():
     print("Iniciando sistema de Farmácia E-Commerce…")
+    # No console as métricas ficam ligadas, a menos que FARMACIA_METRICAS=0.
+    if os.environ.get("FARMACIA_METRICAS", "1") != "0":
+        metricas.habilitar()
+    if ARQUIVO_REGRAS:
+        definir_regras(carregar_regras(ARQUIVO_REGRAS))
+    persistencia.abrir(DIRETORIO_DADOS)
+    auditoria.abrir(DIRETORIO_DADOS)
+    try:
+        loop_principal()
+    finally:
+        # A trilha de auditoria grava os eventos ainda na fila antes de sair.
+        auditoria.fechar()
+        persistencia.fechar()
+        if ARQUIVO_METRICAS:
+            metricas.exportar_prometheus(ARQUIVO_METRICAS)
+
+def loop_principal():
     while True:
         exibir_menu()
-        opcao = input("Escolha uma opção (1-6): ").strip()
+        opcao = input("Escolha uma opção (1-8): ").strip()
 
         if opcao == "1":
             cadastrar_cliente()
@@ -54,6 +250,10 @@ def main():
         elif opcao == "5":
             menu_relatorios()
         elif opcao == "6":
+            menu_importacao()
+        elif opcao == "7":
+            menu_estoque()
+        elif opcao == "8":
             print("Saindo do sistema. Até mais!")
             sys.exit()
         else:
@@ -0,0 +1,330 @@
+import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from entidades.cliente import Cliente
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico
+from entidades.itens_venda import QUANTIDADE_MAXIMA
+from entidades.venda import Venda
+from utils import auditoria, persistencia
+from utils.estoque import EstoqueInsuficiente, Reserva
+from utils.metricas import instrumentar
+from regras_preco import (AvaliadorPrecos, DescontoIdoso, DescontoValorMinimo, Precificacao, Regra,
+                          compilar)
+from data import LOJA, clientes, medicamentos, vendas, estatisticas, historico_vendas, historico_clientes, estoque
+
+# Regras de desconto padrão (vale a maior entre as aplicáveis).
+IDADE_IDOSO = 65
+DESCONTO_IDOSO = 0.20
+LIMITE_DESCONTO_VALOR = 150.0
+DESCONTO_VALOR = 0.10
+
+TIPO_DESCONTO_NENHUM = ""
+TIPO_DESCONTO_IDOSO = "idoso"
+TIPO_DESCONTO_VALOR = "valor"
+
+REGRAS_PADRAO = (
+    DescontoIdoso(IDADE_IDOSO, DESCONTO_IDOSO, nome=TIPO_DESCONTO_IDOSO),
+    DescontoValorMinimo(LIMITE_DESCONTO_VALOR, DESCONTO_VALOR, nome=TIPO_DESCONTO_VALOR),
+)
+
+# Conjunto de regras compilado em uso no checkout (trocado por `definir_regras`).
+avaliador = compilar(REGRAS_PADRAO)
+
+ItemCarrinho = Tuple[str, int]
+
+
+class VendaInvalida(ValueError):
+    """
+    Carrinho que não pode ser vendido (cliente inexistente, item desconhecido,
+    quantidade inválida ou sem estoque).
+    """
+
+
+class ResultadoCheckout:
+    """
+    Resultado da precificação de um carrinho.
+
+    Atributos:
+        cliente (Cliente): Cliente da venda.
+        itens (List[Tuple[Medicamento, int]]): Itens (medicamento, quantidade).
+        subtotal (float): Soma de preço x quantidade dos itens.
+        precos (List[float]): Preço unitário cobrado em cada item (pode diferir do cadastro).
+        desconto (float): Fração do subtotal abatida (0.20 = 20%).
+        tipo_desconto (str): Regras que originaram o desconto, separadas por "+" ("" se nenhuma).
+        valor_desconto (float): Valor abatido do subtotal.
+        total (float): Valor final da venda.
+        controlados (List[Medicamento]): Quimioterápicos que exigem receita.
+        receita (str): Referência da receita apresentada, gravada na trilha de auditoria dos controlados.
+        reserva (Optional[Reserva]): Estoque reservado para o carrinho até a confirmação ou o cancelamento.
+        venda (Optional[Venda]): Venda registrada, se o carrinho foi confirmado.
+    """
+    def __init__(self, cliente: Cliente, itens: List[Tuple[Medicamento, int]], precificacao: Precificacao,
+                 controlados: List[Medicamento]):
+        self.cliente = cliente
+        self.itens = itens
+        self.precos = precificacao.precos
+        self.subtotal = precificacao.subtotal
+        self.valor_desconto = precificacao.valor_desconto
+        self.desconto = self.valor_desconto / self.subtotal if self.subtotal else 0.0
+        self.tipo_desconto = precificacao.tipo_desconto
+        self.total = self.subtotal - self.valor_desconto
+        self.controlados = controlados
+        self.receita = ""
+        self.reserva: Optional[Reserva] = None
+        self.venda: Optional[Venda] = None
+        self._descricao_desconto = precificacao.descricao
+
+    def descricao_desconto(self) -> str:
+        return self._descricao_desconto or "Nenhum"
+
+
+class ResultadoLote:
+    """
+    Resultado de um checkout em lote.
+
+    Atributos:
+        resultados (List[ResultadoCheckout]): Carrinhos precificados (e confirmados, se pedido).
+        erros (List[Tuple[int, str]]): Pares (posição do carrinho no lote, motivo da rejeição).
+    """
+    def __init__(self):
+        self.resultados: List[ResultadoCheckout] = []
+        self.erros: List[Tuple[int, str]] = []
+
+
+def definir_regras(regras: Iterable[Regra]) -> AvaliadorPrecos:
+    """Compila e passa a usar um novo conjunto de regras de preço (na ordem de prioridade)."""
+    global avaliador
+    avaliador = compilar(regras)
+    return avaliador
+
+
+def _controlados(itens: Sequence[Tuple[Medicamento, int]]) -> List[Medicamento]:
+    return [med for med, _ in itens if isinstance(med, MedicamentoQuimioterapico) and med.necessita_receita]
+
+
+@instrumentar()
+def precificar(cliente: Cliente, itens: Sequence[Tuple[Medicamento, int]],
+               dia: Optional[datetime.date] = None) -> ResultadoCheckout:
+    """Calcula subtotal, desconto e total de um carrinho já resolvido, sem registrar nada."""
+    itens = list(itens)
+    return ResultadoCheckout(cliente, itens, avaliador.avaliar(cliente, itens, dia), _controlados(itens))
+
+
+@instrumentar()
+def precificar_lote(carrinhos: Iterable[Tuple[Cliente, Sequence[Tuple[Medicamento, int]]]],
+                    dia: Optional[datetime.date] = None) -> List[ResultadoCheckout]:
+    """
+    Precifica vários carrinhos (cliente, itens) já resolvidos em uma passada,
+    com as regras e os fatos de cliente de um mesmo dia.
+    """
+    carrinhos = [(cliente, list(itens)) for cliente, itens in carrinhos]
+    precificacoes = avaliador.avaliar_lote(carrinhos, dia)
+    return [ResultadoCheckout(cliente, itens, precificacao, _controlados(itens))
+            for (cliente, itens), precificacao in zip(carrinhos, precificacoes)]
+
+
+def reprecificar(resultados: Iterable[ResultadoCheckout]) -> List[ResultadoCheckout]:
+    """
+    Precifica de novo, com as regras atuais, carrinhos ainda não confirmados
+    (ex.: após `definir_regras`). Levanta VendaInvalida se algum já foi confirmado.
+    """
+    resultados = list(resultados)
+    if any(resultado.venda is not None for resultado in resultados):
+        raise VendaInvalida("Venda já confirmada não pode ser reprecificada.")
+    return precificar_lote((resultado.cliente, resultado.itens) for resultado in resultados)
+
+
+def resolver_itens(itens: Iterable[ItemCarrinho]) -> List[Tuple[Medicamento, int]]:
+    """Converte pares (nome do medicamento, quantidade) em (Medicamento, quantidade)."""
+    resolvidos = []
+    for sku, qtde in itens:
+        med = medicamentos.get(sku)
+        if med is None:
+            raise VendaInvalida(f"Medicamento não cadastrado: {sku}")
+        # bool é subclasse de int, mas `true` num JSON não é uma quantidade.
+        if not isinstance(qtde, int) or isinstance(qtde, bool) or not 0 < qtde <= QUANTIDADE_MAXIMA:
+            raise VendaInvalida(f"Quantidade inválida para {sku}: {qtde}")
+        resolvidos.append((med, qtde))
+    if not resolvidos:
+        raise VendaInvalida("Carrinho vazio.")
+    return resolvidos
+
+
+def reservar_itens(itens: Iterable[Tuple[Medicamento, int]], reserva: Optional[Reserva] = None) -> Reserva:
+    """Reserva estoque para os itens (ou os acrescenta a `reserva`); levanta VendaInvalida se faltar."""
+    try:
+        return estoque.reservar(itens, reserva)
+    except EstoqueInsuficiente as exc:
+        raise VendaInvalida(str(exc)) from exc
+
+
+def _anexar_venda(venda: Venda) -> None:
+    venda.armazenar_itens()
+    with persistencia.transacao():
+        vendas.append(venda)
+        persistencia.registrar_evento(persistencia.EVENTO_VENDA, venda)
+
+
+def _atualizar_agregados(venda: Venda) -> None:
+    # Os agregados não entram no snapshot (são refeitos a partir das vendas na recuperação),
+    # então ficam fora da transação.
+    historico_vendas.registrar(venda)
+    historico_clientes.registrar_venda(venda)
+    estatisticas.registrar_venda(venda)
+
+
+@instrumentar()
+def registrar_venda(venda: Venda) -> None:
+    """Armazena a venda confirmada e a grava no log; depois atualiza as estatísticas diárias e o histórico."""
+    _anexar_venda(venda)
+    _atualizar_agregados(venda)
+
+
+@instrumentar()
+def confirmar(resultado: ResultadoCheckout, data_hora: Optional[datetime.datetime] = None) -> Venda:
+    """
+    Registra como Venda um carrinho precificado. Os itens controlados exigem a
+    referência da receita em `resultado.receita` e vão antes para a trilha de auditoria.
+    """
+    if resultado.venda is not None:
+        raise VendaInvalida("Venda já confirmada.")
+    if resultado.controlados and not resultado.receita.strip():
+        nomes = ", ".join(med.nome for med in resultado.controlados)
+        raise VendaInvalida(f"Receita obrigatória para: {nomes}")
+    # A vaga na fila de auditoria é reservada antes da transação: com o disco da trilha
+    # atrasado, só este caixa espera, sem segurar a trava da persistência dos demais.
+    try:
+        vaga = auditoria.reservar_vaga() if resultado.controlados else None
+    except auditoria.AuditoriaIndisponivel as exc:
+        raise VendaInvalida(str(exc)) from exc
+    try:
+        # A baixa do estoque e o evento da venda entram juntos no log: uma contagem absoluta de
+        # estoque (evento "E") gravada entre os dois seria reproduzida antes da baixa e a descontaria de novo.
+        with persistencia.transacao():
+            # Sem reserva (ou com a reserva já expirada), o estoque é reservado agora, tudo ou nada.
+            if resultado.reserva is None or not resultado.reserva.efetivar():
+                resultado.reserva = reservar_itens(resultado.itens)
+                resultado.reserva.efetivar()
+            data_hora = data_hora or datetime.datetime.now()
+            if vaga is not None:
+                # Os eventos da venda entram na trilha juntos, antes de a Venda existir: se a trilha
+                # recusar, não sobra nem venda nem parte dos eventos.
+                eventos = auditoria.eventos_controlados(data_hora, resultado.cliente.cpf, resultado.itens,
+                                                        resultado.receita, LOJA)
+                try:
+                    vaga.registrar(eventos)
+                except auditoria.AuditoriaIndisponivel as exc:
+                    # Sem trilha de auditoria a venda não é registrada: o estoque já baixado volta.
+                    estoque.repor([(med, qtde) for med, qtde in resultado.itens if estoque.controla(med)])
+                    raise VendaInvalida(str(exc)) from exc
+            venda = Venda(data_hora, resultado.itens, resultado.cliente, resultado.total,
+                          resultado.desconto, resultado.tipo_desconto, LOJA, resultado.precos)
+            _anexar_venda(venda)
+    finally:
+        if vaga is not None:
+            vaga.devolver()
+    _atualizar_agregados(venda)
+    resultado.venda = venda
+    return venda
+
+
+def cancelar(resultado: ResultadoCheckout) -> None:
+    """Desiste de um carrinho não confirmado, devolvendo o estoque reservado para ele."""
+    if resultado.venda is not None:
+        raise VendaInvalida("Venda já confirmada não pode ser cancelada.")
+    if resultado.reserva is not None:
+        resultado.reserva.liberar()
+
+
+@instrumentar()
+def checkout(cpf: str, itens: Iterable[ItemCarrinho], confirmar_venda: bool = True,
+             receita: str = "") -> ResultadoCheckout:
+    """
+    Precifica (e, por padrão, confirma) a venda de `itens` para o cliente `cpf`.
+    Levanta VendaInvalida se o cliente ou algum item não existir, se faltar
+    estoque ou se a venda confirmada tiver item controlado sem `receita` (a
+    referência da receita, gravada na auditoria). Sem confirmação, o estoque
+    fica reservado até `confirmar` ou `cancelar`.
+    """
+    cliente = clientes.get(cpf)
+    if cliente is None:
+        raise VendaInvalida(f"Cliente não cadastrado: {cpf}")
+    resolvidos = resolver_itens(itens)
+    reserva = reservar_itens(resolvidos)
+    try:
+        resultado = precificar(cliente, resolvidos)
+    except BaseException:
+        reserva.liberar()
+        raise
+    resultado.reserva = reserva
+    resultado.receita = receita
+    if confirmar_venda:
+        try:
+            confirmar(resultado)
+        except BaseException:
+            cancelar(resultado)
+            raise
+    return resultado
+
+
+@instrumentar()
+def checkout_lote(carrinhos: Iterable[Tuple[str, Sequence[ItemCarrinho]]],
+                  confirmar_venda: bool = True, receitas: Optional[Sequence[str]] = None) -> ResultadoLote:
+    """
+    Precifica (e, por padrão, confirma) vários carrinhos (cpf, itens) em uma passada.
+    `receitas`, se dada, traz a referência da receita de cada carrinho, na mesma
+    ordem; carrinhos com item controlado sem receita são rejeitados na confirmação.
+
+    Todo o lote é precificado com as regras do mesmo dia e todas as vendas
+    recebem o mesmo horário. Carrinhos inválidos (ou sem estoque, ou rejeitados
+    na confirmação) não interrompem o lote: ficam em `erros`, fora de `resultados`.
+    """
+    carrinhos = list(carrinhos)
+    if receitas is not None and len(receitas) != len(carrinhos):
+        raise ValueError("`receitas` precisa ter uma referência (ou \"\") por carrinho.")
+    lote = ResultadoLote()
+    agora = datetime.datetime.now()
+    validos = []
+    posicoes: List[int] = []
+    reservas: List[Reserva] = []
+    for pos, (cpf, itens) in enumerate(carrinhos):
+        cliente = clientes.get(cpf)
+        if cliente is None:
+            lote.erros.append((pos, f"Cliente não cadastrado: {cpf}"))
+            continue
+        try:
+            resolvidos = resolver_itens(itens)
+            reservas.append(reservar_itens(resolvidos))
+            validos.append((cliente, resolvidos))
+            posicoes.append(pos)
+        except VendaInvalida as exc:
+            lote.erros.append((pos, str(exc)))
+    try:
+        lote.resultados = precificar_lote(validos, agora.date())
+    except BaseException:
+        for reserva in reservas:
+            reserva.liberar()
+        raise
+    for pos, resultado, reserva in zip(posicoes, lote.resultados, reservas):
+        resultado.reserva = reserva
+        if receitas is not None:
+            resultado.receita = receitas[pos]
+    if confirmar_venda:
+        confirmados = []
+        for i, (pos, resultado) in enumerate(zip(posicoes, lote.resultados)):
+            try:
+                confirmar(resultado, agora)
+            except VendaInvalida as exc:
+                cancelar(resultado)
+                lote.erros.append((pos, str(exc)))
+                continue
+            except BaseException:
+                # Falha inesperada: os carrinhos ainda não confirmados devolvem o estoque reservado.
+                for restante in lote.resultados[i:]:
+                    if restante.venda is None:
+                        cancelar(restante)
+                raise
+            confirmados.append(resultado)
+        lote.resultados = confirmados
+        lote.erros.sort()
+    return lote
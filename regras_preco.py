@@ -0,0 +1,324 @@
+"""
+Motor de regras de preço e desconto.
+
+Um conjunto de regras (preços por SKU, promoções por laboratório, descontos por
+tipo de medicamento, por idade do cliente ou por valor da compra) é compilado
+uma vez em um `AvaliadorPrecos`, que precifica carrinhos sem reinterpretar as
+regras a cada venda:
+
+- as regras de cada medicamento (preço próprio, promoções do laboratório e do
+  tipo) são resolvidas na primeira vez que ele aparece e memorizadas;
+- a idade de cada cliente é calculada uma vez por dia;
+- as duas memórias são descartadas na virada do dia, quando também mudam as
+  regras vigentes.
+
+Empilhamento: regras combináveis somam-se (cada uma calculada sobre o preço
+cheio); uma regra exclusiva não se soma a nenhuma outra. Vale o que der o
+maior desconto entre a soma das combináveis e cada exclusiva isoladamente (no
+empate, a regra que vem primeiro no conjunto).
+"""
+import datetime
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from entidades.cliente import Cliente
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico
+
+# Valores aceitos para o tipo de medicamento nas regras.
+TIPO_QUIMIO = "Q"
+TIPO_FITO = "F"
+
+
+class Regra:
+    """
+    Base das regras de preço.
+
+    Atributos:
+        nome (str): Identificador curto, gravado em `tipo_desconto` da venda.
+        descricao (str): Texto exibido ao operador quando a regra é aplicada.
+        combinavel (bool): Se o desconto pode somar-se ao de outras regras combináveis.
+        inicio (Optional[datetime.date]): Primeiro dia de vigência (None = sem início).
+        fim (Optional[datetime.date]): Último dia de vigência (None = sem fim).
+    """
+    def __init__(self, nome: str, descricao: str = "", combinavel: bool = False,
+                 inicio: Optional[datetime.date] = None, fim: Optional[datetime.date] = None):
+        self.nome = nome
+        self.descricao = descricao or nome
+        self.combinavel = combinavel
+        self.inicio = inicio
+        self.fim = fim
+
+    def vigente(self, dia: datetime.date) -> bool:
+        return (self.inicio is None or self.inicio <= dia) and (self.fim is None or dia <= self.fim)
+
+
+class PrecoSku(Regra):
+    """
+    Preço próprio de um medicamento, no lugar do preço de cadastro. Não é um
+    desconto: o valor entra no subtotal.
+
+    Atributos:
+        medicamento (str): Nome do medicamento.
+        preco (float): Preço unitário a cobrar.
+    """
+    def __init__(self, medicamento: str, preco: float, **kwargs):
+        kwargs.setdefault("nome", f"preco:{medicamento}")
+        super().__init__(**kwargs)
+        self.medicamento = medicamento
+        self.preco = preco
+
+
+class DescontoLaboratorio(Regra):
+    """
+    Promoção sobre os itens de um laboratório.
+
+    Atributos:
+        laboratorio (str): Nome do laboratório (sem diferenciar maiúsculas).
+        percentual (float): Desconto sobre o valor dos itens (0.15 = 15%).
+    """
+    def __init__(self, laboratorio: str, percentual: float, **kwargs):
+        kwargs.setdefault("nome", f"lab:{laboratorio}")
+        kwargs.setdefault("descricao", f"{percentual:.0%} (Promoção {laboratorio})")
+        super().__init__(**kwargs)
+        self.laboratorio = laboratorio
+        self.percentual = percentual
+
+
+class DescontoTipo(Regra):
+    """
+    Desconto sobre os itens de um tipo de medicamento.
+
+    Atributos:
+        tipo (str): "Q" (quimioterápicos) ou "F" (fitoterápicos).
+        percentual (float): Desconto sobre o valor dos itens.
+    """
+    def __init__(self, tipo: str, percentual: float, **kwargs):
+        if tipo not in (TIPO_QUIMIO, TIPO_FITO):
+            raise ValueError(f"Tipo de medicamento inválido: {tipo!r}")
+        kwargs.setdefault("nome", f"tipo:{tipo}")
+        rotulo = "Quimioterápicos" if tipo == TIPO_QUIMIO else "Fitoterápicos"
+        kwargs.setdefault("descricao", f"{percentual:.0%} ({rotulo})")
+        super().__init__(**kwargs)
+        self.tipo = tipo
+        self.percentual = percentual
+
+
+class DescontoIdoso(Regra):
+    """
+    Desconto sobre a compra toda para clientes acima de uma idade.
+
+    Atributos:
+        idade_minima (int): O cliente precisa ter mais que esta idade.
+        percentual (float): Desconto sobre o subtotal.
+    """
+    def __init__(self, idade_minima: int, percentual: float, **kwargs):
+        kwargs.setdefault("nome", "idoso")
+        kwargs.setdefault("descricao", f"{percentual:.0%} (Idoso)")
+        super().__init__(**kwargs)
+        self.idade_minima = idade_minima
+        self.percentual = percentual
+
+
+class DescontoValorMinimo(Regra):
+    """
+    Desconto sobre a compra toda quando o subtotal passa de um limite.
+
+    Atributos:
+        limite (float): O subtotal precisa ser maior que este valor.
+        percentual (float): Desconto sobre o subtotal.
+    """
+    def __init__(self, limite: float, percentual: float, **kwargs):
+        kwargs.setdefault("nome", "valor")
+        kwargs.setdefault("descricao", f"{percentual:.0%} (>= R${limite:.0f})")
+        super().__init__(**kwargs)
+        self.limite = limite
+        self.percentual = percentual
+
+
+class Precificacao:
+    """
+    Resultado da avaliação das regras sobre um carrinho.
+
+    Atributos:
+        precos (List[float]): Preço unitário cobrado em cada item, na ordem do carrinho.
+        subtotal (float): Soma de preço x quantidade.
+        valor_desconto (float): Valor total abatido.
+        aplicadas (List[Regra]): Regras de desconto aplicadas.
+    """
+    __slots__ = ("precos", "subtotal", "valor_desconto", "aplicadas")
+
+    def __init__(self, precos: List[float], subtotal: float, valor_desconto: float, aplicadas: List[Regra]):
+        self.precos = precos
+        self.subtotal = subtotal
+        self.valor_desconto = valor_desconto
+        self.aplicadas = aplicadas
+
+    @property
+    def tipo_desconto(self) -> str:
+        return "+".join(regra.nome for regra in self.aplicadas)
+
+    @property
+    def descricao(self) -> str:
+        return " + ".join(regra.descricao for regra in self.aplicadas)
+
+
+# Regras de um medicamento já resolvidas: (preço próprio ou None, [(percentual, regra), ...]).
+_RegrasItem = Tuple[Optional[float], Tuple[Tuple[float, Regra], ...]]
+
+
+class _EstadoDia:
+    """Regras vigentes em um dia e as memórias válidas só nesse dia."""
+    __slots__ = ("dia", "precos", "por_laboratorio", "por_tipo", "idoso", "valor", "itens", "idades")
+
+    def __init__(self, regras: Sequence[Regra], dia: datetime.date):
+        self.dia = dia
+        self.precos: Dict[str, float] = {}
+        self.por_laboratorio: Dict[str, List[Tuple[float, Regra]]] = {}
+        self.por_tipo: Dict[str, List[Tuple[float, Regra]]] = {}
+        self.idoso: List[DescontoIdoso] = []
+        self.valor: List[DescontoValorMinimo] = []
+        for regra in regras:
+            if not regra.vigente(dia):
+                continue
+            if isinstance(regra, PrecoSku):
+                self.precos[regra.medicamento] = regra.preco
+            elif isinstance(regra, DescontoLaboratorio):
+                self.por_laboratorio.setdefault(regra.laboratorio.lower(), []).append((regra.percentual, regra))
+            elif isinstance(regra, DescontoTipo):
+                self.por_tipo.setdefault(regra.tipo, []).append((regra.percentual, regra))
+            elif isinstance(regra, DescontoIdoso):
+                self.idoso.append(regra)
+            elif isinstance(regra, DescontoValorMinimo):
+                self.valor.append(regra)
+        self.itens: Dict[str, _RegrasItem] = {}
+        self.idades: Dict[str, int] = {}
+
+
+class AvaliadorPrecos:
+    """
+    Conjunto de regras compilado, pronto para precificar carrinhos.
+
+    Atributos:
+        regras (Tuple[Regra, ...]): Regras na ordem de prioridade (usada nos empates).
+    """
+    def __init__(self, regras: Iterable[Regra]):
+        self.regras = tuple(regras)
+        self._ordem = {id(regra): pos for pos, regra in enumerate(self.regras)}
+        self._estado: Optional[_EstadoDia] = None
+
+    def _estado_do_dia(self, dia: datetime.date) -> _EstadoDia:
+        estado = self._estado
+        if estado is None or estado.dia != dia:
+            # Troca de referência: quem já está avaliando continua com o estado anterior.
+            estado = self._estado = _EstadoDia(self.regras, dia)
+        return estado
+
+    def _regras_item(self, estado: _EstadoDia, med: Medicamento) -> _RegrasItem:
+        regras = estado.itens.get(med.nome)
+        if regras is None:
+            descontos = estado.por_laboratorio.get(med.laboratorio.nome.lower(), []) + \
+                estado.por_tipo.get(TIPO_QUIMIO if isinstance(med, MedicamentoQuimioterapico) else TIPO_FITO, [])
+            regras = estado.itens[med.nome] = (estado.precos.get(med.nome), tuple(descontos))
+        return regras
+
+    @staticmethod
+    def _idade(estado: _EstadoDia, cliente: Cliente) -> int:
+        idade = estado.idades.get(cliente.cpf)
+        if idade is None:
+            idade = estado.idades[cliente.cpf] = cliente.idade(estado.dia)
+        return idade
+
+    def idade(self, cliente: Cliente, dia: Optional[datetime.date] = None) -> int:
+        """Idade do cliente no dia, calculada uma vez por dia."""
+        return self._idade(self._estado_do_dia(dia or datetime.date.today()), cliente)
+
+    def avaliar(self, cliente: Cliente, itens: Sequence[Tuple[Medicamento, int]],
+                dia: Optional[datetime.date] = None) -> Precificacao:
+        """Aplica as regras vigentes no dia (padrão: hoje) ao carrinho."""
+        estado = self._estado_do_dia(dia or datetime.date.today())
+        precos: List[float] = []
+        subtotal = 0.0
+        descontos: Dict[int, List] = {}
+        for med, qtde in itens:
+            preco_proprio, regras_item = self._regras_item(estado, med)
+            preco = med.preco if preco_proprio is None else preco_proprio
+            precos.append(preco)
+            valor = preco * qtde
+            subtotal += valor
+            for percentual, regra in regras_item:
+                acumulado = descontos.get(id(regra))
+                if acumulado is None:
+                    descontos[id(regra)] = [valor * percentual, regra]
+                else:
+                    acumulado[0] += valor * percentual
+
+        if estado.idoso:
+            idade = self._idade(estado, cliente)
+            for regra in estado.idoso:
+                if idade > regra.idade_minima:
+                    descontos[id(regra)] = [subtotal * regra.percentual, regra]
+        for regra in estado.valor:
+            if subtotal > regra.limite:
+                descontos[id(regra)] = [subtotal * regra.percentual, regra]
+
+        if not descontos:
+            return Precificacao(precos, subtotal, 0.0, [])
+        ordem = self._ordem
+        candidatos = sorted(descontos.values(), key=lambda par: ordem[id(par[1])])
+        combinadas = [regra for _, regra in candidatos if regra.combinavel]
+        melhor_valor = sum(valor for valor, regra in candidatos if regra.combinavel)
+        aplicadas = combinadas
+        for valor, regra in candidatos:
+            if not regra.combinavel and valor > melhor_valor:
+                melhor_valor, aplicadas = valor, [regra]
+        if melhor_valor <= 0.0:
+            return Precificacao(precos, subtotal, 0.0, [])
+        return Precificacao(precos, subtotal, min(subtotal, melhor_valor), aplicadas)
+
+    def avaliar_lote(self, carrinhos: Iterable[Tuple[Cliente, Sequence[Tuple[Medicamento, int]]]],
+                     dia: Optional[datetime.date] = None) -> List[Precificacao]:
+        """Precifica vários carrinhos (cliente, itens) com as regras e as memórias de um mesmo dia."""
+        dia = dia or datetime.date.today()
+        return [self.avaliar(cliente, itens, dia) for cliente, itens in carrinhos]
+
+
+def compilar(regras: Iterable[Regra]) -> AvaliadorPrecos:
+    """Compila o conjunto de regras (na ordem de prioridade) em um avaliador."""
+    return AvaliadorPrecos(regras)
+
+
+def _ler_data(texto: Optional[str]) -> Optional[datetime.date]:
+    return datetime.date.fromisoformat(texto) if texto else None
+
+
+def regra_de_dict(d: dict) -> Regra:
+    """
+    Constrói uma regra a partir de um dicionário (ex.: uma entrada de JSON).
+    Campos comuns: "tipo", "nome", "descricao", "combinavel", "inicio", "fim" (YYYY-MM-DD).
+    Levanta ValueError se a regra for inválida.
+    """
+    d = dict(d)
+    tipo = d.pop("tipo", None)
+    comuns = {chave: d.pop(chave) for chave in ("nome", "descricao", "combinavel") if chave in d}
+    comuns["inicio"] = _ler_data(d.pop("inicio", None))
+    comuns["fim"] = _ler_data(d.pop("fim", None))
+    try:
+        if tipo == "preco":
+            return PrecoSku(d.pop("medicamento"), float(d.pop("preco")), **comuns)
+        if tipo == "laboratorio":
+            return DescontoLaboratorio(d.pop("laboratorio"), float(d.pop("percentual")), **comuns)
+        if tipo == "tipo_medicamento":
+            return DescontoTipo(d.pop("tipo_medicamento"), float(d.pop("percentual")), **comuns)
+        if tipo == "idoso":
+            return DescontoIdoso(int(d.pop("idade_minima")), float(d.pop("percentual")), **comuns)
+        if tipo == "valor_minimo":
+            return DescontoValorMinimo(float(d.pop("limite")), float(d.pop("percentual")), **comuns)
+    except KeyError as exc:
+        raise ValueError(f"Regra {tipo!r} sem o campo {exc}") from None
+    raise ValueError(f"Tipo de regra desconhecido: {tipo!r}")
+
+
+def carregar_regras(caminho: str) -> List[Regra]:
+    """Lê uma lista de regras de um arquivo JSON (na ordem de prioridade)."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [regra_de_dict(d) for d in json.load(arquivo)]
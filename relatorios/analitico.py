@@ -0,0 +1,223 @@
+import datetime
+import heapq
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from entidades.venda import Venda
+from entidades.itens_venda import catalogo_skus
+from data import vendas
+
+try:  # NumPy é opcional: acelera os agrupamentos, mas não é obrigatório.
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+# Faixas etárias (idade mínima, rótulo), em ordem crescente.
+FAIXAS_ETARIAS = ((0, "0-17"), (18, "18-29"), (30, "30-44"), (45, "45-59"), (60, "60-65"), (66, "66+"))
+
+DIMENSAO_MEDICAMENTO = "medicamento"
+DIMENSAO_LABORATORIO = "laboratorio"
+DIMENSAO_ESTADO = "estado"
+DIMENSAO_FAIXA_ETARIA = "faixa_etaria"
+DIMENSAO_TIPO_DESCONTO = "tipo_desconto"
+DIMENSOES = (DIMENSAO_MEDICAMENTO, DIMENSAO_LABORATORIO, DIMENSAO_ESTADO, DIMENSAO_FAIXA_ETARIA,
+             DIMENSAO_TIPO_DESCONTO)
+
+
+def faixa_etaria(idade: int) -> int:
+    """Índice em FAIXAS_ETARIAS da faixa que contém `idade`."""
+    indice = 0
+    for i, (minima, _) in enumerate(FAIXAS_ETARIAS):
+        if idade >= minima:
+            indice = i
+    return indice
+
+
+class Interning:
+    """Atribui ids inteiros densos a rótulos (nomes de laboratório, UFs, tipos de desconto)."""
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.rotulos: List[str] = []
+
+    def id_de(self, rotulo: str) -> int:
+        id_ = self.ids.get(rotulo)
+        if id_ is None:
+            id_ = self.ids[rotulo] = len(self.rotulos)
+            self.rotulos.append(rotulo)
+        return id_
+
+
+class ProjecaoVendas:
+    """
+    Projeção colunar dos itens vendidos: uma linha por item de venda, uma coluna
+    (array) por atributo. A projeção é incremental: cada atualização só projeta
+    as vendas acrescentadas a `data.vendas` desde a anterior.
+
+    Colunas:
+        sku (I): sku_id do medicamento.
+        laboratorio (I): id do laboratório (ver `laboratorios`).
+        qtde (I): Quantidade vendida.
+        preco_centavos (q): Preço unitário, em centavos.
+        receita_centavos (q): Valor do item já com o desconto da venda, em centavos.
+        faixa (B): Índice da faixa etária do cliente (ver FAIXAS_ETARIAS).
+        desconto (B): id do tipo de desconto da venda (ver `tipos_desconto`).
+        instante (d): Timestamp da venda.
+    """
+    def __init__(self):
+        self.sku = array("I")
+        self.laboratorio = array("I")
+        self.qtde = array("I")
+        self.preco_centavos = array("q")
+        self.receita_centavos = array("q")
+        self.faixa = array("B")
+        self.desconto = array("B")
+        self.instante = array("d")
+        self.laboratorios = Interning()
+        self.tipos_desconto = Interning()
+        # id do laboratório -> UF, para agrupar por estado sem uma coluna extra.
+        self.estado_do_laboratorio: List[str] = []
+        self._faixa_por_cpf: Dict[str, int] = {}
+        self._vendas_projetadas = 0
+
+    def __len__(self) -> int:
+        return len(self.sku)
+
+    def _projetar(self, venda: Venda) -> None:
+        cpf = venda.cliente.cpf
+        faixa = self._faixa_por_cpf.get(cpf)
+        if faixa is None:
+            faixa = self._faixa_por_cpf[cpf] = faixa_etaria(venda.cliente.idade())
+        tipo_desconto = self.tipos_desconto.id_de(venda.tipo_desconto or "nenhum")
+        # Rateia o valor pago pelos itens, proporcionalmente ao preço unitário cobrado em cada um.
+        itens = list(zip(venda.itens_ids(), venda.precos))
+        bruto = sum(preco_cobrado * qtde for (_, qtde), preco_cobrado in itens)
+        fator = venda.valor_total / bruto if bruto else 0.0
+        instante = venda.data_hora.timestamp()
+        for (sku, qtde), preco_cobrado in itens:
+            med = catalogo_skus.medicamento(sku)
+            lab = med.laboratorio
+            lab_id = self.laboratorios.id_de(lab.nome)
+            if lab_id == len(self.estado_do_laboratorio):
+                self.estado_do_laboratorio.append(lab.estado)
+            preco = round(preco_cobrado * 100)
+            self.sku.append(sku)
+            self.laboratorio.append(lab_id)
+            self.qtde.append(qtde)
+            self.preco_centavos.append(preco)
+            self.receita_centavos.append(round(preco * qtde * fator))
+            self.faixa.append(faixa)
+            self.desconto.append(tipo_desconto)
+            self.instante.append(instante)
+
+    def atualizar(self, origem: Sequence[Venda] = vendas) -> None:
+        """Projeta as vendas de `origem` ainda não projetadas."""
+        for i in range(self._vendas_projetadas, len(origem)):
+            self._projetar(origem[i])
+        self._vendas_projetadas = len(origem)
+
+
+def _somar_por_chave(chaves: array, valores: array, tamanho: int,
+                     mascara: Optional[Tuple[float, float]], instantes: array) -> Tuple[List[int], List[int]]:
+    """Retorna (somas, contagens) por chave densa em [0, tamanho)."""
+    if np is not None:
+        k = np.frombuffer(chaves, dtype=np.uint32) if chaves.typecode == "I" else np.frombuffer(chaves, dtype=np.uint8)
+        v = np.frombuffer(valores, dtype=np.int64) if valores.typecode == "q" else \
+            np.frombuffer(valores, dtype=np.uint32).astype(np.int64)
+        if mascara is not None:
+            t = np.frombuffer(instantes, dtype=np.float64)
+            filtro = (t >= mascara[0]) & (t < mascara[1])
+            k, v = k[filtro], v[filtro]
+        somas = np.bincount(k, weights=v, minlength=tamanho)
+        contagens = np.bincount(k, minlength=tamanho)
+        return [int(round(s)) for s in somas], [int(c) for c in contagens]
+
+    somas = [0] * tamanho
+    contagens = [0] * tamanho
+    if mascara is None:
+        for chave, valor in zip(chaves, valores):
+            somas[chave] += valor
+            contagens[chave] += 1
+    else:
+        inicio, fim = mascara
+        for chave, valor, instante in zip(chaves, valores, instantes):
+            if inicio <= instante < fim:
+                somas[chave] += valor
+                contagens[chave] += 1
+    return somas, contagens
+
+
+class LinhaAgrupada:
+    """
+    Uma linha de um agrupamento.
+
+    Atributos:
+        rotulo (str): Valor da dimensão (nome do laboratório, UF, faixa etária...).
+        receita (float): Faturamento com desconto, em reais.
+        unidades (int): Unidades vendidas.
+        itens (int): Itens de venda (linhas) agrupados.
+    """
+    __slots__ = ("rotulo", "receita", "unidades", "itens")
+
+    def __init__(self, rotulo: str, receita: float, unidades: int, itens: int):
+        self.rotulo = rotulo
+        self.receita = receita
+        self.unidades = unidades
+        self.itens = itens
+
+    def __str__(self) -> str:
+        return f"{self.rotulo} | R$ {self.receita:.2f} | {self.unidades} unidades | {self.itens} itens"
+
+
+def agrupar(projecao: ProjecaoVendas, dimensao: str, inicio: Optional[datetime.datetime] = None,
+            fim: Optional[datetime.datetime] = None) -> List[LinhaAgrupada]:
+    """
+    Soma faturamento e unidades por `dimensao` (ver DIMENSOES), opcionalmente só
+    nas vendas com inicio <= data_hora < fim. Ordena do maior para o menor faturamento.
+    """
+    if dimensao == DIMENSAO_MEDICAMENTO:
+        chaves, tamanho = projecao.sku, len(catalogo_skus)
+        rotulo = lambda i: catalogo_skus.medicamento(i).nome
+    elif dimensao in (DIMENSAO_LABORATORIO, DIMENSAO_ESTADO):
+        chaves, tamanho = projecao.laboratorio, len(projecao.laboratorios.rotulos)
+        rotulo = projecao.laboratorios.rotulos.__getitem__
+    elif dimensao == DIMENSAO_FAIXA_ETARIA:
+        chaves, tamanho = projecao.faixa, len(FAIXAS_ETARIAS)
+        rotulo = lambda i: FAIXAS_ETARIAS[i][1]
+    elif dimensao == DIMENSAO_TIPO_DESCONTO:
+        chaves, tamanho = projecao.desconto, len(projecao.tipos_desconto.rotulos)
+        rotulo = projecao.tipos_desconto.rotulos.__getitem__
+    else:
+        raise ValueError(f"Dimensão desconhecida: {dimensao}")
+
+    mascara = None
+    if inicio is not None or fim is not None:
+        mascara = (inicio.timestamp() if inicio else float("-inf"), fim.timestamp() if fim else float("inf"))
+    receitas, itens = _somar_por_chave(chaves, projecao.receita_centavos, tamanho, mascara, projecao.instante)
+    unidades, _ = _somar_por_chave(chaves, projecao.qtde, tamanho, mascara, projecao.instante)
+
+    if dimensao == DIMENSAO_ESTADO:
+        # Dobra os totais por laboratório em totais por UF (poucos laboratórios, custo desprezível).
+        por_uf: Dict[str, List[int]] = {}
+        for lab_id in range(tamanho):
+            acumulado = por_uf.setdefault(projecao.estado_do_laboratorio[lab_id], [0, 0, 0])
+            acumulado[0] += receitas[lab_id]
+            acumulado[1] += unidades[lab_id]
+            acumulado[2] += itens[lab_id]
+        linhas = [LinhaAgrupada(uf, r / 100, u, n) for uf, (r, u, n) in por_uf.items() if n]
+    else:
+        linhas = [LinhaAgrupada(rotulo(i), receitas[i] / 100, unidades[i], itens[i])
+                  for i in range(tamanho) if itens[i]]
+    linhas.sort(key=lambda linha: (-linha.receita, linha.rotulo))
+    return linhas
+
+
+def top_n(projecao: ProjecaoVendas, dimensao: str, n: int, por_unidades: bool = False) -> List[LinhaAgrupada]:
+    """Os `n` maiores valores da dimensão, por faturamento ou por unidades."""
+    linhas = agrupar(projecao, dimensao)
+    if por_unidades:
+        return heapq.nlargest(n, linhas, key=lambda linha: linha.unidades)
+    return linhas[:n]
+
+
+# Projeção compartilhada, atualizada sob demanda a partir de `data.vendas`.
+projecao = ProjecaoVendas()
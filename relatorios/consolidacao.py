@@ -0,0 +1,270 @@
+"""
+Consolidação da rede: cada loja (filial) grava um resumo compacto das suas
+estatísticas, e os resumos de N lojas são somados em relatórios da rede.
+
+O resumo guarda só agregados (vendas, unidades e faturamento da loja e, por
+medicamento, unidades, valor e tipo), então tanto gerá-lo quanto somá-lo custa
+O(medicamentos vendidos), e não O(vendas): nenhuma venda é relida. Os
+medicamentos são identificados pelo nome, já que os sku_id de cada loja são
+atribuídos localmente. Os valores são somados em centavos (inteiros), e por
+isso o resultado não depende da ordem em que os resumos são somados.
+
+Formato (inteiros little-endian):
+    cabeçalho  MAGIC, versão, tamanho do nome da loja, nº de medicamentos,
+               vendas, unidades e faturamento líquido em centavos (ver CABECALHO)
+    loja       nome da loja em UTF-8
+    colunas    arrays em `fechamento.empacotar`: unidades, centavos, tipo e
+               tamanho do nome de cada medicamento, e os nomes em UTF-8
+
+Uso pela linha de comando:
+    python -m relatorios.consolidacao --dados DIRETORIO --loja LOJA --saida loja.dig
+    python -m relatorios.consolidacao loja1.dig loja2.dig ... [--top 10]
+"""
+import argparse
+import heapq
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from entidades.medicamento import MedicamentoQuimioterapico, MedicamentoFitoterapico
+from relatorios.fechamento import TIPO_FITO, TIPO_OUTRO, TIPO_QUIMIO, desempacotar, empacotar
+from utils.estatisticas import CRITERIO_QUANTIDADE, CRITERIO_VALOR, EstatisticasVendas
+
+MAGIC_RESUMO = b"FARMDIG1"
+VERSAO_RESUMO = 1
+# magic, versão, tamanho do nome da loja, medicamentos, vendas, unidades, faturamento (centavos).
+CABECALHO = struct.Struct("<8sIHIQQq")
+# Itens exibidos nos rankings da rede.
+LIMITE_RANKING = 10
+
+
+def _centavos(valor: float) -> int:
+    return round(valor * 100)
+
+
+class ResumoEstatisticas:
+    """
+    Estatísticas somáveis de uma loja ou de um conjunto de lojas.
+
+    Atributos:
+        itens (Dict[str, List[int]]): Nome do medicamento -> [unidades, valor em centavos, tipo].
+        lojas (Dict[str, Tuple[int, int, int]]): Loja -> (vendas, unidades, faturamento líquido em centavos).
+    """
+    def __init__(self):
+        self.itens: Dict[str, List[int]] = {}
+        self.lojas: Dict[str, Tuple[int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+    @property
+    def vendas(self) -> int:
+        return sum(vendas for vendas, _, _ in self.lojas.values())
+
+    @property
+    def unidades(self) -> int:
+        return sum(unidades for _, unidades, _ in self.lojas.values())
+
+    @property
+    def faturamento(self) -> float:
+        """Valor pago pelos clientes (com descontos), em reais."""
+        return sum(centavos for _, _, centavos in self.lojas.values()) / 100
+
+    def mesclar(self, outro: "ResumoEstatisticas") -> "ResumoEstatisticas":
+        """
+        Soma `outro` a este resumo, em O(medicamentos de `outro`), e retorna
+        este resumo. Levanta ValueError se alguma loja já foi somada, para que
+        o mesmo arquivo passado duas vezes não seja contado em dobro.
+        """
+        repetidas = self.lojas.keys() & outro.lojas.keys()
+        if repetidas:
+            raise ValueError(f"Loja(s) já consolidada(s): {', '.join(sorted(repetidas))}")
+        self.lojas.update(outro.lojas)
+        itens = self.itens
+        for nome, (qtde, centavos, tipo) in outro.itens.items():
+            atual = itens.get(nome)
+            if atual is None:
+                itens[nome] = [qtde, centavos, tipo]
+            else:
+                atual[0] += qtde
+                atual[1] += centavos
+        return self
+
+    def totais_por_tipo(self) -> Dict[int, Tuple[int, float]]:
+        """Tipo (TIPO_QUIMIO, TIPO_FITO, TIPO_OUTRO) -> (unidades, valor em reais)."""
+        totais = {TIPO_QUIMIO: [0, 0], TIPO_FITO: [0, 0], TIPO_OUTRO: [0, 0]}
+        for qtde, centavos, tipo in self.itens.values():
+            total = totais[tipo]
+            total[0] += qtde
+            total[1] += centavos
+        return {tipo: (qtde, centavos / 100) for tipo, (qtde, centavos) in totais.items()}
+
+    def mais_vendidos(self, n: int = 1, criterio: str = CRITERIO_QUANTIDADE) -> List[Tuple[str, int, float]]:
+        """
+        Até `n` tuplas (nome, quantidade, valor) ordenadas pelo critério, do
+        maior para o menor, com empates pelo nome (como em `EstatisticasVendas`).
+        """
+        if criterio == CRITERIO_QUANTIDADE:
+            coluna = 0
+        elif criterio == CRITERIO_VALOR:
+            coluna = 1
+        else:
+            raise ValueError(f"Critério de ranking desconhecido: {criterio}")
+        topo = heapq.nsmallest(n, self.itens.items(), key=lambda par: (-par[1][coluna], par[0]))
+        return [(nome, qtde, centavos / 100) for nome, (qtde, centavos, _) in topo]
+
+    def mais_vendido(self) -> Optional[Tuple[str, int, float]]:
+        """Retorna (nome, quantidade, valor) do medicamento com mais unidades vendidas, ou None."""
+        topo = self.mais_vendidos(1)
+        return topo[0] if topo else None
+
+
+def gerar_resumo(loja: str, estatisticas: EstatisticasVendas,
+                 medicamentos: Dict[str, object]) -> ResumoEstatisticas:
+    """
+    Resumo da loja a partir dos agregados já mantidos a cada venda: os itens e
+    os totais por loja de `estatisticas`. O tipo de cada item vem de
+    `medicamentos` (nome -> Medicamento); itens que já não estão no catálogo
+    entram como TIPO_OUTRO.
+
+    Os totais são os das vendas feitas em `loja` (`Venda.loja`), somados aos
+    das vendas anteriores às filiais (loja ""). Como os itens não são
+    separados por loja, levanta ValueError se houver vendas de outra loja, em
+    vez de atribuí-las a `loja`.
+    """
+    if not loja:
+        raise ValueError("Loja não definida (use FARMACIA_LOJA ou informe a loja).")
+    por_loja = dict(estatisticas.por_loja)
+    outras = sorted(outra for outra in por_loja if outra not in ("", loja))
+    if outras:
+        raise ValueError(f"Os dados têm vendas de outra(s) loja(s): {', '.join(outras)}")
+    resumo = ResumoEstatisticas()
+    for nome, (qtde, valor) in list(estatisticas.itens.items()):
+        med = medicamentos.get(nome)
+        if isinstance(med, MedicamentoQuimioterapico):
+            tipo = TIPO_QUIMIO
+        elif isinstance(med, MedicamentoFitoterapico):
+            tipo = TIPO_FITO
+        else:
+            tipo = TIPO_OUTRO
+        resumo.itens[nome] = [qtde, _centavos(valor), tipo]
+    n_vendas = unidades = 0
+    valor_pago = 0.0
+    for vendas_loja, unidades_loja, valor_loja in por_loja.values():
+        n_vendas += vendas_loja
+        unidades += unidades_loja
+        valor_pago += valor_loja
+    resumo.lojas[loja] = (n_vendas, unidades, _centavos(valor_pago))
+    return resumo
+
+
+def gravar_resumo(caminho: str, resumo: ResumoEstatisticas) -> int:
+    """Grava o resumo de uma única loja (atomicamente) e retorna o número de medicamentos."""
+    if len(resumo.lojas) != 1:
+        raise ValueError("Só o resumo de uma única loja pode ser gravado.")
+    (loja, (n_vendas, unidades, centavos)), = resumo.lojas.items()
+    qtdes, valores, tipos, tamanhos = array("q"), array("q"), array("B"), array("I")
+    nomes = []
+    for nome, (qtde, valor, tipo) in resumo.itens.items():
+        dados = nome.encode("utf-8")
+        qtdes.append(qtde)
+        valores.append(valor)
+        tipos.append(tipo)
+        tamanhos.append(len(dados))
+        nomes.append(dados)
+    loja_bytes = loja.encode("utf-8")
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arq:
+        arq.write(CABECALHO.pack(MAGIC_RESUMO, VERSAO_RESUMO, len(loja_bytes), len(qtdes),
+                                 n_vendas, unidades, centavos))
+        arq.write(loja_bytes)
+        arq.write(empacotar([qtdes, valores, tipos, tamanhos, array("B", b"".join(nomes))]))
+        arq.flush()
+        os.fsync(arq.fileno())
+    os.replace(temporario, caminho)
+    return len(qtdes)
+
+
+def ler_resumo(caminho: str) -> ResumoEstatisticas:
+    """Lê um resumo gravado por `gravar_resumo`."""
+    with open(caminho, "rb") as arq:
+        dados = arq.read()
+    if len(dados) < CABECALHO.size:
+        raise ValueError(f"Resumo inválido: {caminho}")
+    magic, versao, tamanho_loja, n_itens, n_vendas, unidades, centavos = CABECALHO.unpack_from(dados, 0)
+    if magic != MAGIC_RESUMO or versao != VERSAO_RESUMO:
+        raise ValueError(f"Resumo inválido ou de versão desconhecida: {caminho}")
+    inicio = CABECALHO.size
+    loja = dados[inicio:inicio + tamanho_loja].decode("utf-8")
+    qtdes, valores, tipos, tamanhos, textos = desempacotar(dados[inicio + tamanho_loja:])
+    if not len(qtdes) == len(valores) == len(tipos) == len(tamanhos) == n_itens:
+        raise ValueError(f"Resumo truncado: {caminho}")
+    resumo = ResumoEstatisticas()
+    nomes = textos.tobytes()
+    pos = 0
+    for qtde, valor, tipo, tamanho in zip(qtdes, valores, tipos, tamanhos):
+        resumo.itens[nomes[pos:pos + tamanho].decode("utf-8")] = [qtde, valor, tipo]
+        pos += tamanho
+    resumo.lojas[loja] = (n_vendas, unidades, centavos)
+    return resumo
+
+
+def consolidar(caminhos: Iterable[str]) -> ResumoEstatisticas:
+    """Soma os resumos gravados nos arquivos em um resumo da rede."""
+    rede = ResumoEstatisticas()
+    for caminho in caminhos:
+        rede.mesclar(ler_resumo(caminho))
+    return rede
+
+
+def exibir_consolidacao(rede: ResumoEstatisticas, n: int = LIMITE_RANKING) -> None:
+    """Imprime os totais da rede, por loja e por tipo, e os rankings dos mais vendidos."""
+    print("\n========== Consolidação da Rede ==========")
+    print(f"Lojas: {len(rede.lojas)} | Vendas: {rede.vendas} | Unidades: {rede.unidades} | "
+          f"Faturamento: R$ {rede.faturamento:.2f}")
+    for loja, (n_vendas, unidades, centavos) in sorted(rede.lojas.items()):
+        print(f"  {loja}: {n_vendas} vendas | {unidades} unidades | R$ {centavos / 100:.2f}")
+    mais_vendido = rede.mais_vendido()
+    if mais_vendido:
+        nome, qtde, valor = mais_vendido
+        print(f"Remédio mais vendido na rede: {nome} | {qtde} unidades | R$ {valor:.2f}")
+    totais = rede.totais_por_tipo()
+    for tipo, rotulo in ((TIPO_QUIMIO, "Quimioterápicos"), (TIPO_FITO, "Fitoterápicos")):
+        qtde, valor = totais[tipo]
+        print(f"Total de {rotulo} vendidos: {qtde} unidades | Valor total: R$ {valor:.2f}")
+    for criterio, rotulo in ((CRITERIO_QUANTIDADE, "Unidades"), (CRITERIO_VALOR, "Faturamento")):
+        print(f"\n--- Top {n} Mais Vendidos na Rede ({rotulo}) ---")
+        for pos, (nome, qtde, valor) in enumerate(rede.mais_vendidos(n, criterio), start=1):
+            print(f"{pos}. {nome} | {qtde} unidades | R$ {valor:.2f}")
+    print("==========================================\n")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Resumos por loja e consolidação da rede da Farmácia E-Commerce.")
+    parser.add_argument("resumos", nargs="*", help="resumos de loja a consolidar")
+    parser.add_argument("--dados", help="diretório de persistência de onde gerar o resumo da loja")
+    parser.add_argument("--loja", help="loja do resumo (padrão: FARMACIA_LOJA)")
+    parser.add_argument("--saida", help="arquivo do resumo a gravar")
+    parser.add_argument("--top", type=int, default=LIMITE_RANKING, help="itens nos rankings da rede")
+    args = parser.parse_args(argv)
+
+    if args.dados and args.saida:
+        from data import LOJA, estatisticas, medicamentos
+        from utils import persistencia
+        persistencia.abrir(args.dados)
+        try:
+            resumo = gerar_resumo(args.loja or LOJA, estatisticas, medicamentos)
+            n = gravar_resumo(args.saida, resumo)
+            print(f"Resumo da loja {args.loja or LOJA} gravado em {args.saida}: {n} medicamentos.", file=sys.stderr)
+        finally:
+            persistencia.fechar()
+    elif args.resumos:
+        exibir_consolidacao(consolidar(args.resumos), args.top)
+    else:
+        parser.error("use --dados, --loja e --saida para gerar um resumo, ou informe os resumos a consolidar")
+
+
+if __name__ == "__main__":
+    main()
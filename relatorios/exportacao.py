@@ -0,0 +1,278 @@
+"""
+Exportação de clientes, medicamentos e vendas (com os itens) para CSV ou JSONL.
+
+As linhas são geradas sob demanda e gravadas em blocos, com memória constante
+independente do tamanho do histórico. O destino pode ser um arquivo ou a saída
+padrão ("-"); arquivos terminados em ".gz" (ou com gzip=True) são comprimidos.
+
+O formato segue a extensão (".jsonl"/".ndjson" -> JSONL, senão CSV com
+cabeçalho), e as colunas de clientes e medicamentos são as mesmas aceitas por
+`utils.importacao`, de modo que um arquivo exportado pode ser reimportado.
+
+Vendas saem com uma linha por item vendido:
+    venda, data_hora, cpf, medicamento, tipo, laboratorio, preco_unitario, quantidade,
+    valor_total_venda, desconto, tipo_desconto
+
+`preco_unitario` é o preço cobrado no item (o das regras de preço vigentes na
+venda), não o preço atual do cadastro.
+
+Uso pela linha de comando (lê os dados do diretório de persistência):
+    python -m relatorios.exportacao --dados DIRETORIO [--clientes clientes.csv]
+        [--medicamentos meds.jsonl [--tipo Q|F]] [--vendas vendas.csv.gz]
+"""
+import argparse
+import contextlib
+import csv
+import gzip as gzip_mod
+import io
+import itertools
+import json
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from entidades.itens_venda import catalogo_skus, armazem_itens
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico
+from data import vendas, indice_clientes_nome, indice_medicamentos_nome, indice_medicamentos_tipo
+from utils import persistencia
+
+FORMATO_CSV = "csv"
+FORMATO_JSONL = "jsonl"
+
+# Trechos de texto acumulados antes de cada escrita no arquivo.
+LINHAS_POR_BLOCO = 8192
+# Buffer do arquivo de saída, em bytes.
+TAMANHO_BUFFER = 1 << 20
+# Nível do gzip: 1 comprime um pouco menos, mas várias vezes mais rápido que o padrão 9.
+NIVEL_GZIP = 1
+
+COLUNAS_CLIENTES = ("cpf", "nome", "data_nascimento")
+COLUNAS_MEDICAMENTOS = ("tipo", "nome", "composto_principal", "laboratorio", "descricao", "preco",
+                        "necessita_receita")
+COLUNAS_VENDAS = ("venda", "data_hora", "cpf", "medicamento", "tipo", "laboratorio", "preco_unitario",
+                  "quantidade", "valor_total_venda", "desconto", "tipo_desconto")
+
+
+def formato_de(caminho: str) -> str:
+    nome = caminho.lower()
+    if nome.endswith(".gz"):
+        nome = nome[:-3]
+    return FORMATO_JSONL if nome.endswith((".jsonl", ".ndjson")) else FORMATO_CSV
+
+
+def campo_csv(valor: object) -> str:
+    """Valor como campo CSV, entre aspas só quando necessário."""
+    texto = str(valor)
+    if any(c in texto for c in ',"\r\n'):
+        return '"' + texto.replace('"', '""') + '"'
+    return texto
+
+
+def tipo_medicamento(med: Medicamento) -> str:
+    return "Q" if isinstance(med, MedicamentoQuimioterapico) else "F"
+
+
+# --- Geradores de linhas (tuplas na ordem das colunas) ---
+
+def linhas_clientes() -> Iterator[Tuple]:
+    """Clientes em ordem alfabética de nome."""
+    for pagina in indice_clientes_nome.paginas(LINHAS_POR_BLOCO):
+        for cli in pagina:
+            yield cli.cpf, cli.nome, cli.data_nascimento.isoformat()
+
+
+def linhas_medicamentos(tipo: Optional[str] = None) -> Iterator[Tuple]:
+    """Medicamentos em ordem alfabética de nome; `tipo` ("Q"/"F") restringe a um tipo."""
+    indice = indice_medicamentos_nome if tipo is None else indice_medicamentos_tipo[tipo]
+    for pagina in indice.paginas(LINHAS_POR_BLOCO):
+        for med in pagina:
+            quimio = isinstance(med, MedicamentoQuimioterapico)
+            yield ("Q" if quimio else "F", med.nome, med.composto_principal, med.laboratorio.nome, med.descricao,
+                   med.preco, ("S" if med.necessita_receita else "N") if quimio else "")
+
+
+def linhas_vendas() -> Iterator[Tuple]:
+    """
+    Uma tupla por item vendido, na ordem das vendas (a posição na lista é o
+    número da venda). É a referência do conteúdo que `texto_vendas` gera já
+    formatado; os testes conferem um contra o outro.
+    """
+    medicamento = catalogo_skus.medicamento
+    for numero in range(len(vendas)):
+        venda = vendas[numero]
+        data_hora = venda.data_hora.isoformat(sep=" ")
+        for (sku, qtde), preco in zip(venda.itens_ids(), venda.precos):
+            med = medicamento(sku)
+            yield (numero, data_hora, venda.cliente.cpf, med.nome, tipo_medicamento(med), med.laboratorio.nome,
+                   preco, qtde, round(venda.valor_total, 2), venda.desconto, venda.tipo_desconto)
+
+
+# --- Formatação em texto ---
+
+def texto_csv(colunas: Sequence[str], linhas: Iterable[Tuple]) -> Iterator[Tuple[str, int]]:
+    """
+    Gera o CSV em trechos de até LINHAS_POR_BLOCO registros, formatados pelo
+    módulo csv, como (trecho, registros no trecho); o cabeçalho não conta.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(colunas)
+    linhas = iter(linhas)
+    while True:
+        lote = list(itertools.islice(linhas, LINHAS_POR_BLOCO))
+        escritor.writerows(lote)
+        yield buffer.getvalue(), len(lote)
+        if len(lote) < LINHAS_POR_BLOCO:
+            return
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def texto_jsonl(colunas: Sequence[str], linhas: Iterable[Tuple]) -> Iterator[Tuple[str, int]]:
+    dumps = json.dumps
+    for linha in linhas:
+        yield dumps(dict(zip(colunas, linha)), ensure_ascii=False) + "\n", 1
+
+
+def texto_vendas(formato: str) -> Iterator[Tuple[str, int]]:
+    """
+    Mesmo conteúdo de `linhas_vendas`, já em texto, como (trecho, itens no
+    trecho). É o caminho rápido da exportação de vendas: os trechos de cada
+    medicamento e de cada venda são montados uma vez, cada item custa uma
+    concatenação de strings e cada venda sai como um único trecho com todas
+    as suas linhas.
+    """
+    em_csv = formato == FORMATO_CSV
+    if em_csv:
+        yield ",".join(COLUNAS_VENDAS) + "\n", 0
+    # Entre o preço cobrado e a quantidade de cada item.
+    antes_qtde = "," if em_csv else ',"quantidade":'
+    trechos_sku: List[str] = []
+    trechos_desconto: Dict[str, str] = {}
+    skus, qtdes, precos = armazem_itens.skus, armazem_itens.qtdes, armazem_itens.precos
+    for numero in range(len(vendas)):
+        venda = vendas[numero]
+        inicio, fim = venda.intervalo_itens()
+        # Novos medicamentos podem ter sido cadastrados desde a venda anterior.
+        while len(trechos_sku) < len(catalogo_skus):
+            med = catalogo_skus.medicamento(len(trechos_sku))
+            valores = (med.nome, tipo_medicamento(med), med.laboratorio.nome)
+            if em_csv:
+                trechos_sku.append(",".join(campo_csv(v) for v in valores) + ",")
+            else:
+                trechos_sku.append(",".join(f"{json.dumps(c)}:{json.dumps(v, ensure_ascii=False)}"
+                                            for c, v in zip(COLUNAS_VENDAS[3:6], valores))
+                                   + ',"preco_unitario":')
+        tipo = trechos_desconto.get(venda.tipo_desconto)
+        if tipo is None:
+            tipo = trechos_desconto[venda.tipo_desconto] = (campo_csv(venda.tipo_desconto) if em_csv else
+                                                            json.dumps(venda.tipo_desconto, ensure_ascii=False))
+        data_hora = venda.data_hora.isoformat(sep=" ")
+        if em_csv:
+            prefixo = f"{numero},{campo_csv(data_hora)},{campo_csv(venda.cliente.cpf)},"
+            sufixo = f",{venda.valor_total:.2f},{venda.desconto!r},{tipo}\n"
+        else:
+            prefixo = f'{{"venda":{numero},"data_hora":"{data_hora}","cpf":{json.dumps(venda.cliente.cpf)},'
+            sufixo = f',"valor_total_venda":{venda.valor_total:.2f},"desconto":{venda.desconto!r},' \
+                     f'"tipo_desconto":{tipo}}}\n'
+        yield "".join([prefixo + trechos_sku[skus[i]] + repr(precos[i]) + antes_qtde + str(qtdes[i]) + sufixo
+                       for i in range(inicio, fim)]), fim - inicio
+
+
+# --- Escrita ---
+
+@contextlib.contextmanager
+def abrir_saida(caminho: str, gzip: Optional[bool] = None) -> Iterator[TextIO]:
+    """Abre o destino para escrita de texto: "-" é a saída padrão; ".gz" (ou gzip=True) comprime."""
+    if caminho == "-":
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    if gzip is None:
+        gzip = caminho.lower().endswith(".gz")
+    if gzip:
+        with gzip_mod.open(caminho, "wt", compresslevel=NIVEL_GZIP, encoding="utf-8", newline="") as arq:
+            yield arq
+    else:
+        with open(caminho, "w", encoding="utf-8", newline="", buffering=TAMANHO_BUFFER) as arq:
+            yield arq
+
+
+def escrever(caminho: str, texto: Iterable[Tuple[str, int]], gzip: Optional[bool] = None) -> int:
+    """
+    Grava os trechos de `texto`, pares (trecho com uma ou mais linhas
+    completas, registros no trecho), juntando LINHAS_POR_BLOCO trechos por
+    escrita, e retorna quantos registros foram gravados. Os registros vêm do
+    gerador, e não da contagem de quebras de linha, que também aparecem
+    dentro de campos CSV entre aspas.
+    """
+    total = 0
+    with abrir_saida(caminho, gzip) as arq:
+        bloco: List[str] = []
+        for trecho, registros in texto:
+            bloco.append(trecho)
+            total += registros
+            if len(bloco) >= LINHAS_POR_BLOCO:
+                arq.write("".join(bloco))
+                bloco.clear()
+        arq.write("".join(bloco))
+    return total
+
+
+def _exportar(caminho: str, colunas: Sequence[str], linhas: Callable[[], Iterable[Tuple]],
+              formato: Optional[str], gzip: Optional[bool]) -> int:
+    formato = formato or formato_de(caminho)
+    if formato == FORMATO_CSV:
+        return escrever(caminho, texto_csv(colunas, linhas()), gzip)
+    if formato == FORMATO_JSONL:
+        return escrever(caminho, texto_jsonl(colunas, linhas()), gzip)
+    raise ValueError(f"Formato de exportação desconhecido: {formato}")
+
+
+def exportar_clientes(caminho: str, formato: Optional[str] = None, gzip: Optional[bool] = None) -> int:
+    """Exporta os clientes; retorna a quantidade de registros gravados."""
+    return _exportar(caminho, COLUNAS_CLIENTES, linhas_clientes, formato, gzip)
+
+
+def exportar_medicamentos(caminho: str, tipo: Optional[str] = None, formato: Optional[str] = None,
+                          gzip: Optional[bool] = None) -> int:
+    """Exporta os medicamentos (todos, ou só do tipo "Q"/"F"); retorna a quantidade de registros gravados."""
+    if tipo is not None and tipo not in indice_medicamentos_tipo:
+        raise ValueError(f"Tipo de medicamento inválido: {tipo!r}")
+    return _exportar(caminho, COLUNAS_MEDICAMENTOS, lambda: linhas_medicamentos(tipo), formato, gzip)
+
+
+def exportar_vendas(caminho: str, formato: Optional[str] = None, gzip: Optional[bool] = None) -> int:
+    """Exporta as vendas, uma linha por item; retorna a quantidade de itens gravados."""
+    formato = formato or formato_de(caminho)
+    if formato not in (FORMATO_CSV, FORMATO_JSONL):
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    return escrever(caminho, texto_vendas(formato), gzip)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Exportação (CSV/JSONL) da Farmácia E-Commerce.")
+    parser.add_argument("--dados", required=True, help="diretório de persistência de onde ler os registros")
+    parser.add_argument("--clientes", help="arquivo de saída dos clientes ('-' = saída padrão)")
+    parser.add_argument("--medicamentos", help="arquivo de saída dos medicamentos")
+    parser.add_argument("--tipo", choices=("Q", "F"), help="exporta só medicamentos deste tipo")
+    parser.add_argument("--vendas", help="arquivo de saída das vendas (uma linha por item)")
+    args = parser.parse_args(argv)
+    persistencia.abrir(args.dados)
+    try:
+        tarefas = [(args.clientes, "clientes", lambda c: exportar_clientes(c)),
+                   (args.medicamentos, "medicamentos", lambda c: exportar_medicamentos(c, args.tipo)),
+                   (args.vendas, "itens de venda", lambda c: exportar_vendas(c))]
+        for caminho, entidade, exportar in tarefas:
+            if not caminho:
+                continue
+            inicio = time.perf_counter()
+            n = exportar(caminho)
+            print(f"{n} {entidade} exportados para {caminho} em {time.perf_counter() - inicio:.2f}s",
+                  file=sys.stderr)
+    finally:
+        persistencia.fechar()
+
+
+if __name__ == "__main__":
+    main()
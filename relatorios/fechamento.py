@@ -0,0 +1,353 @@
+"""
+Fechamento do dia em paralelo: totais por medicamento, por tipo e por cliente
+sobre todas as vendas da sessão, agregados em vários processos.
+
+As vendas são projetadas (de forma incremental) em partições compactas: arrays
+de inteiros serializados em bytes, e não objetos Venda. Cada partição é
+agregada num processo (fase de mapeamento), que já separa os totais parciais
+por faixa de sku_id e de cliente; cada faixa é então somada por um processo
+(fase de redução), que devolve só os candidatos ao topo dos rankings. O processo
+principal apenas encaminha bytes e junta os poucos candidatos, de modo que o
+tempo cai quase linearmente com o número de núcleos.
+
+Os valores são somados em centavos (inteiros), e por isso o resultado não
+depende da ordem em que as partições são agregadas.
+"""
+import heapq
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from entidades.medicamento import MedicamentoQuimioterapico, MedicamentoFitoterapico
+from entidades.venda import Venda
+from entidades.itens_venda import armazem_itens, catalogo_skus
+from data import vendas, clientes
+from relatorios.analitico import Interning
+from utils.estatisticas import CRITERIO_QUANTIDADE, CRITERIO_VALOR
+from utils.metricas import instrumentar
+
+# Vendas por partição serializada.
+TAMANHO_PARTICAO = 50_000
+# Abaixo deste número de vendas o fechamento é agregado no próprio processo.
+MINIMO_PARALELO = 100_000
+# Candidatos devolvidos por faixa para cada ranking (empates no limite também vêm).
+LIMITE_RANKING = 10
+
+# Tipo de cada sku na tabela do catálogo.
+TIPO_QUIMIO = 0
+TIPO_FITO = 1
+TIPO_OUTRO = 2
+
+
+def empacotar(colunas: Sequence[array]) -> bytes:
+    """Serializa arrays como (typecode, tamanho, bytes) em sequência."""
+    partes = []
+    for coluna in colunas:
+        partes.append(struct.pack("<cQ", coluna.typecode.encode(), len(coluna)))
+        partes.append(coluna.tobytes())
+    return b"".join(partes)
+
+
+def desempacotar(dados: bytes) -> List[array]:
+    """Inverso de `empacotar`."""
+    colunas = []
+    visao = memoryview(dados)
+    pos = 0
+    while pos < len(visao):
+        typecode, tamanho = struct.unpack_from("<cQ", visao, pos)
+        pos += struct.calcsize("<cQ")
+        coluna = array(typecode.decode())
+        fim = pos + tamanho * coluna.itemsize
+        coluna.frombytes(visao[pos:fim])
+        colunas.append(coluna)
+        pos = fim
+    return colunas
+
+
+class ParticaoAberta:
+    """
+    Partição ainda em formação: uma linha por item e uma por venda.
+
+    Atributos:
+        skus (array I): sku_id de cada item.
+        qtdes (array I): Quantidade de cada item.
+        valores (array q): Valor de cada item (quantidade x preço unitário cobrado), em centavos.
+        clientes (array I): id do cliente de cada venda (ver `ParticionamentoVendas.clientes`).
+        pagos (array q): Valor pago em cada venda, em centavos.
+    """
+    def __init__(self):
+        self.skus = array("I")
+        self.qtdes = array("I")
+        self.valores = array("q")
+        self.clientes = array("I")
+        self.pagos = array("q")
+
+    def __len__(self) -> int:
+        return len(self.clientes)
+
+    def serializar(self) -> bytes:
+        return empacotar((self.skus, self.qtdes, self.valores, self.clientes, self.pagos))
+
+
+class ParticionamentoVendas:
+    """
+    Vendas da sessão em partições serializadas, atualizadas de forma incremental:
+    cada atualização só projeta as vendas acrescentadas desde a anterior, e as
+    partições completas não são serializadas de novo.
+
+    Também mantém a tabela do catálogo que os processos precisam (o tipo de
+    cada sku), enviada uma vez a cada processo. Os valores vêm do preço
+    cobrado em cada item, e não do preço de cadastro.
+
+    Atributos:
+        particoes (List[bytes]): Partições completas, já serializadas.
+        clientes (Interning): CPF -> id denso do cliente.
+        tipos (array B): Tipo de cada sku (TIPO_QUIMIO, TIPO_FITO ou TIPO_OUTRO).
+    """
+    def __init__(self, tamanho: int = TAMANHO_PARTICAO):
+        self.tamanho = tamanho
+        self.particoes: List[bytes] = []
+        self.clientes = Interning()
+        self.tipos = array("B")
+        self._aberta = ParticaoAberta()
+        self._vendas_particionadas = 0
+
+    def _projetar(self, venda: Venda) -> None:
+        aberta = self._aberta
+        inicio, fim = venda.intervalo_itens()
+        aberta.skus.extend(armazem_itens.skus[inicio:fim])
+        qtdes, precos = armazem_itens.qtdes[inicio:fim], armazem_itens.precos[inicio:fim]
+        aberta.qtdes.extend(qtdes)
+        aberta.valores.extend([round(qtde * preco * 100) for qtde, preco in zip(qtdes, precos)])
+        aberta.clientes.append(self.clientes.id_de(venda.cliente.cpf))
+        aberta.pagos.append(round(venda.valor_total * 100))
+        if len(aberta) >= self.tamanho:
+            self.particoes.append(aberta.serializar())
+            self._aberta = ParticaoAberta()
+
+    def _atualizar_catalogo(self) -> None:
+        # O tipo não muda depois do cadastro: só os skus novos entram na tabela.
+        for sku in range(len(self.tipos), len(catalogo_skus)):
+            med = catalogo_skus.medicamento(sku)
+            if isinstance(med, MedicamentoQuimioterapico):
+                self.tipos.append(TIPO_QUIMIO)
+            elif isinstance(med, MedicamentoFitoterapico):
+                self.tipos.append(TIPO_FITO)
+            else:
+                self.tipos.append(TIPO_OUTRO)
+
+    def atualizar(self, origem: Sequence[Venda] = vendas) -> None:
+        """Particiona as vendas de `origem` ainda não particionadas."""
+        for i in range(self._vendas_particionadas, len(origem)):
+            self._projetar(origem[i])
+        self._vendas_particionadas = len(origem)
+        self._atualizar_catalogo()
+
+    def serializadas(self) -> List[bytes]:
+        """Todas as partições, inclusive a que ainda está em formação."""
+        if len(self._aberta):
+            return self.particoes + [self._aberta.serializar()]
+        return list(self.particoes)
+
+
+def mapear(particao: bytes, tipos: array, faixas: int) -> Tuple[array, List[bytes]]:
+    """
+    Agrega uma partição. Retorna os totais
+    [vendas, unidades quimio, centavos quimio, unidades fito, centavos fito]
+    e, por faixa (sku_id % faixas e cliente % faixas), os totais parciais serializados.
+    """
+    skus, qtdes, valores, ids_clientes, pagos = desempacotar(particao)
+    por_sku: Dict[int, int] = {}
+    valor_sku: Dict[int, int] = {}
+    for sku, qtde, valor in zip(skus, qtdes, valores):
+        por_sku[sku] = por_sku.get(sku, 0) + qtde
+        valor_sku[sku] = valor_sku.get(sku, 0) + valor
+    compras: Dict[int, int] = {}
+    gasto: Dict[int, int] = {}
+    for cliente, pago in zip(ids_clientes, pagos):
+        compras[cliente] = compras.get(cliente, 0) + 1
+        gasto[cliente] = gasto.get(cliente, 0) + pago
+
+    totais = array("q", [len(ids_clientes), 0, 0, 0, 0])
+    saidas = [(array("I"), array("q"), array("q"), array("I"), array("I"), array("q")) for _ in range(faixas)]
+    for sku, qtde in por_sku.items():
+        valor = valor_sku[sku]
+        tipo = tipos[sku]
+        if tipo != TIPO_OUTRO:
+            totais[1 + 2 * tipo] += qtde
+            totais[2 + 2 * tipo] += valor
+        saida = saidas[sku % faixas]
+        saida[0].append(sku)
+        saida[1].append(qtde)
+        saida[2].append(valor)
+    for cliente, n in compras.items():
+        saida = saidas[cliente % faixas]
+        saida[3].append(cliente)
+        saida[4].append(n)
+        saida[5].append(gasto[cliente])
+    return totais, [empacotar(saida) for saida in saidas]
+
+
+def _candidatos(valores: Dict[int, int], limite: int) -> List[int]:
+    """Chaves com os `limite` maiores valores, mais as que empatam com o último deles."""
+    if len(valores) <= limite:
+        return list(valores)
+    corte = heapq.nlargest(limite, valores.values())[-1]
+    return [chave for chave, valor in valores.items() if valor >= corte]
+
+
+def reduzir(partes: Sequence[bytes], limite: int) -> bytes:
+    """
+    Soma os totais parciais de uma faixa e devolve, serializados, só os
+    candidatos aos rankings: (skus, unidades, centavos) e (clientes, compras, centavos).
+    """
+    por_sku: Dict[int, int] = {}
+    valor_sku: Dict[int, int] = {}
+    compras: Dict[int, int] = {}
+    gasto: Dict[int, int] = {}
+    for parte in partes:
+        skus, qtdes, valores, ids_clientes, ns, pagos = desempacotar(parte)
+        for sku, qtde, valor in zip(skus, qtdes, valores):
+            por_sku[sku] = por_sku.get(sku, 0) + qtde
+            valor_sku[sku] = valor_sku.get(sku, 0) + valor
+        for cliente, n, pago in zip(ids_clientes, ns, pagos):
+            compras[cliente] = compras.get(cliente, 0) + n
+            gasto[cliente] = gasto.get(cliente, 0) + pago
+
+    skus_topo = sorted(set(_candidatos(por_sku, limite)) | set(_candidatos(valor_sku, limite)))
+    clientes_topo = sorted(_candidatos(gasto, limite))
+    return empacotar((
+        array("I", skus_topo),
+        array("q", [por_sku[sku] for sku in skus_topo]),
+        array("q", [valor_sku[sku] for sku in skus_topo]),
+        array("I", clientes_topo),
+        array("q", [compras[cliente] for cliente in clientes_topo]),
+        array("q", [gasto[cliente] for cliente in clientes_topo]),
+    ))
+
+
+# Tabela do catálogo em cada processo de trabalho (ver `_inicializar_processo`).
+_tipos_processo = array("B")
+
+
+def _inicializar_processo(tipos: bytes) -> None:
+    global _tipos_processo
+    _tipos_processo = array("B")
+    _tipos_processo.frombytes(tipos)
+
+
+def _mapear_no_processo(particao: bytes, faixas: int) -> Tuple[array, List[bytes]]:
+    return mapear(particao, _tipos_processo, faixas)
+
+
+def _reduzir_no_processo(partes: Sequence[bytes], limite: int) -> bytes:
+    return reduzir(partes, limite)
+
+
+class FechamentoDia:
+    """
+    Resultado do fechamento: os mesmos números de `exibir_estatisticas_dia`,
+    mais os maiores clientes.
+
+    Atributos:
+        clientes_atendidos (int): Vendas (atendimentos) do período.
+        total_quimio_vendido_qtde (int): Unidades de quimioterápicos vendidas.
+        total_quimio_vendido_valor (float): Valor de quimioterápicos vendidos.
+        total_fito_vendido_qtde (int): Unidades de fitoterápicos vendidas.
+        total_fito_vendido_valor (float): Valor de fitoterápicos vendidos.
+        processos (int): Processos usados na agregação (1 = no próprio processo).
+        particoes (int): Partições agregadas.
+    """
+    def __init__(self, totais: Sequence[int], candidatos_sku: List[Tuple[int, int, int]],
+                 candidatos_cliente: List[Tuple[str, int, int]], processos: int, particoes: int):
+        self.clientes_atendidos = totais[0]
+        self.total_quimio_vendido_qtde = totais[1]
+        self.total_quimio_vendido_valor = totais[2] / 100
+        self.total_fito_vendido_qtde = totais[3]
+        self.total_fito_vendido_valor = totais[4] / 100
+        self.processos = processos
+        self.particoes = particoes
+        # (sku_id, unidades, centavos) e (cpf, compras, centavos) dos candidatos ao topo.
+        self._candidatos_sku = candidatos_sku
+        self._candidatos_cliente = candidatos_cliente
+
+    def mais_vendidos(self, n: int = 1, criterio: str = CRITERIO_QUANTIDADE) -> List[Tuple[str, int, float]]:
+        """
+        Até `n` (no máximo LIMITE_RANKING) tuplas (nome, quantidade, valor), na
+        mesma ordem de `EstatisticasVendas.mais_vendidos`.
+        """
+        if criterio == CRITERIO_QUANTIDADE:
+            chave = lambda linha: (-linha[1], linha[0])
+        elif criterio == CRITERIO_VALOR:
+            chave = lambda linha: (-linha[2], linha[0])
+        else:
+            raise ValueError(f"Critério de ranking desconhecido: {criterio}")
+        linhas = [(catalogo_skus.medicamento(sku).nome, qtde, centavos)
+                  for sku, qtde, centavos in self._candidatos_sku]
+        return [(nome, qtde, centavos / 100) for nome, qtde, centavos in heapq.nsmallest(n, linhas, key=chave)]
+
+    def mais_vendido(self) -> Optional[Tuple[str, int, float]]:
+        """Retorna (nome, quantidade, valor) do medicamento com mais unidades vendidas, ou None."""
+        topo = self.mais_vendidos(1)
+        return topo[0] if topo else None
+
+    def maiores_clientes(self, n: int = LIMITE_RANKING) -> List[Tuple[str, str, int, float]]:
+        """Até `n` tuplas (cpf, nome, compras, valor pago), do cliente que mais gastou ao que menos gastou."""
+        topo = heapq.nsmallest(n, self._candidatos_cliente, key=lambda linha: (-linha[2], linha[0]))
+        return [(cpf, clientes[cpf].nome if cpf in clientes else "", compras, centavos / 100)
+                for cpf, compras, centavos in topo]
+
+
+# Partições das vendas da sessão, reaproveitadas entre um fechamento e outro.
+particionamento = ParticionamentoVendas()
+
+
+@instrumentar()
+def fechar_dia(processos: Optional[int] = None, origem: Sequence[Venda] = vendas,
+               particoes: Optional[ParticionamentoVendas] = None,
+               tamanho_particao: int = TAMANHO_PARTICAO) -> FechamentoDia:
+    """
+    Agrega as vendas de `origem` em `processos` processos (padrão: um por
+    núcleo; no próprio processo se houver menos de MINIMO_PARALELO vendas).
+    Cada processo agrega partições inteiras, então são usados no máximo
+    tantos processos quantas forem as partições de `tamanho_particao` vendas.
+    `particoes` guarda o particionamento de `origem` entre chamadas (com o
+    tamanho dele); para as vendas da sessão é o `particionamento` do módulo.
+    """
+    if tamanho_particao < 1:
+        raise ValueError(f"Tamanho de partição inválido: {tamanho_particao}")
+    if particoes is None:
+        if origem is vendas and tamanho_particao == particionamento.tamanho:
+            particoes = particionamento
+        else:
+            particoes = ParticionamentoVendas(tamanho_particao)
+    particoes.atualizar(origem)
+    serializadas = particoes.serializadas()
+    if processos is None:
+        processos = (os.cpu_count() or 1) if len(origem) >= MINIMO_PARALELO else 1
+    processos = max(1, min(processos, len(serializadas)))
+
+    if processos == 1:
+        mapeadas = [mapear(particao, particoes.tipos, 1) for particao in serializadas]
+        reduzidas = [reduzir([faixas[0] for _, faixas in mapeadas], LIMITE_RANKING)]
+    else:
+        with ProcessPoolExecutor(processos, initializer=_inicializar_processo,
+                                 initargs=(particoes.tipos.tobytes(),)) as pool:
+            mapeadas = list(pool.map(_mapear_no_processo, serializadas, [processos] * len(serializadas)))
+            por_faixa = [[faixas[i] for _, faixas in mapeadas] for i in range(processos)]
+            reduzidas = list(pool.map(_reduzir_no_processo, por_faixa, [LIMITE_RANKING] * processos))
+
+    totais = [0] * 5
+    for parciais, _ in mapeadas:
+        for i, valor in enumerate(parciais):
+            totais[i] += valor
+    candidatos_sku: List[Tuple[int, int, int]] = []
+    candidatos_cliente: List[Tuple[str, int, int]] = []
+    rotulos = particoes.clientes.rotulos
+    for reduzida in reduzidas:
+        skus, qtdes, centavos_sku, ids_clientes, compras, centavos_cliente = desempacotar(reduzida)
+        candidatos_sku.extend(zip(skus, qtdes, centavos_sku))
+        candidatos_cliente.extend((rotulos[i], n, c) for i, n, c in zip(ids_clientes, compras, centavos_cliente))
+    return FechamentoDia(totais, candidatos_sku, candidatos_cliente, processos, len(serializadas))
@@ -1,29 +1,55 @@
-from entidades.cliente import Cliente
-from entidades.medicamento import Medicamento, MedicamentoQuimioterapico, MedicamentoFitoterapico
-from data import clientes, medicamentos, vendas, estatisticas_itens_vendidos, total_quimio_vendido_qtde, total_quimio_vendido_valor, total_fito_vendido_qtde, total_fito_vendido_valor
+import datetime
+from typing import Optional
 
+from data import (LOJA, clientes, medicamentos, vendas, estatisticas, historico_vendas, indice_clientes_nome,
+                  indice_medicamentos_nome, indice_medicamentos_tipo)
+from utils.estatisticas import CRITERIO_QUANTIDADE, CRITERIO_VALOR
+from utils.indice_ordenado import IndiceOrdenado
+from utils import metricas
+from utils.metricas import instrumentar
+from services import (buscar_cliente_por_cpf, historico_cliente, ultimas_compras, auditoria_controlados,
+                      trilha_auditoria)
+from relatorios import analitico, consolidacao, fechamento
+
+# Itens exibidos por página nas listagens.
+TAMANHO_PAGINA = 20
+
+
+@instrumentar()
+def exibir_paginado(indice: IndiceOrdenado, tamanho: int = TAMANHO_PAGINA):
+    """Exibe um índice ordenado página a página, perguntando antes de carregar a próxima."""
+    total_paginas = (len(indice) + tamanho - 1) // tamanho
+    for numero, pagina in enumerate(indice.paginas(tamanho), start=1):
+        for item in pagina:
+            print(item)
+        if numero < total_paginas:
+            resp = input(f"-- Página {numero}/{total_paginas}. [Enter] próxima página / [S]air: ").strip().upper()
+            if resp == "S":
+                break
+    print()
+
+
+@instrumentar()
 def listar_clientes():
     """Exibe lista de clientes ordenados por nome (A-Z)."""
     if not clientes:
         print("Nenhum cliente cadastrado.")
         return
     print("\n--- Lista de Clientes (A-Z) ---")
-    for cli in sorted(clientes.values(), key=lambda c: c.nome.lower()):
-        print(cli)
-    print()
+    exibir_paginado(indice_clientes_nome)
 
 
+@instrumentar()
 def listar_todos_medicamentos():
     """Exibe todos os medicamentos (quimio e fito) em ordem alfabética por nome."""
     if not medicamentos:
         print("Nenhum medicamento cadastrado.")
         return
     print("\n--- Lista de Medicamentos (A-Z) ---")
-    for med in sorted(medicamentos.values(), key=lambda m: m.nome.lower()):
-        print(med)
-    print()
+    exibir_paginado(indice_medicamentos_nome)
 
 
+@instrumentar()
 def listar_medicamentos_por_tipo():
     """Pergunta ao usuário se deseja listar Quimioterápicos ou Fitoterápicos e exibe."""
     if not medicamentos:
@@ -35,13 +61,10 @@ def listar_medicamentos_por_tipo():
         return
 
     print("\n--- Lista de Medicamentos {}".format("Quimioterápicos" if tipo == "Q" else "Fitoterápicos"))
-    for med in sorted(medicamentos.values(), key=lambda m: m.nome.lower()):
-        if (tipo == "Q" and isinstance(med, MedicamentoQuimioterapico)) or \
-           (tipo == "F" and isinstance(med, MedicamentoFitoterapico)):
-            print(med)
-    print()
+    exibir_paginado(indice_medicamentos_tipo[tipo])
 
 
+@instrumentar()
 def exibir_estatisticas_dia():
     """
     Exibe as estatísticas de vendas do dia (sessão atual).
@@ -49,18 +72,313 @@ def exibir_estatisticas_dia():
     print("\n========== Relatório de Vendas (Sessão) ==========")
     print(f"Clientes atendidos: {len(vendas)}")
 
-    if estatisticas_itens_vendidos:
-        # Remédio mais vendido
-        mais_vendido_nome = max(estatisticas_itens_vendidos, key=lambda k: estatisticas_itens_vendidos[k][0])
-        qtde_mais_vendido, valor_mais_vendido = estatisticas_itens_vendidos[mais_vendido_nome]
+    mais_vendido = estatisticas.mais_vendido()
+    if mais_vendido:
+        mais_vendido_nome, qtde_mais_vendido, valor_mais_vendido = mais_vendido
         print(f"Remédio mais vendido: {mais_vendido_nome}")
         print(f"Quantidade total vendida: {qtde_mais_vendido} unidades")
         print(f"Valor total: R$ {valor_mais_vendido:.2f}")
     else:
         print("Nenhum medicamento vendido ainda.")
 
-    print(f"Total de Quimioterápicos vendidos: {total_quimio_vendido_qtde} unidades | Valor total: R$ {total_quimio_vendido_valor:.2f}")
-    print(f"Total de Fitoterápicos vendidos: {total_fito_vendido_qtde} unidades | Valor total: R$ {total_fito_vendido_valor:.2f}")
+    print(f"Total de Quimioterápicos vendidos: {estatisticas.total_quimio_vendido_qtde} unidades | "
+          f"Valor total: R$ {estatisticas.total_quimio_vendido_valor:.2f}")
+    print(f"Total de Fitoterápicos vendidos: {estatisticas.total_fito_vendido_qtde} unidades | "
+          f"Valor total: R$ {estatisticas.total_fito_vendido_valor:.2f}")
     print("==================================================\n")
 
 
+@instrumentar()
+def exibir_fechamento_dia():
+    """
+    Exibe o fechamento do dia: os números de `exibir_estatisticas_dia`, os mais
+    vendidos e os maiores clientes, agregados em paralelo sobre todas as vendas.
+    """
+    if not vendas:
+        print("Nenhuma venda registrada ainda.")
+        return
+    resultado = fechamento.fechar_dia()
+    print("\n========== Fechamento do Dia ==========")
+    print(f"Clientes atendidos: {resultado.clientes_atendidos}")
+    mais_vendido = resultado.mais_vendido()
+    if mais_vendido:
+        nome, qtde, valor = mais_vendido
+        print(f"Remédio mais vendido: {nome}")
+        print(f"Quantidade total vendida: {qtde} unidades")
+        print(f"Valor total: R$ {valor:.2f}")
+    print(f"Total de Quimioterápicos vendidos: {resultado.total_quimio_vendido_qtde} unidades | "
+          f"Valor total: R$ {resultado.total_quimio_vendido_valor:.2f}")
+    print(f"Total de Fitoterápicos vendidos: {resultado.total_fito_vendido_qtde} unidades | "
+          f"Valor total: R$ {resultado.total_fito_vendido_valor:.2f}")
+
+    print(f"\n--- Top {fechamento.LIMITE_RANKING} Mais Vendidos (Unidades) ---")
+    for pos, (nome, qtde, valor) in enumerate(resultado.mais_vendidos(fechamento.LIMITE_RANKING), start=1):
+        print(f"{pos}. {nome} | {qtde} unidades | R$ {valor:.2f}")
+    print(f"\n--- Top {fechamento.LIMITE_RANKING} Mais Vendidos (Faturamento) ---")
+    for pos, (nome, qtde, valor) in enumerate(
+            resultado.mais_vendidos(fechamento.LIMITE_RANKING, CRITERIO_VALOR), start=1):
+        print(f"{pos}. {nome} | {qtde} unidades | R$ {valor:.2f}")
+    print(f"\n--- Top {fechamento.LIMITE_RANKING} Clientes ---")
+    for pos, (cpf, nome, compras, valor) in enumerate(resultado.maiores_clientes(), start=1):
+        print(f"{pos}. {nome} (CPF {cpf}) | {compras} compras | R$ {valor:.2f}")
+    print(f"({resultado.particoes} partições em {resultado.processos} processo(s))")
+    print("=======================================\n")
+
+
+@instrumentar()
+def exibir_mais_vendidos():
+    """Pergunta quantos itens e qual critério (unidades ou faturamento) e exibe o ranking."""
+    if not estatisticas.itens:
+        print("Nenhum medicamento vendido ainda.")
+        return
+    criterio = input("Ranking por ([U]nidades / [F]aturamento): ").strip().upper()
+    if criterio not in ("U", "F"):
+        print("Critério inválido.")
+        return
+    try:
+        n = int(input("Quantos itens exibir? ").strip())
+        if n <= 0:
+            raise ValueError
+    except ValueError:
+        print("Quantidade inválida.")
+        return
+
+    titulo = "Unidades" if criterio == "U" else "Faturamento"
+    print(f"\n--- Top {n} Mais Vendidos ({titulo}) ---")
+    ranking = estatisticas.mais_vendidos(n, CRITERIO_QUANTIDADE if criterio == "U" else CRITERIO_VALOR)
+    for pos, (nome, qtde, valor) in enumerate(ranking, start=1):
+        print(f"{pos}. {nome} | {qtde} unidades | R$ {valor:.2f}")
+    print()
+
+
+@instrumentar()
+def ler_data_hora(mensagem: str) -> Optional[datetime.datetime]:
+    """Lê 'YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM'; retorna None se o formato for inválido."""
+    texto = input(mensagem).strip()
+    for formato in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    print("Formato de data inválido.")
+    return None
+
+
+@instrumentar()
+def exibir_vendas_periodo():
+    """Pergunta um intervalo de data/hora e exibe as vendas dele, com totais."""
+    inicio = ler_data_hora("Início (YYYY-MM-DD [HH:MM]): ")
+    if inicio is None:
+        return
+    fim = ler_data_hora("Fim, exclusivo (YYYY-MM-DD [HH:MM]): ")
+    if fim is None:
+        return
+
+    vendas_periodo = historico_vendas.entre(inicio, fim)
+    print(f"\n--- Vendas de {inicio:%Y-%m-%d %H:%M} a {fim:%Y-%m-%d %H:%M} ---")
+    if not vendas_periodo:
+        print("Nenhuma venda no período.\n")
+        return
+    for venda in vendas_periodo:
+        print(venda)
+    total = sum(venda.valor_total for venda in vendas_periodo)
+    print(f"Vendas no período: {len(vendas_periodo)} | Valor total: R$ {total:.2f}\n")
+
+
+@instrumentar()
+def exibir_resumo_periodo():
+    """Pergunta um intervalo de dias e exibe os totais diários (e por hora, se for um só dia)."""
+    inicio = ler_data_hora("Dia inicial (YYYY-MM-DD): ")
+    if inicio is None:
+        return
+    fim = ler_data_hora("Dia final (YYYY-MM-DD): ")
+    if fim is None:
+        return
+
+    dias = historico_vendas.resumo_por_dia(inicio.date(), fim.date())
+    print(f"\n--- Resumo de {inicio:%Y-%m-%d} a {fim:%Y-%m-%d} ---")
+    if not dias:
+        print("Nenhuma venda no período.\n")
+        return
+    for dia, n_vendas, unidades, valor in dias:
+        print(f"{dia.isoformat()} | {n_vendas} vendas | {unidades} unidades | R$ {valor:.2f}")
+    if inicio.date() == fim.date():
+        print("Por hora:")
+        dia_seguinte = datetime.datetime.combine(inicio.date(), datetime.time()) + datetime.timedelta(days=1)
+        for hora, n_vendas, unidades, valor in historico_vendas.resumo_por_hora(inicio, dia_seguinte):
+            print(f"  {hora:%H:00} | {n_vendas} vendas | {unidades} unidades | R$ {valor:.2f}")
+    print()
+
+
+@instrumentar()
+def exibir_faturamento_por_dimensao():
+    """Pergunta a dimensão (laboratório, UF, faixa etária, desconto ou medicamento) e exibe o faturamento."""
+    if not vendas:
+        print("Nenhuma venda registrada ainda.")
+        return
+    opcoes = {
+        "1": ("Laboratório", analitico.DIMENSAO_LABORATORIO),
+        "2": ("Estado do Laboratório", analitico.DIMENSAO_ESTADO),
+        "3": ("Faixa Etária do Cliente", analitico.DIMENSAO_FAIXA_ETARIA),
+        "4": ("Tipo de Desconto", analitico.DIMENSAO_TIPO_DESCONTO),
+        "5": ("Medicamento", analitico.DIMENSAO_MEDICAMENTO),
+    }
+    for chave, (titulo, _) in opcoes.items():
+        print(f"{chave}. {titulo}")
+    escolha = input("Agrupar faturamento por (1-5): ").strip()
+    if escolha not in opcoes:
+        print("Opção inválida.")
+        return
+    try:
+        n = int(input("Quantas linhas exibir (0 = todas)? ").strip() or "0")
+    except ValueError:
+        print("Quantidade inválida.")
+        return
+
+    titulo, dimensao = opcoes[escolha]
+    analitico.projecao.atualizar(vendas)
+    linhas = analitico.agrupar(analitico.projecao, dimensao)
+    if n > 0:
+        linhas = linhas[:n]
+    print(f"\n--- Faturamento por {titulo} ---")
+    for linha in linhas:
+        print(linha)
+    print()
+
+
+@instrumentar()
+def exibir_historico_cliente():
+    """Pergunta um CPF e exibe os agregados, as últimas compras e os controlados repetidos do cliente."""
+    cpf = input("CPF do cliente (somente números): ").strip()
+    cliente = buscar_cliente_por_cpf(cpf)
+    if cliente is None:
+        print("Cliente não cadastrado.")
+        return
+    historico = historico_cliente(cpf)
+    print(f"\n--- Histórico de {cliente.nome} (CPF {cpf}) ---")
+    if historico is None:
+        print("Nenhuma compra registrada.\n")
+        return
+    print(f"Visitas: {historico.visitas} | Valor total: R$ {historico.valor_total:.2f} | "
+          f"Ticket médio: R$ {historico.ticket_medio:.2f}")
+    print(f"Primeira visita: {historico.primeira_visita:%Y-%m-%d %H:%M} | "
+          f"Última visita: {historico.ultima_visita:%Y-%m-%d %H:%M}")
+    print("Últimas compras:")
+    for venda in ultimas_compras(cpf):
+        print(f"  {venda}")
+    repetidos = historico.controlados_repetidos()
+    if repetidos:
+        print("Controlados comprados mais de uma vez:")
+        for compra in repetidos:
+            print(f"  {compra}")
+    print()
+
+
+@instrumentar()
+def exibir_auditoria_controlados():
+    """Lista os clientes que compraram o mesmo quimioterápico com receita em várias vendas."""
+    try:
+        minimo = int(input("Mínimo de compras do mesmo controlado (padrão 2): ").strip() or "2")
+        if minimo < 2:
+            raise ValueError
+    except ValueError:
+        print("Quantidade inválida.")
+        return
+    auditoria = auditoria_controlados(minimo)
+    print(f"\n--- Controlados comprados {minimo} vezes ou mais ---")
+    if not auditoria:
+        print("Nenhum cliente encontrado.\n")
+        return
+    for cpf, compras in auditoria:
+        cliente = buscar_cliente_por_cpf(cpf)
+        print(f"{cliente.nome if cliente else '?'} (CPF {cpf})")
+        for compra in compras:
+            print(f"  {compra}")
+    print()
+
+
+@instrumentar()
+def exibir_trilha_auditoria():
+    """Exibe os itens controlados vendidos a um cliente (por CPF) ou de um medicamento (por nome)."""
+    criterio = input("Buscar por ([C]PF do cliente / [M]edicamento): ").strip().upper()
+    if criterio == "C":
+        chave = input("CPF do cliente (somente números): ").strip()
+    elif criterio == "M":
+        chave = input("Nome do medicamento: ").strip()
+    else:
+        print("Opção inválida.")
+        return
+    if not chave:
+        print("Nada informado.")
+        return
+    eventos = trilha_auditoria(cpf=chave) if criterio == "C" else trilha_auditoria(medicamento=chave)
+    print(f"\n--- Trilha de auditoria: {chave} ---")
+    if not eventos:
+        print("Nenhum registro encontrado.\n")
+        return
+    for evento in eventos:
+        print(evento)
+    print()
+
+
+@instrumentar()
+def exibir_consolidacao_rede():
+    """
+    Pergunta os arquivos de resumo das outras lojas e exibe os totais e os
+    rankings da rede, somando também o resumo desta loja (se ela tiver nome).
+    """
+    caminhos = input("Resumos das lojas (arquivos separados por vírgula): ").split(",")
+    caminhos = [caminho.strip() for caminho in caminhos if caminho.strip()]
+    try:
+        rede = consolidacao.consolidar(caminhos)
+        if LOJA and LOJA not in rede.lojas:
+            rede.mesclar(consolidacao.gerar_resumo(LOJA, estatisticas, medicamentos))
+    except (OSError, ValueError) as exc:
+        print(f"Não foi possível consolidar: {exc}")
+        return
+    if not rede.lojas:
+        print("Nenhum resumo informado.")
+        return
+    consolidacao.exibir_consolidacao(rede)
+
+
+@instrumentar()
+def exibir_metricas():
+    """Exibe chamadas, erros e latências de cada operação instrumentada e oferece exportar o instantâneo."""
+    if not metricas.registro.ativo:
+        resp = input("Métricas desligadas. Deseja ligá-las? ([S]im/[N]ão): ").strip().upper()
+        if resp == "S":
+            metricas.habilitar()
+            print("Métricas ligadas: as próximas operações serão medidas.")
+        return
+
+    operacoes, contadores = metricas.registro.instantaneo()
+    print("\n--- Métricas das Operações ---")
+    print("(operações de console incluem o tempo de digitação do operador)")
+    if not operacoes and not contadores:
+        print("Nenhuma operação medida ainda.")
+    else:
+        print(f"{'operação':<45} {'chamadas':>8} {'erros':>6} {'média':>9} {'p50':>9} {'p99':>9} {'máx':>9}")
+    for metrica in operacoes:
+        lat = metrica.latencias
+        print(f"{metrica.nome:<45} {metrica.chamadas:>8} {metrica.erros:>6} "
+              f"{metricas.formatar_duracao(lat.media()):>9} {metricas.formatar_duracao(lat.percentil(0.5)):>9} "
+              f"{metricas.formatar_duracao(lat.percentil(0.99)):>9} {metricas.formatar_duracao(lat.maximo):>9}")
+    for nome, valor in sorted(contadores.items()):
+        print(f"{nome:<45} {valor:>8}")
+
+    acao = input("\n[E]xportar (Prometheus) / [Z]erar / [D]esligar / [Enter] voltar: ").strip().upper()
+    if acao == "E":
+        caminho = input("Arquivo de destino (ex.: metricas.prom): ").strip() or "metricas.prom"
+        try:
+            metricas.exportar_prometheus(caminho)
+        except OSError as exc:
+            print(f"Não foi possível gravar o arquivo: {exc}")
+            return
+        print(f"Métricas exportadas para {caminho}.")
+    elif acao == "Z":
+        metricas.registro.zerar()
+        print("Métricas zeradas.")
+    elif acao == "D":
+        metricas.desabilitar()
+        print("Métricas desligadas.")
@@ -1,13 +1,75 @@
 import datetime
-import sys
-from typing import List, Dict, Tuple, Optional
+from typing import List, Tuple, Optional
 
 from entidades.cliente import Cliente
 from entidades.laboratorio import Laboratorio
 from entidades.medicamento import Medicamento, MedicamentoQuimioterapico, MedicamentoFitoterapico
 from entidades.venda import Venda
-from data import clientes, laboratorios, medicamentos, vendas, estatisticas_itens_vendidos, total_quimio_vendido_qtde, total_quimio_vendido_valor, total_fito_vendido_qtde, total_fito_vendido_valor
-
+from entidades.itens_venda import QUANTIDADE_MAXIMA, catalogo_skus
+from utils import auditoria, persistencia
+from utils.auditoria import EventoControlado
+from utils.metricas import instrumentar
+from motor_vendas import precificar, confirmar, reservar_itens, cancelar, VendaInvalida
+from utils.estoque import Reserva
+from utils.historico_clientes import CompraControlada, HistoricoCliente
+from data import (clientes, laboratorios, medicamentos, indice_busca, indice_nomes, indice_clientes_nome,
+                  indice_medicamentos_nome, indice_medicamentos_tipo, trava_clientes, trava_laboratorios,
+                  trava_catalogo, estoque, historico_clientes)
+
+# Máximo de nomes devolvidos pelo autocompletar e pelas sugestões.
+LIMITE_SUGESTOES = 10
+
+
+@instrumentar()
+def converter_data_nascimento(data_str: str) -> datetime.date:
+    """Converte 'YYYY-MM-DD' em date; levanta ValueError se o formato for inválido."""
+    return datetime.datetime.strptime(data_str.strip(), "%Y-%m-%d").date()
+
+
+@instrumentar()
+def converter_preco(valor: str) -> float:
+    """Converte o preço informado em float; levanta ValueError se inválido ou negativo."""
+    preco = float(valor.strip())
+    if preco < 0:
+        raise ValueError("preço negativo")
+    return preco
+
+
+@instrumentar()
+def converter_tipo_medicamento(tipo: str) -> str:
+    """Normaliza o tipo do medicamento para 'Q' ou 'F'; levanta ValueError se inválido."""
+    tipo = tipo.strip().upper()
+    if tipo not in ("Q", "F"):
+        raise ValueError(f"tipo inválido: {tipo!r}")
+    return tipo
+
+
+@instrumentar()
+def registrar_cliente(cliente: Cliente) -> bool:
+    """Insere o cliente indexado por CPF. Retorna False se o CPF já estiver cadastrado."""
+    with trava_clientes.escrita():
+        if cliente.cpf in clientes:
+            return False
+        with persistencia.transacao():
+            clientes[cliente.cpf] = cliente
+            persistencia.registrar_evento(persistencia.EVENTO_CLIENTE, cliente)
+        indice_clientes_nome.adicionar(cliente)
+    return True
+
+
+@instrumentar()
+def registrar_laboratorio(lab: Laboratorio) -> bool:
+    """Insere o laboratório indexado por nome. Retorna False se o nome já existir."""
+    with trava_laboratorios.escrita():
+        if lab.nome in laboratorios:
+            return False
+        with persistencia.transacao():
+            laboratorios[lab.nome] = lab
+            persistencia.registrar_evento(persistencia.EVENTO_LABORATORIO, lab)
+    return True
+
+
+@instrumentar()
 def cadastrar_cliente():
     """Solicita dados e cadastra um cliente novo, indexando por CPF."""
     cpf = input("Digite o CPF (somente números): ").strip()
@@ -17,15 +79,18 @@ def cadastrar_cliente():
     nome = input("Digite o nome completo: ").strip()
     data_str = input("Digite a data de nascimento (YYYY-MM-DD): ").strip()
     try:
-        data_nascimento = datetime.datetime.strptime(data_str, "%Y-%m-%d").date()
+        data_nascimento = converter_data_nascimento(data_str)
     except ValueError:
         print("Formato de data inválido. Cadastro cancelado.")
         return
     novo = Cliente(cpf, nome, data_nascimento)
-    clientes[cpf] = novo
+    if not registrar_cliente(novo):
+        print("Cliente com este CPF já existe!")
+        return
     print("Cliente cadastrado com sucesso!\n")
 
 
+@instrumentar()
 def cadastrar_laboratorio():
     """Solicita dados e cadastra um laboratório novo."""
     nome = input("Digite o nome do laboratório: ").strip()
@@ -37,10 +102,13 @@ def cadastrar_laboratorio():
     cidade = input("Digite a cidade: ").strip()
     estado = input("Digite o estado (sigla): ").strip().upper()
     lab = Laboratorio(nome, endereco, telefone, cidade, estado)
-    laboratorios[nome] = lab
+    if not registrar_laboratorio(lab):
+        print("Laboratório com este nome já existe!")
+        return
     print("Laboratório cadastrado com sucesso!\n")
 
 
+@instrumentar()
 def escolher_laboratorio() -> Optional[Laboratorio]:
     """Exibe labs cadastrados e retorna a instância escolhida, ou None se não houver."""
     if not laboratorios:
@@ -58,13 +126,35 @@ def escolher_laboratorio() -> Optional[Laboratorio]:
         return None
 
 
+@instrumentar()
+def registrar_medicamento(med: Medicamento) -> bool:
+    """
+    Insere o medicamento no catálogo e o publica nos índices de busca.
+    Retorna False se já existir medicamento com o mesmo nome.
+    """
+    with trava_catalogo.escrita():
+        if med.nome in medicamentos:
+            return False
+        with persistencia.transacao():
+            medicamentos[med.nome] = med
+            persistencia.registrar_evento(persistencia.EVENTO_MEDICAMENTO, med)
+        catalogo_skus.id_de(med)
+        indice_busca.adicionar(med)
+        indice_nomes.adicionar(med)
+        indice_medicamentos_nome.adicionar(med)
+        indice_medicamentos_tipo["Q" if isinstance(med, MedicamentoQuimioterapico) else "F"].adicionar(med)
+    return True
+
+
+@instrumentar()
 def cadastrar_medicamento():
     """
     Pergunta se o medicamento é Quimioterápico ou Fitoterápico,
     coleta os dados, e insere no dicionário `medicamentos` indexado pelo nome.
     """
-    tipo = input("Tipo de medicamento ([Q]uimio / [F]ito): ").strip().upper()
-    if tipo not in ("Q", "F"):
+    try:
+        tipo = converter_tipo_medicamento(input("Tipo de medicamento ([Q]uimio / [F]ito): "))
+    except ValueError:
         print("Tipo inválido.")
         return
 
@@ -79,9 +169,7 @@ def cadastrar_medicamento():
         return
     descricao = input("Digite uma breve descrição: ").strip()
     try:
-        preco = float(input("Digite o preço unitário (use ponto decimal): ").strip())
-        if preco < 0:
-            raise ValueError
+        preco = converter_preco(input("Digite o preço unitário (use ponto decimal): "))
     except ValueError:
         print("Preço inválido. Cadastro cancelado.")
         return
@@ -89,23 +177,112 @@ def cadastrar_medicamento():
     if tipo == "Q":
         rec = input("Necessita receita? ([S]im/[N]ão): ").strip().upper()
         necessita_receita = rec == "S"
-        mq = MedicamentoQuimioterapico(nome, composto, lab, descricao, preco, necessita_receita)
-        medicamentos[nome] = mq
+        med = MedicamentoQuimioterapico(nome, composto, lab, descricao, preco, necessita_receita)
     else:
-        mf = MedicamentoFitoterapico(nome, composto, lab, descricao, preco)
-        medicamentos[nome] = mf
+        med = MedicamentoFitoterapico(nome, composto, lab, descricao, preco)
+    if not registrar_medicamento(med):
+        print("Medicamento com este nome já existe!")
+        return
 
     print("Medicamento cadastrado com sucesso!\n")
 
 
+@instrumentar()
+def definir_estoque(med: Medicamento, em_maos: int, minimo: Optional[int] = None) -> None:
+    """Passa a controlar o estoque do medicamento (ou corrige a contagem) e grava no log."""
+    with persistencia.transacao():
+        estoque.definir(med, em_maos, minimo)
+        persistencia.registrar_evento(persistencia.EVENTO_ESTOQUE, (med, em_maos, minimo, False))
+
+
+@instrumentar()
+def repor_estoque(reposicoes: List[Tuple[Medicamento, int]]) -> int:
+    """Soma ao estoque em mãos as quantidades recebidas (reposição em lote) e grava no log."""
+    with persistencia.transacao():
+        n = estoque.repor(reposicoes)
+        for med, qtde in reposicoes:
+            persistencia.registrar_evento(persistencia.EVENTO_ESTOQUE, (med, qtde, None, True))
+    return n
+
+
+@instrumentar()
 def buscar_cliente_por_cpf(cpf: str) -> Optional[Cliente]:
     """Retorna o Cliente se existir, senão None."""
-    return clientes.get(cpf)
+    with trava_clientes.leitura():
+        return clientes.get(cpf)
+
+
+@instrumentar()
+def historico_cliente(cpf: str) -> Optional[HistoricoCliente]:
+    """Agregados de compras do cliente (visitas, valor total, última visita...), ou None se nunca comprou."""
+    return historico_clientes.historico(cpf)
+
+
+@instrumentar()
+def ultimas_compras(cpf: str, n: int = 10) -> List[Venda]:
+    """
+    Até `n` vendas mais recentes do cliente, da mais recente à mais antiga, sem
+    varrer `vendas`. Levanta ValueError se `n` for menor que 1.
+    """
+    return historico_clientes.ultimas_vendas(cpf, n)
+
+
+@instrumentar()
+def auditoria_controlados(minimo: int = 2) -> List[Tuple[str, List[CompraControlada]]]:
+    """Clientes (cpf, compras) que levaram o mesmo quimioterápico com receita em `minimo` vendas ou mais."""
+    return historico_clientes.auditoria_controlados(minimo)
+
+
+@instrumentar()
+def trilha_auditoria(cpf: Optional[str] = None, medicamento: Optional[str] = None) -> List[EventoControlado]:
+    """
+    Itens controlados vendidos ao cliente `cpf` ou do `medicamento` (nome), em
+    ordem de gravação, lidos da trilha de auditoria. Lista vazia se a auditoria estiver desligada.
+    """
+    if auditoria.trilha is None:
+        return []
+    if cpf is not None:
+        return auditoria.trilha.por_cliente(cpf)
+    if medicamento is not None:
+        return auditoria.trilha.do_medicamento(medicamento)
+    raise ValueError("Informe o CPF ou o medicamento.")
 
 
+@instrumentar()
+def buscar_medicamentos(criterio: str, termo: str) -> List[Medicamento]:
+    """
+    Busca medicamentos sem interação com o console, usando os índices do catálogo.
+
+    Critérios aceitos:
+        "nome": nome exato; se não houver, o mesmo nome sem diferenciar acentos e maiúsculas;
+        "prefixo": nomes que começam com o termo (autocompletar), em ordem alfabética;
+        "sugestao": nomes parecidos com o termo, para erros de digitação, dos mais próximos aos mais distantes;
+        "laboratorio": nome do laboratório (sem diferenciar maiúsculas);
+        "descricao": trecho da descrição, resultados ordenados por relevância;
+        "texto": trecho da descrição ou do princípio ativo, ordenados por relevância.
+    """
+    with trava_catalogo.leitura():
+        if criterio == "nome":
+            med = medicamentos.get(termo)
+            return [med] if med else indice_nomes.buscar_exato(termo)
+        if criterio == "prefixo":
+            return indice_nomes.completar(termo, LIMITE_SUGESTOES)
+        if criterio == "sugestao":
+            return indice_nomes.sugerir(termo, LIMITE_SUGESTOES)
+        if criterio == "laboratorio":
+            return indice_busca.buscar_por_laboratorio(termo)
+        if criterio == "descricao":
+            return indice_busca.buscar_texto(termo, campos=("descricao",))
+        if criterio == "texto":
+            return indice_busca.buscar_texto(termo)
+    raise ValueError(f"Critério de busca desconhecido: {criterio}")
+
+
+@instrumentar()
 def menu_buscar_medicamentos() -> List[Medicamento]:
     """
-    Permite buscar por nome exato, por fabricante (nome do laboratório) ou
+    Permite buscar por nome (exato, início do nome ou, se nada for
+    encontrado, nomes parecidos), por fabricante (nome do laboratório) ou
     por descrição parcial dentro do tipo de medicamento.
     Retorna lista de instâncias encontradas.
     """
@@ -114,27 +291,27 @@ def menu_buscar_medicamentos() -> List[Medicamento]:
         return []
 
     print("Buscar medicamentos por:")
-    print("1. Nome exato")
+    print("1. Nome (exato ou início)")
     print("2. Nome do laboratório")
     print("3. Texto parcial na descrição")
     escolha = input("Escolha (1/2/3): ").strip()
 
     encontrados: List[Medicamento] = []
     if escolha == "1":
-        termo = input("Digite o nome exato do medicamento: ").strip()
-        med = medicamentos.get(termo)
-        if med:
-            encontrados.append(med)
+        termo = input("Digite o nome (ou o início do nome) do medicamento: ").strip()
+        encontrados = buscar_medicamentos("nome", termo) or buscar_medicamentos("prefixo", termo)
+        if not encontrados:
+            encontrados = buscar_medicamentos("sugestao", termo)
+            if encontrados:
+                print("Você quis dizer:")
+                for med in encontrados:
+                    print(f"  - {med.nome}")
     elif escolha == "2":
-        termo = input("Digite o nome do laboratório: ").strip().lower()
-        for med in medicamentos.values():
-            if med.laboratorio.nome.lower() == termo:
-                encontrados.append(med)
+        termo = input("Digite o nome do laboratório: ").strip()
+        encontrados = buscar_medicamentos("laboratorio", termo)
     elif escolha == "3":
-        termo = input("Digite texto parcial para buscar na descrição: ").strip().lower()
-        for med in medicamentos.values():
-            if termo in med.descricao.lower():
-                encontrados.append(med)
+        termo = input("Digite texto parcial para buscar na descrição: ").strip()
+        encontrados = buscar_medicamentos("descricao", termo)
     else:
         print("Opção inválida.")
 
@@ -143,18 +320,18 @@ def menu_buscar_medicamentos() -> List[Medicamento]:
     return encontrados
 
 
+@instrumentar()
 def realizar_venda():
     """
     Controla todo o fluxo de uma venda:
       - Verifica cliente cadastrado por CPF;
-      - Permite adicionar múltiplos itens (medicamento + quantidade);
+      - Permite adicionar múltiplos itens (medicamento + quantidade), reservando o estoque de cada um;
       - Aplica descontos (idoso > 65 anos ou compras acima de R$150);
-      - Gera alerta se houver medicamento quimioterápico controlado (necessita_receita=True);
+      - Gera alerta se houver medicamento quimioterápico controlado (necessita_receita=True) e pede a
+        referência da receita, gravada na trilha de auditoria;
       - Armazena a Venda e atualiza estatísticas diárias.
+    A precificação e o registro ficam a cargo de `motor_vendas`; aqui só há a interação.
     """
-    global total_quimio_vendido_qtde, total_quimio_vendido_valor
-    global total_fito_vendido_qtde, total_fito_vendido_valor
-
     cpf = input("CPF do cliente para a venda (somente números): ").strip()
     cliente = buscar_cliente_por_cpf(cpf)
     if cliente is None:
@@ -162,109 +339,91 @@ def realizar_venda():
         return
 
     itens_venda: List[Tuple[Medicamento, int]] = []
-    subtotal = 0.0
-    tem_quimio_controlado = False
-    nomes_quimio_controlados: List[str] = []
-
-    while True:
-        print("\n--- Adicionar item ---")
-        encontrados = menu_buscar_medicamentos()
-        if not encontrados:
-            # possibilidade de encerrar busca sem achar nada
-            resp = input("Deseja tentar outra busca? ([S]im/[N]ão): ").strip().upper()
-            if resp != "S":
-                break
+    # Cada item adicionado já reserva estoque; se a venda não for confirmada, a reserva é devolvida.
+    reserva: Optional[Reserva] = None
+    try:
+        while True:
+            print("\n--- Adicionar item ---")
+            encontrados = menu_buscar_medicamentos()
+            if not encontrados:
+                # possibilidade de encerrar busca sem achar nada
+                resp = input("Deseja tentar outra busca? ([S]im/[N]ão): ").strip().upper()
+                if resp != "S":
+                    break
+                else:
+                    continue
+
+            # se houve mais de um resultado, perguntar qual deseja
+            if len(encontrados) > 1:
+                print("Vários medicamentos encontrados:")
+                for idx, m in enumerate(encontrados, start=1):
+                    print(f"{idx}. {m}")
+                try:
+                    escolha = int(input("Escolha o número do medicamento desejado: ").strip())
+                    med_sel = encontrados[escolha - 1]
+                except (ValueError, IndexError):
+                    print("Escolha inválida. Voltando ao menu de adicionar item.")
+                    continue
             else:
-                continue
+                med_sel = encontrados[0]
 
-        # se houve mais de um resultado, perguntar qual deseja
-        if len(encontrados) > 1:
-            print("Vários medicamentos encontrados:")
-            for idx, m in enumerate(encontrados, start=1):
-                print(f"{idx}. {m}")
             try:
-                escolha = int(input("Escolha o número do medicamento desejado: ").strip())
-                med_sel = encontrados[escolha - 1]
-            except (ValueError, IndexError):
-                print("Escolha inválida. Voltando ao menu de adicionar item.")
+                qtde = int(input(f"Quantidade de \'{med_sel.nome}\' ").strip())
+                if not 0 < qtde <= QUANTIDADE_MAXIMA:
+                    raise ValueError
+            except ValueError:
+                print("Quantidade inválida. Item não adicionado.")
                 continue
-        else:
-            med_sel = encontrados[0]
-
-        try:
-            qtde = int(input(f"Quantidade de \'{med_sel.nome}\' ").strip())
-            if qtde <= 0:
-                raise ValueError
-        except ValueError:
-            print("Quantidade inválida. Item não adicionado.")
-            continue
-
-        itens_venda.append((med_sel, qtde))
-        subtotal += med_sel.preco * qtde
-
-        # Se for Quimioterápico controlado, marca alerta
-        if isinstance(med_sel, MedicamentoQuimioterapico) and med_sel.necessita_receita:
-            tem_quimio_controlado = True
-            nomes_quimio_controlados.append(med_sel.nome)
-
-        resp = input("Deseja adicionar outro medicamento? ([S]im/[N]ão): ").strip().upper()
-        if resp != "S":
-            break
-
-    if not itens_venda:
-        print("Nenhum item adicionado. Venda cancelada.\n")
-        return
-
-    # Alerta para checar receita, se aplicável
-    if tem_quimio_controlado:
-        nomes_str = ", ".join(nomes_quimio_controlados)
-        print(f"\n*** ATENÇÃO: Verifique a receita para o(s) medicamento(s): {nomes_str} ***\n")
-
-    # Cálculo de descontos
-    desconto_idoso = 0.0
-    desconto_valor = 0.0
-    if cliente.idade() > 65:
-        desconto_idoso = 0.20  # 20%
-    if subtotal > 150.0:
-        desconto_valor = 0.10  # 10%
-
-    desconto_aplicado = max(desconto_idoso, desconto_valor)
-    valor_desconto = subtotal * desconto_aplicado
-    total_final = subtotal - valor_desconto
-
-    print(f"Subtotal: R$ {subtotal:.2f}")
-    if desconto_aplicado > 0:
-        tipo_desc = "20% (Idoso)" if desconto_aplicado == 0.20 else "10% (>= R$150)"
-        print(f"Desconto aplicado: {tipo_desc} => R$ {valor_desconto:.2f}")
-    else:
-        print("Nenhum desconto aplicado.")
-    print(f"Valor final da venda: R$ {total_final:.2f}\n")
-
-    confirma = input("Confirmar venda? ([S]im/[N]ão): ").strip().upper()
-    if confirma != "S":
-        print("Venda não confirmada.\n")
-        return
-
-    # Criar instância de Venda
-    venda = Venda(datetime.datetime.now(), itens_venda, cliente, total_final)
-    vendas.append(venda)
 
-    # Atualizar estatísticas
-    for med, qt in itens_venda:
-        # Estatísticas gerais de itens vendidos
-        nome_med = med.nome
-        qtd_antiga, valor_antigo = estatisticas_itens_vendidos.get(nome_med, (0, 0.0))
-        estatisticas_itens_vendidos[nome_med] = (qtd_antiga + qt, valor_antigo + med.preco * qt)
-
-        # Estatísticas por tipo (Quimioterápico ou Fitoterápico)
-        if isinstance(med, MedicamentoQuimioterapico):
-            total_quimio_vendido_qtde += qt
-            total_quimio_vendido_valor += med.preco * qt
-        elif isinstance(med, MedicamentoFitoterapico):
-            total_fito_vendido_qtde += qt
-            total_fito_vendido_valor += med.preco * qt
+            try:
+                reserva = reservar_itens([(med_sel, qtde)], reserva)
+            except VendaInvalida as exc:
+                print(f"{exc}. Item não adicionado.")
+                continue
+            itens_venda.append((med_sel, qtde))
 
-    print("Venda registrada com sucesso!\n")
+            resp = input("Deseja adicionar outro medicamento? ([S]im/[N]ão): ").strip().upper()
+            if resp != "S":
+                break
 
+        if not itens_venda:
+            print("Nenhum item adicionado. Venda cancelada.\n")
+            return
+
+        resultado = precificar(cliente, itens_venda)
+        resultado.reserva = reserva
+
+        # Alerta para checar receita, se aplicável; a referência vai para a trilha de auditoria.
+        if resultado.controlados:
+            nomes_str = ", ".join(med.nome for med in resultado.controlados)
+            print(f"\n*** ATENÇÃO: Verifique a receita para o(s) medicamento(s): {nomes_str} ***\n")
+            resultado.receita = input("Referência da receita (número/identificação): ").strip()
+            if not resultado.receita:
+                cancelar(resultado)
+                print("Receita não informada. Venda cancelada.\n")
+                return
+
+        print(f"Subtotal: R$ {resultado.subtotal:.2f}")
+        if resultado.desconto > 0:
+            print(f"Desconto aplicado: {resultado.descricao_desconto()} => R$ {resultado.valor_desconto:.2f}")
+        else:
+            print("Nenhum desconto aplicado.")
+        print(f"Valor final da venda: R$ {resultado.total:.2f}\n")
 
+        confirma = input("Confirmar venda? ([S]im/[N]ão): ").strip().upper()
+        if confirma != "S":
+            cancelar(resultado)
+            print("Venda não confirmada.\n")
+            return
 
+        try:
+            confirmar(resultado)
+        except VendaInvalida as exc:
+            print(f"{exc}. Venda não registrada.\n")
+            return
+
+        print("Venda registrada com sucesso!\n")
+    finally:
+        # Sem efeito se a venda foi confirmada (a reserva já foi baixada do estoque).
+        if reserva is not None:
+            reserva.liberar()
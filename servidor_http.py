@@ -0,0 +1,320 @@
+"""
+Servidor HTTP/JSON (asyncio, só biblioteca padrão) sobre o catálogo, os clientes e o checkout.
+
+Rotas:
+    GET  /medicamentos?criterio=nome|laboratorio|descricao|texto&termo=...
+    GET  /clientes/<cpf>
+    GET  /clientes/<cpf>/historico?n=10
+    POST /vendas          {"cpf": "...", "itens": [["Nome", 2], ...], "confirmar": true, "receita": "..."}
+    GET  /estatisticas?top=5
+
+Conexões HTTP/1.1 ficam abertas (keep-alive) e aceitam requisições em pipeline:
+as respostas saem na mesma ordem em que as requisições chegaram.
+
+As rotas que gravam (POST) rodam num pool de threads, fora do laço de eventos:
+o checkout pode esperar travas, o fsync do log ou a fila da auditoria cheia,
+e nada disso deve parar as outras conexões.
+
+Uso:
+    python -m servidor_http [--host 127.0.0.1] [--porta 8080] [--dados DIRETORIO]
+"""
+import argparse
+import asyncio
+import json
+import traceback
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from entidades.cliente import Cliente
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico
+from motor_vendas import ResultadoCheckout, VendaInvalida, cancelar, checkout
+from services import buscar_cliente_por_cpf, buscar_medicamentos, historico_cliente, ultimas_compras
+from data import vendas, estatisticas
+from utils import auditoria, persistencia
+
+# Limites de tamanho de uma requisição.
+MAX_CABECALHO = 64 * 1024
+MAX_CORPO = 1024 * 1024
+# Conexões ociosas por mais que isso são encerradas.
+TIMEOUT_OCIOSO = 30.0
+# Métodos despachados no pool de threads (podem bloquear em disco ou em travas).
+METODOS_BLOQUEANTES = frozenset({"POST"})
+
+
+class ErroHttp(Exception):
+    """Erro que vira uma resposta HTTP com o status e a mensagem informados."""
+    def __init__(self, status: HTTPStatus, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+# ---------------------------------------------------------------------------
+# Serialização
+# ---------------------------------------------------------------------------
+
+def medicamento_para_dict(med: Medicamento) -> dict:
+    controlado = isinstance(med, MedicamentoQuimioterapico)
+    return {
+        "nome": med.nome,
+        "tipo": "Q" if controlado else "F",
+        "composto_principal": med.composto_principal,
+        "laboratorio": med.laboratorio.nome,
+        "descricao": med.descricao,
+        "preco": med.preco,
+        "necessita_receita": controlado and med.necessita_receita,
+    }
+
+
+def cliente_para_dict(cli: Cliente) -> dict:
+    return {"cpf": cli.cpf, "nome": cli.nome, "data_nascimento": cli.data_nascimento.isoformat(),
+            "idade": cli.idade()}
+
+
+def resultado_para_dict(resultado: ResultadoCheckout) -> dict:
+    return {
+        "cpf": resultado.cliente.cpf,
+        "itens": [{"nome": med.nome, "quantidade": qtde, "preco": preco}
+                  for (med, qtde), preco in zip(resultado.itens, resultado.precos)],
+        "subtotal": round(resultado.subtotal, 2),
+        "desconto": resultado.desconto,
+        "tipo_desconto": resultado.tipo_desconto,
+        "valor_desconto": round(resultado.valor_desconto, 2),
+        "total": round(resultado.total, 2),
+        "alerta_receita": [med.nome for med in resultado.controlados],
+        "confirmada": resultado.venda is not None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Rotas
+# ---------------------------------------------------------------------------
+
+def _get_medicamentos(consulta: Dict[str, list], _corpo: bytes) -> Tuple[HTTPStatus, object]:
+    criterio = consulta.get("criterio", ["nome"])[0]
+    termo = consulta.get("termo", [""])[0]
+    try:
+        encontrados = buscar_medicamentos(criterio, termo)
+    except ValueError as exc:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, str(exc))
+    return HTTPStatus.OK, [medicamento_para_dict(med) for med in encontrados]
+
+
+def _get_cliente(cpf: str) -> Tuple[HTTPStatus, object]:
+    cliente = buscar_cliente_por_cpf(cpf)
+    if cliente is None:
+        raise ErroHttp(HTTPStatus.NOT_FOUND, "Cliente não cadastrado.")
+    return HTTPStatus.OK, cliente_para_dict(cliente)
+
+
+def _get_historico_cliente(cpf: str, consulta: Dict[str, list]) -> Tuple[HTTPStatus, object]:
+    if buscar_cliente_por_cpf(cpf) is None:
+        raise ErroHttp(HTTPStatus.NOT_FOUND, "Cliente não cadastrado.")
+    try:
+        n = int(consulta.get("n", ["10"])[0])
+    except ValueError:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, "Parâmetro 'n' inválido.")
+    if n < 1:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, "Parâmetro 'n' deve ser pelo menos 1.")
+    historico = historico_cliente(cpf)
+    if historico is None:
+        return HTTPStatus.OK, {"cpf": cpf, "visitas": 0, "valor_total": 0.0, "primeira_visita": None, "ultima_visita": None,
+                               "ultimas_compras": [], "controlados_repetidos": []}
+    return HTTPStatus.OK, {
+        "cpf": cpf,
+        "visitas": historico.visitas,
+        "valor_total": round(historico.valor_total, 2),
+        "primeira_visita": historico.primeira_visita.isoformat(timespec="seconds"),
+        "ultima_visita": historico.ultima_visita.isoformat(timespec="seconds"),
+        "ultimas_compras": [{"data_hora": venda.data_hora.isoformat(timespec="seconds"),
+                             "itens": [{"nome": med.nome, "quantidade": qtde} for med, qtde in venda.itens],
+                             "total": round(venda.valor_total, 2)}
+                            for venda in ultimas_compras(cpf, n)],
+        "controlados_repetidos": [{"nome": compra.medicamento.nome, "compras": compra.compras,
+                                   "unidades": compra.unidades,
+                                   "ultimas_datas": [data.isoformat(timespec="seconds") for data in compra.datas]}
+                                  for compra in historico.controlados_repetidos()],
+    }
+
+
+def _post_vendas(_consulta: Dict[str, list], corpo: bytes) -> Tuple[HTTPStatus, object]:
+    try:
+        pedido = json.loads(corpo or b"{}")
+        cpf = str(pedido["cpf"])
+        itens = [(str(nome), qtde) for nome, qtde in pedido["itens"]]
+    except (ValueError, KeyError, TypeError):
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, 'Corpo esperado: {"cpf": "...", "itens": [["nome", qtde], ...]}')
+    try:
+        resultado = checkout(cpf, itens, confirmar_venda=bool(pedido.get("confirmar", True)),
+                             receita=str(pedido.get("receita", "")))
+    except VendaInvalida as exc:
+        raise ErroHttp(HTTPStatus.UNPROCESSABLE_ENTITY, str(exc))
+    if resultado.venda is None:
+        # Simulação sem confirmação: o estoque foi conferido, mas não fica reservado.
+        cancelar(resultado)
+    status = HTTPStatus.CREATED if resultado.venda is not None else HTTPStatus.OK
+    return status, resultado_para_dict(resultado)
+
+
+def _get_estatisticas(consulta: Dict[str, list], _corpo: bytes) -> Tuple[HTTPStatus, object]:
+    try:
+        top = int(consulta.get("top", ["5"])[0])
+    except ValueError:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, "Parâmetro 'top' inválido.")
+    if top < 1:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, "Parâmetro 'top' deve ser pelo menos 1.")
+    mais_vendido = estatisticas.mais_vendido()
+    return HTTPStatus.OK, {
+        "clientes_atendidos": len(vendas),
+        "mais_vendido": ({"nome": mais_vendido[0], "quantidade": mais_vendido[1], "valor": mais_vendido[2]}
+                         if mais_vendido else None),
+        "mais_vendidos": [{"nome": nome, "quantidade": qtde, "valor": valor}
+                          for nome, qtde, valor in estatisticas.mais_vendidos(top)],
+        "quimioterapicos": {"quantidade": estatisticas.total_quimio_vendido_qtde,
+                            "valor": estatisticas.total_quimio_vendido_valor},
+        "fitoterapicos": {"quantidade": estatisticas.total_fito_vendido_qtde,
+                          "valor": estatisticas.total_fito_vendido_valor},
+    }
+
+
+ROTAS = {
+    ("GET", "/medicamentos"): _get_medicamentos,
+    ("POST", "/vendas"): _post_vendas,
+    ("GET", "/estatisticas"): _get_estatisticas,
+}
+
+
+def despachar(metodo: str, alvo: str, corpo: bytes) -> Tuple[HTTPStatus, object]:
+    """Encaminha a requisição para a rota certa e retorna (status, objeto JSON)."""
+    partes = urlsplit(alvo)
+    caminho = partes.path.rstrip("/") or "/"
+    if caminho.startswith("/clientes/"):
+        if metodo != "GET":
+            raise ErroHttp(HTTPStatus.METHOD_NOT_ALLOWED, "Método não permitido.")
+        cpf = unquote(caminho[len("/clientes/"):])
+        if cpf.endswith("/historico"):
+            return _get_historico_cliente(cpf[:-len("/historico")], parse_qs(partes.query))
+        return _get_cliente(cpf)
+    rota = ROTAS.get((metodo, caminho))
+    if rota is None:
+        if any(c == caminho for _, c in ROTAS):
+            raise ErroHttp(HTTPStatus.METHOD_NOT_ALLOWED, "Método não permitido.")
+        raise ErroHttp(HTTPStatus.NOT_FOUND, "Rota não encontrada.")
+    return rota(parse_qs(partes.query), corpo)
+
+
+# ---------------------------------------------------------------------------
+# Protocolo HTTP/1.1
+# ---------------------------------------------------------------------------
+
+def montar_resposta(status: HTTPStatus, objeto: object, manter_aberta: bool) -> bytes:
+    corpo = json.dumps(objeto, ensure_ascii=False).encode("utf-8")
+    cabecalho = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                 f"Content-Type: application/json; charset=utf-8\r\n"
+                 f"Content-Length: {len(corpo)}\r\n"
+                 f"Connection: {'keep-alive' if manter_aberta else 'close'}\r\n\r\n")
+    return cabecalho.encode("latin-1") + corpo
+
+
+async def _ler_requisicao(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+    """Lê uma requisição; retorna None se o cliente fechou a conexão entre requisições."""
+    try:
+        bruto = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), TIMEOUT_OCIOSO)
+    except asyncio.IncompleteReadError as exc:
+        if exc.partial.strip():
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Requisição incompleta.")
+        return None
+    except asyncio.LimitOverrunError:
+        raise ErroHttp(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Cabeçalho grande demais.")
+
+    linhas = bruto.decode("latin-1").split("\r\n")
+    try:
+        metodo, alvo, versao = linhas[0].split(" ", 2)
+    except ValueError:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, "Linha de requisição inválida.")
+    cabecalhos: Dict[str, str] = {}
+    for linha in linhas[1:]:
+        if linha:
+            nome, _, valor = linha.partition(":")
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+    try:
+        tamanho = int(cabecalhos.get("content-length", "0"))
+    except ValueError:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, "Content-Length inválido.")
+    if tamanho < 0:
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, "Content-Length inválido.")
+    if tamanho > MAX_CORPO:
+        raise ErroHttp(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corpo grande demais.")
+    corpo = await reader.readexactly(tamanho) if tamanho else b""
+    return metodo.upper(), alvo, versao, cabecalhos, corpo
+
+
+async def atender_conexao(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Atende requisições da conexão em sequência (keep-alive e pipeline) até ela fechar."""
+    try:
+        while True:
+            try:
+                requisicao = await _ler_requisicao(reader)
+            except ErroHttp as exc:
+                writer.write(montar_resposta(exc.status, {"erro": exc.mensagem}, False))
+                break
+            if requisicao is None:
+                break
+            metodo, alvo, versao, cabecalhos, corpo = requisicao
+            conexao = cabecalhos.get("connection", "").lower()
+            manter_aberta = conexao != "close" if versao == "HTTP/1.1" else conexao == "keep-alive"
+            try:
+                if metodo in METODOS_BLOQUEANTES:
+                    status, objeto = await asyncio.get_running_loop().run_in_executor(
+                        None, despachar, metodo, alvo, corpo)
+                else:
+                    status, objeto = despachar(metodo, alvo, corpo)
+            except ErroHttp as exc:
+                status, objeto = exc.status, {"erro": exc.mensagem}
+            except Exception:
+                # Falha inesperada numa rota: responde 500 e a conexão continua atendendo.
+                traceback.print_exc()
+                status, objeto = HTTPStatus.INTERNAL_SERVER_ERROR, {"erro": "Erro interno do servidor."}
+            writer.write(montar_resposta(status, objeto, manter_aberta))
+            # Com pipeline, as próximas requisições já estão no buffer: só espera o envio
+            # quando o buffer de saída passa do limite.
+            await writer.drain()
+            if not manter_aberta:
+                break
+    except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def servir(host: str = "127.0.0.1", porta: int = 8080) -> None:
+    servidor = await asyncio.start_server(atender_conexao, host, porta, limit=MAX_CABECALHO, backlog=4096,
+                                          reuse_address=True)
+    enderecos = ", ".join(str(sock.getsockname()) for sock in servidor.sockets)
+    print(f"Servidor HTTP ouvindo em {enderecos}")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON da Farmácia E-Commerce.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--dados", help="diretório de persistência a carregar (e gravar)")
+    args = parser.parse_args()
+    if args.dados:
+        persistencia.abrir(args.dados)
+        auditoria.abrir(args.dados)
+    try:
+        asyncio.run(servir(args.host, args.porta))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        auditoria.fechar()
+        persistencia.fechar()
+
+
+if __name__ == "__main__":
+    main()
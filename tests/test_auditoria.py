@@ -0,0 +1,196 @@
+"""
+Trilha de auditoria dos medicamentos controlados (utils.auditoria).
+
+Os cenários que passam pelo checkout rodam num interpretador próprio, como em
+`test_persistencia`, porque o estado de `data` e as trilhas ativas são globais
+ao processo.
+"""
+import datetime
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils import auditoria  # noqa: E402
+from utils.auditoria import ARQUIVO_AUDITORIA, AuditoriaIndisponivel, EventoControlado, TrilhaAuditoria  # noqa: E402
+
+AGORA = datetime.datetime(2024, 5, 17, 10, 30)
+
+CADASTRO = """
+import datetime
+from entidades.cliente import Cliente
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import MedicamentoFitoterapico, MedicamentoQuimioterapico
+lab = Laboratorio("Lab", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+services.registrar_laboratorio(lab)
+services.registrar_medicamento(MedicamentoQuimioterapico("Quimio", "x", lab, "controlado", 50.0, True))
+services.registrar_medicamento(MedicamentoFitoterapico("Boldo", "boldo", lab, "chá", 10.0))
+services.registrar_cliente(Cliente("11111111111", "Ana", datetime.date(1990, 1, 1)))
+quimio, boldo = data.medicamentos["Quimio"], data.medicamentos["Boldo"]
+services.definir_estoque(quimio, 10)
+services.definir_estoque(boldo, 10)
+"""
+
+
+def executar(diretorio: str, codigo: str, capacidade: int = auditoria.CAPACIDADE_FILA) -> str:
+    """Abre a persistência e a auditoria em `diretorio`, roda `codigo`, fecha e retorna a saída padrão."""
+    script = "\n".join([
+        "from utils import auditoria, persistencia",
+        f"persistencia.abrir({diretorio!r})",
+        f"auditoria.abrir({diretorio!r}, capacidade={capacidade})",
+        "import data, motor_vendas, services",
+        textwrap.dedent(codigo),
+        "auditoria.fechar()",
+        "persistencia.fechar()",
+    ])
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, FARMACIA_METRICAS="0")
+    processo = subprocess.run([sys.executable, "-c", script], cwd=diretorio, env=ambiente,
+                              capture_output=True, text=True, timeout=60)
+    assert processo.returncode == 0, processo.stderr
+    return processo.stdout
+
+
+def evento(cpf: str, medicamento: str, quantidade: int = 1, receita: str = "R1") -> EventoControlado:
+    return EventoControlado(AGORA, cpf, medicamento, quantidade, receita, "Centro")
+
+
+def parar_gravadora(trilha: TrilhaAuditoria):
+    """Faz a thread gravadora parar no próximo lote até o evento devolvido ser sinalizado."""
+    dentro, soltar = threading.Event(), threading.Event()
+    gravar_lote = trilha._gravar_lote
+
+    def gravar_parado(eventos):
+        dentro.set()
+        soltar.wait()
+        gravar_lote(eventos)
+
+    trilha._gravar_lote = gravar_parado
+    return dentro, soltar
+
+
+def test_lotes_gravados_e_relidos_pelo_indice(tmp_path):
+    caminho = str(tmp_path / ARQUIVO_AUDITORIA)
+    trilha = TrilhaAuditoria(caminho)
+    dentro, soltar = parar_gravadora(trilha)
+    trilha.registrar([evento("111", "Quimio A")])
+    dentro.wait()
+    # Enquanto o primeiro lote grava, as vendas seguintes se acumulam e saem num único fsync.
+    for i in range(10):
+        trilha.registrar([evento("111" if i % 2 else "222", "Quimio B", i + 1)])
+    assert trilha.pendentes == 10
+    soltar.set()
+    trilha.descarregar()
+    assert (len(trilha), trilha.lotes) == (11, 2)
+    assert [e.quantidade for e in trilha.por_cliente("222")] == [1, 3, 5, 7, 9]
+    trilha.fechar()
+
+    # Reaberta, a trilha refaz o índice a partir do arquivo.
+    relida = TrilhaAuditoria(caminho)
+    assert len(relida) == 11
+    assert [(e.medicamento, e.quantidade) for e in relida.por_cliente("111")] == \
+        [("Quimio A", 1), ("Quimio B", 2), ("Quimio B", 4), ("Quimio B", 6), ("Quimio B", 8), ("Quimio B", 10)]
+    assert [e.cpf for e in relida.do_medicamento("Quimio A")] == ["111"]
+    primeiro = relida.do_medicamento("Quimio A")[0]
+    assert (primeiro.data_hora, primeiro.receita, primeiro.loja) == (AGORA, "R1", "Centro")
+    assert relida.por_cliente("999") == []
+    relida.fechar()
+
+
+def test_eventos_da_venda_entram_juntos(tmp_path):
+    trilha = TrilhaAuditoria(str(tmp_path / ARQUIVO_AUDITORIA), tamanho_lote=2)
+    dentro, soltar = parar_gravadora(trilha)
+    trilha.registrar([evento("111", "Quimio A")])
+    dentro.wait()
+    # Os três eventos de uma venda são uma única entrada na fila...
+    trilha.registrar([evento("222", f"Quimio {i}") for i in range(3)])
+    assert trilha.pendentes == 1
+    soltar.set()
+    trilha.descarregar()
+    # ...e vão para o mesmo lote, mesmo passando do tamanho do lote.
+    assert (len(trilha), trilha.lotes) == (4, 2)
+    trilha.fechar()
+    # Com a trilha fechada, nenhum evento da venda entra.
+    try:
+        trilha.registrar([evento("333", "Quimio A"), evento("333", "Quimio B")])
+    except AuditoriaIndisponivel:
+        pass
+    else:
+        raise AssertionError("a trilha fechada aceitou eventos")
+    assert len(TrilhaAuditoria(str(tmp_path / ARQUIVO_AUDITORIA)).por_cliente("333")) == 0
+
+
+def test_fechar_grava_os_pendentes(tmp_path):
+    trilha = auditoria.abrir(str(tmp_path))
+    dentro, soltar = parar_gravadora(trilha)
+    auditoria.registrar([evento("111", "Quimio A")])
+    dentro.wait()
+    for i in range(5):
+        auditoria.registrar([evento("111", "Quimio A", i + 2)])
+    soltar.set()
+    # Sem descarregar antes: o fechamento grava o que ainda estava na fila.
+    auditoria.fechar()
+    assert auditoria.trilha is None
+    assert auditoria.registrar([evento("111", "Quimio A")]) == 0
+    relida = TrilhaAuditoria(str(tmp_path / ARQUIVO_AUDITORIA))
+    assert [e.quantidade for e in relida.por_cliente("111")] == [1, 2, 3, 4, 5, 6]
+    relida.fechar()
+
+
+def test_auditoria_indisponivel_devolve_o_estoque(tmp_path):
+    saida = executar(str(tmp_path), CADASTRO + """
+trilha = auditoria.trilha
+reservar_vaga = trilha.reservar_vaga
+
+def reservar_e_falhar():
+    vaga = reservar_vaga()
+    # A gravação falha depois de a vaga ser reservada e antes de os eventos entrarem na fila.
+    trilha._erro = OSError("disco cheio")
+    return vaga
+
+trilha.reservar_vaga = reservar_e_falhar
+try:
+    motor_vendas.checkout("11111111111", [("Quimio", 2), ("Boldo", 1)], receita="R1")
+except motor_vendas.VendaInvalida as exc:
+    print("recusada:", exc)
+for med in (quimio, boldo):
+    item = data.estoque.item(med)
+    print(item.em_maos, item.reservado)
+print(len(data.vendas), trilha.pendentes)
+""")
+    assert saida == "recusada: Trilha de auditoria indisponível: disco cheio\n10 0\n10 0\n0 0\n"
+
+
+def test_fila_cheia_nao_trava_as_outras_vendas(tmp_path):
+    saida = executar(str(tmp_path), CADASTRO + """
+import threading
+trilha = auditoria.trilha
+dentro, soltar = threading.Event(), threading.Event()
+gravar_lote = trilha._gravar_lote
+
+def gravar_parado(eventos):
+    dentro.set()
+    soltar.wait()
+    gravar_lote(eventos)
+
+trilha._gravar_lote = gravar_parado
+controladas = [threading.Thread(target=motor_vendas.checkout, args=("11111111111", [("Quimio", 1)]),
+                                kwargs={"receita": "R1"}) for _ in range(3)]
+controladas[0].start()
+dentro.wait()
+# Com a gravadora parada e a fila cheia, as vendas controladas seguintes esperam por vaga.
+for caixa in controladas[1:]:
+    caixa.start()
+caixa = threading.Thread(target=motor_vendas.checkout, args=("11111111111", [("Boldo", 1)]))
+caixa.start()
+caixa.join(10)
+print(caixa.is_alive(), len(data.vendas), data.estoque.item(boldo).em_maos)
+soltar.set()
+for controlada in controladas:
+    controlada.join()
+print(len(data.vendas), len(trilha))
+""", capacidade=1)
+    assert saida == "False 2 9\n4 3\n"
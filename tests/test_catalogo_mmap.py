@@ -0,0 +1,118 @@
+"""Catálogo somente leitura em arquivo mapeado com mmap (utils.catalogo_mmap)."""
+import os
+import random
+import struct
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico, MedicamentoQuimioterapico  # noqa: E402
+from utils.catalogo_mmap import CABECALHO, abrir_catalogo, gravar_catalogo  # noqa: E402
+
+
+def gerar_catalogo():
+    gerador = random.Random(18)
+    labs = [Laboratorio(f"Lab {cidade}", f"Rua {i}, {i * 10}", f"{i:04}-0000", cidade, uf)
+            for i, (cidade, uf) in enumerate((("São Paulo", "SP"), ("Goiânia", "GO"), ("Recife", "PE")))]
+    # Laboratório que só aparece nos medicamentos, fora da lista passada à gravação.
+    avulso = Laboratorio("Lab Avulso", "", "", "Natal", "RN")
+    meds = {}
+    while len(meds) < 300:
+        nome = "".join(gerador.choice("abcáéíçõ Z") for _ in range(gerador.randint(1, 12))).strip()
+        if not nome or nome in meds:
+            continue
+        lab = gerador.choice(labs + [avulso])
+        preco = gerador.randrange(1, 100_000) / 100
+        descricao = gerador.choice(("", "uso adulto", "gotas, 20 ml", "pomada \"nova\""))
+        if gerador.random() < 0.5:
+            meds[nome] = MedicamentoQuimioterapico(nome, f"comp {nome}", lab, descricao, preco,
+                                                   gerador.random() < 0.5)
+        else:
+            meds[nome] = MedicamentoFitoterapico(nome, f"planta {nome}", lab, descricao, preco)
+    return list(meds.values()), labs + [Laboratorio("Lab Sem Produtos", "Rua Z", "9", "Belém", "PA")]
+
+
+def campos(med):
+    receita = med.necessita_receita if isinstance(med, MedicamentoQuimioterapico) else None
+    lab = med.laboratorio
+    return (type(med), med.nome, med.composto_principal, med.descricao, med.preco, receita,
+            (lab.nome, lab.endereco, lab.telefone, lab.cidade, lab.estado))
+
+
+def test_gravar_abrir_e_consultar(tmp_path):
+    meds, labs = gerar_catalogo()
+    caminho = str(tmp_path / "catalogo.cat")
+    assert gravar_catalogo(caminho, meds, labs) == len(meds)
+    assert not os.path.exists(caminho + ".tmp")
+    nomes = sorted(med.nome for med in meds)
+    with abrir_catalogo(caminho) as catalogo:
+        assert (len(catalogo), catalogo.n_laboratorios) == (300, 5)
+        assert list(catalogo) == nomes
+        for med in meds:
+            assert med.nome in catalogo
+            assert campos(catalogo[med.nome]) == campos(med)
+        # Cada registro vira objeto uma só vez; o laboratório é compartilhado.
+        primeiro = catalogo[nomes[0]]
+        assert catalogo[nomes[0]] is primeiro and catalogo.get(nomes[0]) is primeiro
+        mesmo_lab = [catalogo[med.nome] for med in meds if med.laboratorio is meds[0].laboratorio]
+        assert all(med.laboratorio is mesmo_lab[0].laboratorio for med in mesmo_lab)
+        for ausente in ("", "zzz", nomes[0] + " ", nomes[-1] + "a", "\U0001F48A"):
+            assert ausente not in catalogo and catalogo.get(ausente) is None
+        with pytest.raises(KeyError):
+            catalogo["zzz"]
+        assert 42 not in catalogo
+        for prefixo in ("", "a", "á", "ab", "Z", "ç", "zz"):
+            for limite in (1, 5, 400):
+                assert [med.nome for med in catalogo.com_prefixo(prefixo, limite)] == \
+                    [nome for nome in nomes if nome.startswith(prefixo)][:limite]
+        assert {lab.nome for lab in catalogo.laboratorios()} == {lab.nome for lab in labs} | {"Lab Avulso"}
+        assert dict(catalogo.items()).keys() == set(nomes)
+
+
+def test_catalogo_vazio(tmp_path):
+    caminho = str(tmp_path / "vazio.cat")
+    assert gravar_catalogo(caminho, []) == 0
+    with abrir_catalogo(caminho) as catalogo:
+        assert (len(catalogo), list(catalogo), catalogo.com_prefixo(""), "a" in catalogo) == (0, [], [], False)
+
+
+def test_arquivo_truncado_ou_corrompido(tmp_path):
+    meds, labs = gerar_catalogo()
+    caminho = str(tmp_path / "catalogo.cat")
+    gravar_catalogo(caminho, meds[:20], labs)
+    with open(caminho, "rb") as arq:
+        dados = arq.read()
+
+    def gravar_copia(conteudo: bytes) -> str:
+        copia = str(tmp_path / "copia.cat")
+        with open(copia, "wb") as arq:
+            arq.write(conteudo)
+        return copia
+
+    def campo_alterado(indice: int, valor: int) -> bytes:
+        campos_cabecalho = list(CABECALHO.unpack_from(dados, 0))
+        campos_cabecalho[indice] = valor
+        return CABECALHO.pack(*campos_cabecalho) + dados[CABECALHO.size:]
+
+    n_meds = CABECALHO.unpack_from(dados, 0)[3]
+    invalidos = [dados[:corte] for corte in (0, 7, CABECALHO.size - 1, CABECALHO.size, len(dados) // 2,
+                                             len(dados) - 1)]
+    invalidos += [
+        b"X" + dados[1:],                       # magic
+        campo_alterado(1, 1),                   # versão anterior
+        campo_alterado(3, n_meds + 1),          # contagem que não bate com as seções
+        campo_alterado(5, 0),                   # início de seção fora do lugar
+        campo_alterado(8, len(dados) * 2),      # tamanho gravado maior que o arquivo
+        dados + b"\0",                          # lixo no fim
+        struct.pack("<8s", b"FARMDIG1") + dados[8:],  # outro formato da casa
+    ]
+    for conteudo in invalidos:
+        with pytest.raises(ValueError, match="Catálogo"):
+            abrir_catalogo(gravar_copia(conteudo))
+    # O original continua válido.
+    with abrir_catalogo(caminho) as catalogo:
+        assert len(catalogo) == 20
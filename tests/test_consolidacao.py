@@ -0,0 +1,81 @@
+"""Resumos por loja e consolidação da rede (relatorios.consolidacao)."""
+import datetime
+import os
+import random
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from entidades.cliente import Cliente  # noqa: E402
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico, MedicamentoQuimioterapico  # noqa: E402
+from entidades.venda import Venda  # noqa: E402
+from relatorios import consolidacao  # noqa: E402
+from relatorios.fechamento import TIPO_FITO, TIPO_OUTRO, TIPO_QUIMIO  # noqa: E402
+from utils.estatisticas import CRITERIO_QUANTIDADE, CRITERIO_VALOR, EstatisticasVendas  # noqa: E402
+
+
+def gerar_lojas():
+    """Estatísticas de duas lojas e as do conjunto de todas as vendas, mais o catálogo."""
+    lab = Laboratorio("Lab Rede", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+    meds = [MedicamentoQuimioterapico(f"Rede Quimio {i}", "x", lab, "d", 20.0 + i, False) for i in range(6)]
+    meds += [MedicamentoFitoterapico(f"Rede Fito {i}", "y", lab, "d", 5.0 + i) for i in range(6)]
+    # Vendido só na loja B e fora do catálogo de hoje.
+    descontinuado = MedicamentoFitoterapico("Rede Descontinuado", "z", lab, "d", 3.0)
+    catalogo = {med.nome: med for med in meds}
+    cliente = Cliente("rede1", "Cliente", datetime.date(1980, 1, 1))
+    gerador = random.Random(21)
+    por_loja = {"A": EstatisticasVendas(), "B": EstatisticasVendas()}
+    rede = EstatisticasVendas()
+    inicio = datetime.datetime(2024, 5, 17, 8)
+    for i in range(1_500):
+        loja = gerador.choice("AB")
+        opcoes = meds[:8] if loja == "A" else meds[4:] + [descontinuado]
+        itens = [(med, gerador.randint(1, 3)) for med in gerador.sample(opcoes, gerador.randint(1, 3))]
+        # Múltiplos de 0,25: somas exatas, em qualquer ordem.
+        precos = [med.preco - gerador.choice((0.0, 0.25)) for med, _ in itens]
+        total = sum(qtde * preco for (_, qtde), preco in zip(itens, precos)) * gerador.choice((1.0, 0.75))
+        venda = Venda(inicio + datetime.timedelta(seconds=i), itens, cliente, total, loja=loja, precos=precos)
+        por_loja[loja].registrar_venda(venda)
+        rede.registrar_venda(venda)
+    return por_loja, rede, catalogo
+
+
+def test_consolidar_igual_as_estatisticas_de_todas_as_vendas(tmp_path):
+    por_loja, rede, catalogo = gerar_lojas()
+    caminhos = []
+    for loja, estatisticas in por_loja.items():
+        caminho = str(tmp_path / f"{loja}.dig")
+        assert consolidacao.gravar_resumo(caminho, consolidacao.gerar_resumo(loja, estatisticas, catalogo)) == \
+            len(estatisticas.itens)
+        caminhos.append(caminho)
+
+    for ordem in (caminhos, caminhos[::-1]):
+        consolidado = consolidacao.consolidar(ordem)
+        for criterio in (CRITERIO_QUANTIDADE, CRITERIO_VALOR):
+            for n in (1, 3, len(rede.itens) + 1):
+                assert consolidado.mais_vendidos(n, criterio) == \
+                    [(nome, qtde, round(valor, 2)) for nome, qtde, valor in rede.mais_vendidos(n, criterio)]
+        assert consolidado.mais_vendido() == consolidado.mais_vendidos(1)[0]
+        totais = consolidado.totais_por_tipo()
+        assert totais[TIPO_QUIMIO] == (rede.total_quimio_vendido_qtde, rede.total_quimio_vendido_valor)
+        # O descontinuado não tem tipo no catálogo: sai dos fitoterápicos e entra como "outro".
+        qtde_fora, valor_fora = rede.itens["Rede Descontinuado"]
+        assert totais[TIPO_FITO] == (rede.total_fito_vendido_qtde - qtde_fora,
+                                     rede.total_fito_vendido_valor - valor_fora)
+        assert totais[TIPO_OUTRO] == (qtde_fora, valor_fora)
+        # O faturamento de cada loja é guardado em centavos.
+        assert consolidado.lojas == {loja: (vendas, unidades, round(valor * 100))
+                                     for loja, (vendas, unidades, valor) in rede.por_loja.items()}
+        assert (consolidado.vendas, consolidado.unidades) == (1_500, sum(qtde for qtde, _ in rede.itens.values()))
+        assert consolidado.faturamento == sum(round(valor * 100) for _, _, valor in rede.por_loja.values()) / 100
+
+    # O mesmo arquivo duas vezes não é contado em dobro.
+    with pytest.raises(ValueError, match="já consolidada"):
+        consolidacao.consolidar(caminhos + caminhos[:1])
+    # O resumo de uma loja não aceita vendas de outra.
+    with pytest.raises(ValueError, match="outra"):
+        consolidacao.gerar_resumo("A", rede, catalogo)
@@ -0,0 +1,74 @@
+"""Rankings em blocos e agregador de estatísticas de vendas (utils.estatisticas)."""
+import os
+import random
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico, MedicamentoQuimioterapico  # noqa: E402
+from utils import estatisticas as modulo  # noqa: E402
+from utils.estatisticas import CRITERIO_QUANTIDADE, CRITERIO_VALOR, EstatisticasVendas, RankingBlocos  # noqa: E402
+
+
+def test_ranking_blocos_igual_a_lista_ordenada(monkeypatch):
+    # Blocos de até 8 chaves: as sequências abaixo dividem e esvaziam blocos o tempo todo.
+    monkeypatch.setattr(modulo, "TAMANHO_BLOCO_RANKING", 4)
+    gerador = random.Random(4)
+    ranking, referencia = RankingBlocos(), []
+    assert ranking.primeiros(5) == []
+    for passo in range(4000):
+        # Fases de crescimento e de encolhimento, para criar e esvaziar blocos.
+        crescendo = (passo // 500) % 2 == 0
+        if referencia and gerador.random() < (0.3 if crescendo else 0.7):
+            chave = referencia.pop(gerador.randrange(len(referencia)))
+            ranking.remover(chave)
+        else:
+            chave = (-gerador.randrange(50), f"med{gerador.randrange(30)}", passo)
+            ranking.inserir(chave)
+            referencia.append(chave)
+        if passo % 25 == 0:
+            esperado = sorted(referencia)
+            assert len(ranking) == len(esperado)
+            for n in (1, 3, 8, 9, 17, len(esperado) + 1):
+                assert ranking.primeiros(n) == esperado[:n]
+            assert all(len(bloco) <= 8 for bloco in ranking._blocos)
+            assert ranking._maximos == [bloco[-1] for bloco in ranking._blocos]
+    for chave in list(referencia):
+        ranking.remover(chave)
+    assert (len(ranking), ranking._blocos, ranking.primeiros(3)) == (0, [], [])
+
+
+def test_mais_vendidos_empates_em_ordem_alfabetica(monkeypatch):
+    monkeypatch.setattr(modulo, "TAMANHO_BLOCO_RANKING", 2)
+    lab = Laboratorio("Lab Estatísticas", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+    meds = [MedicamentoFitoterapico(f"Est {letra}", "planta", lab, "d", 10.0) for letra in "edcba"]
+    meds += [MedicamentoQuimioterapico(f"Est Q{i}", "x", lab, "d", 5.0 * (i + 1), False) for i in range(5)]
+    gerador = random.Random(11)
+    estatisticas = EstatisticasVendas()
+    for _ in range(400):
+        med = gerador.choice(meds)
+        estatisticas.registrar_item(med, gerador.randint(1, 3), gerador.choice((None, 2.5, 5.0)))
+    # Ordem de referência: métrica decrescente e, nos empates, nome em ordem alfabética.
+    for criterio, coluna in ((CRITERIO_QUANTIDADE, 0), (CRITERIO_VALOR, 1)):
+        esperado = sorted(((nome,) + valores for nome, valores in estatisticas.itens.items()),
+                          key=lambda linha: (-linha[1 + coluna], linha[0]))
+        for n in range(1, len(meds) + 2):
+            assert estatisticas.mais_vendidos(n, criterio) == esperado[:n]
+    assert estatisticas.mais_vendido() == estatisticas.mais_vendidos(1)[0]
+    try:
+        estatisticas.mais_vendidos(0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ranking de tamanho 0 aceito")
+
+    # Empate exato: sai primeiro o nome menor, não o primeiro vendido.
+    empate = EstatisticasVendas()
+    for med in meds[:5]:
+        empate.registrar_item(med, 2)
+    assert [nome for nome, _, _ in empate.mais_vendidos(5)] == ["Est a", "Est b", "Est c", "Est d", "Est e"]
+    empate.registrar_item(meds[0], 1)
+    assert [nome for nome, _, _ in empate.mais_vendidos(2, CRITERIO_VALOR)] == ["Est e", "Est a"]
+    assert (empate.total_fito_vendido_qtde, empate.total_fito_vendido_valor) == (11, 110.0)
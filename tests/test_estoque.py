@@ -0,0 +1,157 @@
+"""Reservas, expiração e índice de estoque baixo (utils.estoque)."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import motor_vendas  # noqa: E402
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico  # noqa: E402
+from utils.estoque import PRAZO_RESERVA, Estoque, EstoqueInsuficiente  # noqa: E402
+
+LAB = Laboratorio("Lab Estoque", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+
+
+def medicamentos(*nomes: str):
+    return [MedicamentoFitoterapico(f"Estoque {nome}", "planta", LAB, "d", 10.0) for nome in nomes]
+
+
+def conferir(estoque: Estoque) -> None:
+    """O índice de estoque baixo tem exatamente os SKUs com em_maos <= minimo, e ninguém reserva além do que há."""
+    esperado = {sku: item for sku, item in estoque._itens.items() if item.em_maos <= item.minimo}
+    assert set(estoque._baixo) == set(esperado)
+    assert estoque.estoque_baixo() == sorted(esperado.values(),
+                                             key=lambda item: (item.em_maos - item.minimo, item.medicamento.nome))
+    assert all(0 <= item.reservado <= item.em_maos for item in estoque.itens())
+    assert set(estoque._reservas) == {id(r) for r in estoque._reservas.values() if r.ativa}
+
+
+def test_reserva_tudo_ou_nada(monkeypatch):
+    estoque = Estoque(listras=2)
+    a, b, c, livre = medicamentos("A", "B", "C", "Livre")
+    estoque.definir(a, 10, 2)
+    estoque.definir(b, 3, 1)
+    estoque.definir(c, 5)
+    conferir(estoque)
+
+    # Falta B: nem A nem C ficam reservados, e nenhuma reserva é registrada.
+    with pytest.raises(EstoqueInsuficiente) as erro:
+        estoque.reservar([(a, 4), (c, 1), (b, 5), (livre, 100)])
+    assert erro.value.faltas == [(b, 5, 3)]
+    assert [item.reservado for item in estoque.itens()] == [0, 0, 0]
+    assert estoque._reservas == {}
+    # O mesmo SKU em duas linhas soma o pedido.
+    with pytest.raises(EstoqueInsuficiente):
+        estoque.reservar([(b, 2), (b, 2)])
+    conferir(estoque)
+
+    # Pelo checkout, a falta vira VendaInvalida, também sem reservar nada.
+    monkeypatch.setattr(motor_vendas, "estoque", estoque)
+    reserva = motor_vendas.reservar_itens([(a, 4), (b, 3)])
+    with pytest.raises(motor_vendas.VendaInvalida, match="Estoque B"):
+        motor_vendas.reservar_itens([(c, 5), (b, 1)], reserva)
+    assert reserva.itens == {a.sku_id: 4, b.sku_id: 3}
+    assert (estoque.disponivel(a), estoque.disponivel(b), estoque.disponivel(c)) == (6, 0, 5)
+    # Medicamento sem estoque definido passa sem reserva.
+    assert estoque.disponivel(livre) is None
+    assert estoque.reservar([(livre, 1000)]).itens == {}
+    conferir(estoque)
+
+
+def test_efetivar_e_liberar_sao_idempotentes():
+    estoque = Estoque(listras=2)
+    a, b = medicamentos("Efetivar A", "Efetivar B")
+    estoque.definir(a, 5, 2)
+    estoque.definir(b, 4, 1)
+
+    vendida = estoque.reservar([(a, 3), (b, 1)])
+    assert (estoque.item(a).reservado, estoque.item(a).em_maos) == (3, 5)
+    conferir(estoque)
+    assert vendida.efetivar()
+    assert (estoque.item(a).em_maos, estoque.item(a).reservado, estoque.item(b).em_maos) == (2, 0, 3)
+    conferir(estoque)
+    # Repetir ou liberar depois de efetivada não mexe em mais nada.
+    assert not vendida.efetivar()
+    assert not vendida.liberar()
+    assert (estoque.item(a).em_maos, estoque.item(b).em_maos) == (2, 3)
+    assert [item.medicamento for item in estoque.estoque_baixo()] == [a]
+
+    cancelada = estoque.reservar([(b, 3)])
+    assert cancelada.liberar()
+    assert not cancelada.liberar()
+    assert not cancelada.efetivar()
+    assert (estoque.item(b).em_maos, estoque.item(b).reservado) == (3, 0)
+    with pytest.raises(ValueError, match="encerrada"):
+        estoque.reservar([(b, 1)], cancelada)
+    conferir(estoque)
+
+    # Reposição e correção de contagem também atualizam o índice.
+    assert estoque.repor([(a, 1), (a, 2), (b, 1)]) == 2
+    assert estoque.item(a).em_maos == 5 and estoque.estoque_baixo() == []
+    estoque.definir(b, 1)
+    conferir(estoque)
+    estoque.baixar([(a, 3)])
+    assert [item.medicamento for item in estoque.estoque_baixo()] == [a, b]
+    conferir(estoque)
+
+
+def test_expirar_reservas_devolve_as_unidades():
+    estoque = Estoque()
+    a, b = medicamentos("Expirar A", "Expirar B")
+    estoque.definir(a, 6, 1)
+    estoque.definir(b, 6, 1)
+    abandonada = estoque.reservar([(a, 4), (b, 2)])
+    recente = estoque.reservar([(a, 2)])
+    assert estoque.disponivel(a) == 0
+    abandonada.criada_em = time.monotonic() - PRAZO_RESERVA - 1
+
+    assert estoque.expirar_reservas() == 1
+    assert (abandonada.ativa, recente.ativa) == (False, True)
+    assert (estoque.disponivel(a), estoque.disponivel(b)) == (4, 6)
+    assert (estoque.item(a).em_maos, estoque.item(b).em_maos) == (6, 6)
+    conferir(estoque)
+    # A venda da reserva expirada não consegue mais baixar o estoque.
+    assert not abandonada.efetivar()
+    assert estoque.item(a).em_maos == 6
+    assert estoque.expirar_reservas() == 0
+    assert estoque.expirar_reservas(prazo=-1) == 1
+    assert estoque.disponivel(a) == 6 and estoque._reservas == {}
+    conferir(estoque)
+
+
+def test_confirmacao_e_expiracao_simultaneas():
+    estoque = Estoque(listras=4)
+    meds = medicamentos(*(f"Corrida {i}" for i in range(6)))
+    for med in meds:
+        estoque.definir(med, 1000, 900)
+    reservas = [estoque.reservar([(meds[i % 6], 2), (meds[(i + 1) % 6], 1)]) for i in range(300)]
+    efetivadas = []
+
+    def confirmar():
+        efetivadas.extend(reserva for reserva in reservas if reserva.efetivar())
+
+    def expirar():
+        for reserva in reservas:
+            reserva.criada_em = 0.0
+        estoque.expirar_reservas(0)
+
+    threads = [threading.Thread(target=confirmar), threading.Thread(target=expirar)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Cada reserva foi efetivada ou liberada, nunca as duas coisas.
+    vendidas = {med.sku_id: 0 for med in meds}
+    for reserva in efetivadas:
+        for sku, qtde in reserva.itens.items():
+            vendidas[sku] += qtde
+    for med in meds:
+        item = estoque.item(med)
+        assert (item.reservado, item.em_maos) == (0, 1000 - vendidas[med.sku_id])
+    assert not any(reserva.ativa for reserva in reservas)
+    conferir(estoque)
@@ -0,0 +1,89 @@
+"""Exportação de vendas: caminho rápido em texto contra as linhas de referência (relatorios.exportacao)."""
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from entidades.cliente import Cliente  # noqa: E402
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico, MedicamentoQuimioterapico  # noqa: E402
+from entidades.venda import Venda  # noqa: E402
+from relatorios import exportacao  # noqa: E402
+from relatorios.exportacao import COLUNAS_VENDAS, FORMATO_CSV, FORMATO_JSONL  # noqa: E402
+
+# Comparadas como números: o caminho rápido grava o total com duas casas ("12.50"), a referência como float.
+NUMERICAS = {"venda", "preco_unitario", "quantidade", "valor_total_venda", "desconto"}
+
+
+def registrar_vendas(monkeypatch):
+    lab = Laboratorio('Lab "Exportação", Ltda', "Rua A, 1", "0000-0000", "São Paulo", "SP")
+    meds = [MedicamentoQuimioterapico("Exp Quimio, 500mg", "x", lab, "d", 12.5, True),
+            MedicamentoFitoterapico('Exp "Fito"', "y", lab, "d", 7.25),
+            MedicamentoFitoterapico("Exp Fito\nduas linhas", "z", lab, "d", 3.1)]
+    clientes = [Cliente("123.456.789-00", "Simples", datetime.date(1950, 1, 1)),
+                Cliente('12,3"4', "Com vírgula e aspas", datetime.date(1990, 1, 1)),
+                Cliente("9\r\n9", "Com quebra", datetime.date(1990, 1, 1))]
+    lista = []
+    for i in range(40):
+        itens = [(meds[(i + j) % 3], j + 1) for j in range(i % 3 + 1)]
+        precos = [med.preco - 0.1 * (i % 2) for med, _ in itens]
+        venda = Venda(datetime.datetime(2024, 5, 17, 8, 30, 0, 1000 * i), itens, clientes[i % 3],
+                      sum(q * p for (_, q), p in zip(itens, precos)) * 0.8, 0.2 if i % 4 else 0.0,
+                      ("idoso+lab:Lab, Exp" if i % 2 else "idoso") if i % 4 else "", precos=precos)
+        venda.armazenar_itens()
+        lista.append(venda)
+    # Um medicamento cadastrado depois das primeiras vendas, que o caminho rápido descobre no meio.
+    novo = MedicamentoFitoterapico("Exp Tardio", "w", lab, "d", 1.0)
+    venda = Venda(datetime.datetime(2024, 5, 18), [(novo, 2)], clientes[0], 2.0)
+    venda.armazenar_itens()
+    lista.append(venda)
+    monkeypatch.setattr(exportacao, "vendas", lista)
+    return sum(len(venda.itens) for venda in lista)
+
+
+def normalizar(registro: dict) -> dict:
+    return {coluna: float(valor) if coluna in NUMERICAS else valor for coluna, valor in registro.items()}
+
+
+def ler(caminho: str, compactado: bool) -> str:
+    abrir = gzip.open if compactado else open
+    with abrir(caminho, "rt", encoding="utf-8", newline="") as arq:
+        return arq.read()
+
+
+def registros(texto: str, formato: str) -> list:
+    if formato == FORMATO_CSV:
+        leitor = csv.DictReader(io.StringIO(texto, newline=""))
+        assert tuple(leitor.fieldnames) == COLUNAS_VENDAS
+        return [normalizar(registro) for registro in leitor]
+    return [normalizar(json.loads(linha)) for linha in texto.split("\n") if linha]
+
+
+def test_texto_vendas_igual_as_linhas_de_referencia(monkeypatch, tmp_path):
+    monkeypatch.setattr(exportacao, "LINHAS_POR_BLOCO", 7)
+    itens = registrar_vendas(monkeypatch)
+    referencia = [normalizar(dict(zip(COLUNAS_VENDAS, linha))) for linha in exportacao.linhas_vendas()]
+    assert len(referencia) == itens
+
+    for formato, nome in ((FORMATO_CSV, "vendas.csv"), (FORMATO_JSONL, "vendas.jsonl")):
+        for compactado in (False, True):
+            caminho = str(tmp_path / (nome + (".gz" if compactado else "")))
+            assert exportacao.exportar_vendas(caminho) == itens
+            texto = ler(caminho, compactado)
+            assert registros(texto, formato) == referencia
+            if formato == FORMATO_CSV:
+                # Byte a byte o que o módulo csv grava com as mesmas linhas (total com duas casas),
+                # inclusive as aspas de cpf, data_hora, nomes e tipo_desconto.
+                linhas = (linha[:8] + (f"{linha[8]:.2f}",) + linha[9:] for linha in exportacao.linhas_vendas())
+                assert texto == "".join(trecho for trecho, _ in exportacao.texto_csv(COLUNAS_VENDAS, linhas))
+                assert '"12,3""4"' in texto and '"9\r\n9"' in texto and "2024-05-17 08:30:00.001000" in texto
+    # gzip explícito num nome sem ".gz".
+    caminho = str(tmp_path / "vendas.txt")
+    assert exportacao.exportar_vendas(caminho, FORMATO_JSONL, gzip=True) == itens
+    assert registros(ler(caminho, True), FORMATO_JSONL) == referencia
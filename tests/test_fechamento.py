@@ -0,0 +1,84 @@
+"""Fechamento do dia em partições e em vários processos (relatorios.fechamento)."""
+import datetime
+import os
+import random
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import data  # noqa: E402
+from entidades.cliente import Cliente  # noqa: E402
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico, MedicamentoQuimioterapico  # noqa: E402
+from entidades.venda import Venda  # noqa: E402
+from relatorios import fechamento  # noqa: E402
+from utils.estatisticas import CRITERIO_QUANTIDADE, CRITERIO_VALOR, EstatisticasVendas  # noqa: E402
+
+
+def gerar_vendas(n: int):
+    """`n` vendas já armazenadas e as estatísticas delas, com preços cobrados diferentes do cadastro."""
+    lab = Laboratorio("Lab Fechamento", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+    meds = [MedicamentoQuimioterapico(f"Fech Quimio {i}", "x", lab, "d", 20.0 + i, i % 2 == 0) for i in range(8)]
+    meds += [MedicamentoFitoterapico(f"Fech Fito {i}", "y", lab, "d", 5.0 + i) for i in range(8)]
+    clientes = [Cliente(f"fech{i:03}", f"Cliente {i}", datetime.date(1970 + i % 30, 1, 1)) for i in range(40)]
+    for cliente in clientes:
+        data.clientes[cliente.cpf] = cliente
+    gerador = random.Random(2024)
+    inicio = datetime.datetime(2024, 5, 17, 8)
+    vendas, estatisticas = [], EstatisticasVendas()
+    for i in range(n):
+        itens = [(med, gerador.randint(1, 4)) for med in gerador.sample(meds, gerador.randint(1, 3))]
+        # Múltiplos de 0,25: somas exatas em float e em centavos.
+        precos = [med.preco - gerador.choice((0.0, 0.25, 1.5)) for med, _ in itens]
+        total = sum(qtde * preco for (_, qtde), preco in zip(itens, precos)) * gerador.choice((1.0, 0.75))
+        venda = Venda(inicio + datetime.timedelta(seconds=i), itens, gerador.choice(clientes), total,
+                      precos=precos)
+        venda.armazenar_itens()
+        estatisticas.registrar_venda(venda)
+        vendas.append(venda)
+    return vendas, estatisticas
+
+
+def test_varios_processos_conferem_com_o_serial_e_as_estatisticas():
+    vendas, estatisticas = gerar_vendas(3_000)
+    serial = fechamento.fechar_dia(1, vendas, tamanho_particao=250)
+    paralelo = fechamento.fechar_dia(3, vendas, tamanho_particao=250)
+    assert (serial.processos, serial.particoes) == (1, 12)
+    assert (paralelo.processos, paralelo.particoes) == (3, 12)
+
+    for resultado in (serial, paralelo):
+        assert resultado.clientes_atendidos == len(vendas)
+        assert resultado.total_quimio_vendido_qtde == estatisticas.total_quimio_vendido_qtde
+        assert resultado.total_fito_vendido_qtde == estatisticas.total_fito_vendido_qtde
+        assert resultado.total_quimio_vendido_valor == round(estatisticas.total_quimio_vendido_valor, 2)
+        assert resultado.total_fito_vendido_valor == round(estatisticas.total_fito_vendido_valor, 2)
+        for criterio in (CRITERIO_QUANTIDADE, CRITERIO_VALOR):
+            for n in (1, 5, fechamento.LIMITE_RANKING):
+                assert resultado.mais_vendidos(n, criterio) == \
+                    [(nome, qtde, round(valor, 2)) for nome, qtde, valor in estatisticas.mais_vendidos(n, criterio)]
+
+    # Maiores clientes calculados direto das vendas.
+    gastos = {}
+    for venda in vendas:
+        compras, centavos = gastos.get(venda.cliente.cpf, (0, 0))
+        gastos[venda.cliente.cpf] = (compras + 1, centavos + round(venda.valor_total * 100))
+    esperado = sorted(((cpf, data.clientes[cpf].nome, compras, centavos / 100)
+                       for cpf, (compras, centavos) in gastos.items()), key=lambda linha: (-linha[3], linha[0]))
+    assert serial.maiores_clientes() == esperado[:fechamento.LIMITE_RANKING]
+    assert paralelo.maiores_clientes() == serial.maiores_clientes()
+    assert paralelo.maiores_clientes(3) == esperado[:3]
+
+
+def test_particionamento_incremental():
+    vendas, estatisticas = gerar_vendas(1_000)
+    particoes = fechamento.ParticionamentoVendas(300)
+    parcial = fechamento.fechar_dia(2, vendas[:700], particoes)
+    assert (parcial.clientes_atendidos, len(particoes.particoes)) == (700, 2)
+    # Só as vendas novas são projetadas; as partições completas não são refeitas.
+    completas = list(particoes.particoes)
+    total = fechamento.fechar_dia(2, vendas, particoes)
+    assert particoes.particoes[:2] == completas
+    assert (total.clientes_atendidos, total.particoes, total.processos) == (1_000, 4, 2)
+    assert total.mais_vendidos(3) == fechamento.fechar_dia(1, vendas, tamanho_particao=1_000).mais_vendidos(3)
+    assert total.total_fito_vendido_qtde == estatisticas.total_fito_vendido_qtde
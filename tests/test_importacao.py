@@ -0,0 +1,168 @@
+"""Importação em lote de CSV/JSONL: validação por linha, duplicados e codificação (utils.importacao)."""
+import csv
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils.importacao import ler_registros  # noqa: E402
+
+LABORATORIOS = [
+    {"nome": "Lab Import", "endereco": "Rua A, 1", "telefone": "0000-0000", "cidade": "São Paulo", "estado": "sp"},
+    {"nome": "Lab Import", "endereco": "Rua B, 2", "telefone": "1111-1111", "cidade": "Recife", "estado": "PE"},
+    {"nome": "Lab Sem Cidade", "endereco": "Rua C, 3", "telefone": "2222-2222", "cidade": " ", "estado": "RJ"},
+]
+MEDICAMENTOS = [
+    {"tipo": "q", "nome": "Imp Quimio", "composto_principal": "x", "laboratorio": "Lab Import",
+     "descricao": "dose única", "preco": "12.50", "necessita_receita": "S"},
+    {"tipo": "F", "nome": "Imp Fito", "composto_principal": "y", "laboratorio": "Lab Import",
+     "descricao": "chá, \"forte\"", "preco": "7", "necessita_receita": ""},
+    {"tipo": "X", "nome": "Imp Tipo", "composto_principal": "z", "laboratorio": "Lab Import",
+     "descricao": "", "preco": "1", "necessita_receita": ""},
+    {"tipo": "F", "nome": "Imp Preço", "composto_principal": "z", "laboratorio": "Lab Import",
+     "descricao": "", "preco": "-3", "necessita_receita": ""},
+    {"tipo": "F", "nome": "Imp Lab", "composto_principal": "z", "laboratorio": "Lab Fantasma",
+     "descricao": "", "preco": "3", "necessita_receita": ""},
+    {"tipo": "F", "nome": "Imp Fito", "composto_principal": "y2", "laboratorio": "Lab Import",
+     "descricao": "repetido", "preco": "8", "necessita_receita": ""},
+    {"tipo": "Q", "nome": "", "composto_principal": "z", "laboratorio": "Lab Import",
+     "descricao": "", "preco": "3", "necessita_receita": "N"},
+]
+CLIENTES = [
+    {"cpf": "111", "nome": "Ana", "data_nascimento": "1950-02-03"},
+    {"cpf": "222", "nome": "Bruno", "data_nascimento": "03/02/1990"},
+    {"cpf": "111", "nome": "Ana de Novo", "data_nascimento": "1960-01-01"},
+    {"cpf": "333", "nome": "Carla", "data_nascimento": "1990-02-30"},
+    {"cpf": "444", "nome": "Davi", "data_nascimento": "2001-12-31"},
+]
+MOTIVOS_MEDICAMENTOS = [
+    "tipo inválido: 'X'",
+    "preço negativo",
+    "laboratório não cadastrado: Lab Fantasma",
+    "registro duplicado",
+    "campo obrigatório ausente: nome",
+]
+
+
+def gravar(caminho: str, registros: list) -> str:
+    if caminho.endswith(".csv"):
+        with open(caminho, "w", newline="", encoding="utf-8") as arq:
+            escritor = csv.DictWriter(arq, fieldnames=list(registros[0]))
+            escritor.writeheader()
+            escritor.writerows(registros)
+    else:
+        with open(caminho, "w", encoding="utf-8") as arq:
+            arq.writelines(json.dumps(registro, ensure_ascii=False) + "\n" for registro in registros)
+    return caminho
+
+
+# Resume um relatório e o catálogo resultante numa linha JSON.
+RESUMIR = """
+def resumir(relatorio):
+    print(json.dumps({"aceitos": relatorio.aceitos, "rejeitados": relatorio.rejeitados,
+                      "rejeicoes": relatorio.rejeicoes,
+                      "laboratorios": sorted((l.nome, l.cidade, l.estado) for l in data.laboratorios.values()),
+                      "medicamentos": sorted((m.nome, type(m).__name__, m.preco, m.descricao,
+                                              getattr(m, "necessita_receita", None))
+                                             for m in data.medicamentos.values()),
+                      "clientes": sorted((c.cpf, c.nome, c.data_nascimento.isoformat())
+                                         for c in data.clientes.values())}))
+"""
+
+
+def executar(diretorio: str, codigo: str, entrada: str = "") -> str:
+    """
+    Roda `codigo` num processo novo (catálogo vazio), com `entrada` na entrada
+    padrão e a função `resumir` definida; retorna a saída.
+    """
+    script = "\n".join(["import json", "import data, services", "from utils import importacao", RESUMIR,
+                        textwrap.dedent(codigo)])
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, FARMACIA_METRICAS="0")
+    processo = subprocess.run([sys.executable, "-c", script], cwd=diretorio, env=ambiente, input=entrada,
+                              capture_output=True, text=True, timeout=60)
+    assert processo.returncode == 0, processo.stderr
+    return processo.stdout
+
+
+def importar_tudo(diretorio: str, extensao: str) -> list:
+    caminhos = [gravar(os.path.join(diretorio, f"{nome}{extensao}"), registros)
+                for nome, registros in (("labs", LABORATORIOS), ("meds", MEDICAMENTOS), ("clientes", CLIENTES))]
+    saida = executar(diretorio, f"""
+        for relatorio in importacao.importar_arquivos(*{caminhos!r}):
+            resumir(relatorio)
+    """)
+    return [json.loads(linha) for linha in saida.splitlines()]
+
+
+def test_rejeicoes_por_linha_e_duplicados(tmp_path):
+    labs, meds, clientes = importar_tudo(str(tmp_path), ".csv")
+    # Linha 1 é o cabeçalho: o primeiro registro está na linha 2.
+    assert (labs["aceitos"], labs["rejeicoes"]) == \
+        (1, [[3, "registro duplicado"], [4, "campo obrigatório ausente: cidade"]])
+    assert (meds["aceitos"], meds["rejeitados"]) == (2, 5)
+    assert meds["rejeicoes"] == [[linha, motivo] for linha, motivo in zip((4, 5, 6, 7, 8), MOTIVOS_MEDICAMENTOS)]
+    # Do arquivo duplicado vale o primeiro registro.
+    assert meds["medicamentos"] == [["Imp Fito", "MedicamentoFitoterapico", 7.0, 'chá, "forte"', None],
+                                    ["Imp Quimio", "MedicamentoQuimioterapico", 12.5, "dose única", True]]
+    assert [linha for linha, _ in clientes["rejeicoes"]] == [3, 4, 5]
+    assert clientes["rejeicoes"][1] == [4, "registro duplicado"]
+    assert all(motivo.startswith(("time data", "day is out of range")) for _, motivo in
+               (clientes["rejeicoes"][0], clientes["rejeicoes"][2]))
+    assert clientes["clientes"] == [["111", "Ana", "1950-02-03"], ["444", "Davi", "2001-12-31"]]
+    assert labs["laboratorios"] == [["Lab Import", "São Paulo", "SP"]]
+
+
+def test_csv_e_jsonl_importam_o_mesmo(tmp_path):
+    os.mkdir(tmp_path / "csv")
+    os.mkdir(tmp_path / "jsonl")
+    pelo_csv = importar_tudo(str(tmp_path / "csv"), ".csv")
+    pelo_jsonl = importar_tudo(str(tmp_path / "jsonl"), ".jsonl")
+    for relatorio_csv, relatorio_jsonl in zip(pelo_csv, pelo_jsonl):
+        # Sem cabeçalho, cada registro JSONL fica uma linha acima do CSV.
+        assert relatorio_jsonl["rejeicoes"] == [[linha - 1, motivo] for linha, motivo in relatorio_csv["rejeicoes"]]
+        del relatorio_csv["rejeicoes"], relatorio_jsonl["rejeicoes"]
+        assert relatorio_jsonl == relatorio_csv
+
+
+def test_linhas_malformadas_mantem_a_numeracao(tmp_path):
+    jsonl = tmp_path / "clientes.jsonl"
+    jsonl.write_text('{"cpf": "1", "nome": "A", "data_nascimento": "1990-01-01"}\n'
+                     "\n"
+                     "{nao é json\n"
+                     "[1, 2]\n"
+                     '   \n'
+                     '{"cpf": 2, "nome": "B", "data_nascimento": "1990-01-01"}\n', encoding="utf-8")
+    assert [(num, registro is not None) for num, registro in ler_registros(str(jsonl))] == \
+        [(1, True), (3, False), (4, False), (6, True)]
+    # Campo entre aspas com quebra de linha: o registro seguinte continua com o número da sua linha.
+    arquivo_csv = tmp_path / "clientes.csv"
+    arquivo_csv.write_text('cpf,nome,data_nascimento\n1,"Nome\nem duas linhas",1990-01-01\n'
+                           "2,,1990-01-01\n\n3,C\n", encoding="utf-8")
+    assert [(num, registro["cpf"]) for num, registro in ler_registros(str(arquivo_csv))] == \
+        [(3, "1"), (4, "2"), (6, "3")]
+    saida = executar(str(tmp_path), f"""
+        resumir(importacao.importar_clientes({str(jsonl)!r}))
+        resumir(importacao.importar_clientes({str(arquivo_csv)!r}))
+    """)
+    pelo_jsonl, pelo_csv = (json.loads(linha) for linha in saida.splitlines())
+    assert pelo_jsonl["rejeicoes"] == [[3, "linha malformada"], [4, "linha malformada"]]
+    assert pelo_csv["rejeicoes"] == [[3, "registro duplicado"], [4, "campo obrigatório ausente: nome"],
+                                     [6, "campo obrigatório ausente: data_nascimento"]]
+    assert pelo_csv["clientes"] == [["1", "A", "1990-01-01"], ["2", "B", "1990-01-01"]]
+
+
+def test_arquivo_fora_de_utf8(tmp_path):
+    caminho = tmp_path / "clientes.csv"
+    caminho.write_bytes("cpf,nome,data_nascimento\n1,João,1990-01-01\n".encode("latin-1"))
+    # O menu de importação informa o erro em vez de derrubar o console.
+    saida = executar(str(tmp_path), """
+        import main
+        main.menu_importacao()
+        print(len(data.clientes))
+    """, entrada=f"3\n{caminho}\n")
+    assert "Não foi possível ler o arquivo: 'utf-8' codec can't decode" in saida
+    assert saida.splitlines()[-1] == "0"
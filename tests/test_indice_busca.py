@@ -0,0 +1,119 @@
+"""Índice invertido de n-gramas e ranking da busca por texto (utils.indice_busca)."""
+import os
+import random
+import subprocess
+import sys
+import textwrap
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico  # noqa: E402
+from utils.indice_busca import CAMPOS_TEXTO, IndiceBusca  # noqa: E402
+
+LAB = Laboratorio("Lab Busca", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+
+
+def busca_linear(meds, termo, campos=CAMPOS_TEXTO):
+    """Ranking da busca por texto calculado varrendo o catálogo inteiro."""
+    termo = termo.strip().lower()
+    if not termo:
+        return []
+    chaves = []
+    for med in meds:
+        melhor = None
+        for prioridade, campo in enumerate(campos):
+            texto = getattr(med, campo).lower()
+            pos = texto.find(termo)
+            if pos < 0:
+                continue
+            tipo = 0 if texto == termo else 1 if pos == 0 or not texto[pos - 1].isalnum() else 2
+            if melhor is None or (prioridade, tipo, pos) < melhor:
+                melhor = (prioridade, tipo, pos)
+        if melhor is not None:
+            chaves.append((melhor, med.nome.lower(), med))
+    chaves.sort(key=lambda chave: chave[:2])
+    return [med for _, _, med in chaves]
+
+
+def test_busca_igual_a_varredura_linear():
+    gerador = random.Random(1)
+    palavras = ["dor", "febre", "ação", "analgésico", "a", "xarope", "tosse", "b12", "anti-inflamatório"]
+    meds = []
+    indice = IndiceBusca()
+    termos = {"", "  ", "z", "ç", "Ç", "a", "A ", "do", "xa", "12", "ão", "-", "dor febre", "ação a"}
+    for i in range(300):
+        descricao = " ".join(gerador.choice(palavras) for _ in range(gerador.randint(0, 4)))
+        composto = gerador.choice(palavras) + gerador.choice(("", "", " sódica", "na"))
+        med = MedicamentoFitoterapico(f"Busca {i * 37 % 300:03}", composto, LAB, descricao, 5.0)
+        indice.adicionar(med)
+        meds.append(med)
+        # Trechos de todos os tamanhos dos textos cadastrados, inclusive de 1 e 2 caracteres.
+        for texto in (descricao, composto):
+            if texto:
+                inicio = gerador.randrange(len(texto))
+                termos.add(texto[inicio:inicio + gerador.randint(1, 6)])
+        if i in (0, 1, 50, 299):
+            for termo in sorted(termos):
+                assert indice.buscar_texto(termo) == busca_linear(meds, termo), termo
+                assert indice.buscar_texto(termo, campos=("descricao",)) == \
+                    busca_linear(meds, termo, ("descricao",)), termo
+                assert indice.buscar_texto(termo, limite=3) == busca_linear(meds, termo)[:3], termo
+    assert len(indice) == 300
+
+
+def test_ranking():
+    indice = IndiceBusca()
+    meds = {}
+    for nome, descricao, composto in (
+            ("Meio", "xarope para tosse", "guaifenesina"),
+            ("Exato", "tosse", "dextrometorfano"),
+            ("Composto", "pastilha", "tosse seca"),
+            ("Inicio", "tosse e gripe", "paracetamol"),
+            ("Dentro", "antitosse", "ambroxol"),
+            ("Abc Palavra", "alívio da tosse", "codeína"),
+            ("Aaa Palavra", "contra a tosse", "codeína")):
+        meds[nome] = MedicamentoFitoterapico(nome, composto, LAB, descricao, 5.0)
+        indice.adicionar(meds[nome])
+    ordem = [med.nome for med in indice.buscar_texto("TOSSE")]
+    # Descrição antes do princípio ativo; texto idêntico, início de palavra (pela posição, depois pelo
+    # nome) e trecho dentro de palavra.
+    assert ordem == ["Exato", "Inicio", "Aaa Palavra", "Abc Palavra", "Meio", "Dentro", "Composto"]
+    # Termos de um e dois caracteres usam o índice, sem varrer o catálogo.
+    assert [med.nome for med in indice.buscar_texto("í")] == ["Abc Palavra", "Aaa Palavra"]
+    assert [med.nome for med in indice.buscar_texto("x", campos=("composto_principal",))] == \
+        ["Exato", "Dentro"]
+    assert indice.buscar_texto("qz") == [] and indice.buscar_texto("q") == []
+    assert (len(indice._candidatos("descricao", "í")), len(indice._candidatos("descricao", "q"))) == (1, 0)
+    assert indice.buscar_por_laboratorio("  LAB busca ") == list(meds.values())
+
+
+def test_cadastro_atualiza_o_indice(tmp_path):
+    respostas = ["F", "Novo Xz", "kw", "1", "xz para tosse", "9.90"]
+    script = textwrap.dedent("""
+        import data, services
+        from entidades.laboratorio import Laboratorio
+        data.laboratorios["Lab Busca"] = Laboratorio("Lab Busca", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+        print([m.nome for m in services.buscar_medicamentos("texto", "xz")])
+        services.cadastrar_medicamento()
+        for criterio, termo in (("texto", "xz"), ("texto", "K"), ("descricao", "x"), ("descricao", "kw"),
+                                ("texto", "xz para tosse"), ("laboratorio", "lab busca")):
+            print(criterio, termo, [m.nome for m in services.buscar_medicamentos(criterio, termo)])
+    """)
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, FARMACIA_METRICAS="0")
+    # As respostas do cadastro vêm pela entrada padrão, como no balcão.
+    processo = subprocess.run([sys.executable, "-c", script], cwd=str(tmp_path), env=ambiente,
+                              input="\n".join(respostas) + "\n", capture_output=True, text=True, timeout=60)
+    assert processo.returncode == 0, processo.stderr
+    linhas = processo.stdout.splitlines()
+    assert linhas[0] == "[]"
+    assert "Medicamento cadastrado com sucesso!" in processo.stdout
+    assert linhas[-6:] == [
+        "texto xz ['Novo Xz']",
+        "texto K ['Novo Xz']",
+        "descricao x ['Novo Xz']",
+        "descricao kw []",
+        "texto xz para tosse ['Novo Xz']",
+        "laboratorio lab busca ['Novo Xz']",
+    ]
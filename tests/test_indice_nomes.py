@@ -0,0 +1,111 @@
+"""Distância de edição, árvore BK e índice de prefixos (utils.indice_nomes)."""
+import os
+import random
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico  # noqa: E402
+from utils import indice_nomes  # noqa: E402
+from utils.indice_nomes import ArvoreBK, IndiceNomes, IndicePrefixos, PadraoEdicao, normalizar  # noqa: E402
+
+LETRAS = "abcdeáéçõ"
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Programação dinâmica direta, linha a linha."""
+    anterior = list(range(len(b) + 1))
+    for i, x in enumerate(a, start=1):
+        atual = [i]
+        for j, y in enumerate(b, start=1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (x != y)))
+        anterior = atual
+    return anterior[-1]
+
+
+def palavra(gerador: random.Random, maximo: int) -> str:
+    return "".join(gerador.choice(LETRAS) for _ in range(gerador.randint(0, maximo)))
+
+
+def medicamento(nome: str) -> MedicamentoFitoterapico:
+    lab = Laboratorio("Lab Nomes", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+    return MedicamentoFitoterapico(nome, "planta", lab, "descrição", 10.0)
+
+
+def test_distancia_igual_a_programacao_dinamica(monkeypatch):
+    # Sempre o cálculo bit-paralelo em Python, mesmo com o rapidfuzz instalado.
+    monkeypatch.setattr(indice_nomes, "_levenshtein_c", None)
+    gerador = random.Random(16)
+    pares = [(palavra(gerador, 12), palavra(gerador, 12)) for _ in range(3000)]
+    # Palavras com mais de 64 letras passam do tamanho de uma palavra de máquina.
+    pares += [(palavra(gerador, 150), palavra(gerador, 150)) for _ in range(100)]
+    base = "abcde" * 18
+    pares += [(base, base[:40] + "y" + base[41:]), ("", "abc"), ("abc", ""), ("", ""),
+              ("dipirona", "dipiróna"), ("ÁÉÍ", "aei")]
+    for a, b in pares:
+        assert PadraoEdicao(a).distancia(b) == levenshtein(a, b), (a, b)
+    # O mesmo padrão serve para vários textos.
+    padrao = PadraoEdicao("paracetamol")
+    for texto in ("paracetamol", "paracetamlo", "paracetamol 750mg", "", "lomatecarap"):
+        assert padrao.distancia(texto) == levenshtein("paracetamol", texto)
+
+
+def test_normalizar():
+    assert normalizar("  Dipiróna   SÓDICA ") == "dipirona sodica"
+    assert normalizar("Straße") == "strasse"
+
+
+def test_arvore_bk_igual_ao_filtro_linear(monkeypatch):
+    monkeypatch.setattr(indice_nomes, "_levenshtein_c", None)
+    gerador = random.Random(7)
+    palavras = {palavra(gerador, 9) for _ in range(1500)} | {"x" * 70, "x" * 68 + "yy"}
+    arvore = ArvoreBK()
+    for p in palavras:
+        assert arvore.adicionar(p)
+    assert not arvore.adicionar(next(iter(palavras)))
+    assert len(arvore) == len(palavras)
+    termos = [palavra(gerador, 9) for _ in range(60)] + ["x" * 69]
+    for termo in termos:
+        distancias = sorted((levenshtein(termo, p), p) for p in palavras)
+        for tolerancia in (0, 1, 2, 3):
+            assert arvore.buscar(termo, tolerancia) == [(d, p) for d, p in distancias if d <= tolerancia]
+    assert ArvoreBK().buscar("abc", 2) == []
+
+
+def test_completar_com_novidades_nao_fundidas(monkeypatch):
+    monkeypatch.setattr(indice_nomes, "LIMITE_NOVIDADES", 8)
+    gerador = random.Random(3)
+    indice = IndicePrefixos()
+    todos = []
+    for i in range(300):
+        chave = palavra(gerador, 5)
+        med = medicamento(f"med {i}")
+        indice.adicionar(chave, med)
+        todos.append((chave, i, med))
+        # Parte dos nomes está no arranjo principal e parte ainda no bloco de novidades.
+        if i in (5, 100, 299):
+            assert indice._novidades
+            for prefixo in ("", "a", "á", "ab", "ca", "eee", "z"):
+                esperado = [(chave, med) for chave, _, med in sorted(todos, key=lambda t: (t[0], t[1]))
+                            if chave.startswith(prefixo)]
+                for limite in (1, 10, 1000):
+                    assert indice.completar(prefixo, limite) == esperado[:limite]
+    assert len(indice) == 300
+
+
+def test_indice_nomes_completa_e_sugere(monkeypatch):
+    monkeypatch.setattr(indice_nomes, "LIMITE_NOVIDADES", 2)
+    indice = IndiceNomes()
+    meds = [medicamento(nome) for nome in ("Dipirona Sódica", "Dipirona Gotas", "Dimenidrinato", "Paracetamol",
+                                           "Paracetamol Infantil", "Ibuprofeno")]
+    for med in meds:
+        indice.adicionar(med)
+    assert indice.buscar_exato("DIPIRONA  sodica") == [meds[0]]
+    assert indice.completar("dip") == [meds[1], meds[0]]
+    assert indice.completar("para", 1) == [meds[3]]
+    assert indice.completar("   ") == []
+    assert indice.sugerir("paracetmol") == [meds[3], meds[4]]
+    assert indice.sugerir("paracetmol infatil") == [meds[4]]
+    assert indice.sugerir("xyzxyz") == []
@@ -0,0 +1,64 @@
+"""Listagens ordenadas com bloco de novidades e paginação (utils.indice_ordenado)."""
+import os
+import random
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils import indice_ordenado  # noqa: E402
+from utils.indice_ordenado import IndiceOrdenado  # noqa: E402
+
+
+def conferir(indice: IndiceOrdenado, inseridos: list) -> None:
+    """Compara a iteração e as páginas do índice com `sorted` (estável) dos itens inseridos."""
+    esperado = sorted(inseridos, key=lambda item: item[0])
+    assert len(indice) == len(esperado)
+    assert list(indice) == esperado
+    for tamanho in (1, 3, 7, 50):
+        paginas = list(indice.paginas(tamanho))
+        assert paginas == [esperado[i:i + tamanho] for i in range(0, len(esperado), tamanho)]
+        for numero in range(1, len(paginas) + 1):
+            assert indice.pagina(numero, tamanho) == paginas[numero - 1]
+        # Fora do intervalo: páginas vazias.
+        assert indice.pagina(len(paginas) + 1, tamanho) == []
+        assert indice.pagina(0, tamanho) == []
+
+
+def test_insercoes_e_leituras_intercaladas(monkeypatch):
+    monkeypatch.setattr(indice_ordenado, "LIMITE_NOVIDADES", 16)
+    gerador = random.Random(7)
+    indice = IndiceOrdenado(lambda item: item[0])
+    inseridos = []
+    conferir(indice, inseridos)
+    for i in range(600):
+        # Poucas chaves distintas: muitos empates, que precisam sair na ordem de inserção.
+        item = (gerador.choice("abcdefghij") + gerador.choice("abc"), i)
+        indice.adicionar(item)
+        inseridos.append(item)
+        if i % 37 == 0 or i in (15, 16, 17):
+            conferir(indice, inseridos)
+    # Terminou com itens tanto no arranjo principal quanto nas novidades.
+    assert indice._itens and indice._itens_novos
+    conferir(indice, inseridos)
+
+
+def test_paginas_que_atravessam_as_duas_partes(monkeypatch):
+    monkeypatch.setattr(indice_ordenado, "LIMITE_NOVIDADES", 1000)
+    indice = IndiceOrdenado(lambda item: item[0])
+    inseridos = [(f"{i:03}", i) for i in range(0, 100, 2)]
+    for item in inseridos:
+        indice.adicionar(item)
+    indice._fundir()
+    # Os ímpares ficam no bloco de novidades, intercalados com os pares já fundidos.
+    for i in range(1, 100, 2):
+        indice.adicionar((f"{i:03}", i))
+        inseridos.append((f"{i:03}", i))
+    assert len(indice._itens) == len(indice._itens_novos) == 50
+    # Chaves acima e abaixo de todo o arranjo principal.
+    for item in (("000", -1), ("zzz", 999)):
+        indice.adicionar(item)
+        inseridos.append(item)
+    conferir(indice, inseridos)
+    assert indice.pagina(3, 10) == sorted(inseridos, key=lambda item: item[0])[20:30]
+    assert indice.pagina(11, 10) == [("099", 99), ("zzz", 999)]
@@ -0,0 +1,126 @@
+"""Histogramas de latência, instrumentação e exportação Prometheus (utils.metricas)."""
+import os
+import random
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils import metricas  # noqa: E402
+from utils.metricas import BITS_PRECISAO, HistogramaLatencia, RegistroMetricas  # noqa: E402
+
+
+def test_faixas_do_histograma():
+    # Até 2 * 2**BITS_PRECISAO cada valor tem a sua faixa; acima, a faixa tem erro relativo < 1/32.
+    gerador = random.Random(7)
+    for valor in list(range(200)) + [gerador.randrange(1, 10 ** 12) for _ in range(5000)]:
+        i = HistogramaLatencia.indice(valor)
+        inferior, superior = HistogramaLatencia.limite_inferior(i), HistogramaLatencia.limite_superior(i)
+        assert inferior <= valor <= superior
+        if valor < 2 << BITS_PRECISAO:
+            assert inferior == superior == valor
+        else:
+            assert (superior - inferior + 1) / inferior <= 1 / (1 << BITS_PRECISAO)
+    # As faixas são contíguas e crescentes.
+    for i in range(1, 2000):
+        assert HistogramaLatencia.limite_inferior(i) == HistogramaLatencia.limite_superior(i - 1) + 1
+
+
+def test_percentis_contra_amostras_conhecidas():
+    pequenos = HistogramaLatencia()
+    for valor in range(1, 61):
+        pequenos.registrar(valor)
+    # Valores pequenos são exatos.
+    assert [pequenos.percentil(q) for q in (0.5, 0.9, 1.0)] == [30, 54, 60]
+    assert (pequenos.minimo, pequenos.maximo, pequenos.total, pequenos.media()) == (1, 60, 60, 30.5)
+
+    gerador = random.Random(42)
+    amostras = [gerador.randrange(1_000, 50_000_000) for _ in range(20_000)]
+    histograma = HistogramaLatencia()
+    for valor in amostras:
+        histograma.registrar(valor)
+    ordenadas = sorted(amostras)
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exato = ordenadas[max(1, round(q * len(amostras))) - 1]
+        assert exato <= histograma.percentil(q) <= exato * (1 + 1 / (1 << BITS_PRECISAO))
+    assert histograma.percentil(1.0) == max(amostras)
+
+    # Mesclar dá o mesmo histograma que registrar tudo num só.
+    metade, resto = HistogramaLatencia(), HistogramaLatencia()
+    for valor in amostras[:7_000]:
+        metade.registrar(valor)
+    for valor in amostras[7_000:]:
+        resto.registrar(valor)
+    metade.mesclar(resto)
+    assert (metade.contagens, metade.soma, metade.minimo, metade.maximo) == \
+        (histograma.contagens, histograma.soma, histograma.minimo, histograma.maximo)
+
+
+def test_desligadas_nao_registram():
+    ativo = metricas.registro.ativo
+
+    @metricas.instrumentar("teste.operacao")
+    def dobro(x):
+        if x < 0:
+            raise ValueError(x)
+        return 2 * x
+
+    try:
+        metricas.desabilitar()
+        metricas.registro.zerar()
+        assert dobro(3) == 6
+        metricas.contar("teste.contador")
+        assert metricas.registro.instantaneo() == ([], {})
+
+        metricas.habilitar()
+        dobro(1)
+        try:
+            dobro(-1)
+        except ValueError:
+            pass
+        metricas.contar("teste.contador", 2)
+        operacoes, contadores = metricas.registro.instantaneo()
+        assert [(m.nome, m.chamadas, m.erros, m.latencias.total) for m in operacoes] == [("teste.operacao", 2, 1, 2)]
+        assert contadores == {"teste.contador": 2}
+    finally:
+        metricas.registro.ativo = ativo
+        metricas.registro.zerar()
+
+
+def test_formato_prometheus(tmp_path):
+    registro = RegistroMetricas(ativo=True)
+    registro.inicio = 1700000000.25
+    for duracao in (10, 20, 40):
+        registro.operacao("services.buscar").registrar(duracao)
+    registro.operacao('rel"at\\orio').registrar(5, erro=True)
+    registro.contar("vendas.confirmadas", 3)
+    esperado = "\n".join([
+        "# HELP farmacia_operacao_duracao_segundos Duração das operações instrumentadas.",
+        "# TYPE farmacia_operacao_duracao_segundos summary",
+        'farmacia_operacao_duracao_segundos{operacao="rel\\"at\\\\orio",quantile="0.5"} 0.000000005',
+        'farmacia_operacao_duracao_segundos{operacao="rel\\"at\\\\orio",quantile="0.9"} 0.000000005',
+        'farmacia_operacao_duracao_segundos{operacao="rel\\"at\\\\orio",quantile="0.99"} 0.000000005',
+        'farmacia_operacao_duracao_segundos{operacao="rel\\"at\\\\orio",quantile="0.999"} 0.000000005',
+        'farmacia_operacao_duracao_segundos_sum{operacao="rel\\"at\\\\orio"} 0.000000005',
+        'farmacia_operacao_duracao_segundos_count{operacao="rel\\"at\\\\orio"} 1',
+        'farmacia_operacao_duracao_segundos{operacao="services.buscar",quantile="0.5"} 0.000000020',
+        'farmacia_operacao_duracao_segundos{operacao="services.buscar",quantile="0.9"} 0.000000040',
+        'farmacia_operacao_duracao_segundos{operacao="services.buscar",quantile="0.99"} 0.000000040',
+        'farmacia_operacao_duracao_segundos{operacao="services.buscar",quantile="0.999"} 0.000000040',
+        'farmacia_operacao_duracao_segundos_sum{operacao="services.buscar"} 0.000000070',
+        'farmacia_operacao_duracao_segundos_count{operacao="services.buscar"} 3',
+        "# HELP farmacia_operacao_erros_total Chamadas encerradas com exceção.",
+        "# TYPE farmacia_operacao_erros_total counter",
+        'farmacia_operacao_erros_total{operacao="rel\\"at\\\\orio"} 1',
+        'farmacia_operacao_erros_total{operacao="services.buscar"} 0',
+        "# TYPE farmacia_vendas_confirmadas_total counter",
+        "farmacia_vendas_confirmadas_total 3",
+        "# TYPE farmacia_metricas_inicio_segundos gauge",
+        "farmacia_metricas_inicio_segundos 1700000000.250",
+    ]) + "\n"
+    assert metricas.texto_prometheus(registro) == esperado
+    caminho = str(tmp_path / "metricas.prom")
+    metricas.exportar_prometheus(caminho, registro)
+    with open(caminho, encoding="utf-8") as arq:
+        assert arq.read() == esperado
+    assert os.listdir(tmp_path) == ["metricas.prom"]
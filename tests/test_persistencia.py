@@ -0,0 +1,158 @@
+"""
+Recuperação do estado pelo snapshot + log de eventos (utils.persistencia).
+
+O estado de `data` é global ao processo, então cada etapa (antes e depois de
+um "reinício") roda num interpretador próprio sobre o mesmo diretório de dados.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils.persistencia import ARQUIVO_LOG, ARQUIVO_SNAPSHOT, CABECALHO_LOG  # noqa: E402
+
+CADASTRO = """
+import datetime
+from entidades.cliente import Cliente
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import MedicamentoFitoterapico
+import services
+lab = Laboratorio("Lab", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+services.registrar_laboratorio(lab)
+services.registrar_medicamento(MedicamentoFitoterapico("Boldo", "boldo", lab, "chá", 10.0))
+services.registrar_cliente(Cliente("11111111111", "Ana", datetime.date(1990, 1, 1)))
+"""
+
+
+def executar(diretorio: str, codigo: str, eventos_por_snapshot: int = 100_000) -> str:
+    """Abre a persistência em `diretorio`, roda `codigo`, fecha e retorna a saída padrão."""
+    script = "\n".join([
+        "from utils import persistencia",
+        f"persistencia.abrir({diretorio!r}, eventos_por_snapshot={eventos_por_snapshot})",
+        "import data, motor_vendas, services",
+        textwrap.dedent(codigo),
+        "persistencia.fechar()",
+    ])
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, FARMACIA_METRICAS="0")
+    processo = subprocess.run([sys.executable, "-c", script], cwd=diretorio, env=ambiente,
+                              capture_output=True, text=True, timeout=60)
+    assert processo.returncode == 0, processo.stderr
+    return processo.stdout
+
+
+ESTADO = """
+boldo = data.medicamentos["Boldo"]
+print(len(data.vendas), data.estatisticas.itens.get("Boldo"), data.estoque.item(boldo).em_maos)
+"""
+
+
+def test_cauda_truncada_e_descartada(tmp_path):
+    diretorio = str(tmp_path)
+    executar(diretorio, CADASTRO + """
+services.definir_estoque(data.medicamentos["Boldo"], 10)
+motor_vendas.checkout("11111111111", [("Boldo", 2)])
+""")
+    # Queda no meio de uma gravação: cabeçalho completo, payload pela metade.
+    with open(os.path.join(diretorio, ARQUIVO_LOG), "ab") as arq:
+        arq.write(CABECALHO_LOG.pack(64, 0, 99) + b"parcial")
+    assert executar(diretorio, ESTADO) == "1 (2, 20.0) 8\n"
+    # Os eventos gravados depois da recuperação não podem ficar atrás da cauda descartada.
+    executar(diretorio, 'motor_vendas.checkout("11111111111", [("Boldo", 1)])')
+    assert executar(diretorio, ESTADO) == "2 (3, 30.0) 7\n"
+
+
+def test_reproducao_apos_compactacao(tmp_path):
+    diretorio = str(tmp_path)
+    # Com snapshots a cada 4 eventos, o log é compactado várias vezes durante o cadastro e as vendas.
+    executar(diretorio, CADASTRO + """
+services.definir_estoque(data.medicamentos["Boldo"], 50)
+for _ in range(6):
+    motor_vendas.checkout("11111111111", [("Boldo", 3)])
+""", eventos_por_snapshot=4)
+    assert os.path.exists(os.path.join(diretorio, ARQUIVO_SNAPSHOT))
+    assert executar(diretorio, ESTADO) == "6 (18, 180.0) 32\n"
+    executar(diretorio, 'motor_vendas.checkout("11111111111", [("Boldo", 2)])', eventos_por_snapshot=4)
+    assert executar(diretorio, ESTADO) == "7 (20, 200.0) 30\n"
+
+
+def test_eventos_de_estoque(tmp_path):
+    diretorio = str(tmp_path)
+    executar(diretorio, CADASTRO + """
+boldo = data.medicamentos["Boldo"]
+services.definir_estoque(boldo, 10, 2)
+motor_vendas.checkout("11111111111", [("Boldo", 4)])
+services.repor_estoque([(boldo, 5)])
+motor_vendas.checkout("11111111111", [("Boldo", 1)])
+""")
+    # definir 10, venda 4, reposição 5, venda 1.
+    assert executar(diretorio, ESTADO + "print(data.estoque.item(boldo).minimo)") == "2 (5, 50.0) 10\n2\n"
+    # Uma contagem absoluta depois das vendas prevalece sobre elas na reprodução.
+    executar(diretorio, 'services.definir_estoque(data.medicamentos["Boldo"], 7)')
+    assert executar(diretorio, ESTADO) == "2 (5, 50.0) 7\n"
+    # E sobrevive também à compactação (o snapshot grava a posição absoluta).
+    executar(diretorio, "persistencia.motor.compactar()")
+    assert executar(diretorio, ESTADO) == "2 (5, 50.0) 7\n"
+
+
+def test_evento_sobrevive_a_queda_do_processo(tmp_path):
+    diretorio = str(tmp_path)
+    # Sai sem fechar a persistência (nem descarregar buffers): o evento já tem de estar no arquivo.
+    executar(diretorio, CADASTRO + """
+services.definir_estoque(data.medicamentos["Boldo"], 10)
+motor_vendas.checkout("11111111111", [("Boldo", 2)])
+import os
+os._exit(0)
+""")
+    assert executar(diretorio, ESTADO) == "1 (2, 20.0) 8\n"
+
+
+def test_compactacao_concorrente_nao_duplica_venda(tmp_path):
+    diretorio = str(tmp_path)
+    executar(diretorio, CADASTRO + 'services.definir_estoque(data.medicamentos["Boldo"], 10)')
+    # A compactação chega enquanto a venda já está em `data.vendas` e o seu evento ainda não foi gravado.
+    executar(diretorio, """
+import threading, time
+registrar_evento = persistencia.registrar_evento
+dentro = threading.Event()
+
+def registrar_devagar(tipo, obj):
+    if tipo == persistencia.EVENTO_VENDA:
+        dentro.set()
+        time.sleep(0.3)
+    registrar_evento(tipo, obj)
+
+persistencia.registrar_evento = registrar_devagar
+caixa = threading.Thread(target=motor_vendas.checkout, args=("11111111111", [("Boldo", 1)]))
+caixa.start()
+dentro.wait()
+persistencia.motor.compactar()
+caixa.join()
+""")
+    assert executar(diretorio, ESTADO) == "1 (1, 10.0) 9\n"
+
+
+def test_contagem_de_estoque_durante_venda_nao_desconta_duas_vezes(tmp_path):
+    diretorio = str(tmp_path)
+    executar(diretorio, CADASTRO + 'services.definir_estoque(data.medicamentos["Boldo"], 10)')
+    # A contagem absoluta chega depois de a venda baixar o estoque e antes de o seu evento ser gravado.
+    executar(diretorio, """
+import threading, time
+Venda = motor_vendas.Venda
+dentro = threading.Event()
+
+def venda_devagar(*args):
+    dentro.set()
+    time.sleep(0.3)
+    return Venda(*args)
+
+motor_vendas.Venda = venda_devagar
+caixa = threading.Thread(target=motor_vendas.checkout, args=("11111111111", [("Boldo", 1)]))
+caixa.start()
+dentro.wait()
+services.definir_estoque(data.medicamentos["Boldo"], 20)
+caixa.join()
+""")
+    assert executar(diretorio, ESTADO) == "1 (1, 10.0) 20\n"
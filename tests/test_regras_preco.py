@@ -0,0 +1,151 @@
+"""Motor de regras de preço e desconto (regras_preco)."""
+import datetime
+import json
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import motor_vendas  # noqa: E402
+from entidades.cliente import Cliente  # noqa: E402
+from entidades.laboratorio import Laboratorio  # noqa: E402
+from entidades.medicamento import MedicamentoFitoterapico, MedicamentoQuimioterapico  # noqa: E402
+from regras_preco import (DescontoIdoso, DescontoLaboratorio, DescontoTipo, DescontoValorMinimo,  # noqa: E402
+                          PrecoSku, carregar_regras, compilar, regra_de_dict)
+
+HOJE = datetime.date(2024, 5, 17)
+LAB = Laboratorio("Lab Regras", "Rua A, 1", "0000-0000", "São Paulo", "SP")
+OUTRO_LAB = Laboratorio("Outro Lab", "Rua B, 2", "1111-1111", "Recife", "PE")
+QUIMIO = MedicamentoQuimioterapico("Regras Quimio", "x", LAB, "d", 100.0, False)
+FITO = MedicamentoFitoterapico("Regras Fito", "y", LAB, "d", 20.0)
+FITO_OUTRO = MedicamentoFitoterapico("Regras Fito Outro", "z", OUTRO_LAB, "d", 10.0)
+ADULTO = Cliente("regras1", "Adulto", datetime.date(1990, 1, 1))
+IDOSO = Cliente("regras2", "Idoso", datetime.date(1950, 1, 1))
+
+
+def desconto_original(cliente: Cliente, subtotal: float, dia: datetime.date):
+    """Regra de desconto anterior ao motor de regras: a maior entre idoso (> 65 anos) e compra > R$150."""
+    desconto_idoso = 0.20 if cliente.idade(dia) > 65 else 0.0
+    desconto_valor = 0.10 if subtotal > 150.0 else 0.0
+    desconto = max(desconto_idoso, desconto_valor)
+    tipo = "" if not desconto else ("idoso" if desconto == 0.20 else "valor")
+    return desconto, subtotal * desconto, tipo
+
+
+def test_sem_regras_carregadas_repete_os_descontos_originais():
+    avaliador = compilar(motor_vendas.REGRAS_PADRAO)
+    nascimentos = (datetime.date(1959, 5, 17), datetime.date(1958, 5, 18), datetime.date(1958, 5, 17),
+                   datetime.date(1940, 1, 1), datetime.date(2000, 1, 1))
+    for i, nascimento in enumerate(nascimentos):
+        cliente = Cliente(f"paridade{i}", "Cliente", nascimento)
+        for qtde_fito in (1, 7, 8, 50):
+            itens = [(FITO, qtde_fito)] + ([(QUIMIO, 1)] if qtde_fito == 50 else [])
+            precificacao = avaliador.avaliar(cliente, itens, HOJE)
+            subtotal = sum(med.preco * qtde for med, qtde in itens)
+            desconto, valor, tipo = desconto_original(cliente, subtotal, HOJE)
+            assert precificacao.precos == [med.preco for med, _ in itens]
+            assert precificacao.subtotal == subtotal
+            assert precificacao.valor_desconto == pytest.approx(valor)
+            assert precificacao.tipo_desconto == tipo
+    # O checkout usa o mesmo conjunto quando nenhuma regra foi carregada.
+    resultado = motor_vendas.precificar(IDOSO, [(FITO, 10)], HOJE)
+    assert (resultado.subtotal, resultado.desconto, resultado.total, resultado.tipo_desconto) == \
+        (200.0, pytest.approx(0.20), pytest.approx(160.0), "idoso")
+
+
+def test_empilhamento_e_precedencia():
+    lab = DescontoLaboratorio("lab regras", 0.10, combinavel=True)
+    tipo = DescontoTipo("F", 0.05, combinavel=True)
+    itens = [(FITO, 10), (FITO_OUTRO, 10)]  # subtotal 300; 200 do laboratório, 300 fitoterápicos
+
+    # Combináveis somam-se, cada uma sobre o preço cheio: 20 + 15.
+    combinadas = compilar([lab, tipo]).avaliar(ADULTO, itens, HOJE)
+    assert (combinadas.valor_desconto, combinadas.tipo_desconto) == (pytest.approx(35.0), "lab:lab regras+tipo:F")
+
+    # Uma exclusiva só vale sozinha, e só se der mais que a soma das combináveis.
+    valor = DescontoValorMinimo(150.0, 0.10)
+    assert compilar([lab, tipo, valor]).avaliar(ADULTO, itens, HOJE).tipo_desconto == "lab:lab regras+tipo:F"
+    idoso = DescontoIdoso(65, 0.20)
+    maior = compilar([lab, tipo, idoso]).avaliar(IDOSO, itens, HOJE)
+    assert (maior.valor_desconto, maior.tipo_desconto) == (pytest.approx(60.0), "idoso")
+
+    # Empate entre exclusivas: vale a que vem primeiro no conjunto.
+    por_valor = DescontoValorMinimo(150.0, 0.20, nome="valor20")
+    assert compilar([idoso, por_valor]).avaliar(IDOSO, itens, HOJE).tipo_desconto == "idoso"
+    assert compilar([por_valor, idoso]).avaliar(IDOSO, itens, HOJE).tipo_desconto == "valor20"
+
+    # O preço próprio substitui o de cadastro, e os descontos incidem sobre ele.
+    preco = PrecoSku("Regras Fito", 15.0)
+    com_preco = compilar([preco, lab]).avaliar(ADULTO, [(FITO, 10)], HOJE)
+    assert (com_preco.precos, com_preco.subtotal, com_preco.valor_desconto) == ([15.0], 150.0, pytest.approx(15.0))
+    # Limite do valor mínimo é estrito (como o original: acima de R$150).
+    assert compilar([preco, valor]).avaliar(ADULTO, [(FITO, 10)], HOJE).aplicadas == []
+    # O desconto nunca passa do subtotal.
+    tudo = compilar([DescontoTipo("Q", 0.8, combinavel=True),
+                     DescontoLaboratorio("Lab Regras", 0.5, combinavel=True)])
+    assert tudo.avaliar(ADULTO, [(QUIMIO, 1)], HOJE).valor_desconto == 100.0
+
+
+def test_janelas_de_vigencia():
+    promocao = DescontoTipo("Q", 0.30, inicio=datetime.date(2024, 5, 10), fim=datetime.date(2024, 5, 20))
+    avaliador = compilar([promocao, PrecoSku("Regras Quimio", 90.0, inicio=datetime.date(2024, 5, 18))])
+    # O mesmo avaliador troca as regras vigentes na virada do dia.
+    esperados = [
+        (datetime.date(2024, 5, 9), [100.0], 0.0),
+        (datetime.date(2024, 5, 10), [100.0], 30.0),
+        (datetime.date(2024, 5, 17), [100.0], 30.0),
+        (datetime.date(2024, 5, 18), [90.0], 27.0),
+        (datetime.date(2024, 5, 20), [90.0], 27.0),
+        (datetime.date(2024, 5, 21), [90.0], 0.0),
+        (datetime.date(2024, 5, 17), [100.0], 30.0),
+    ]
+    for dia, precos, desconto in esperados:
+        precificacao = avaliador.avaliar(ADULTO, [(QUIMIO, 1)], dia)
+        assert (precificacao.precos, precificacao.valor_desconto) == (precos, pytest.approx(desconto)), dia
+    lote = avaliador.avaliar_lote([(ADULTO, [(QUIMIO, 1)]), (IDOSO, [(QUIMIO, 2)])], datetime.date(2024, 5, 18))
+    assert [p.subtotal for p in lote] == [90.0, 180.0]
+    # A idade também é a do dia avaliado.
+    assert avaliador.idade(IDOSO, datetime.date(2024, 5, 17)) == 74
+    assert avaliador.idade(Cliente("regras3", "Aniversário", datetime.date(1959, 5, 18)), HOJE) == 64
+
+
+def test_carregar_regras(tmp_path):
+    regras = [
+        {"tipo": "preco", "medicamento": "Regras Fito", "preco": "18.5"},
+        {"tipo": "laboratorio", "laboratorio": "Lab Regras", "percentual": 0.1, "combinavel": True,
+         "inicio": "2024-05-01", "fim": "2024-05-31"},
+        {"tipo": "tipo_medicamento", "tipo_medicamento": "F", "percentual": 0.05, "nome": "fito"},
+        {"tipo": "idoso", "idade_minima": 60, "percentual": 0.25},
+        {"tipo": "valor_minimo", "limite": 300, "percentual": 0.15, "descricao": "Compra grande"},
+    ]
+    caminho = tmp_path / "regras.json"
+    caminho.write_text(json.dumps(regras), encoding="utf-8")
+    carregadas = carregar_regras(str(caminho))
+    assert [type(regra) for regra in carregadas] == [PrecoSku, DescontoLaboratorio, DescontoTipo, DescontoIdoso,
+                                                      DescontoValorMinimo]
+    assert carregadas[0].preco == 18.5
+    assert (carregadas[1].combinavel, carregadas[1].inicio, carregadas[1].fim) == \
+        (True, datetime.date(2024, 5, 1), datetime.date(2024, 5, 31))
+    assert (carregadas[2].nome, carregadas[4].descricao) == ("fito", "Compra grande")
+
+
+@pytest.mark.parametrize("regra, mensagem", [
+    ({"tipo": "cupom", "percentual": 0.1}, "Tipo de regra desconhecido: 'cupom'"),
+    ({"percentual": 0.1}, "Tipo de regra desconhecido: None"),
+    ({"tipo": "laboratorio", "percentual": 0.1}, "Regra 'laboratorio' sem o campo 'laboratorio'"),
+    ({"tipo": "idoso", "idade_minima": 65}, "Regra 'idoso' sem o campo 'percentual'"),
+    ({"tipo": "tipo_medicamento", "tipo_medicamento": "X", "percentual": 0.1}, "Tipo de medicamento inválido"),
+    ({"tipo": "valor_minimo", "limite": "muito", "percentual": 0.1}, "muito"),
+    ({"tipo": "preco", "medicamento": "A", "preco": 1, "inicio": "17/05/2024"}, "17/05/2024"),
+])
+def test_regra_invalida(tmp_path, regra, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        regra_de_dict(regra)
+    caminho = tmp_path / "regras.json"
+    caminho.write_text(json.dumps([{"tipo": "idoso", "idade_minima": 65, "percentual": 0.2}, regra]),
+                       encoding="utf-8")
+    with pytest.raises(ValueError, match=mensagem):
+        carregar_regras(str(caminho))
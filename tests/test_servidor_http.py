@@ -0,0 +1,125 @@
+"""Protocolo HTTP/1.1 e despacho de rotas do servidor (servidor_http)."""
+import asyncio
+import json
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import servidor_http  # noqa: E402
+
+
+async def ler_resposta(reader: asyncio.StreamReader):
+    """(status, cabeçalhos, objeto JSON) da próxima resposta; IncompleteReadError se o servidor fechou a conexão."""
+    bruto = await reader.readuntil(b"\r\n\r\n")
+    linhas = bruto.decode("latin-1").split("\r\n")
+    cabecalhos = dict((nome.lower(), valor.strip()) for nome, _, valor in
+                      (linha.partition(":") for linha in linhas[1:] if linha))
+    corpo = await reader.readexactly(int(cabecalhos["content-length"]))
+    return int(linhas[0].split(" ")[1]), cabecalhos, json.loads(corpo)
+
+
+def conversar(*envios: bytes):
+    """
+    Sobe o servidor numa porta livre, envia cada bloco de bytes na mesma conexão
+    e retorna as respostas recebidas até o servidor fechá-la, ou "aberta" se ele parar de responder sem fechar.
+    """
+    async def rodar():
+        servidor = await asyncio.start_server(servidor_http.atender_conexao, "127.0.0.1", 0,
+                                              limit=servidor_http.MAX_CABECALHO)
+        porta = servidor.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+        respostas = []
+        try:
+            for envio in envios:
+                writer.write(envio)
+                await writer.drain()
+            while True:
+                try:
+                    resposta = await asyncio.wait_for(ler_resposta(reader), 0.5)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.TimeoutError:
+                    respostas.append("aberta")
+                    break
+                respostas.append(resposta)
+        finally:
+            writer.close()
+            servidor.close()
+            await servidor.wait_closed()
+        return respostas
+    return asyncio.run(rodar())
+
+
+def requisicao(metodo: str, alvo: str, corpo: bytes = b"", *cabecalhos: str) -> bytes:
+    linhas = [f"{metodo} {alvo} HTTP/1.1", "Host: teste"] + list(cabecalhos)
+    if corpo:
+        linhas.append(f"Content-Length: {len(corpo)}")
+    return ("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1") + corpo
+
+
+def test_pipeline_responde_na_ordem():
+    # As duas requisições chegam no mesmo pacote; uma GET e uma POST (no pool de threads).
+    respostas = conversar(requisicao("POST", "/vendas", b"{}") + requisicao("GET", "/estatisticas?top=2"))
+    assert len(respostas) == 3 and respostas[-1] == "aberta"
+    (status1, cab1, obj1), (status2, cab2, obj2) = respostas[:2]
+    assert (status1, cab1["connection"]) == (400, "keep-alive")
+    assert "erro" in obj1
+    assert (status2, cab2["connection"]) == (200, "keep-alive")
+    assert {"clientes_atendidos", "mais_vendidos"} <= set(obj2)
+
+
+def test_connection_close_encerra_depois_da_resposta():
+    respostas = conversar(requisicao("GET", "/estatisticas", b"", "Connection: close")
+                          + requisicao("GET", "/estatisticas"))
+    assert len(respostas) == 1
+    assert (respostas[0][0], respostas[0][1]["connection"]) == (200, "close")
+    # HTTP/1.0 só mantém a conexão se pedir keep-alive.
+    respostas = conversar(b"GET /estatisticas HTTP/1.0\r\n\r\n")
+    assert [(status, cab["connection"]) for status, cab, _ in respostas] == [(200, "close")]
+
+
+def test_content_length_invalido():
+    for valor in ("dez", "-1"):
+        respostas = conversar(f"POST /vendas HTTP/1.1\r\nContent-Length: {valor}\r\n\r\n{{}}".encode())
+        assert [(status, cab["connection"], obj) for status, cab, obj in respostas] == \
+            [(400, "close", {"erro": "Content-Length inválido."})]
+    grande = conversar(f"POST /vendas HTTP/1.1\r\nContent-Length: {servidor_http.MAX_CORPO + 1}\r\n\r\n".encode())
+    assert [status for status, _, _ in grande] == [413]
+
+
+def test_json_invalido():
+    for corpo in (b"{nao e json", b'{"cpf": "1"}', b'{"cpf": "1", "itens": [["Dipirona"]]}', b"[1, 2]"):
+        respostas = conversar(requisicao("POST", "/vendas", corpo, "Connection: close"))
+        assert len(respostas) == 1
+        status, _, objeto = respostas[0]
+        assert status == 400 and objeto["erro"].startswith("Corpo esperado")
+
+
+def test_rota_desconhecida_e_metodo_errado():
+    respostas = conversar(requisicao("GET", "/nada") + requisicao("DELETE", "/estatisticas")
+                          + requisicao("GET", "/vendas") + requisicao("PUT", "/clientes/123")
+                          + requisicao("GET", "/clientes/cpf-inexistente", b"", "Connection: close"))
+    assert [(status, obj["erro"]) for status, _, obj in respostas] == [
+        (404, "Rota não encontrada."),
+        (405, "Método não permitido."),
+        (405, "Método não permitido."),
+        (405, "Método não permitido."),
+        (404, "Cliente não cadastrado."),
+    ]
+
+
+def test_erro_inesperado_responde_500(monkeypatch, capsys):
+    def falhar(_consulta, _corpo):
+        raise RuntimeError("falha na rota")
+
+    monkeypatch.setitem(servidor_http.ROTAS, ("GET", "/estatisticas"), falhar)
+    monkeypatch.setitem(servidor_http.ROTAS, ("POST", "/vendas"), falhar)
+    # Tanto no laço de eventos (GET) quanto no pool de threads (POST); a conexão segue aberta.
+    respostas = conversar(requisicao("GET", "/estatisticas") + requisicao("POST", "/vendas", b"{}")
+                          + requisicao("GET", "/medicamentos?criterio=outro", b"", "Connection: close"))
+    assert [(status, obj["erro"]) for status, _, obj in respostas[:2]] == \
+        [(500, "Erro interno do servidor.")] * 2
+    assert respostas[2][0] == 400 and len(respostas) == 3
+    assert capsys.readouterr().err.count("RuntimeError: falha na rota") == 2
@@ -0,0 +1,352 @@
+"""
+Trilha de auditoria das vendas de medicamentos controlados (quimioterápicos
+que exigem receita): CPF, medicamento, quantidade, data/hora e a referência
+da receita de cada item vendido, em um arquivo append-only.
+
+O caixa não espera o disco: os eventos de cada venda vão juntos, como uma
+única entrada, para uma fila em memória (ou todos entram, ou nenhum), e uma
+thread gravadora anexa ao arquivo tudo o que encontrar na fila e faz um único
+fsync por lote (commit em grupo). A fila tem capacidade fixa, então a memória
+é limitada: com o disco atrasado e a fila cheia, quem registra espera até
+abrir espaço (contrapressão), em vez de descartar eventos. O caixa espera por
+uma vaga (`reservar_vaga`) antes de entrar na transação da venda, e dentro
+dela só enfileira, sem bloquear: um disco de auditoria lento não segura a
+trava da persistência, e os demais caixas seguem vendendo.
+
+Os registros usam o mesmo enquadramento do log de eventos (`persistencia`):
+cabeçalho com tamanho, CRC32 e número de sequência, seguido do payload. O
+índice por CPF e por medicamento guarda só a posição de cada registro no
+arquivo, e as consultas leem os registros do disco. Os medicamentos são
+identificados pelo nome, já que os sku_id são atribuídos em cada processo.
+"""
+import datetime
+import os
+import pickle
+import queue
+import threading
+import zlib
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico
+from utils.metricas import instrumentar
+from utils.persistencia import CABECALHO_LOG, ler_log
+
+ARQUIVO_AUDITORIA = "auditoria.log"
+# Vendas (grupos de eventos) que cabem na fila antes de quem reserva vaga passar a esperar.
+CAPACIDADE_FILA = 10_000
+# Máximo de eventos gravados por fsync.
+TAMANHO_LOTE = 1_000
+# Segundos entre as verificações da trilha (fechada ou com falha) enquanto a fila está cheia.
+ESPERA_FILA = 0.5
+
+
+class AuditoriaIndisponivel(RuntimeError):
+    """A trilha de auditoria não pode aceitar eventos (fechada ou com falha de gravação)."""
+
+
+class EventoControlado:
+    """
+    Um item controlado vendido.
+
+    Atributos:
+        data_hora (datetime.datetime): Data/hora da venda.
+        cpf (str): CPF do cliente.
+        medicamento (str): Nome do medicamento.
+        quantidade (int): Unidades vendidas.
+        receita (str): Referência da receita apresentada ("" se não informada).
+        loja (str): Loja (filial) da venda.
+    """
+    __slots__ = ("data_hora", "cpf", "medicamento", "quantidade", "receita", "loja")
+
+    def __init__(self, data_hora: datetime.datetime, cpf: str, medicamento: str, quantidade: int,
+                 receita: str = "", loja: str = ""):
+        self.data_hora = data_hora
+        self.cpf = cpf
+        self.medicamento = medicamento
+        self.quantidade = quantidade
+        self.receita = receita
+        self.loja = loja
+
+    def para_tupla(self) -> tuple:
+        return (self.data_hora.timestamp(), self.cpf, self.medicamento, self.quantidade, self.receita, self.loja)
+
+    @classmethod
+    def de_tupla(cls, t: tuple) -> "EventoControlado":
+        ts, cpf, medicamento, quantidade, receita, loja = t
+        return cls(datetime.datetime.fromtimestamp(ts), cpf, medicamento, quantidade, receita, loja)
+
+    def __str__(self) -> str:
+        return (f"{self.data_hora:%Y-%m-%d %H:%M:%S} | CPF {self.cpf} | {self.medicamento} | "
+                f"{self.quantidade} unidades | receita: {self.receita or '-'}")
+
+
+def eventos_controlados(data_hora: datetime.datetime, cpf: str, itens: Sequence[Tuple[Medicamento, int]],
+                        receita: str = "", loja: str = "") -> List[EventoControlado]:
+    """Eventos dos itens controlados de uma venda (lista vazia se não houver nenhum)."""
+    return [EventoControlado(data_hora, cpf, med.nome, qtde, receita, loja)
+            for med, qtde in itens
+            if isinstance(med, MedicamentoQuimioterapico) and med.necessita_receita]
+
+
+class VagaFila:
+    """
+    Espaço reservado na fila da trilha para os eventos de uma venda
+    (`TrilhaAuditoria.reservar_vaga`). É usado uma vez, por `registrar`, ou
+    devolvido por `devolver`; como gerenciador de contexto, devolve na saída
+    a vaga que não foi usada.
+
+    Atributos:
+        trilha (TrilhaAuditoria): Trilha em que a vaga foi reservada.
+        usada (bool): Se a vaga já foi usada ou devolvida.
+    """
+    __slots__ = ("trilha", "usada")
+
+    def __init__(self, trilha: "TrilhaAuditoria"):
+        self.trilha = trilha
+        self.usada = False
+
+    def __enter__(self) -> "VagaFila":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.devolver()
+
+    def registrar(self, eventos: Sequence[EventoControlado]) -> None:
+        """
+        Põe os eventos de uma venda na fila, como uma única entrada, sem
+        esperar. Levanta AuditoriaIndisponivel (e devolve a vaga) se a trilha
+        estiver fechada ou se a gravação tiver falhado.
+        """
+        if self.usada:
+            raise RuntimeError("Vaga da fila de auditoria já usada.")
+        self.usada = True
+        self.trilha._enfileirar(list(eventos))
+
+    def devolver(self) -> None:
+        """Devolve a vaga, se ainda não foi usada."""
+        if not self.usada:
+            self.usada = True
+            self.trilha._vagas.release()
+
+
+class TrilhaAuditoria:
+    """
+    Arquivo de auditoria com gravação assíncrona em lotes e índice por CPF e
+    por medicamento.
+
+    Atributos:
+        caminho (str): Arquivo da trilha.
+        seq (int): Número de sequência do último evento gravado.
+        lotes (int): Lotes gravados (fsyncs) desde a abertura.
+        por_cpf (Dict[str, array]): CPF -> posições dos registros no arquivo.
+        por_medicamento (Dict[str, array]): Nome do medicamento -> posições dos registros no arquivo.
+    """
+    def __init__(self, caminho: str, capacidade: int = CAPACIDADE_FILA, tamanho_lote: int = TAMANHO_LOTE):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.seq = 0
+        self.lotes = 0
+        self.por_cpf: Dict[str, array] = {}
+        self.por_medicamento: Dict[str, array] = {}
+        # A fila em si não tem limite: quem limita as entradas é o semáforo de vagas,
+        # reservadas antes (`reservar_vaga`) e liberadas pela thread gravadora.
+        self._fila: "queue.Queue[Optional[List[EventoControlado]]]" = queue.Queue()
+        self._vagas = threading.Semaphore(capacidade)
+        self._trava_indice = threading.Lock()
+        self._erro: Optional[BaseException] = None
+        self._fechada = False
+
+        offset_valido = 0
+        for seq, offset, tupla in ler_log(caminho):
+            evento = EventoControlado.de_tupla(tupla)
+            self._indexar(evento, offset_valido)
+            offset_valido = offset
+            self.seq = seq
+        self._arq = open(caminho, "ab")
+        # Descarta uma eventual cauda corrompida antes de voltar a anexar.
+        self._arq.truncate(offset_valido)
+        self._offset = offset_valido
+        self._gravadora = threading.Thread(target=self._gravar, name="auditoria", daemon=True)
+        self._gravadora.start()
+
+    def __len__(self) -> int:
+        return self.seq
+
+    @property
+    def pendentes(self) -> int:
+        """Vendas (grupos de eventos) na fila, ainda não gravadas."""
+        return self._fila.qsize()
+
+    def _indexar(self, evento: EventoControlado, offset: int) -> None:
+        for indice, chave in ((self.por_cpf, evento.cpf), (self.por_medicamento, evento.medicamento)):
+            posicoes = indice.get(chave)
+            if posicoes is None:
+                posicoes = indice[chave] = array("Q")
+            posicoes.append(offset)
+
+    def _verificar(self) -> None:
+        if self._fechada or self._erro is not None:
+            raise AuditoriaIndisponivel(f"Trilha de auditoria indisponível: {self._erro or 'fechada'}")
+
+    @instrumentar()
+    def reservar_vaga(self) -> VagaFila:
+        """
+        Reserva espaço na fila para os eventos de uma venda; com a fila cheia,
+        espera a thread gravadora abrir espaço. Deve ser chamado fora de
+        travas compartilhadas. Levanta AuditoriaIndisponivel se a trilha
+        estiver fechada ou se a gravação tiver falhado.
+        """
+        while True:
+            self._verificar()
+            if self._vagas.acquire(timeout=ESPERA_FILA):
+                return VagaFila(self)
+
+    def registrar(self, eventos: Sequence[EventoControlado]) -> None:
+        """
+        Põe os eventos de uma venda na fila de gravação, como uma única entrada:
+        entram todos ou nenhum. Com a fila cheia, espera a thread gravadora abrir
+        espaço. Levanta AuditoriaIndisponivel se a trilha estiver fechada ou se a
+        gravação tiver falhado.
+        """
+        with self.reservar_vaga() as vaga:
+            vaga.registrar(eventos)
+
+    def _enfileirar(self, grupo: List[EventoControlado]) -> None:
+        # Chamado com uma vaga reservada, que passa para o grupo ou volta ao semáforo.
+        if not grupo:
+            self._vagas.release()
+            return
+        try:
+            self._verificar()
+        except AuditoriaIndisponivel:
+            self._vagas.release()
+            raise
+        self._fila.put_nowait(grupo)
+
+    def _gravar(self) -> None:
+        fila = self._fila
+        while True:
+            grupos = [fila.get()]
+            eventos = list(grupos[0] or ())
+            while grupos[-1] is not None and len(eventos) < self.tamanho_lote:
+                try:
+                    grupos.append(fila.get_nowait())
+                except queue.Empty:
+                    break
+                eventos.extend(grupos[-1] or ())
+            try:
+                if eventos and self._erro is None:
+                    self._gravar_lote(eventos)
+            except BaseException as exc:
+                self._erro = exc
+            finally:
+                for grupo in grupos:
+                    if grupo is not None:
+                        self._vagas.release()
+                    fila.task_done()
+            if grupos[-1] is None:
+                return
+
+    def _gravar_lote(self, eventos: List[EventoControlado]) -> None:
+        registros = []
+        posicoes: List[Tuple[EventoControlado, int]] = []
+        offset = self._offset
+        for evento in eventos:
+            payload = pickle.dumps(evento.para_tupla(), protocol=pickle.HIGHEST_PROTOCOL)
+            self.seq += 1
+            registros.append(CABECALHO_LOG.pack(len(payload), zlib.crc32(payload), self.seq))
+            registros.append(payload)
+            posicoes.append((evento, offset))
+            offset += CABECALHO_LOG.size + len(payload)
+        self._arq.write(b"".join(registros))
+        self._arq.flush()
+        os.fsync(self._arq.fileno())
+        self._offset = offset
+        self.lotes += 1
+        # Só entram no índice os eventos já duráveis.
+        with self._trava_indice:
+            for evento, posicao in posicoes:
+                self._indexar(evento, posicao)
+
+    def descarregar(self) -> None:
+        """Espera até que todos os eventos já registrados estejam gravados em disco."""
+        self._fila.join()
+        if self._erro is not None:
+            raise AuditoriaIndisponivel(f"Falha ao gravar a trilha de auditoria: {self._erro}")
+
+    def _ler(self, posicoes: array) -> List[EventoControlado]:
+        eventos = []
+        with open(self.caminho, "rb") as arq:
+            for posicao in posicoes:
+                arq.seek(posicao)
+                tamanho, _, _ = CABECALHO_LOG.unpack(arq.read(CABECALHO_LOG.size))
+                eventos.append(EventoControlado.de_tupla(pickle.loads(arq.read(tamanho))))
+        return eventos
+
+    def _consultar(self, indice: Dict[str, array], chave: str) -> List[EventoControlado]:
+        self.descarregar()
+        with self._trava_indice:
+            posicoes = array("Q", indice.get(chave, ()))
+        return self._ler(posicoes)
+
+    def por_cliente(self, cpf: str) -> List[EventoControlado]:
+        """Eventos do cliente, em ordem de gravação (inclui os que ainda estavam na fila)."""
+        return self._consultar(self.por_cpf, cpf)
+
+    def do_medicamento(self, nome: str) -> List[EventoControlado]:
+        """Eventos do medicamento, em ordem de gravação (inclui os que ainda estavam na fila)."""
+        return self._consultar(self.por_medicamento, nome)
+
+    def fechar(self) -> None:
+        """Grava os eventos pendentes, encerra a thread gravadora e fecha o arquivo."""
+        if self._fechada:
+            return
+        self._fechada = True
+        self._fila.put(None)
+        self._gravadora.join()
+        self._arq.close()
+
+
+# Trilha ativa no processo (None enquanto a auditoria não for aberta).
+trilha: Optional[TrilhaAuditoria] = None
+
+
+def abrir(diretorio: str, capacidade: int = CAPACIDADE_FILA, tamanho_lote: int = TAMANHO_LOTE) -> TrilhaAuditoria:
+    """Abre (ou cria) a trilha de auditoria no diretório e a ativa no processo."""
+    global trilha
+    if trilha is not None:
+        raise RuntimeError("Auditoria já está aberta.")
+    os.makedirs(diretorio, exist_ok=True)
+    trilha = TrilhaAuditoria(os.path.join(diretorio, ARQUIVO_AUDITORIA), capacidade, tamanho_lote)
+    return trilha
+
+
+def reservar_vaga() -> Optional[VagaFila]:
+    """
+    Reserva, na trilha ativa, espaço na fila para os eventos de uma venda
+    (ver `TrilhaAuditoria.reservar_vaga`); None se a auditoria estiver desligada.
+    """
+    if trilha is None:
+        return None
+    return trilha.reservar_vaga()
+
+
+def registrar(eventos: Sequence[EventoControlado]) -> int:
+    """
+    Registra na trilha ativa, de uma vez, os eventos de uma venda e retorna
+    quantos foram; não faz nada se a auditoria estiver desligada.
+    """
+    if trilha is None:
+        return 0
+    trilha.registrar(eventos)
+    return len(eventos)
+
+
+def fechar() -> None:
+    """Grava os eventos pendentes e desativa a auditoria."""
+    global trilha
+    if trilha is None:
+        return
+    trilha.fechar()
+    trilha = None
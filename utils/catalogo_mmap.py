@@ -0,0 +1,290 @@
+"""
+Catálogo somente leitura (medicamentos e laboratórios) em um arquivo aberto
+com mmap, para terminais de consulta que não precisam do resto da base.
+
+Abrir o arquivo custa O(1) no tamanho do catálogo: só o cabeçalho é lido, e
+os objetos Medicamento/Laboratorio são montados sob demanda, no primeiro
+acesso a cada registro. Como o arquivo é mapeado somente para leitura, vários
+processos na mesma máquina compartilham uma única cópia no cache de páginas.
+
+Formato (inteiros little-endian):
+    cabeçalho     MAGIC, versão, nº de laboratórios, nº de medicamentos, o
+                  início de cada seção e o tamanho do arquivo (ver CABECALHO)
+    laboratórios  registros de largura fixa (REGISTRO_LABORATORIO)
+    medicamentos  registros de largura fixa (REGISTRO_MEDICAMENTO)
+    índice        nº do registro de cada medicamento, em ordem de nome (bytes UTF-8)
+    textos        heap de strings UTF-8; registros guardam (início, tamanho)
+
+Uso pela linha de comando:
+    python -m utils.catalogo_mmap --dados DIRETORIO --saida catalogo.cat
+    python -m utils.catalogo_mmap --catalogo catalogo.cat --buscar "Nome" [--prefixo]
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico, MedicamentoFitoterapico
+
+MAGIC_CATALOGO = b"FARMCAT1"
+VERSAO_CATALOGO = 2
+# magic, versão, laboratórios, medicamentos, início das seções (labs, meds, índice, textos), tamanho do arquivo.
+CABECALHO = struct.Struct("<8sIIIQQQQQ")
+# nome, endereço, telefone, cidade, estado: (início, tamanho) no heap de textos.
+REGISTRO_LABORATORIO = struct.Struct("<10I")
+# tipo ("Q"/"F"), necessita_receita, laboratório, preço, nome, composto, descrição (início, tamanho).
+REGISTRO_MEDICAMENTO = struct.Struct("<cBxxId6I")
+INDICE = struct.Struct("<I")
+
+
+class _HeapTextos:
+    """Acumula strings UTF-8 e devolve a posição (início, tamanho) de cada uma."""
+    def __init__(self):
+        self.partes: List[bytes] = []
+        self.tamanho = 0
+
+    def adicionar(self, texto: str) -> tuple:
+        dados = texto.encode("utf-8")
+        posicao = (self.tamanho, len(dados))
+        self.partes.append(dados)
+        self.tamanho += len(dados)
+        return posicao
+
+
+def gravar_catalogo(caminho: str, meds: Iterable[Medicamento], labs: Iterable[Laboratorio] = ()) -> int:
+    """
+    Grava o catálogo em `caminho` (em um temporário renomeado ao final, como o
+    snapshot) e retorna quantos medicamentos foram gravados. Laboratórios dos
+    medicamentos que não estejam em `labs` entram também.
+    """
+    textos = _HeapTextos()
+    labs_ids: Dict[int, int] = {}
+    registros_labs: List[bytes] = []
+
+    def id_laboratorio(lab: Laboratorio) -> int:
+        id_ = labs_ids.get(id(lab))
+        if id_ is None:
+            id_ = labs_ids[id(lab)] = len(registros_labs)
+            campos = (lab.nome, lab.endereco, lab.telefone, lab.cidade, lab.estado)
+            registros_labs.append(REGISTRO_LABORATORIO.pack(*(n for c in campos for n in textos.adicionar(c))))
+        return id_
+
+    for lab in labs:
+        id_laboratorio(lab)
+    registros_meds: List[bytes] = []
+    nomes: List[bytes] = []
+    for med in meds:
+        quimio = isinstance(med, MedicamentoQuimioterapico)
+        nome = textos.adicionar(med.nome)
+        registros_meds.append(REGISTRO_MEDICAMENTO.pack(
+            b"Q" if quimio else b"F", quimio and med.necessita_receita, id_laboratorio(med.laboratorio),
+            med.preco, *nome, *textos.adicionar(med.composto_principal), *textos.adicionar(med.descricao)))
+        nomes.append(med.nome.encode("utf-8"))
+    # A ordem dos bytes UTF-8 é a mesma dos code points, isto é, a de comparar str.
+    indice = sorted(range(len(nomes)), key=nomes.__getitem__)
+
+    inicio_labs = CABECALHO.size
+    inicio_meds = inicio_labs + len(registros_labs) * REGISTRO_LABORATORIO.size
+    inicio_indice = inicio_meds + len(registros_meds) * REGISTRO_MEDICAMENTO.size
+    inicio_textos = inicio_indice + len(indice) * INDICE.size
+    fim = inicio_textos + textos.tamanho
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arq:
+        arq.write(CABECALHO.pack(MAGIC_CATALOGO, VERSAO_CATALOGO, len(registros_labs), len(registros_meds),
+                                 inicio_labs, inicio_meds, inicio_indice, inicio_textos, fim))
+        arq.write(b"".join(registros_labs))
+        arq.write(b"".join(registros_meds))
+        arq.write(struct.pack(f"<{len(indice)}I", *indice))
+        arq.write(b"".join(textos.partes))
+        arq.flush()
+        os.fsync(arq.fileno())
+    os.replace(temporario, caminho)
+    return len(registros_meds)
+
+
+class CatalogoMapeado(Mapping):
+    """
+    Catálogo aberto com mmap, consultado como um dicionário somente leitura
+    nome -> Medicamento (a mesma interface de `data.medicamentos`).
+
+    Cada registro vira objeto só quando acessado, e o objeto é guardado: o
+    mesmo nome devolve sempre a mesma instância.
+
+    Atributos:
+        caminho (str): Arquivo do catálogo.
+        n_laboratorios (int): Laboratórios gravados.
+        n_medicamentos (int): Medicamentos gravados.
+    """
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        with open(caminho, "rb") as arq:
+            if os.fstat(arq.fileno()).st_size < CABECALHO.size:
+                raise ValueError(f"Catálogo inválido: {caminho}")
+            self._mapa = mmap.mmap(arq.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, versao, self.n_laboratorios, self.n_medicamentos, self._inicio_labs, self._inicio_meds,
+         self._inicio_indice, self._inicio_textos, fim) = CABECALHO.unpack_from(self._mapa, 0)
+        if magic != MAGIC_CATALOGO or versao != VERSAO_CATALOGO:
+            self._mapa.close()
+            raise ValueError(f"Catálogo inválido ou de outra versão: {caminho}")
+        # As seções têm de estar onde as contagens dizem e o arquivo, ter o tamanho gravado: um
+        # arquivo truncado ou com o cabeçalho corrompido é recusado aqui, e não no meio de uma consulta.
+        inicio_meds = self._inicio_labs + self.n_laboratorios * REGISTRO_LABORATORIO.size
+        inicio_indice = inicio_meds + self.n_medicamentos * REGISTRO_MEDICAMENTO.size
+        inicio_textos = inicio_indice + self.n_medicamentos * INDICE.size
+        if ((self._inicio_labs, self._inicio_meds, self._inicio_indice, self._inicio_textos) !=
+                (CABECALHO.size, inicio_meds, inicio_indice, inicio_textos)
+                or not inicio_textos <= fim == len(self._mapa)):
+            self._mapa.close()
+            raise ValueError(f"Catálogo truncado ou corrompido: {caminho}")
+        self._laboratorios: Dict[int, Laboratorio] = {}
+        self._medicamentos: Dict[int, Medicamento] = {}
+
+    def fechar(self) -> None:
+        self._mapa.close()
+
+    def __enter__(self) -> "CatalogoMapeado":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+    def _texto(self, inicio: int, tamanho: int) -> str:
+        inicio += self._inicio_textos
+        return self._mapa[inicio:inicio + tamanho].decode("utf-8")
+
+    def _nome_bytes(self, posicao: int) -> bytes:
+        """Nome (em UTF-8) do medicamento na posição `posicao` do índice por nome."""
+        registro = INDICE.unpack_from(self._mapa, self._inicio_indice + posicao * INDICE.size)[0]
+        # O nome é o primeiro texto do registro, logo após tipo, receita, laboratório e preço.
+        inicio, tamanho = struct.unpack_from("<2I", self._mapa,
+                                             self._inicio_meds + registro * REGISTRO_MEDICAMENTO.size + 16)
+        inicio += self._inicio_textos
+        return self._mapa[inicio:inicio + tamanho]
+
+    def _posicao(self, nome: bytes) -> int:
+        """Primeira posição do índice cujo nome é >= `nome` (busca binária no arquivo)."""
+        baixo, alto = 0, self.n_medicamentos
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._nome_bytes(meio) < nome:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return baixo
+
+    def laboratorio(self, registro: int) -> Laboratorio:
+        """Laboratório do registro `registro`, montado no primeiro acesso."""
+        lab = self._laboratorios.get(registro)
+        if lab is None:
+            campos = REGISTRO_LABORATORIO.unpack_from(self._mapa,
+                                                      self._inicio_labs + registro * REGISTRO_LABORATORIO.size)
+            lab = Laboratorio(*(self._texto(campos[i], campos[i + 1]) for i in range(0, 10, 2)))
+            self._laboratorios[registro] = lab
+        return lab
+
+    def medicamento(self, registro: int) -> Medicamento:
+        """Medicamento do registro `registro` (ordem de gravação), montado no primeiro acesso."""
+        med = self._medicamentos.get(registro)
+        if med is None:
+            (tipo, receita, lab, preco, nome_ini, nome_tam, comp_ini, comp_tam, desc_ini,
+             desc_tam) = REGISTRO_MEDICAMENTO.unpack_from(self._mapa,
+                                                          self._inicio_meds + registro * REGISTRO_MEDICAMENTO.size)
+            argumentos = (self._texto(nome_ini, nome_tam), self._texto(comp_ini, comp_tam), self.laboratorio(lab),
+                          self._texto(desc_ini, desc_tam), preco)
+            if tipo == b"Q":
+                med = MedicamentoQuimioterapico(*argumentos, bool(receita))
+            else:
+                med = MedicamentoFitoterapico(*argumentos)
+            self._medicamentos[registro] = med
+        return med
+
+    def _medicamento_na_posicao(self, posicao: int) -> Medicamento:
+        registro = INDICE.unpack_from(self._mapa, self._inicio_indice + posicao * INDICE.size)[0]
+        return self.medicamento(registro)
+
+    def __len__(self) -> int:
+        return self.n_medicamentos
+
+    def __getitem__(self, nome: str) -> Medicamento:
+        chave = nome.encode("utf-8")
+        posicao = self._posicao(chave)
+        if posicao < self.n_medicamentos and self._nome_bytes(posicao) == chave:
+            return self._medicamento_na_posicao(posicao)
+        raise KeyError(nome)
+
+    def __contains__(self, nome: object) -> bool:
+        if not isinstance(nome, str):
+            return False
+        chave = nome.encode("utf-8")
+        posicao = self._posicao(chave)
+        return posicao < self.n_medicamentos and self._nome_bytes(posicao) == chave
+
+    def __iter__(self) -> Iterator[str]:
+        """Nomes dos medicamentos, em ordem (sem montar os objetos)."""
+        for posicao in range(self.n_medicamentos):
+            yield self._nome_bytes(posicao).decode("utf-8")
+
+    def com_prefixo(self, prefixo: str, limite: int = 10) -> List[Medicamento]:
+        """Até `limite` medicamentos cujo nome começa com `prefixo` (diferencia maiúsculas), em ordem."""
+        chave = prefixo.encode("utf-8")
+        encontrados = []
+        posicao = self._posicao(chave)
+        while posicao < self.n_medicamentos and len(encontrados) < limite:
+            if not self._nome_bytes(posicao).startswith(chave):
+                break
+            encontrados.append(self._medicamento_na_posicao(posicao))
+            posicao += 1
+        return encontrados
+
+    def laboratorios(self) -> Iterator[Laboratorio]:
+        """Todos os laboratórios do catálogo."""
+        for registro in range(self.n_laboratorios):
+            yield self.laboratorio(registro)
+
+
+def abrir_catalogo(caminho: str) -> CatalogoMapeado:
+    """Abre um catálogo gravado por `gravar_catalogo`."""
+    return CatalogoMapeado(caminho)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Catálogo somente leitura (mmap) da Farmácia E-Commerce.")
+    parser.add_argument("--dados", help="diretório de persistência de onde gerar o catálogo")
+    parser.add_argument("--saida", help="arquivo do catálogo a gravar")
+    parser.add_argument("--catalogo", help="catálogo a consultar")
+    parser.add_argument("--buscar", help="nome do medicamento a consultar no catálogo")
+    parser.add_argument("--prefixo", action="store_true", help="trata --buscar como início do nome")
+    args = parser.parse_args(argv)
+
+    if args.dados and args.saida:
+        from data import laboratorios, medicamentos
+        from utils import persistencia
+        persistencia.abrir(args.dados)
+        try:
+            inicio = time.perf_counter()
+            n = gravar_catalogo(args.saida, medicamentos.values(), laboratorios.values())
+            print(f"{n} medicamentos gravados em {args.saida} em {time.perf_counter() - inicio:.2f}s",
+                  file=sys.stderr)
+        finally:
+            persistencia.fechar()
+    elif args.catalogo and args.buscar is not None:
+        with abrir_catalogo(args.catalogo) as catalogo:
+            if args.prefixo:
+                encontrados = catalogo.com_prefixo(args.buscar)
+            else:
+                encontrados = [catalogo[args.buscar]] if args.buscar in catalogo else []
+            for med in encontrados:
+                print(med)
+            if not encontrados:
+                print("Nenhum medicamento encontrado.")
+    else:
+        parser.error("use --dados e --saida para gerar, ou --catalogo e --buscar para consultar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator, List
+
+
+class TravaLeituraEscrita:
+    """
+    Trava de leitores/escritor: vários leitores simultâneos, um escritor por vez.
+
+    Escritores têm preferência: quando há um escritor esperando, novos leitores
+    aguardam, para que cadastros não fiquem famintos sob muitas consultas.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._leitores = 0
+        self._escrevendo = False
+        self._escritores_esperando = 0
+
+    @contextmanager
+    def leitura(self) -> Iterator[None]:
+        with self._cond:
+            while self._escrevendo or self._escritores_esperando:
+                self._cond.wait()
+            self._leitores += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._leitores -= 1
+                if not self._leitores:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def escrita(self) -> Iterator[None]:
+        with self._cond:
+            self._escritores_esperando += 1
+            while self._escrevendo or self._leitores:
+                self._cond.wait()
+            self._escritores_esperando -= 1
+            self._escrevendo = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._escrevendo = False
+                self._cond.notify_all()
+
+
+class TravasListradas:
+    """
+    Conjunto fixo de travas indexado pelo hash da chave: operações sobre chaves
+    diferentes raramente disputam a mesma trava, sem o custo de uma trava por chave.
+    """
+    def __init__(self, quantidade: int = 64):
+        self._travas: List[threading.Lock] = [threading.Lock() for _ in range(quantidade)]
+
+    def trava(self, chave: Hashable) -> threading.Lock:
+        return self._travas[hash(chave) % len(self._travas)]
@@ -0,0 +1,174 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico, MedicamentoFitoterapico
+from entidades.venda import Venda
+from utils.concorrencia import TravasListradas
+from utils.metricas import instrumentar
+
+CRITERIO_QUANTIDADE = "quantidade"
+CRITERIO_VALOR = "valor"
+
+# Chaves por bloco do ranking; um bloco com o dobro disto é dividido ao meio.
+TAMANHO_BLOCO_RANKING = 256
+
+
+class RankingBlocos:
+    """
+    Lista ordenada de chaves guardada em blocos ordenados de até
+    2 * TAMANHO_BLOCO_RANKING chaves, localizados por busca binária no maior
+    elemento de cada bloco. Inserir ou remover desloca só um bloco (e, ao
+    dividir ou esvaziar um bloco, a lista de blocos), em vez do ranking inteiro.
+
+    Atributos:
+        _blocos (List[list]): Blocos ordenados, em ordem.
+        _maximos (List[tuple]): Maior chave de cada bloco.
+    """
+    def __init__(self):
+        self._blocos: List[list] = []
+        self._maximos: List[tuple] = []
+
+    def __len__(self) -> int:
+        return sum(len(bloco) for bloco in self._blocos)
+
+    def inserir(self, chave: tuple) -> None:
+        if not self._blocos:
+            self._blocos.append([chave])
+            self._maximos.append(chave)
+            return
+        i = min(bisect_left(self._maximos, chave), len(self._blocos) - 1)
+        bloco = self._blocos[i]
+        insort(bloco, chave)
+        if len(bloco) > 2 * TAMANHO_BLOCO_RANKING:
+            metade = bloco[TAMANHO_BLOCO_RANKING:]
+            del bloco[TAMANHO_BLOCO_RANKING:]
+            self._blocos.insert(i + 1, metade)
+            self._maximos.insert(i + 1, metade[-1])
+        self._maximos[i] = bloco[-1]
+
+    def remover(self, chave: tuple) -> None:
+        i = bisect_left(self._maximos, chave)
+        bloco = self._blocos[i]
+        del bloco[bisect_left(bloco, chave)]
+        if bloco:
+            self._maximos[i] = bloco[-1]
+        else:
+            del self._blocos[i]
+            del self._maximos[i]
+
+    def primeiros(self, n: int) -> list:
+        """As `n` menores chaves, em ordem."""
+        topo: list = []
+        for bloco in self._blocos:
+            if len(topo) >= n:
+                break
+            topo.extend(bloco[:n - len(topo)])
+        return topo
+
+
+class EstatisticasVendas:
+    """
+    Agregador das estatísticas de vendas da sessão, atualizado a cada venda confirmada.
+
+    Além dos totais por tipo e por medicamento, mantém dois rankings ordenados
+    (por unidades e por faturamento) em blocos (`RankingBlocos`), atualizados
+    a cada item vendido, de modo que os N mais vendidos saem sem varrer os
+    itens. Empates na métrica saem em ordem alfabética de nome.
+
+    É seguro para vários caixas: cada medicamento é atualizado sob uma trava
+    listrada pelo nome, e só os rankings e os totais por tipo têm travas próprias.
+
+    Atributos:
+        itens (Dict[str, Tuple[int, float]]): Nome do medicamento -> (quantidade, valor total).
+        total_quimio_vendido_qtde (int): Unidades de quimioterápicos vendidas.
+        total_quimio_vendido_valor (float): Valor de quimioterápicos vendidos.
+        total_fito_vendido_qtde (int): Unidades de fitoterápicos vendidas.
+        total_fito_vendido_valor (float): Valor de fitoterápicos vendidos.
+        por_loja (Dict[str, list]): Loja da venda (`Venda.loja`) -> [vendas, unidades, valor pago].
+    """
+    def __init__(self):
+        self.itens: Dict[str, Tuple[int, float]] = {}
+        self.total_quimio_vendido_qtde = 0
+        self.total_quimio_vendido_valor = 0.0
+        self.total_fito_vendido_qtde = 0
+        self.total_fito_vendido_valor = 0.0
+        self.por_loja: Dict[str, list] = {}
+        # Chaves (-métrica, nome) em ordem: a primeira é sempre o líder.
+        self._ranking_qtde = RankingBlocos()
+        self._ranking_valor = RankingBlocos()
+        self._travas_itens = TravasListradas()
+        self._trava_ranking = threading.Lock()
+        self._trava_totais = threading.Lock()
+
+    @staticmethod
+    def _reposicionar(ranking: RankingBlocos, antigo: Optional[tuple], novo: tuple) -> None:
+        if antigo is not None:
+            ranking.remover(antigo)
+        ranking.inserir(novo)
+
+    def registrar_item(self, med: Medicamento, qtde: int, preco: Optional[float] = None) -> None:
+        """Contabiliza `qtde` unidades vendidas de `med` ao preço unitário cobrado (padrão: o de cadastro)."""
+        valor = (med.preco if preco is None else preco) * qtde
+        nome = med.nome
+        with self._travas_itens.trava(nome):
+            anterior = self.itens.get(nome)
+            if anterior is None:
+                qtd_nova, valor_novo = qtde, valor
+                antigo_qtde = antigo_valor = None
+            else:
+                qtd_antiga, valor_antigo = anterior
+                qtd_nova, valor_novo = qtd_antiga + qtde, valor_antigo + valor
+                antigo_qtde, antigo_valor = (-qtd_antiga, nome), (-valor_antigo, nome)
+            self.itens[nome] = (qtd_nova, valor_novo)
+            # Ainda sob a trava do item, para que as atualizações do mesmo nome entrem em ordem.
+            with self._trava_ranking:
+                self._reposicionar(self._ranking_qtde, antigo_qtde, (-qtd_nova, nome))
+                self._reposicionar(self._ranking_valor, antigo_valor, (-valor_novo, nome))
+
+        with self._trava_totais:
+            if isinstance(med, MedicamentoQuimioterapico):
+                self.total_quimio_vendido_qtde += qtde
+                self.total_quimio_vendido_valor += valor
+            elif isinstance(med, MedicamentoFitoterapico):
+                self.total_fito_vendido_qtde += qtde
+                self.total_fito_vendido_valor += valor
+
+    @instrumentar()
+    def registrar_venda(self, venda: Venda) -> None:
+        """Contabiliza todos os itens de uma venda confirmada e os totais da loja em que foi feita."""
+        unidades = 0
+        for med, qtde, preco in venda.itens_precificados():
+            self.registrar_item(med, qtde, preco)
+            unidades += qtde
+        with self._trava_totais:
+            totais = self.por_loja.get(venda.loja)
+            if totais is None:
+                self.por_loja[venda.loja] = [1, unidades, venda.valor_total]
+            else:
+                totais[0] += 1
+                totais[1] += unidades
+                totais[2] += venda.valor_total
+
+    def mais_vendidos(self, n: int = 1, criterio: str = CRITERIO_QUANTIDADE) -> List[Tuple[str, int, float]]:
+        """
+        Retorna até `n` tuplas (nome, quantidade, valor) ordenadas pelo critério,
+        do maior para o menor; empates saem em ordem alfabética de nome.
+        Levanta ValueError se `n` for menor que 1.
+        """
+        if n < 1:
+            raise ValueError(f"Tamanho de ranking inválido: {n}")
+        if criterio == CRITERIO_QUANTIDADE:
+            ranking = self._ranking_qtde
+        elif criterio == CRITERIO_VALOR:
+            ranking = self._ranking_valor
+        else:
+            raise ValueError(f"Critério de ranking desconhecido: {criterio}")
+        with self._trava_ranking:
+            topo = ranking.primeiros(n)
+        return [(nome,) + self.itens[nome] for _, nome in topo]
+
+    def mais_vendido(self) -> Optional[Tuple[str, int, float]]:
+        """Retorna (nome, quantidade, valor) do medicamento com mais unidades vendidas, ou None."""
+        topo = self.mais_vendidos(1)
+        return topo[0] if topo else None
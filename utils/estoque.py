@@ -0,0 +1,257 @@
+"""
+Estoque por SKU: quantidade em mãos, quantidade reservada por carrinhos ainda
+não confirmados e o ponto de reposição (estoque mínimo) de cada medicamento.
+
+Só os medicamentos com estoque definido são controlados; os demais continuam
+vendáveis sem limite, como antes do controle de estoque existir.
+
+Cada SKU é atualizado sob uma trava listrada pelo sku_id, de modo que caixas
+vendendo medicamentos diferentes não disputam a mesma trava. Reservas de
+vários itens tomam as travas envolvidas sempre em ordem crescente, o que evita
+impasses entre dois carrinhos que compartilham medicamentos.
+"""
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from entidades.itens_venda import catalogo_skus
+from entidades.medicamento import Medicamento
+from utils.concorrencia import TravasListradas
+from utils.metricas import instrumentar
+
+# Segundos que uma reserva não confirmada segura o estoque antes de poder ser expirada.
+PRAZO_RESERVA = 15 * 60
+
+
+class EstoqueInsuficiente(ValueError):
+    """
+    Reserva recusada por falta de estoque.
+
+    Atributos:
+        faltas (List[Tuple[Medicamento, int, int]]): (medicamento, pedido, disponível) de cada item em falta.
+    """
+    def __init__(self, faltas: List[Tuple[Medicamento, int, int]]):
+        self.faltas = faltas
+        super().__init__("Estoque insuficiente: " + "; ".join(
+            f"{med.nome} (pedido {pedido}, disponível {disponivel})" for med, pedido, disponivel in faltas))
+
+
+class ItemEstoque:
+    """
+    Posição de estoque de um SKU.
+
+    Atributos:
+        medicamento (Medicamento): Medicamento controlado.
+        em_maos (int): Unidades fisicamente na loja.
+        reservado (int): Unidades seguras por carrinhos ainda não confirmados.
+        minimo (int): Ponto de reposição: com `em_maos` <= `minimo` o item é de estoque baixo.
+    """
+    __slots__ = ("medicamento", "em_maos", "reservado", "minimo")
+
+    def __init__(self, medicamento: Medicamento, em_maos: int = 0, minimo: int = 0):
+        self.medicamento = medicamento
+        self.em_maos = em_maos
+        self.reservado = 0
+        self.minimo = minimo
+
+    @property
+    def disponivel(self) -> int:
+        """Unidades que ainda podem ser reservadas."""
+        return self.em_maos - self.reservado
+
+    def __str__(self) -> str:
+        return (f"{self.medicamento.nome} | em mãos: {self.em_maos} | reservado: {self.reservado} | "
+                f"disponível: {self.disponivel} | mínimo: {self.minimo}")
+
+
+class Reserva:
+    """
+    Unidades reservadas para um carrinho. Termina de uma de duas formas:
+    `efetivar` (venda confirmada: as unidades saem do estoque) ou `liberar`
+    (venda cancelada: as unidades voltam a ficar disponíveis). Ambas são
+    idempotentes, e a que vier primeiro encerra a reserva.
+
+    Atributos:
+        itens (Dict[int, int]): sku_id -> unidades reservadas (só SKUs controlados).
+        criada_em (float): time.monotonic() da criação.
+        ativa (bool): False depois de efetivada ou liberada.
+    """
+    def __init__(self, estoque: "Estoque"):
+        self.itens: Dict[int, int] = {}
+        self.criada_em = time.monotonic()
+        self.ativa = True
+        self._estoque = estoque
+
+    def efetivar(self) -> bool:
+        """Baixa as unidades do estoque; False se a reserva já tinha sido encerrada (ex.: expirada)."""
+        return self._estoque._encerrar(self, efetivar=True)
+
+    def liberar(self) -> bool:
+        """Devolve as unidades ao disponível; False se a reserva já tinha sido encerrada."""
+        return self._estoque._encerrar(self, efetivar=False)
+
+
+class Estoque:
+    """
+    Posições de estoque por sku_id, reservas de carrinhos e índice de itens
+    com estoque baixo.
+
+    Atributos:
+        _itens (Dict[int, ItemEstoque]): sku_id -> posição, só para SKUs controlados.
+        _baixo (Dict[int, None]): sku_ids com `em_maos` <= `minimo`, atualizado a cada mudança.
+        _reservas (Dict[int, Reserva]): Reservas ativas, por id, para expirar as abandonadas.
+    """
+    def __init__(self, listras: int = 64):
+        self._itens: Dict[int, ItemEstoque] = {}
+        self._baixo: Dict[int, None] = {}
+        self._reservas: Dict[int, Reserva] = {}
+        self._travas = TravasListradas(listras)
+        self._listras = listras
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def _listra(self, sku: int) -> int:
+        # Mesmo cálculo de TravasListradas.trava: hash(int) é o próprio inteiro.
+        return hash(sku) % self._listras
+
+    def _atualizar_baixo(self, sku: int, item: ItemEstoque) -> None:
+        if item.em_maos <= item.minimo:
+            self._baixo[sku] = None
+        else:
+            self._baixo.pop(sku, None)
+
+    def controla(self, med: Medicamento) -> bool:
+        """True se o medicamento tem estoque definido (e, portanto, limitado)."""
+        return med.sku_id is not None and med.sku_id in self._itens
+
+    def item(self, med: Medicamento) -> Optional[ItemEstoque]:
+        """Posição de estoque do medicamento, ou None se ele não é controlado."""
+        return self._itens.get(med.sku_id) if med.sku_id is not None else None
+
+    def disponivel(self, med: Medicamento) -> Optional[int]:
+        """Unidades disponíveis para venda, ou None se o medicamento não é controlado."""
+        item = self.item(med)
+        return None if item is None else item.disponivel
+
+    @instrumentar()
+    def definir(self, med: Medicamento, em_maos: int, minimo: Optional[int] = None) -> ItemEstoque:
+        """Passa a controlar o medicamento (ou corrige a contagem), com `em_maos` unidades."""
+        if em_maos < 0 or (minimo is not None and minimo < 0):
+            raise ValueError("Quantidades de estoque não podem ser negativas.")
+        sku = catalogo_skus.id_de(med)
+        with self._travas.trava(sku):
+            item = self._itens.get(sku)
+            if item is None:
+                item = self._itens[sku] = ItemEstoque(med, em_maos, minimo or 0)
+            else:
+                item.em_maos = em_maos
+                if minimo is not None:
+                    item.minimo = minimo
+            self._atualizar_baixo(sku, item)
+        return item
+
+    @instrumentar()
+    def repor(self, reposicoes: Iterable[Tuple[Medicamento, int]]) -> int:
+        """
+        Soma as quantidades recebidas ao estoque em mãos, passando a controlar
+        os medicamentos que ainda não eram. Cada trava é tomada uma só vez para
+        todos os SKUs da sua listra. Retorna quantos SKUs foram atualizados.
+        """
+        por_listra: Dict[int, Dict[int, Tuple[Medicamento, int]]] = {}
+        for med, qtde in reposicoes:
+            if qtde <= 0:
+                raise ValueError(f"Quantidade de reposição inválida para {med.nome}: {qtde}")
+            sku = catalogo_skus.id_de(med)
+            listra = por_listra.setdefault(self._listra(sku), {})
+            anterior = listra.get(sku)
+            listra[sku] = (med, qtde + (anterior[1] if anterior else 0))
+        for skus in por_listra.values():
+            with self._travas.trava(next(iter(skus))):
+                for sku, (med, qtde) in skus.items():
+                    item = self._itens.get(sku)
+                    if item is None:
+                        item = self._itens[sku] = ItemEstoque(med, 0)
+                    item.em_maos += qtde
+                    self._atualizar_baixo(sku, item)
+        return sum(len(skus) for skus in por_listra.values())
+
+    @instrumentar()
+    def reservar(self, itens: Iterable[Tuple[Medicamento, int]], reserva: Optional[Reserva] = None) -> Reserva:
+        """
+        Reserva os itens (tudo ou nada) e retorna a reserva, ou acrescenta-os a
+        `reserva`. Itens de medicamentos não controlados passam sem reserva.
+        Levanta EstoqueInsuficiente, sem reservar nada, se faltar algum item.
+        """
+        if reserva is None:
+            reserva = Reserva(self)
+        elif not reserva.ativa:
+            raise ValueError("Reserva já encerrada.")
+        pedidos: Dict[int, int] = {}
+        for med, qtde in itens:
+            if med.sku_id is not None and med.sku_id in self._itens:
+                pedidos[med.sku_id] = pedidos.get(med.sku_id, 0) + qtde
+        if pedidos:
+            travas = [self._travas.trava(listra) for listra in sorted({self._listra(sku) for sku in pedidos})]
+            for trava in travas:
+                trava.acquire()
+            try:
+                faltas = [(self._itens[sku].medicamento, qtde, self._itens[sku].disponivel)
+                          for sku, qtde in pedidos.items() if self._itens[sku].disponivel < qtde]
+                if faltas:
+                    raise EstoqueInsuficiente(faltas)
+                for sku, qtde in pedidos.items():
+                    self._itens[sku].reservado += qtde
+                    reserva.itens[sku] = reserva.itens.get(sku, 0) + qtde
+            finally:
+                for trava in reversed(travas):
+                    trava.release()
+        if reserva.itens:
+            self._reservas[id(reserva)] = reserva
+        return reserva
+
+    def _encerrar(self, reserva: Reserva, efetivar: bool) -> bool:
+        if not reserva.ativa:
+            return False
+        reserva.ativa = False
+        # Retirar a reserva do registro é atômico: se dois encerramentos correrem
+        # juntos (confirmação e expiração), só um deles devolve ou baixa as unidades.
+        if reserva.itens and self._reservas.pop(id(reserva), None) is None:
+            return False
+        por_listra: Dict[int, List[Tuple[int, int]]] = {}
+        for sku, qtde in reserva.itens.items():
+            por_listra.setdefault(self._listra(sku), []).append((sku, qtde))
+        for listra, skus in por_listra.items():
+            with self._travas.trava(listra):
+                for sku, qtde in skus:
+                    item = self._itens[sku]
+                    item.reservado -= qtde
+                    if efetivar:
+                        item.em_maos -= qtde
+                        self._atualizar_baixo(sku, item)
+        return True
+
+    def baixar(self, itens: Iterable[Tuple[Medicamento, int]]) -> None:
+        """Desconta do estoque em mãos, sem reserva, itens já vendidos (reprodução do log)."""
+        for med, qtde in itens:
+            item = self.item(med)
+            if item is not None:
+                with self._travas.trava(med.sku_id):
+                    item.em_maos -= qtde
+                    self._atualizar_baixo(med.sku_id, item)
+
+    def expirar_reservas(self, prazo: float = PRAZO_RESERVA) -> int:
+        """Libera as reservas ativas há mais de `prazo` segundos (carrinhos abandonados). Retorna quantas."""
+        limite = time.monotonic() - prazo
+        expiradas = [reserva for reserva in list(self._reservas.values()) if reserva.criada_em < limite]
+        for reserva in expiradas:
+            reserva.liberar()
+        return len(expiradas)
+
+    def estoque_baixo(self) -> List[ItemEstoque]:
+        """Itens com estoque em mãos no mínimo ou abaixo dele, do mais crítico ao menos crítico."""
+        itens = [self._itens[sku] for sku in list(self._baixo)]
+        return sorted(itens, key=lambda item: (item.em_maos - item.minimo, item.medicamento.nome))
+
+    def itens(self) -> Iterator[ItemEstoque]:
+        """Posições de todos os SKUs controlados."""
+        return iter(list(self._itens.values()))
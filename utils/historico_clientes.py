@@ -0,0 +1,161 @@
+import datetime
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico
+from entidades.venda import Venda
+from utils.concorrencia import TravasListradas
+from utils.metricas import instrumentar
+
+# Vendas mais recentes guardadas por cliente.
+VENDAS_RECENTES = 20
+# Itens (medicamento, quantidade) mais recentes guardados por cliente.
+ITENS_RECENTES = 50
+# Datas das últimas compras guardadas por medicamento controlado, por cliente.
+DATAS_CONTROLADOS = 10
+
+
+class CompraControlada:
+    """
+    Compras repetidas de um quimioterápico com receita por um mesmo cliente.
+
+    Atributos:
+        medicamento (Medicamento): Medicamento controlado.
+        compras (int): Vendas em que apareceu.
+        unidades (int): Unidades compradas no total.
+        datas (Deque[datetime.datetime]): Até DATAS_CONTROLADOS datas das compras mais recentes.
+    """
+    __slots__ = ("medicamento", "compras", "unidades", "datas")
+
+    def __init__(self, medicamento: Medicamento):
+        self.medicamento = medicamento
+        self.compras = 0
+        self.unidades = 0
+        self.datas: Deque[datetime.datetime] = deque(maxlen=DATAS_CONTROLADOS)
+
+    def __str__(self) -> str:
+        datas = ", ".join(f"{data:%Y-%m-%d}" for data in self.datas)
+        return f"{self.medicamento.nome} | {self.compras} compras | {self.unidades} unidades | últimas: {datas}"
+
+
+class HistoricoCliente:
+    """
+    Agregados das compras de um cliente, atualizados a cada venda confirmada.
+
+    Atributos:
+        visitas (int): Vendas feitas ao cliente.
+        valor_total (float): Valor pago em todas as vendas (lifetime value).
+        primeira_visita (Optional[datetime.datetime]): Data/hora da primeira venda.
+        ultima_visita (Optional[datetime.datetime]): Data/hora da venda mais recente.
+        vendas_recentes (Deque[Venda]): Até VENDAS_RECENTES vendas, da mais antiga à mais recente.
+        itens_recentes (Deque[Tuple[datetime.datetime, Medicamento, int]]): Até ITENS_RECENTES itens comprados.
+        controlados (Dict[str, CompraControlada]): Nome do quimioterápico com receita -> compras dele.
+    """
+    __slots__ = ("visitas", "valor_total", "primeira_visita", "ultima_visita", "vendas_recentes",
+                 "itens_recentes", "controlados")
+
+    def __init__(self):
+        self.visitas = 0
+        self.valor_total = 0.0
+        self.primeira_visita: Optional[datetime.datetime] = None
+        self.ultima_visita: Optional[datetime.datetime] = None
+        self.vendas_recentes: Deque[Venda] = deque(maxlen=VENDAS_RECENTES)
+        self.itens_recentes: Deque[Tuple[datetime.datetime, Medicamento, int]] = deque(maxlen=ITENS_RECENTES)
+        self.controlados: Dict[str, CompraControlada] = {}
+
+    @property
+    def ticket_medio(self) -> float:
+        return self.valor_total / self.visitas if self.visitas else 0.0
+
+    def controlados_repetidos(self, minimo: int = 2) -> List[CompraControlada]:
+        """Controlados comprados em pelo menos `minimo` vendas, do mais ao menos comprado."""
+        repetidos = [compra for compra in self.controlados.values() if compra.compras >= minimo]
+        return sorted(repetidos, key=lambda compra: (-compra.compras, compra.medicamento.nome))
+
+
+class HistoricoClientes:
+    """
+    Índice de vendas por CPF: agregados e compras recentes de cada cliente,
+    atualizados na confirmação de cada venda, para que as consultas por cliente
+    custem O(1) ou O(k) em vez de varrer todas as vendas.
+
+    Cada cliente é atualizado sob uma trava listrada pelo CPF (como em
+    `EstatisticasVendas`), então caixas atendendo clientes diferentes não se bloqueiam.
+
+    Atributos:
+        por_cpf (Dict[str, HistoricoCliente]): CPF -> histórico do cliente.
+        com_controlados_repetidos (Dict[str, None]): CPFs com algum controlado comprado mais de uma vez.
+    """
+    def __init__(self):
+        self.por_cpf: Dict[str, HistoricoCliente] = {}
+        self.com_controlados_repetidos: Dict[str, None] = {}
+        self._travas = TravasListradas()
+
+    def __len__(self) -> int:
+        return len(self.por_cpf)
+
+    @instrumentar()
+    def registrar_venda(self, venda: Venda) -> None:
+        """Contabiliza uma venda confirmada no histórico do cliente."""
+        cpf = venda.cliente.cpf
+        itens = venda.itens
+        # Um controlado repetido em várias linhas do carrinho conta como uma compra só.
+        controlados: Dict[str, Tuple[Medicamento, int]] = {}
+        for med, qtde in itens:
+            if isinstance(med, MedicamentoQuimioterapico) and med.necessita_receita:
+                unidades = controlados[med.nome][1] if med.nome in controlados else 0
+                controlados[med.nome] = (med, unidades + qtde)
+        with self._travas.trava(cpf):
+            historico = self.por_cpf.get(cpf)
+            if historico is None:
+                historico = self.por_cpf[cpf] = HistoricoCliente()
+            historico.visitas += 1
+            historico.valor_total += venda.valor_total
+            if historico.primeira_visita is None or venda.data_hora < historico.primeira_visita:
+                historico.primeira_visita = venda.data_hora
+            if historico.ultima_visita is None or venda.data_hora >= historico.ultima_visita:
+                historico.ultima_visita = venda.data_hora
+            historico.vendas_recentes.append(venda)
+            for med, qtde in itens:
+                historico.itens_recentes.append((venda.data_hora, med, qtde))
+            for nome, (med, unidades) in controlados.items():
+                compra = historico.controlados.get(nome)
+                if compra is None:
+                    compra = historico.controlados[nome] = CompraControlada(med)
+                compra.compras += 1
+                compra.unidades += unidades
+                compra.datas.append(venda.data_hora)
+                if compra.compras == 2:
+                    self.com_controlados_repetidos[cpf] = None
+
+    def historico(self, cpf: str) -> Optional[HistoricoCliente]:
+        """Histórico do cliente, ou None se ele ainda não comprou."""
+        return self.por_cpf.get(cpf)
+
+    def ultimas_vendas(self, cpf: str, n: int = 10) -> List[Venda]:
+        """
+        Até `n` (no máximo VENDAS_RECENTES) vendas mais recentes do cliente, da
+        mais recente à mais antiga. Levanta ValueError se `n` for menor que 1.
+        """
+        if n < 1:
+            raise ValueError(f"Número de vendas inválido: {n}")
+        historico = self.por_cpf.get(cpf)
+        if historico is None:
+            return []
+        with self._travas.trava(cpf):
+            recentes = list(historico.vendas_recentes)
+        return recentes[::-1][:n]
+
+    def auditoria_controlados(self, minimo: int = 2) -> List[Tuple[str, List[CompraControlada]]]:
+        """
+        Pares (cpf, compras repetidas) dos clientes que compraram algum
+        quimioterápico com receita em pelo menos `minimo` vendas (minimo >= 2).
+        Só percorre os clientes que já repetiram algum controlado.
+        """
+        auditoria = []
+        for cpf in list(self.com_controlados_repetidos):
+            repetidos = self.por_cpf[cpf].controlados_repetidos(minimo)
+            if repetidos:
+                auditoria.append((cpf, repetidos))
+        auditoria.sort(key=lambda par: (-max(compra.compras for compra in par[1]), par[0]))
+        return auditoria
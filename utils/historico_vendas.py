@@ -0,0 +1,72 @@
+import datetime
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
+
+from entidades.venda import Venda
+
+
+class HistoricoVendas:
+    """
+    Livro-razão das vendas ordenado por `data_hora`.
+
+    Os instantes ficam em um array de floats ordenado, paralelo à lista de
+    vendas, então consultas por intervalo custam O(log n + k). Agregados por
+    hora e por dia são atualizados a cada venda registrada.
+
+    Atributos:
+        _instantes (array): Timestamps (segundos) das vendas, em ordem crescente.
+        _vendas (List[Venda]): Vendas na mesma ordem de `_instantes`.
+        por_hora (Dict[datetime.datetime, list]): Início da hora -> [vendas, unidades, valor total].
+        por_dia (Dict[datetime.date, list]): Dia -> [vendas, unidades, valor total].
+    """
+    def __init__(self):
+        self._instantes = array("d")
+        self._vendas: List[Venda] = []
+        self.por_hora: Dict[datetime.datetime, list] = {}
+        self.por_dia: Dict[datetime.date, list] = {}
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._vendas)
+
+    def registrar(self, venda: Venda) -> None:
+        instante = venda.data_hora.timestamp()
+        unidades = sum(qtde for _, qtde in venda.itens_ids())
+        hora = venda.data_hora.replace(minute=0, second=0, microsecond=0)
+        with self._trava:
+            if not self._instantes or instante >= self._instantes[-1]:
+                self._instantes.append(instante)
+                self._vendas.append(venda)
+            else:
+                # Venda fora de ordem (ex.: reprodução de lote antigo): insere na posição certa.
+                pos = bisect_right(self._instantes, instante)
+                self._instantes.insert(pos, instante)
+                self._vendas.insert(pos, venda)
+
+            for chave, agregados in ((hora, self.por_hora), (hora.date(), self.por_dia)):
+                agregado = agregados.get(chave)
+                if agregado is None:
+                    agregados[chave] = [1, unidades, venda.valor_total]
+                else:
+                    agregado[0] += 1
+                    agregado[1] += unidades
+                    agregado[2] += venda.valor_total
+
+    def entre(self, inicio: datetime.datetime, fim: datetime.datetime) -> List[Venda]:
+        """Vendas com inicio <= data_hora < fim, em ordem cronológica."""
+        with self._trava:
+            i = bisect_left(self._instantes, inicio.timestamp())
+            j = bisect_left(self._instantes, fim.timestamp())
+            return self._vendas[i:j]
+
+    def resumo_por_hora(self, inicio: datetime.datetime,
+                        fim: datetime.datetime) -> List[Tuple[datetime.datetime, int, int, float]]:
+        """(hora, vendas, unidades, valor) das horas com venda em [inicio, fim), em ordem."""
+        return [(hora, *self.por_hora[hora]) for hora in sorted(self.por_hora) if inicio <= hora < fim]
+
+    def resumo_por_dia(self, inicio: datetime.date,
+                       fim: datetime.date) -> List[Tuple[datetime.date, int, int, float]]:
+        """(dia, vendas, unidades, valor) dos dias com venda entre inicio e fim (inclusive), em ordem."""
+        return [(dia, *self.por_dia[dia]) for dia in sorted(self.por_dia) if inicio <= dia <= fim]
@@ -0,0 +1,240 @@
+"""
+Importação em lote de laboratórios, medicamentos e clientes a partir de
+arquivos CSV ou JSONL.
+
+Os arquivos são lidos linha a linha por geradores, sem carregar o conteúdo
+inteiro em memória, e cada linha passa pelas mesmas regras de validação dos
+cadastros interativos de `services`.
+
+Colunas (CSV com cabeçalho) / chaves (JSONL) esperadas:
+    laboratorios: nome, endereco, telefone, cidade, estado
+    medicamentos: tipo (Q/F), nome, composto_principal, laboratorio, descricao,
+                  preco, necessita_receita (S/N, apenas para Q)
+    clientes:     cpf, nome, data_nascimento (YYYY-MM-DD)
+    reposição:    nome (do medicamento), quantidade
+
+Uso pela linha de comando (importa na ordem laboratórios -> medicamentos -> clientes):
+    python -m utils.importacao --laboratorios labs.csv --medicamentos meds.jsonl --clientes clientes.csv \
+        [--dados DIRETORIO]
+"""
+import argparse
+import csv
+import json
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from entidades.cliente import Cliente
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico, MedicamentoFitoterapico
+from data import laboratorios, medicamentos
+from utils import persistencia
+from services import (converter_data_nascimento, converter_preco, converter_tipo_medicamento,
+                      registrar_cliente, registrar_laboratorio, registrar_medicamento, repor_estoque)
+
+# Quantidade máxima de rejeições guardadas com detalhes (as demais são apenas contadas).
+MAX_REJEICOES_DETALHADAS = 100
+
+Registro = Dict[str, str]
+
+
+def ler_registros(caminho: str) -> Iterator[Tuple[int, Optional[Registro]]]:
+    """
+    Gera (número_da_linha, registro) de um arquivo CSV ou JSONL, conforme a extensão.
+    Linhas JSONL vazias são ignoradas; linhas JSONL malformadas geram registro None.
+    Um registro CSV com quebras de linha dentro de aspas é numerado pela linha em que termina.
+    """
+    with open(caminho, newline="", encoding="utf-8") as arq:
+        if caminho.lower().endswith((".jsonl", ".ndjson")):
+            for num, linha in enumerate(arq, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    registro = None
+                yield num, registro if isinstance(registro, dict) else None
+        else:
+            # A linha 1 é o cabeçalho; line_num conta as linhas físicas lidas até o fim do registro.
+            leitor = csv.DictReader(arq)
+            for registro in leitor:
+                yield leitor.line_num, registro
+
+
+def _campo(registro: Registro, chave: str) -> str:
+    """Retorna o campo como texto sem espaços nas pontas; levanta ValueError se ausente ou vazio."""
+    valor = registro.get(chave)
+    if valor is None or str(valor).strip() == "":
+        raise ValueError(f"campo obrigatório ausente: {chave}")
+    return str(valor).strip()
+
+
+def laboratorio_de_registro(registro: Registro) -> Laboratorio:
+    """Constrói um Laboratorio a partir de um registro importado."""
+    return Laboratorio(_campo(registro, "nome"), _campo(registro, "endereco"),
+                       _campo(registro, "telefone"), _campo(registro, "cidade"),
+                       _campo(registro, "estado").upper())
+
+
+def medicamento_de_registro(registro: Registro) -> Medicamento:
+    """Constrói um Medicamento, resolvendo o laboratório pelo nome já cadastrado."""
+    tipo = converter_tipo_medicamento(_campo(registro, "tipo"))
+    nome = _campo(registro, "nome")
+    lab_nome = _campo(registro, "laboratorio")
+    lab = laboratorios.get(lab_nome)
+    if lab is None:
+        raise ValueError(f"laboratório não cadastrado: {lab_nome}")
+    composto = _campo(registro, "composto_principal")
+    descricao = str(registro.get("descricao") or "").strip()
+    preco = converter_preco(str(_campo(registro, "preco")))
+    if tipo == "Q":
+        receita = str(registro.get("necessita_receita") or "N").strip().upper()
+        necessita_receita = receita in ("S", "SIM", "TRUE", "1")
+        return MedicamentoQuimioterapico(nome, composto, lab, descricao, preco, necessita_receita)
+    return MedicamentoFitoterapico(nome, composto, lab, descricao, preco)
+
+
+def cliente_de_registro(registro: Registro) -> Cliente:
+    """Constrói um Cliente a partir de um registro importado."""
+    return Cliente(_campo(registro, "cpf"), _campo(registro, "nome"),
+                   converter_data_nascimento(_campo(registro, "data_nascimento")))
+
+
+class RelatorioImportacao:
+    """
+    Resumo de uma importação em lote.
+
+    Atributos:
+        entidade (str): Tipo de registro importado.
+        aceitos (int): Linhas cadastradas com sucesso.
+        rejeitados (int): Linhas rejeitadas.
+        rejeicoes (List[Tuple[int, str]]): Até MAX_REJEICOES_DETALHADAS pares (linha, motivo).
+        duracao (float): Tempo total da importação, em segundos.
+    """
+    def __init__(self, entidade: str):
+        self.entidade = entidade
+        self.aceitos = 0
+        self.rejeitados = 0
+        self.rejeicoes: List[Tuple[int, str]] = []
+        self.duracao = 0.0
+
+    def rejeitar(self, linha: int, motivo: str) -> None:
+        self.rejeitados += 1
+        if len(self.rejeicoes) < MAX_REJEICOES_DETALHADAS:
+            self.rejeicoes.append((linha, motivo))
+
+    def linhas_por_segundo(self) -> float:
+        total = self.aceitos + self.rejeitados
+        return total / self.duracao if self.duracao > 0 else 0.0
+
+    def __str__(self) -> str:
+        linhas = [f"Importação de {self.entidade}: {self.aceitos} aceitos | {self.rejeitados} rejeitados | "
+                  f"{self.duracao:.2f}s ({self.linhas_por_segundo():.0f} linhas/s)"]
+        for num, motivo in self.rejeicoes:
+            linhas.append(f"  linha {num}: {motivo}")
+        if self.rejeitados > len(self.rejeicoes):
+            linhas.append(f"  ... e mais {self.rejeitados - len(self.rejeicoes)} rejeições")
+        return "\n".join(linhas)
+
+
+def _importar(caminho: str, entidade: str, construir: Callable[[Registro], object],
+              registrar: Callable[[object], bool]) -> RelatorioImportacao:
+    relatorio = RelatorioImportacao(entidade)
+    inicio = time.perf_counter()
+    for num, registro in ler_registros(caminho):
+        if registro is None:
+            relatorio.rejeitar(num, "linha malformada")
+            continue
+        try:
+            obj = construir(registro)
+        except ValueError as exc:
+            relatorio.rejeitar(num, str(exc) or "valor inválido")
+            continue
+        if registrar(obj):
+            relatorio.aceitos += 1
+        else:
+            relatorio.rejeitar(num, "registro duplicado")
+    relatorio.duracao = time.perf_counter() - inicio
+    return relatorio
+
+
+def importar_laboratorios(caminho: str) -> RelatorioImportacao:
+    """Importa laboratórios; nomes já cadastrados são rejeitados."""
+    return _importar(caminho, "laboratórios", laboratorio_de_registro, registrar_laboratorio)
+
+
+def importar_medicamentos(caminho: str) -> RelatorioImportacao:
+    """Importa medicamentos; o laboratório referenciado precisa já estar cadastrado."""
+    return _importar(caminho, "medicamentos", medicamento_de_registro, registrar_medicamento)
+
+
+def importar_clientes(caminho: str) -> RelatorioImportacao:
+    """Importa clientes; CPFs já cadastrados são rejeitados."""
+    return _importar(caminho, "clientes", cliente_de_registro, registrar_cliente)
+
+
+def reposicao_de_registro(registro: Registro) -> Tuple[Medicamento, int]:
+    """Constrói o par (medicamento, quantidade recebida) de uma linha de reposição."""
+    nome = _campo(registro, "nome")
+    med = medicamentos.get(nome)
+    if med is None:
+        raise ValueError(f"medicamento não cadastrado: {nome}")
+    qtde = int(_campo(registro, "quantidade"))
+    if qtde <= 0:
+        raise ValueError(f"quantidade inválida: {qtde}")
+    return med, qtde
+
+
+def importar_reposicao(caminho: str) -> RelatorioImportacao:
+    """
+    Soma ao estoque as quantidades recebidas de cada medicamento. As linhas
+    válidas são aplicadas de uma vez, numa única reposição em lote.
+    """
+    relatorio = RelatorioImportacao("reposições de estoque")
+    inicio = time.perf_counter()
+    reposicoes = []
+    for num, registro in ler_registros(caminho):
+        if registro is None:
+            relatorio.rejeitar(num, "linha malformada")
+            continue
+        try:
+            reposicoes.append(reposicao_de_registro(registro))
+        except ValueError as exc:
+            relatorio.rejeitar(num, str(exc) or "valor inválido")
+    if reposicoes:
+        repor_estoque(reposicoes)
+    relatorio.aceitos = len(reposicoes)
+    relatorio.duracao = time.perf_counter() - inicio
+    return relatorio
+
+
+def importar_arquivos(laboratorios_path: Optional[str] = None, medicamentos_path: Optional[str] = None,
+                      clientes_path: Optional[str] = None) -> List[RelatorioImportacao]:
+    """Importa os arquivos informados na ordem que respeita as referências entre entidades."""
+    relatorios = []
+    if laboratorios_path:
+        relatorios.append(importar_laboratorios(laboratorios_path))
+    if medicamentos_path:
+        relatorios.append(importar_medicamentos(medicamentos_path))
+    if clientes_path:
+        relatorios.append(importar_clientes(clientes_path))
+    return relatorios
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Importação em lote (CSV/JSONL) da Farmácia E-Commerce.")
+    parser.add_argument("--laboratorios", help="arquivo de laboratórios")
+    parser.add_argument("--medicamentos", help="arquivo de medicamentos")
+    parser.add_argument("--clientes", help="arquivo de clientes")
+    parser.add_argument("--dados", help="diretório de persistência onde gravar os registros importados")
+    args = parser.parse_args(argv)
+    if args.dados:
+        persistencia.abrir(args.dados)
+    try:
+        for relatorio in importar_arquivos(args.laboratorios, args.medicamentos, args.clientes):
+            print(relatorio)
+    finally:
+        persistencia.fechar(compactar=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from entidades.medicamento import Medicamento
+
+# Tamanho dos n-gramas usados no índice invertido de texto. Também são indexados os
+# n-gramas menores (de 1 até TAMANHO_NGRAMA - 1 caracteres), para os termos curtos.
+TAMANHO_NGRAMA = 3
+# Campos de texto livre indexados, em ordem de prioridade no ranking.
+CAMPOS_TEXTO = ("descricao", "composto_principal")
+
+
+def _ngramas(texto: str, n: int = TAMANHO_NGRAMA) -> Set[str]:
+    """Retorna o conjunto de n-gramas (sem repetição) de um texto já normalizado."""
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceBusca:
+    """
+    Índices secundários sobre o catálogo de medicamentos.
+
+    Mantém um índice laboratório -> medicamentos e um índice invertido de
+    n-gramas para cada campo de texto livre, de modo que as buscas do balcão
+    não precisem percorrer (nem normalizar) o catálogo inteiro a cada consulta.
+
+    Atributos:
+        _medicamentos (List[Medicamento]): Documentos indexados; a posição é o id interno.
+        _por_laboratorio (Dict[str, List[int]]): Nome do laboratório (minúsculo) -> ids.
+        _textos (Dict[str, List[str]]): Campo -> textos já normalizados, por id.
+        _postings (Dict[str, Dict[str, Set[int]]]): Campo -> n-grama (de 1 a TAMANHO_NGRAMA caracteres) -> ids
+            que o contêm.
+    """
+    def __init__(self):
+        self._medicamentos: List[Medicamento] = []
+        self._por_laboratorio: Dict[str, List[int]] = {}
+        self._textos: Dict[str, List[str]] = {campo: [] for campo in CAMPOS_TEXTO}
+        self._postings: Dict[str, Dict[str, Set[int]]] = {campo: {} for campo in CAMPOS_TEXTO}
+
+    def __len__(self) -> int:
+        return len(self._medicamentos)
+
+    def adicionar(self, med: Medicamento) -> None:
+        """Indexa um medicamento recém-cadastrado."""
+        doc_id = len(self._medicamentos)
+        self._medicamentos.append(med)
+        self._por_laboratorio.setdefault(med.laboratorio.nome.lower(), []).append(doc_id)
+        for campo in CAMPOS_TEXTO:
+            texto = getattr(med, campo).lower()
+            self._textos[campo].append(texto)
+            postings = self._postings[campo]
+            for n in range(1, TAMANHO_NGRAMA + 1):
+                for grama in _ngramas(texto, n):
+                    postings.setdefault(grama, set()).add(doc_id)
+
+    def buscar_por_laboratorio(self, nome_laboratorio: str) -> List[Medicamento]:
+        """Retorna os medicamentos do laboratório (sem diferenciar maiúsculas), na ordem de cadastro."""
+        ids = self._por_laboratorio.get(nome_laboratorio.strip().lower(), [])
+        return [self._medicamentos[i] for i in ids]
+
+    def _candidatos(self, campo: str, termo: str) -> Sequence[int]:
+        """Ids que podem conter `termo` no campo, a partir da interseção das listas de n-gramas."""
+        postings = self._postings[campo]
+        if len(termo) < TAMANHO_NGRAMA:
+            # Termos curtos são eles mesmos um n-grama indexado: a lista já é exata.
+            return postings.get(termo, ())
+        listas = []
+        for grama in _ngramas(termo):
+            ids = postings.get(grama)
+            if not ids:
+                return ()
+            listas.append(ids)
+        listas.sort(key=len)
+        resultado = set(listas[0])
+        for ids in listas[1:]:
+            resultado &= ids
+            if not resultado:
+                break
+        return resultado
+
+    def buscar_texto(self, termo: str, campos: Sequence[str] = CAMPOS_TEXTO,
+                     limite: Optional[int] = None) -> List[Medicamento]:
+        """
+        Busca `termo` como trecho (sem diferenciar maiúsculas) nos campos informados.
+
+        Os resultados vêm ordenados por relevância: campo de maior prioridade,
+        texto idêntico ao termo, termo no início de uma palavra, posição da
+        ocorrência e, por fim, nome do medicamento.
+        """
+        termo = termo.strip().lower()
+        if not termo:
+            return []
+        melhores: Dict[int, Tuple[int, int, int]] = {}
+        for prioridade, campo in enumerate(campos):
+            textos = self._textos[campo]
+            for doc_id in self._candidatos(campo, termo):
+                texto = textos[doc_id]
+                pos = texto.find(termo)
+                if pos < 0:
+                    continue
+                if texto == termo:
+                    tipo = 0
+                elif pos == 0 or not texto[pos - 1].isalnum():
+                    tipo = 1
+                else:
+                    tipo = 2
+                chave = (prioridade, tipo, pos)
+                atual = melhores.get(doc_id)
+                if atual is None or chave < atual:
+                    melhores[doc_id] = chave
+        ordenados = sorted(melhores,
+                           key=lambda i: (melhores[i], self._medicamentos[i].nome.lower()))
+        if limite is not None:
+            ordenados = ordenados[:limite]
+        return [self._medicamentos[i] for i in ordenados]
@@ -0,0 +1,294 @@
+"""
+Índice de nomes de medicamentos para o balcão: autocompletar pelo início do
+nome e sugestões "você quis dizer" para nomes digitados com erro.
+
+Os nomes são comparados já normalizados (sem acentos, sem diferenciar
+maiúsculas e com espaços simples), de modo que "Dipirona", "DIPIRONA" e
+"dipiróna" são o mesmo nome.
+"""
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import merge
+from operator import itemgetter
+from typing import Dict, Iterator, List, Tuple
+
+from entidades.medicamento import Medicamento
+
+try:  # rapidfuzz é opcional: calcula a distância de edição em C, bem mais rápido.
+    from rapidfuzz.distance import Levenshtein as _levenshtein_c
+except ImportError:  # pragma: no cover - depende do ambiente
+    _levenshtein_c = None
+
+# Inserções acumuladas no bloco de novidades antes de fundi-lo ao arranjo principal:
+# no mínimo LIMITE_NOVIDADES, ou 1/FRACAO_NOVIDADES do arranjo, o que for maior.
+LIMITE_NOVIDADES = 4096
+FRACAO_NOVIDADES = 16
+# Palavras mais curtas que isto não entram no índice de sugestões.
+TAMANHO_MINIMO_PALAVRA = 3
+
+
+def normalizar(texto: str) -> str:
+    """Remove acentos, converte para minúsculas (casefold) e reduz os espaços a um só."""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def tolerancia_para(palavra: str) -> int:
+    """Erros de digitação aceitos numa palavra: 1 até 5 letras, 2 acima disso."""
+    return 1 if len(palavra) <= 5 else 2
+
+
+class PadraoEdicao:
+    """
+    Palavra preparada para o cálculo da distância de Levenshtein contra muitos
+    textos (algoritmo bit-paralelo de Myers/Hyyrö): cada comparação custa
+    O(len(texto)) operações sobre inteiros, em vez de uma tabela len x len.
+
+    Atributos:
+        palavra (str): Palavra de referência.
+        _mascaras (Dict[str, int]): Letra -> bits das posições em que aparece na palavra.
+    """
+    __slots__ = ("palavra", "_mascaras", "_cheio", "_topo")
+
+    def __init__(self, palavra: str):
+        self.palavra = palavra
+        self._mascaras: Dict[str, int] = {}
+        for i, letra in enumerate(palavra):
+            self._mascaras[letra] = self._mascaras.get(letra, 0) | (1 << i)
+        self._cheio = (1 << len(palavra)) - 1
+        self._topo = 1 << (len(palavra) - 1) if palavra else 0
+
+    def distancia(self, texto: str) -> int:
+        """Distância de Levenshtein entre a palavra e `texto`."""
+        if _levenshtein_c is not None:
+            return _levenshtein_c.distance(self.palavra, texto)
+        if not self.palavra:
+            return len(texto)
+        mascaras, cheio, topo = self._mascaras, self._cheio, self._topo
+        vp, vn, distancia = cheio, 0, len(self.palavra)
+        for letra in texto:
+            eq = mascaras.get(letra, 0)
+            xv = eq | vn
+            xh = (((eq & vp) + vp) ^ vp) | eq
+            hp = vn | (~(xh | vp) & cheio)
+            hn = vp & xh
+            if hp & topo:
+                distancia += 1
+            elif hn & topo:
+                distancia -= 1
+            hp = ((hp << 1) | 1) & cheio
+            hn = (hn << 1) & cheio
+            vp = hn | (~(xv | hp) & cheio)
+            vn = hp & xv
+        return distancia
+
+
+class IndicePrefixos:
+    """
+    Arranjo ordenado de (nome normalizado, medicamento) para busca por prefixo
+    com bisect.
+
+    Inserções vão para um pequeno bloco de novidades, também ordenado, que é
+    fundido ao arranjo principal quando cresce além de uma fração dele; assim o
+    custo de cadastro fica amortizado (as fusões são lineares e cada vez mais
+    espaçadas) mesmo com milhões de nomes, e cada consulta faz duas buscas binárias.
+
+    Atributos:
+        _chaves (List[str]): Nomes normalizados do arranjo principal, ordenados.
+        _itens (List[Medicamento]): Medicamentos na mesma ordem de `_chaves`.
+        _novidades (List[Tuple[str, int, Medicamento]]): Inserções ainda não fundidas, ordenadas.
+    """
+    def __init__(self):
+        self._chaves: List[str] = []
+        self._itens: List[Medicamento] = []
+        self._novidades: List[Tuple[str, int, Medicamento]] = []
+        self._inseridos = 0
+
+    def __len__(self) -> int:
+        return len(self._chaves) + len(self._novidades)
+
+    def adicionar(self, chave: str, med: Medicamento) -> None:
+        # O contador desempata chaves iguais sem comparar medicamentos.
+        insort(self._novidades, (chave, self._inseridos, med))
+        self._inseridos += 1
+        if len(self._novidades) >= max(LIMITE_NOVIDADES, len(self._chaves) // FRACAO_NOVIDADES):
+            self._fundir()
+
+    def _fundir(self) -> None:
+        fundido = list(zip(self._chaves, self._itens))
+        fundido.extend((chave, med) for chave, _, med in self._novidades)
+        # Duas sequências já ordenadas: o timsort as intercala em tempo linear (e é estável).
+        fundido.sort(key=itemgetter(0))
+        self._chaves = [chave for chave, _ in fundido]
+        self._itens = [med for _, med in fundido]
+        self._novidades = []
+
+    def _faixa(self, prefixo: str) -> Iterator[Tuple[str, Medicamento]]:
+        chaves, itens = self._chaves, self._itens
+        i = bisect_left(chaves, prefixo)
+        while i < len(chaves) and chaves[i].startswith(prefixo):
+            yield chaves[i], itens[i]
+            i += 1
+
+    def _faixa_novidades(self, prefixo: str) -> Iterator[Tuple[str, Medicamento]]:
+        novidades = self._novidades
+        i = bisect_left(novidades, (prefixo,))
+        while i < len(novidades) and novidades[i][0].startswith(prefixo):
+            yield novidades[i][0], novidades[i][2]
+            i += 1
+
+    def completar(self, prefixo: str, limite: int = 10) -> List[Tuple[str, Medicamento]]:
+        """Até `limite` pares (nome normalizado, medicamento) que começam com `prefixo`, em ordem."""
+        resultado = []
+        for par in merge(self._faixa(prefixo), self._faixa_novidades(prefixo), key=lambda t: t[0]):
+            if len(resultado) >= limite:
+                break
+            resultado.append(par)
+        return resultado
+
+
+class ArvoreBK:
+    """
+    Árvore BK sobre palavras, com distância de edição: encontra todas as
+    palavras a no máximo `tolerancia` edições de um termo visitando só os ramos
+    que a desigualdade triangular não descarta.
+
+    Atributos:
+        _palavras (List[str]): Palavra de cada nó; o nó 0 é a raiz.
+        _filhos (List[Dict[int, int]]): Por nó, distância -> nó filho.
+    """
+    def __init__(self):
+        self._palavras: List[str] = []
+        self._filhos: List[Dict[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._palavras)
+
+    def adicionar(self, palavra: str) -> bool:
+        """Insere a palavra; retorna False se ela já estava na árvore."""
+        if not self._palavras:
+            self._palavras.append(palavra)
+            self._filhos.append({})
+            return True
+        padrao = PadraoEdicao(palavra)
+        no = 0
+        while True:
+            d = padrao.distancia(self._palavras[no])
+            if d == 0:
+                return False
+            filho = self._filhos[no].get(d)
+            if filho is None:
+                self._palavras.append(palavra)
+                self._filhos.append({})
+                self._filhos[no][d] = len(self._palavras) - 1
+                return True
+            no = filho
+
+    def buscar(self, termo: str, tolerancia: int) -> List[Tuple[int, str]]:
+        """Pares (distância, palavra) a no máximo `tolerancia` edições do termo, dos mais próximos aos mais longe."""
+        if not self._palavras:
+            return []
+        padrao = PadraoEdicao(termo)
+        palavras, todos_filhos = self._palavras, self._filhos
+        encontrados = []
+        pendentes = [0]
+        while pendentes:
+            no = pendentes.pop()
+            d = padrao.distancia(palavras[no])
+            if d <= tolerancia:
+                encontrados.append((d, palavras[no]))
+            for distancia_filho, filho in todos_filhos[no].items():
+                if d - tolerancia <= distancia_filho <= d + tolerancia:
+                    pendentes.append(filho)
+        encontrados.sort()
+        return encontrados
+
+
+class IndiceNomes:
+    """
+    Índice de nomes do catálogo: nome normalizado exato, autocompletar por
+    prefixo e sugestões tolerantes a erros de digitação.
+
+    Atributos:
+        prefixos (IndicePrefixos): Nomes normalizados ordenados, para busca por prefixo.
+        palavras (ArvoreBK): Palavras distintas dos nomes, para sugestões aproximadas.
+        _por_nome (Dict[str, List[Medicamento]]): Nome normalizado -> medicamentos.
+        _por_palavra (Dict[str, List[Medicamento]]): Palavra normalizada -> medicamentos que a contêm.
+    """
+    def __init__(self):
+        self.prefixos = IndicePrefixos()
+        self.palavras = ArvoreBK()
+        self._por_nome: Dict[str, List[Medicamento]] = {}
+        self._por_palavra: Dict[str, List[Medicamento]] = {}
+
+    def __len__(self) -> int:
+        return len(self.prefixos)
+
+    def adicionar(self, med: Medicamento) -> None:
+        """Indexa o nome de um medicamento recém-cadastrado."""
+        chave = normalizar(med.nome)
+        self._por_nome.setdefault(chave, []).append(med)
+        self.prefixos.adicionar(chave, med)
+        for palavra in set(chave.split()):
+            if len(palavra) < TAMANHO_MINIMO_PALAVRA or not palavra.isalpha():
+                continue
+            meds = self._por_palavra.get(palavra)
+            if meds is None:
+                self._por_palavra[palavra] = [med]
+                self.palavras.adicionar(palavra)
+            else:
+                meds.append(med)
+
+    def buscar_exato(self, nome: str) -> List[Medicamento]:
+        """Medicamentos cujo nome é igual ao informado, ignorando acentos, maiúsculas e espaços extras."""
+        return list(self._por_nome.get(normalizar(nome), ()))
+
+    def completar(self, prefixo: str, limite: int = 10) -> List[Medicamento]:
+        """Até `limite` medicamentos cujo nome começa com `prefixo`, em ordem alfabética."""
+        prefixo = normalizar(prefixo)
+        if not prefixo:
+            return []
+        return [med for _, med in self.prefixos.completar(prefixo, limite)]
+
+    def sugerir(self, termo: str, limite: int = 5) -> List[Medicamento]:
+        """
+        Sugestões para um nome digitado com erro: medicamentos cujo nome tem,
+        para cada palavra do termo, uma palavra parecida. Os mais próximos
+        (menor soma de edições) vêm primeiro.
+        """
+        palavras = [p for p in normalizar(termo).split() if len(p) >= TAMANHO_MINIMO_PALAVRA and p.isalpha()]
+        if not palavras:
+            return []
+        # Por palavra do termo: palavra do índice -> edições. Uma palavra que existe
+        # como foi digitada dispensa a árvore.
+        candidatas: List[Dict[str, int]] = []
+        for palavra in palavras:
+            if palavra in self._por_palavra:
+                candidatas.append({palavra: 0})
+                continue
+            # Procura primeiro a uma edição; só se nada aparecer, com a tolerância toda.
+            parecidas = self.palavras.buscar(palavra, 1)
+            if not parecidas and tolerancia_para(palavra) > 1:
+                parecidas = self.palavras.buscar(palavra, tolerancia_para(palavra))
+            if not parecidas:
+                return []
+            candidatas.append({parecida: d for d, parecida in reversed(parecidas)})
+        # Começa pela palavra mais rara: as demais só filtram os medicamentos já encontrados.
+        candidatas.sort(key=lambda distancias: sum(len(self._por_palavra[p]) for p in distancias))
+        pontuacao: Dict[int, Tuple[int, Medicamento]] = {}
+        for parecida, d in sorted(candidatas[0].items(), key=itemgetter(1)):
+            for med in self._por_palavra[parecida]:
+                pontuacao.setdefault(id(med), (d, med))
+        for distancias in candidatas[1:]:
+            # Todas as palavras do termo precisam aparecer (aproximadamente) no nome.
+            filtrada = {}
+            for chave, (d, med) in pontuacao.items():
+                melhor = min((distancias[p] for p in normalizar(med.nome).split() if p in distancias), default=None)
+                if melhor is not None:
+                    filtrada[chave] = (d + melhor, med)
+            pontuacao = filtrada
+            if not pontuacao:
+                return []
+        ordenados = sorted(pontuacao.values(), key=lambda par: (par[0], par[1].nome.casefold()))
+        return [med for _, med in ordenados[:limite]]
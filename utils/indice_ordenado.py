@@ -0,0 +1,118 @@
+from bisect import bisect_right
+from itertools import islice
+from typing import Callable, Generic, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Inserções acumuladas no bloco de novidades antes de fundi-lo ao arranjo principal:
+# no mínimo LIMITE_NOVIDADES, ou 1/FRACAO_NOVIDADES do arranjo, o que for maior.
+LIMITE_NOVIDADES = 1024
+FRACAO_NOVIDADES = 16
+
+
+class IndiceOrdenado(Generic[T]):
+    """
+    Container ordenado, para listagens em ordem alfabética sem reordenar a
+    coleção inteira a cada consulta.
+
+    Como em `IndicePrefixos`, as inserções vão para um pequeno bloco de
+    novidades, também ordenado, que é fundido ao arranjo principal quando
+    cresce além de uma fração dele: o cadastro não desloca o arranjo inteiro a
+    cada item, e as fusões (lineares) ficam cada vez mais espaçadas. As
+    consultas intercalam as duas partes sem alterá-las.
+
+    Empates na chave preservam a ordem de inserção, como um sort estável.
+
+    Atributos:
+        _chave (Callable[[T], str]): Função que extrai a chave de ordenação.
+        _chaves (List[Tuple[str, int]]): (chave, ordem de inserção) de cada item do arranjo principal, ordenadas.
+        _itens (List[T]): Itens do arranjo principal, na mesma ordem de `_chaves`.
+        _chaves_novas (List[Tuple[str, int]]): Chaves das inserções ainda não fundidas, ordenadas.
+        _itens_novos (List[T]): Itens ainda não fundidos, na mesma ordem de `_chaves_novas`.
+    """
+    def __init__(self, chave: Callable[[T], str]):
+        self._chave = chave
+        self._chaves: List[Tuple[str, int]] = []
+        self._itens: List[T] = []
+        self._chaves_novas: List[Tuple[str, int]] = []
+        self._itens_novos: List[T] = []
+        self._inseridos = 0
+
+    def __len__(self) -> int:
+        return len(self._itens) + len(self._itens_novos)
+
+    def __iter__(self) -> Iterator[T]:
+        return self._percorrer(0, 0)
+
+    def adicionar(self, item: T) -> None:
+        chave = (self._chave(item), self._inseridos)
+        self._inseridos += 1
+        pos = bisect_right(self._chaves_novas, chave)
+        self._chaves_novas.insert(pos, chave)
+        self._itens_novos.insert(pos, item)
+        if len(self._chaves_novas) >= max(LIMITE_NOVIDADES, len(self._chaves) // FRACAO_NOVIDADES):
+            self._fundir()
+
+    def _fundir(self) -> None:
+        # Cada novidade entra na sua posição do arranjo principal; os trechos entre
+        # elas são copiados em bloco, então a fusão custa uma cópia linear.
+        antigas, itens_antigos = self._chaves, self._itens
+        chaves: List[Tuple[str, int]] = []
+        itens: List[T] = []
+        inicio = 0
+        for chave, item in zip(self._chaves_novas, self._itens_novos):
+            fim = bisect_right(antigas, chave, inicio)
+            chaves += antigas[inicio:fim]
+            chaves.append(chave)
+            itens += itens_antigos[inicio:fim]
+            itens.append(item)
+            inicio = fim
+        chaves += antigas[inicio:]
+        itens += itens_antigos[inicio:]
+        self._chaves, self._itens = chaves, itens
+        self._chaves_novas = []
+        self._itens_novos = []
+
+    def _dividir(self, k: int) -> Tuple[int, int]:
+        """Quantos dos `k` primeiros itens (na ordem geral) vêm do arranjo principal e quantos das novidades."""
+        chaves, novas = self._chaves, self._chaves_novas
+        baixo, alto = max(0, k - len(novas)), min(k, len(chaves))
+        while baixo < alto:
+            i = (baixo + alto) // 2
+            if chaves[i] < novas[k - i - 1]:
+                baixo = i + 1
+            else:
+                alto = i
+        return baixo, k - baixo
+
+    def _percorrer(self, i: int, j: int) -> Iterator[T]:
+        """Intercala o arranjo principal a partir de `i` e as novidades a partir de `j`."""
+        chaves, itens = self._chaves, self._itens
+        novas, itens_novos = self._chaves_novas, self._itens_novos
+        while i < len(chaves) and j < len(novas):
+            if novas[j] < chaves[i]:
+                yield itens_novos[j]
+                j += 1
+            else:
+                yield itens[i]
+                i += 1
+        for i in range(i, len(itens)):
+            yield itens[i]
+        for j in range(j, len(itens_novos)):
+            yield itens_novos[j]
+
+    def pagina(self, numero: int, tamanho: int) -> List[T]:
+        """Retorna a página `numero` (a partir de 1) com até `tamanho` itens."""
+        inicio = (numero - 1) * tamanho
+        if not 0 <= inicio < len(self):
+            return []
+        return list(islice(self._percorrer(*self._dividir(inicio)), tamanho))
+
+    def paginas(self, tamanho: int) -> Iterator[List[T]]:
+        """Gera as páginas sob demanda; cada página custa O(tamanho)."""
+        itens = iter(self)
+        while True:
+            pagina = list(islice(itens, tamanho))
+            if not pagina:
+                return
+            yield pagina
@@ -0,0 +1,288 @@
+"""
+Instrumentação leve das operações: contadores e histogramas de latência por
+operação, com exportação no formato texto do Prometheus.
+
+As funções são marcadas com o decorador `instrumentar`. Com as métricas
+desligadas (padrão), o custo por chamada é só o de um teste de booleano antes
+de chamar a função original.
+"""
+import functools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Precisão dos histogramas: 2**BITS_PRECISAO sub-faixas por potência de 2 (erro relativo < 1/32).
+BITS_PRECISAO = 5
+_SUB = 1 << BITS_PRECISAO
+
+# Quantis exportados e exibidos.
+QUANTIS = (0.5, 0.9, 0.99, 0.999)
+
+PREFIXO_PROMETHEUS = "farmacia"
+
+
+class HistogramaLatencia:
+    """
+    Histograma log-linear no estilo HDR: cada potência de 2 é dividida em 32
+    sub-faixas de mesma largura, de modo que qualquer valor é registrado com
+    erro relativo abaixo de ~3%, em memória proporcional ao log do maior valor.
+
+    Os valores são inteiros (nanossegundos); o registro é O(1).
+
+    Atributos:
+        contagens (List[int]): Ocorrências por faixa.
+        total (int): Quantidade de valores registrados.
+        soma (int): Soma dos valores registrados.
+        minimo (int): Menor valor registrado.
+        maximo (int): Maior valor registrado.
+    """
+    def __init__(self):
+        self.contagens: List[int] = []
+        self.total = 0
+        self.soma = 0
+        self.minimo = 0
+        self.maximo = 0
+
+    @staticmethod
+    def indice(valor: int) -> int:
+        if valor < 2 * _SUB:
+            return valor
+        deslocamento = valor.bit_length() - BITS_PRECISAO - 1
+        return (deslocamento + 1) * _SUB + (valor >> deslocamento) - _SUB
+
+    @staticmethod
+    def limite_inferior(indice: int) -> int:
+        """Menor valor que cai na faixa `indice`."""
+        if indice < 2 * _SUB:
+            return indice
+        deslocamento = indice // _SUB - 1
+        return (indice % _SUB + _SUB) << deslocamento
+
+    @classmethod
+    def limite_superior(cls, indice: int) -> int:
+        """Maior valor que cai na faixa `indice`."""
+        return cls.limite_inferior(indice + 1) - 1
+
+    def registrar(self, valor: int) -> None:
+        if valor < 0:
+            valor = 0
+        i = self.indice(valor)
+        contagens = self.contagens
+        if i >= len(contagens):
+            contagens.extend([0] * (i + 1 - len(contagens)))
+        contagens[i] += 1
+        if not self.total or valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+        self.total += 1
+        self.soma += valor
+
+    def mesclar(self, outro: "HistogramaLatencia") -> None:
+        """Soma os registros de `outro` a este histograma."""
+        if not outro.total:
+            return
+        if len(outro.contagens) > len(self.contagens):
+            self.contagens.extend([0] * (len(outro.contagens) - len(self.contagens)))
+        for i, n in enumerate(outro.contagens):
+            self.contagens[i] += n
+        self.minimo = outro.minimo if not self.total else min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self.total += outro.total
+        self.soma += outro.soma
+
+    def percentil(self, quantil: float) -> int:
+        """Valor abaixo do qual está a fração `quantil` (0 a 1) dos registros."""
+        if not self.total:
+            return 0
+        alvo = max(1, int(round(quantil * self.total)))
+        acumulado = 0
+        for i, n in enumerate(self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                return min(self.maximo, max(self.minimo, self.limite_superior(i)))
+        return self.maximo
+
+    def media(self) -> float:
+        return self.soma / self.total if self.total else 0.0
+
+
+class MetricaOperacao:
+    """
+    Contadores e latências de uma operação instrumentada.
+
+    Atributos:
+        nome (str): Nome da operação (ex.: "services.buscar_medicamentos").
+        chamadas (int): Chamadas concluídas (com ou sem erro).
+        erros (int): Chamadas que terminaram em exceção.
+        latencias (HistogramaLatencia): Duração das chamadas, em nanossegundos.
+    """
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.chamadas = 0
+        self.erros = 0
+        self.latencias = HistogramaLatencia()
+        self._trava = threading.Lock()
+
+    def registrar(self, duracao_ns: int, erro: bool = False) -> None:
+        with self._trava:
+            self.chamadas += 1
+            if erro:
+                self.erros += 1
+            self.latencias.registrar(duracao_ns)
+
+    def copia(self) -> "MetricaOperacao":
+        """Cópia consistente para leitura, feita sob a trava da operação."""
+        copia = MetricaOperacao(self.nome)
+        with self._trava:
+            copia.chamadas, copia.erros = self.chamadas, self.erros
+            copia.latencias.mesclar(self.latencias)
+        return copia
+
+
+class RegistroMetricas:
+    """
+    Conjunto das métricas do processo: operações instrumentadas e contadores avulsos.
+
+    Atributos:
+        ativo (bool): Se as chamadas instrumentadas estão sendo medidas.
+        operacoes (Dict[str, MetricaOperacao]): Métricas por nome de operação.
+        contadores (Dict[str, int]): Contadores incrementados com `contar`.
+        inicio (float): Momento (time.time) da criação ou do último `zerar`.
+    """
+    def __init__(self, ativo: bool = False):
+        self.ativo = ativo
+        self.operacoes: Dict[str, MetricaOperacao] = {}
+        self.contadores: Dict[str, int] = {}
+        self.inicio = time.time()
+        self._trava = threading.Lock()
+
+    def operacao(self, nome: str) -> MetricaOperacao:
+        metrica = self.operacoes.get(nome)
+        if metrica is None:
+            with self._trava:
+                metrica = self.operacoes.setdefault(nome, MetricaOperacao(nome))
+        return metrica
+
+    def contar(self, nome: str, quantidade: int = 1) -> None:
+        if not self.ativo:
+            return
+        with self._trava:
+            self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def zerar(self) -> None:
+        with self._trava:
+            self.operacoes = {}
+            self.contadores = {}
+            self.inicio = time.time()
+
+    def instantaneo(self) -> Tuple[List[MetricaOperacao], Dict[str, int]]:
+        """Cópia de todas as métricas, ordenadas por nome, para exibir ou exportar."""
+        with self._trava:
+            operacoes = list(self.operacoes.values())
+            contadores = dict(self.contadores)
+        return sorted((m.copia() for m in operacoes), key=lambda m: m.nome), contadores
+
+
+# Registro único do processo. Ligado por `habilitar()` ou pela variável FARMACIA_METRICAS=1.
+registro = RegistroMetricas(os.environ.get("FARMACIA_METRICAS", "0") == "1")
+
+
+def habilitar() -> None:
+    registro.ativo = True
+
+
+def desabilitar() -> None:
+    registro.ativo = False
+
+
+def contar(nome: str, quantidade: int = 1) -> None:
+    """Incrementa um contador avulso (ignorado com as métricas desligadas)."""
+    registro.contar(nome, quantidade)
+
+
+def instrumentar(nome: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorador que mede a duração e conta as chamadas (e exceções) da função.
+    O nome padrão da operação é "<módulo>.<função>".
+    """
+    def decorador(funcao: Callable) -> Callable:
+        nome_operacao = nome or f"{funcao.__module__}.{funcao.__qualname__}"
+        relogio = time.perf_counter_ns
+
+        @functools.wraps(funcao)
+        def instrumentada(*args, **kwargs):
+            if not registro.ativo:
+                return funcao(*args, **kwargs)
+            inicio = relogio()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except BaseException:
+                registro.operacao(nome_operacao).registrar(relogio() - inicio, erro=True)
+                raise
+            registro.operacao(nome_operacao).registrar(relogio() - inicio)
+            return resultado
+
+        return instrumentada
+    return decorador
+
+
+def formatar_duracao(ns: float) -> str:
+    if ns >= 1e9:
+        return f"{ns / 1e9:.2f}s"
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f}ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.1f}us"
+    return f"{ns:.0f}ns"
+
+
+def _nome_prometheus(nome: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in nome)
+
+
+def _rotulo(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def texto_prometheus(alvo: Optional[RegistroMetricas] = None) -> str:
+    """
+    Métricas no formato de exposição em texto do Prometheus: por operação, um
+    `summary` de latência em segundos (quantis, _sum e _count) e um contador de
+    erros; cada contador avulso vira um `counter`.
+    """
+    alvo = alvo or registro
+    operacoes, contadores = alvo.instantaneo()
+    base = f"{PREFIXO_PROMETHEUS}_operacao"
+    linhas = [f"# HELP {base}_duracao_segundos Duração das operações instrumentadas.",
+              f"# TYPE {base}_duracao_segundos summary"]
+    for metrica in operacoes:
+        rotulo = f'operacao="{_rotulo(metrica.nome)}"'
+        for q in QUANTIS:
+            linhas.append(f'{base}_duracao_segundos{{{rotulo},quantile="{q}"}} '
+                          f'{metrica.latencias.percentil(q) / 1e9:.9f}')
+        linhas.append(f"{base}_duracao_segundos_sum{{{rotulo}}} {metrica.latencias.soma / 1e9:.9f}")
+        linhas.append(f"{base}_duracao_segundos_count{{{rotulo}}} {metrica.chamadas}")
+    linhas += [f"# HELP {base}_erros_total Chamadas encerradas com exceção.",
+               f"# TYPE {base}_erros_total counter"]
+    for metrica in operacoes:
+        linhas.append(f'{base}_erros_total{{operacao="{_rotulo(metrica.nome)}"}} {metrica.erros}')
+    for nome, valor in sorted(contadores.items()):
+        metrica_nome = f"{PREFIXO_PROMETHEUS}_{_nome_prometheus(nome)}_total"
+        linhas += [f"# TYPE {metrica_nome} counter", f"{metrica_nome} {valor}"]
+    linhas += [f"# TYPE {PREFIXO_PROMETHEUS}_metricas_inicio_segundos gauge",
+               f"{PREFIXO_PROMETHEUS}_metricas_inicio_segundos {alvo.inicio:.3f}"]
+    return "\n".join(linhas) + "\n"
+
+
+def exportar_prometheus(caminho: str, alvo: Optional[RegistroMetricas] = None) -> None:
+    """
+    Grava o instantâneo das métricas em `caminho` (formato texto do Prometheus).
+    A troca é atômica, para que um coletor (ex.: textfile do node_exporter)
+    nunca leia um arquivo pela metade.
+    """
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(texto_prometheus(alvo))
+    os.replace(temporario, caminho)
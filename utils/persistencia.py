@@ -0,0 +1,405 @@
+import contextlib
+import datetime
+import os
+import pickle
+import struct
+import threading
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+from entidades.cliente import Cliente
+from entidades.laboratorio import Laboratorio
+from entidades.medicamento import Medicamento, MedicamentoQuimioterapico, MedicamentoFitoterapico
+from entidades.venda import Venda
+from data import clientes, laboratorios, medicamentos, vendas, estoque
+
+# Tipos de evento gravados no log.
+EVENTO_LABORATORIO = "L"
+EVENTO_MEDICAMENTO = "M"
+EVENTO_CLIENTE = "C"
+EVENTO_VENDA = "V"
+EVENTO_ESTOQUE = "E"
+
+ARQUIVO_LOG = "eventos.log"
+ARQUIVO_SNAPSHOT = "snapshot.bin"
+MAGIC_SNAPSHOT = b"FARMSNP1"
+# Cabeçalho de cada registro do log: tamanho do payload, CRC32 do payload, número de sequência.
+CABECALHO_LOG = struct.Struct("<IIQ")
+# Quantidade de registros por bloco serializado no snapshot.
+TAMANHO_BLOCO_SNAPSHOT = 10_000
+
+
+# ---------------------------------------------------------------------------
+# Conversão entidade <-> tupla (formato estável, independente das classes)
+# ---------------------------------------------------------------------------
+
+def laboratorio_para_tupla(lab: Laboratorio) -> tuple:
+    return (lab.nome, lab.endereco, lab.telefone, lab.cidade, lab.estado)
+
+
+def medicamento_para_tupla(med: Medicamento) -> tuple:
+    if isinstance(med, MedicamentoQuimioterapico):
+        return ("Q", med.nome, med.composto_principal, med.laboratorio.nome, med.descricao,
+                med.preco, med.necessita_receita)
+    return ("F", med.nome, med.composto_principal, med.laboratorio.nome, med.descricao, med.preco, False)
+
+
+def cliente_para_tupla(cli: Cliente) -> tuple:
+    return (cli.cpf, cli.nome, cli.data_nascimento.toordinal())
+
+
+def venda_para_tupla(venda: Venda) -> tuple:
+    itens = tuple((med.nome, qtde, preco) for med, qtde, preco in venda.itens_precificados())
+    return (venda.data_hora.timestamp(), venda.cliente.cpf, itens, venda.valor_total,
+            venda.desconto, venda.tipo_desconto, venda.loja)
+
+
+def estoque_para_tupla(registro: tuple) -> tuple:
+    # registro: (medicamento, quantidade, mínimo ou None, reposição?). Na reposição a
+    # quantidade é somada ao estoque em mãos; senão, passa a ser o estoque em mãos.
+    med, quantidade, minimo, reposicao = registro
+    return (med.nome, quantidade, minimo, reposicao)
+
+
+def tupla_para_laboratorio(t: tuple) -> Laboratorio:
+    return Laboratorio(*t)
+
+
+def tupla_para_medicamento(t: tuple) -> Medicamento:
+    tipo, nome, composto, lab_nome, descricao, preco, necessita_receita = t
+    lab = laboratorios[lab_nome]
+    if tipo == "Q":
+        return MedicamentoQuimioterapico(nome, composto, lab, descricao, preco, necessita_receita)
+    return MedicamentoFitoterapico(nome, composto, lab, descricao, preco)
+
+
+def tupla_para_cliente(t: tuple) -> Cliente:
+    cpf, nome, ordinal = t
+    return Cliente(cpf, nome, datetime.date.fromordinal(ordinal))
+
+
+def tupla_para_venda(t: tuple) -> Venda:
+    ts, cpf, itens, valor_total, desconto, tipo_desconto, loja = t
+    return Venda(datetime.datetime.fromtimestamp(ts), [(medicamentos[nome], qtde) for nome, qtde, _ in itens],
+                 clientes[cpf], valor_total, desconto, tipo_desconto, loja, [preco for _, _, preco in itens])
+
+
+PARA_TUPLA = {
+    EVENTO_LABORATORIO: laboratorio_para_tupla,
+    EVENTO_MEDICAMENTO: medicamento_para_tupla,
+    EVENTO_CLIENTE: cliente_para_tupla,
+    EVENTO_VENDA: venda_para_tupla,
+    EVENTO_ESTOQUE: estoque_para_tupla,
+}
+
+
+# ---------------------------------------------------------------------------
+# Log de escrita antecipada (append-only)
+# ---------------------------------------------------------------------------
+
+def ler_log(caminho: str) -> Iterator[Tuple[int, int, tuple]]:
+    """
+    Gera (seq, offset_final, evento) para cada registro íntegro do log.
+    A leitura para no primeiro registro truncado ou corrompido (escrita interrompida).
+    """
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, "rb") as arq:
+        offset = 0
+        while True:
+            cabecalho = arq.read(CABECALHO_LOG.size)
+            if len(cabecalho) < CABECALHO_LOG.size:
+                return
+            tamanho, crc, seq = CABECALHO_LOG.unpack(cabecalho)
+            payload = arq.read(tamanho)
+            if len(payload) < tamanho or zlib.crc32(payload) != crc:
+                return
+            offset += CABECALHO_LOG.size + tamanho
+            yield seq, offset, pickle.loads(payload)
+
+
+class LogEventos:
+    """
+    Log append-only de eventos com fsync em grupo.
+
+    Cada registro é entregue ao sistema operacional (flush) já em `anexar`, de
+    modo que sobrevive a uma queda do processo. O fsync, que o protege também
+    de uma queda da máquina, é amortizado entre vários eventos: acontece em
+    `anexar` a cada `lote_fsync` eventos e, para os que sobram, numa thread de
+    fundo a cada `intervalo_fsync` segundos (0 desliga a thread).
+
+    Atributos:
+        caminho (str): Arquivo do log.
+        seq (int): Número de sequência do último evento gravado.
+        pendentes (int): Eventos gravados desde o último fsync.
+        eventos_no_log (int): Eventos presentes no arquivo atual.
+    """
+    def __init__(self, caminho: str, seq_inicial: int, offset_valido: int, eventos_no_log: int,
+                 lote_fsync: int = 256, intervalo_fsync: float = 0.2):
+        self.caminho = caminho
+        self.seq = seq_inicial
+        self.lote_fsync = lote_fsync
+        self.intervalo_fsync = intervalo_fsync
+        self.pendentes = 0
+        self.eventos_no_log = eventos_no_log
+        self._arq = open(caminho, "ab")
+        # Descarta uma eventual cauda corrompida antes de voltar a anexar.
+        self._arq.truncate(offset_valido)
+        # Protege o arquivo entre quem anexa e a thread de fsync.
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._sincronizador: Optional[threading.Thread] = None
+        if intervalo_fsync > 0:
+            self._sincronizador = threading.Thread(target=self._sincronizar_periodicamente,
+                                                   name="fsync-log", daemon=True)
+            self._sincronizador.start()
+
+    def anexar(self, evento: tuple) -> int:
+        payload = pickle.dumps(evento, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._trava:
+            self.seq += 1
+            self._arq.write(CABECALHO_LOG.pack(len(payload), zlib.crc32(payload), self.seq))
+            self._arq.write(payload)
+            self._arq.flush()
+            self.pendentes += 1
+            self.eventos_no_log += 1
+            seq = self.seq
+            lote_cheio = self.pendentes >= self.lote_fsync
+        if lote_cheio:
+            self.sincronizar()
+        return seq
+
+    def sincronizar(self) -> None:
+        """Força a gravação em disco de todos os eventos pendentes."""
+        with self._trava:
+            self._arq.flush()
+            pendentes = self.pendentes
+            if pendentes:
+                os.fsync(self._arq.fileno())
+            self.pendentes -= pendentes
+
+    def _sincronizar_periodicamente(self) -> None:
+        while not self._parar.wait(self.intervalo_fsync):
+            if self.pendentes:
+                self.sincronizar()
+
+    def reiniciar(self) -> None:
+        """Esvazia o log (usado após um snapshot que já contém todos os eventos)."""
+        with self._trava:
+            self._arq.flush()
+            self._arq.truncate(0)
+            self._arq.seek(0)
+            os.fsync(self._arq.fileno())
+            self.pendentes = 0
+            self.eventos_no_log = 0
+
+    def fechar(self) -> None:
+        self._parar.set()
+        if self._sincronizador is not None:
+            self._sincronizador.join()
+        self.sincronizar()
+        self._arq.close()
+
+
+# ---------------------------------------------------------------------------
+# Snapshot binário
+# ---------------------------------------------------------------------------
+
+def _blocos(tipo: str, objetos, conversor) -> Iterator[tuple]:
+    bloco: List[tuple] = []
+    for obj in objetos:
+        bloco.append(conversor(obj))
+        if len(bloco) >= TAMANHO_BLOCO_SNAPSHOT:
+            yield (tipo, bloco)
+            bloco = []
+    if bloco:
+        yield (tipo, bloco)
+
+
+def gravar_snapshot(diretorio: str, seq: int) -> None:
+    """
+    Grava o estado atual de `data` em um snapshot binário que cobre os eventos até `seq`.
+    O arquivo é escrito em um temporário e renomeado, para nunca deixar um snapshot parcial.
+    """
+    destino = os.path.join(diretorio, ARQUIVO_SNAPSHOT)
+    temporario = destino + ".tmp"
+    with open(temporario, "wb") as arq:
+        arq.write(MAGIC_SNAPSHOT)
+        pickle.dump(seq, arq, protocol=pickle.HIGHEST_PROTOCOL)
+        for tipo, objetos in ((EVENTO_LABORATORIO, laboratorios.values()),
+                              (EVENTO_MEDICAMENTO, medicamentos.values()),
+                              (EVENTO_CLIENTE, clientes.values()),
+                              (EVENTO_VENDA, vendas),
+                              # Por último: a posição absoluta prevalece sobre as vendas já reproduzidas.
+                              (EVENTO_ESTOQUE, ((item.medicamento, item.em_maos, item.minimo, False)
+                                                for item in estoque.itens()))):
+            # Cada bloco é um pickle independente, para não acumular o snapshot inteiro em memória.
+            for bloco in _blocos(tipo, objetos, PARA_TUPLA[tipo]):
+                pickle.dump(bloco, arq, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(None, arq, protocol=pickle.HIGHEST_PROTOCOL)
+        arq.flush()
+        os.fsync(arq.fileno())
+    os.replace(temporario, destino)
+
+
+def ler_snapshot(diretorio: str) -> Tuple[int, Iterator[Tuple[str, List[tuple]]]]:
+    """Retorna (seq coberta, gerador de blocos (tipo, tuplas)) do snapshot, ou (0, vazio)."""
+    caminho = os.path.join(diretorio, ARQUIVO_SNAPSHOT)
+    if not os.path.exists(caminho):
+        return 0, iter(())
+    arq = open(caminho, "rb")
+    if arq.read(len(MAGIC_SNAPSHOT)) != MAGIC_SNAPSHOT:
+        arq.close()
+        raise ValueError(f"Snapshot inválido: {caminho}")
+    seq = pickle.load(arq)
+
+    def blocos() -> Iterator[Tuple[str, List[tuple]]]:
+        with arq:
+            while True:
+                bloco = pickle.load(arq)
+                if bloco is None:
+                    return
+                yield bloco
+
+    return seq, blocos()
+
+
+# ---------------------------------------------------------------------------
+# Motor de persistência
+# ---------------------------------------------------------------------------
+
+class MotorPersistencia:
+    """
+    Motor de armazenamento sob as estruturas de `data`.
+
+    Cada cadastro e cada venda confirmada vira um evento no log; a cada
+    `eventos_por_snapshot` eventos o estado completo é compactado em um
+    snapshot e o log é esvaziado. Na abertura, carrega-se o snapshot mais
+    recente e reproduzem-se apenas os eventos posteriores a ele.
+
+    Atributos:
+        diretorio (str): Diretório com o snapshot e o log.
+        eventos_por_snapshot (int): Tamanho do log que dispara uma compactação.
+        log (LogEventos): Log de eventos aberto para escrita.
+    """
+    def __init__(self, diretorio: str, log: LogEventos, eventos_por_snapshot: int):
+        self.diretorio = diretorio
+        self.log = log
+        self.eventos_por_snapshot = eventos_por_snapshot
+        # Serializa a escrita no log entre threads (vários caixas no mesmo processo) e, via
+        # `transacao`, também a mudança de estado que cada evento descreve. É reentrante porque
+        # `registrar` roda dentro de uma transação.
+        self._trava = threading.RLock()
+
+    def registrar(self, tipo: str, obj) -> None:
+        evento = (tipo, PARA_TUPLA[tipo](obj))
+        with self._trava:
+            self.log.anexar(evento)
+            if self.log.eventos_no_log >= self.eventos_por_snapshot:
+                self._compactar()
+
+    def _compactar(self) -> None:
+        self.log.sincronizar()
+        gravar_snapshot(self.diretorio, self.log.seq)
+        self.log.reiniciar()
+
+    def compactar(self) -> None:
+        """Grava um snapshot do estado atual e descarta o log que ele já cobre."""
+        with self._trava:
+            self._compactar()
+
+    def fechar(self) -> None:
+        with self._trava:
+            self.log.fechar()
+
+
+# Motor ativo no processo (None enquanto a persistência não for aberta).
+motor: Optional[MotorPersistencia] = None
+
+
+@contextlib.contextmanager
+def transacao() -> Iterator[None]:
+    """
+    Seção crítica para aplicar uma mudança ao estado de `data` e gravar o seu
+    evento no log: a compactação não roda no meio dela, então um snapshot
+    nunca contém uma mudança cujo evento ainda vai entrar no log (e seria
+    reproduzida duas vezes). Sem persistência aberta, não trava nada.
+    """
+    atual = motor
+    if atual is None:
+        yield
+        return
+    with atual._trava:
+        yield
+
+
+def registrar_evento(tipo: str, obj) -> None:
+    """Anexa o evento ao log do motor ativo; não faz nada se a persistência estiver desligada."""
+    if motor is not None:
+        motor.registrar(tipo, obj)
+
+
+def _aplicar(tipo: str, tupla: tuple) -> None:
+    # Importação tardia: services e motor_vendas dependem deste módulo para registrar os eventos.
+    from services import registrar_cliente, registrar_laboratorio, registrar_medicamento
+    from motor_vendas import registrar_venda
+    if tipo == EVENTO_ESTOQUE:
+        nome, quantidade, minimo, reposicao = tupla
+        if reposicao:
+            estoque.repor([(medicamentos[nome], quantidade)])
+        else:
+            estoque.definir(medicamentos[nome], quantidade, minimo)
+        return
+    if tipo == EVENTO_LABORATORIO:
+        registrar_laboratorio(tupla_para_laboratorio(tupla))
+    elif tipo == EVENTO_MEDICAMENTO:
+        registrar_medicamento(tupla_para_medicamento(tupla))
+    elif tipo == EVENTO_CLIENTE:
+        registrar_cliente(tupla_para_cliente(tupla))
+    elif tipo == EVENTO_VENDA:
+        venda = tupla_para_venda(tupla)
+        registrar_venda(venda)
+        # A venda já tinha baixado o estoque quando foi confirmada.
+        estoque.baixar(venda.itens)
+
+
+def abrir(diretorio: str, eventos_por_snapshot: int = 100_000, lote_fsync: int = 256,
+          intervalo_fsync: float = 0.2) -> MotorPersistencia:
+    """
+    Restaura o estado a partir do diretório (snapshot + log) e ativa a persistência.
+    Deve ser chamada com `data` ainda vazio, antes de qualquer cadastro.
+    """
+    global motor
+    if motor is not None:
+        raise RuntimeError("Persistência já está aberta.")
+    os.makedirs(diretorio, exist_ok=True)
+
+    seq, blocos = ler_snapshot(diretorio)
+    for tipo, tuplas in blocos:
+        for tupla in tuplas:
+            _aplicar(tipo, tupla)
+
+    caminho_log = os.path.join(diretorio, ARQUIVO_LOG)
+    offset_valido = 0
+    eventos_no_log = 0
+    for seq_evento, offset, (tipo, tupla) in ler_log(caminho_log):
+        offset_valido = offset
+        eventos_no_log += 1
+        if seq_evento > seq:
+            _aplicar(tipo, tupla)
+            seq = seq_evento
+
+    log = LogEventos(caminho_log, seq, offset_valido, eventos_no_log, lote_fsync, intervalo_fsync)
+    motor = MotorPersistencia(diretorio, log, eventos_por_snapshot)
+    return motor
+
+
+def fechar(compactar: bool = False) -> None:
+    """Grava os eventos pendentes (e opcionalmente um snapshot) e desativa a persistência."""
+    global motor
+    if motor is None:
+        return
+    if compactar:
+        motor.compactar()
+    motor.fechar()
+    motor = None